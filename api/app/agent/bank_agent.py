@@ -5,8 +5,12 @@ from ..models.exposure_state import ExposureState
 from ..models.responses import CreditDecision
 from ..services.xrpl_client import XRPLClient, XRPLSubmissionError
 from ..services.bank_service import BankService
+from ..services.wallet_cache import wallet_cache
+from ..models.bank import BankRecord
 from xrpl.models.transactions import EscrowCreate
 from xrpl.transaction import autofill
+from xrpl.wallet import Wallet
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,9 +46,9 @@ class BankAgent(BaseAgent):
         policy_ok = self.policy_engine.check(liquidity_request, proof_result)
 
         # Step 3: exposure check
-        exposure_ok = self.exposure_state.can_lend(
-            liquidity_request.business_id,
-            liquidity_request.amount
+        exposure_ok = self.policy_engine.exposure_allows(
+            liquidity_request.amount,
+            self.exposure_state
         )
 
         # Step 4: select eligible bank
@@ -64,7 +68,7 @@ class BankAgent(BaseAgent):
 
         selected_bank = eligible_banks[0]  # pick the top match
         liquidity_request.selected_bank = selected_bank  # store for reference
-        bank_wallet_address = selected_bank["wallet_address"]
+        bank_wallet_address = selected_bank.wallet_address
 
         # Step 5: XRPL transactions (escrow + clawback)
         approved = True
@@ -85,7 +89,7 @@ class BankAgent(BaseAgent):
             )
 
             logger.info(
-                f"Liquidity approved: {liquidity_request.amount} XRP from {selected_bank['bank_name']} to {liquidity_request.business_id}"
+                f"Liquidity approved: {liquidity_request.amount} XRP from {selected_bank.bank_name} to {liquidity_request.business_id}"
             )
 
         except Exception as e:
@@ -99,13 +103,14 @@ class BankAgent(BaseAgent):
             reason=None if approved else "XRPL transaction failed"
         )
 
-    def auto_sign_escrow(self, tx_dict: dict, bank_seed: str) -> dict:
+    def auto_sign_escrow(self, tx_dict: dict, wallet: Wallet, wait: bool = True) -> dict:
         """
         Auto-sign and submit an escrow transaction from a bank.
         
         Args:
             tx_dict: Transaction dictionary (prepared transaction)
-            bank_seed: Bank's XRPL wallet seed
+            wallet: Bank's derived signing wallet (from WalletCache)
+            wait: Block until validated; False returns after the preliminary result
             
         Returns:
             Transaction result with hash and status
@@ -115,7 +120,7 @@ class BankAgent(BaseAgent):
             tx = EscrowCreate.from_dict(tx_dict)
             
             # Sign and submit with bank wallet
-            result = self.xrpl_client.sign_and_submit_with_wallet(tx, bank_seed)
+            result = self.xrpl_client.sign_and_submit_with_wallet(tx, wallet, wait=wait)
             
             logger.info(
                 f"Escrow auto-signed and submitted: {result.get('hash', 'unknown')} "
@@ -125,6 +130,7 @@ class BankAgent(BaseAgent):
             return {
                 "status": "signed",
                 "tx_hash": result.get("hash"),
+                "validated": result.get("validated", False),
                 "amount": tx.amount,
                 "destination": tx.destination,
                 "message": "Escrow auto-signed and submitted successfully"
@@ -144,80 +150,129 @@ class BankAgent(BaseAgent):
                 "message": "Unexpected error during escrow signing"
             }
 
-    def evaluate_and_auto_sign_escrow(self, liquidity_request, tx_dict: dict, bank: dict, bank_seed: str) -> dict:
+    def _exposure_reason(self, amount_xrp: float) -> str:
+        policy, exposure = self.policy_engine.policy, self.exposure_state
+        if exposure.current_exposure + amount_xrp > policy.max_exposure:
+            return (
+                f"Exposure limit reached: {exposure.current_exposure} outstanding + "
+                f"{amount_xrp} requested > {policy.max_exposure}"
+            )
+        return (
+            f"Bank exposure limit reached: {exposure.bank_exposure} outstanding + "
+            f"{amount_xrp} requested > {policy.max_bank_exposure}"
+        )
+
+    def evaluate_escrow(self, liquidity_request, bank: BankRecord) -> Optional[dict]:
+        """
+        BankAgent decision without signing: bank policy, loan terms, balance and cumulative exposure.
+
+        Returns the rejection dict, or None when the bank would approve.
+        """
+        # Step 1: Check bank's credit policy
+        # The liquidity endpoint already verified credit eligibility,
+        # so we just confirm the bank's policy allows this amount
+        max_amount = bank.max_per_loan
+        amount_xrp = getattr(liquidity_request, 'amount_xrp', 0)
+
+        logger.info(f"Policy check: max={max_amount}, requested={amount_xrp}")
+
+        if amount_xrp > max_amount:
+            logger.warning(f"Bank {bank.bank_name} rejected due to amount exceeds max policy")
+            return {
+                "status": "rejected",
+                "approved": False,
+                "bank_name": bank.bank_name,
+                "reason": f"Request amount {amount_xrp} exceeds bank maximum {max_amount}",
+                "message": f"{bank.bank_name} automatically rejected due to amount limits."
+            }
+
+        # Step 2: Check the bank's loan terms (duration, borrower default rate)
+        duration_days = getattr(liquidity_request, 'duration_days', 0)
+        default_rate = getattr(liquidity_request, 'metrics', {}).get("default_rate", 1.0)
+        if not self.policy_engine.terms_allow(duration_days, default_rate):
+            policy = self.policy_engine.policy
+            logger.warning(f"Bank {bank.bank_name} rejected due to loan terms")
+            return {
+                "status": "rejected",
+                "approved": False,
+                "bank_name": bank.bank_name,
+                "reason": (
+                    f"Loan terms outside policy: {duration_days} days (max {policy.max_duration_days}), "
+                    f"default rate {default_rate} (max {policy.max_default_rate})"
+                ),
+                "message": f"{bank.bank_name} automatically rejected due to its loan terms."
+            }
+
+        # Step 3: Exposure check - verify bank has sufficient balance
+        bank_balance = bank.balance_xrp
+
+        logger.info(f"Balance check: bank_balance={bank_balance}, requested={amount_xrp}")
+
+        if bank_balance < amount_xrp:
+            logger.warning(f"Bank {bank.bank_name} rejected due to insufficient balance")
+            return {
+                "status": "rejected",
+                "approved": False,
+                "bank_name": bank.bank_name,
+                "reason": f"Insufficient balance: {bank_balance} < {amount_xrp}",
+                "message": f"{bank.bank_name} automatically rejected due to insufficient balance."
+            }
+
+        # Step 4: Cumulative exposure from the exposure ledger
+        if not self.policy_engine.exposure_allows(amount_xrp, self.exposure_state):
+            logger.warning(f"Bank {bank.bank_name} rejected due to exposure limit")
+            return {
+                "status": "rejected",
+                "approved": False,
+                "bank_name": bank.bank_name,
+                "reason": self._exposure_reason(amount_xrp),
+                "message": f"{bank.bank_name} automatically rejected due to exposure limits."
+            }
+        return None
+
+    def evaluate_and_auto_sign_escrow(self, liquidity_request, tx_dict: dict, bank: BankRecord, wait: bool = True) -> dict:
         """
         BankAgent decision process:
-        1. Check bank policy (credit score thresholds)
-        2. Evaluate bank exposure
-        3. If APPROVED: Auto-sign and submit escrow
-        4. If REJECTED: Return rejection with reason
+        1. Check bank policy, loan terms, balance and cumulative exposure (evaluate_escrow)
+        2. If APPROVED: Auto-sign and submit escrow
+        3. If REJECTED: Return rejection with reason
         
         Args:
             liquidity_request: The liquidity request object
             tx_dict: Prepared escrow transaction dictionary
             bank: The matched bank object
-            bank_seed: Bank's XRPL wallet seed for signing
+            wait: Block until the escrow is validated (False: fire-and-track)
             
         Returns:
             Decision dict with approval status and action taken
         """
         try:
-            # Step 1: Check bank's credit policy
-            # The liquidity endpoint already verified credit eligibility,
-            # so we just confirm the bank's policy allows this amount
-            bank_policy = bank.get("credit_policy", {})
-            max_amount = bank_policy.get("max", 10000)
-            amount_xrp = getattr(liquidity_request, 'amount_xrp', 0)
-            
-            logger.info(f"Policy check: max={max_amount}, requested={amount_xrp}")
-            
-            if amount_xrp > max_amount:
-                logger.warning(f"Bank {bank['bank_name']} rejected due to amount exceeds max policy")
-                return {
-                    "status": "rejected",
-                    "approved": False,
-                    "bank_name": bank["bank_name"],
-                    "reason": f"Request amount {amount_xrp} exceeds bank maximum {max_amount}",
-                    "message": f"{bank['bank_name']} automatically rejected due to amount limits."
-                }
-            
-            # Step 2: Exposure check - verify bank has sufficient balance
-            amount_xrp = getattr(liquidity_request, 'amount_xrp', 0)
-            bank_balance = bank.get("balance_xrp", 0)
-            
-            logger.info(f"Balance check: bank_balance={bank_balance}, requested={amount_xrp}")
-            
-            if bank_balance < amount_xrp:
-                logger.warning(f"Bank {bank['bank_name']} rejected due to insufficient balance")
-                return {
-                    "status": "rejected",
-                    "approved": False,
-                    "bank_name": bank["bank_name"],
-                    "reason": f"Insufficient balance: {bank_balance} < {amount_xrp}",
-                    "message": f"{bank['bank_name']} automatically rejected due to insufficient balance."
-                }
-            
-            # Step 3: APPROVED - Auto-sign the escrow
-            logger.info(f"Bank {bank['bank_name']} approved the request. Auto-signing escrow...")
-            sign_result = self.auto_sign_escrow(tx_dict, bank_seed)
+            rejection = self.evaluate_escrow(liquidity_request, bank)
+            if rejection is not None:
+                return rejection
+
+            # APPROVED - Auto-sign the escrow
+            logger.info(f"Bank {bank.bank_name} approved the request. Auto-signing escrow...")
+            sign_result = self.auto_sign_escrow(tx_dict, wallet_cache.wallet_for(bank), wait=wait)
             
             if sign_result["status"] == "signed":
-                logger.info(f"Escrow auto-signed by {bank['bank_name']}: {sign_result['tx_hash']}")
+                logger.info(f"Escrow auto-signed by {bank.bank_name}: {sign_result['tx_hash']}")
                 return {
                     "status": "approved",
                     "approved": True,
-                    "bank_name": bank["bank_name"],
+                    "bank_name": bank.bank_name,
                     "tx_hash": sign_result["tx_hash"],
-                    "message": f"{bank['bank_name']} automatically approved and signed the escrow."
+                    "validated": sign_result["validated"],
+                    "message": f"{bank.bank_name} automatically approved and signed the escrow."
                 }
             else:
-                logger.error(f"Auto-sign failed for {bank['bank_name']}: {sign_result.get('error')}")
+                logger.error(f"Auto-sign failed for {bank.bank_name}: {sign_result.get('error')}")
                 return {
                     "status": "signing_failed",
                     "approved": False,
-                    "bank_name": bank["bank_name"],
+                    "bank_name": bank.bank_name,
                     "reason": sign_result.get("error"),
-                    "message": f"{bank['bank_name']} approved but failed to sign the transaction."
+                    "message": f"{bank.bank_name} approved but failed to sign the transaction."
                 }
             
         except Exception as e:
@@ -225,7 +280,7 @@ class BankAgent(BaseAgent):
             return {
                 "status": "error",
                 "approved": False,
-                "bank_name": bank.get("bank_name", "Unknown"),
+                "bank_name": bank.bank_name,
                 "reason": str(e),
                 "message": "BankAgent encountered an error during evaluation."
             }
@@ -2,6 +2,7 @@ from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 import os
 import logging
 
@@ -10,7 +11,15 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="TGLC API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_event(app)
+    try:
+        yield
+    finally:
+        await shutdown_event(app)
+
+app = FastAPI(title="TGLC API", version="0.1.0", lifespan=lifespan)
 
 cors_origins = [
     origin.strip()
@@ -24,20 +33,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Import and include routers directly with full paths
 from .routes.liquidity import router as liquidity_router
 from .routes.credentials import router as credentials_router
 from .routes.banks import router as banks_router
+from .routes.transactions import router as transactions_router
+from .routes.payment import router as payments_router
+from .routes.dashboard import router as dashboard_router
+from .services.bank_registry import bank_registry
+from .services.exposure_ledger import exposure_ledger
+from .services.escrow_index import escrow_index
+from .services.trustline_index import trustline_index
+from .services.maturity_scheduler import build_maturity_scheduler
+from .services.credential_expiry import credential_expiry, build_credential_revoker
+from .services.signing_service import signing_service
+from .services.wallet_cache import wallet_cache
+from .services.proof_verifier import signature_verifier
+from .services.bank_service import BalanceRefresher, BankService
+from .services.leader_lease import LeaderLease
+from .services.container import ServiceContainer
+from .services.xrpl_client import XRPLClient
+from fastapi.concurrency import run_in_threadpool
 
 app.include_router(liquidity_router, prefix="/api/liquidity")
 app.include_router(credentials_router, prefix="/api/credentials")
 app.include_router(banks_router, prefix="/api/banks")
+app.include_router(transactions_router, prefix="/api/transactions")
+app.include_router(payments_router, prefix="/api")  # router carries /payments
+app.include_router(dashboard_router, prefix="/api")  # router carries /dashboard
 
-# Log all registered routes on startup
-@app.on_event("startup")
-async def startup_event():
+maturity_scheduler = None
+maturity_lease = None
+balance_lease = None
+expiry_lease = None
+
+async def startup_event(app: FastAPI):
     logger.info("=" * 60)
     logger.info("REGISTERED ROUTES:")
     for route in app.routes:
@@ -45,6 +78,117 @@ async def startup_event():
             methods = ', '.join(sorted(route.methods))
             logger.info(f"  {methods:15} {route.path}")
     logger.info("=" * 60)
+    bank_registry.load()
+    bank_registry.start_watching()
+    # Build the shared services once and warm them before the first request.
+    # A failure here is logged, and requests build the container on first use;
+    # the background state below does not depend on it.
+    try:
+        services = app.state.services = await run_in_threadpool(ServiceContainer)
+        await run_in_threadpool(services.warm_up)
+        services.loan_jobs.start()
+    except Exception as e:
+        logger.error(f"Service initialisation failed: {e}", exc_info=True)
+    await run_in_threadpool(_init_escrow_state)
+    _init_balance_refresh()
+    await run_in_threadpool(_init_trustline_index)
+    await run_in_threadpool(_init_credential_expiry)
+
+def _init_escrow_state():
+    """
+    Restore exposure from the shared log, backfill the escrow index from the ledger,
+    reconcile exposure against it, then track new transactions.
+    With ESCROW_AUTO_FINISH=true, matured escrows are finished automatically
+    by whichever worker holds the escrow-maturity lease; every worker tracks
+    maturities so another one can take over.
+    """
+    global maturity_scheduler, maturity_lease
+    exposure_ledger.load()
+    try:
+        bank_svc = BankService()
+        xrpl_client = XRPLClient()
+        escrow_index.attach(xrpl_client, bank_svc.bank_id_for)
+        exposure_ledger.attach(xrpl_client, bank_svc.bank_id_for, escrow_index)
+        if os.getenv("ESCROW_AUTO_FINISH", "false").lower() == "true":
+            maturity_scheduler = build_maturity_scheduler(xrpl_client, escrow_index, bank_registry, wallet_cache, signing_service)
+            escrow_index.add_listener(maturity_scheduler.on_index_event)
+        owners = [bank.wallet_address for bank in bank_svc.get_all_banks()] + [xrpl_client.address]
+        escrow_index.backfill(xrpl_client, owners, bank_svc.bank_id_for)
+        exposure_ledger.reconcile(escrow_index.by_owner())
+        # Synced transactions include finishes and cancels no worker submitted
+        escrow_index.add_listener(exposure_ledger.on_index_event)
+        # Banks registered later, in any worker, are backfilled and followed by the next sync
+        bank_registry.add_listener(lambda index: escrow_index.track(bank.wallet_address for bank in index.banks))
+        escrow_index.start_syncing(xrpl_client, bank_svc.bank_id_for)
+        if maturity_scheduler:
+            maturity_lease = LeaderLease("escrow-maturity", maturity_scheduler.start, maturity_scheduler.stop)
+            maturity_lease.start()
+            logger.info(f"Escrow maturity scheduler tracking {len(maturity_scheduler)} escrows")
+    except Exception as e:
+        logger.error(f"Escrow state initialisation failed: {e}", exc_info=True)
+
+def _init_balance_refresh():
+    """
+    Refresh bank balances from the ledger every BANK_BALANCE_REFRESH_SECONDS
+    (default 60) in one worker; this also settles the committed reservations
+    the new balances account for.
+    """
+    global balance_lease
+    interval = float(os.getenv("BANK_BALANCE_REFRESH_SECONDS") or 60)
+    refresher = BalanceRefresher()
+    balance_lease = LeaderLease("bank-balances", lambda: refresher.start(interval), refresher.stop)
+    balance_lease.start()
+
+def _init_trustline_index():
+    """Backfill the issuer's trust lines, then follow TrustSets on the issuer account."""
+    try:
+        xrpl_client = XRPLClient()
+        trustline_index.attach(xrpl_client)
+        trustline_index.backfill(xrpl_client)
+        trustline_index.start_syncing(xrpl_client)
+    except Exception as e:
+        logger.error(f"Trust line index initialisation failed: {e}", exc_info=True)
+
+def _init_credential_expiry():
+    """
+    Restore scheduled credential expiries and revoke them as they pass,
+    unless CREDENTIAL_AUTO_REVOKE=false (expiries are still recorded).
+    Every worker records expiries; the one holding the credential-expiry
+    lease sweeps them.
+    """
+    global expiry_lease
+    credential_expiry.load()
+    trustline_index.add_listener(credential_expiry.on_index_event)
+    if os.getenv("CREDENTIAL_AUTO_REVOKE", "true").lower() != "true":
+        return
+    try:
+        revoke = build_credential_revoker(XRPLClient(), trustline_index, signing_service)
+        expiry_lease = LeaderLease("credential-expiry", lambda: credential_expiry.start(revoke), credential_expiry.stop)
+        expiry_lease.start()
+        logger.info(f"Credential expiry sweeper tracking {len(credential_expiry)} credentials")
+    except Exception as e:
+        logger.error(f"Credential expiry initialisation failed: {e}", exc_info=True)
+
+async def shutdown_event(app: FastAPI):
+    services = getattr(app.state, "services", None)
+    if services is not None:
+        await services.loan_jobs.stop()
+    if balance_lease:
+        balance_lease.stop()
+    bank_registry.stop_watching()
+    escrow_index.stop_syncing()
+    trustline_index.stop_syncing()
+    if maturity_lease:
+        maturity_lease.stop()
+    if maturity_scheduler:
+        maturity_scheduler.stop()
+    if expiry_lease:
+        expiry_lease.stop()
+    credential_expiry.stop()
+    if XRPLClient._instance is not None:
+        XRPLClient._instance.tracker.stop()
+    signing_service.shutdown()
+    signature_verifier.shutdown()
 
 # Debug middleware to log all requests
 @app.middleware("http")
@@ -63,6 +207,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail},
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
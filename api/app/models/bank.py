@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional
+
+from ..utils.amounts import from_units, to_units
+
+POLICY_KEYS = ("min", "max", "risk_score_threshold")
+
+
+class BankRecord:
+    """
+    Represents a bank registered on the platform.
+
+    Use case:
+    - Held in memory by BankService and scanned on every liquidity request.
+    - Carries the bank's lending policy, wallet, balance and optional signing seed.
+    - Holds the balance as integer drops; balance_xrp is a view for the API.
+
+    Purpose:
+    - Keeps per-bank memory small (no per-instance dict) and matching loops fast.
+    - Makes conversion to JSON explicit so the seed never leaks into responses or logs.
+    """
+    __slots__ = (
+        "bank_id",
+        "bank_name",
+        "wallet_address",
+        "min_credit_score",
+        "max_per_loan",
+        "risk_score_threshold",
+        "balance_drops",
+        "active",
+        "issued_tokens",
+        "trustlines",
+        "seed",
+        "extra_policy",
+    )
+
+    def __init__(
+        self,
+        bank_id: str,
+        bank_name: str,
+        wallet_address: str,
+        min_credit_score: int = 500,
+        max_per_loan: float = 1000.0,
+        risk_score_threshold: int = 300,
+        balance_xrp: float = 0.0,
+        active: bool = True,
+        issued_tokens: Optional[List[Dict]] = None,
+        trustlines: Optional[List[Dict]] = None,
+        seed: Optional[str] = None,
+        balance_drops: Optional[int] = None,
+        extra_policy: Optional[Dict] = None,
+    ):
+        self.bank_id = bank_id
+        self.bank_name = bank_name
+        self.wallet_address = wallet_address
+        self.min_credit_score = min_credit_score
+        self.max_per_loan = max_per_loan
+        self.risk_score_threshold = risk_score_threshold
+        self.balance_drops = balance_drops if balance_drops is not None else to_units(balance_xrp)
+        self.active = active
+        self.issued_tokens = issued_tokens or []
+        self.trustlines = trustlines or []
+        self.seed = seed
+        # credit_policy keys this model does not know, written back unchanged
+        self.extra_policy = extra_policy or {}
+
+    @classmethod
+    def from_json(cls, raw: Dict, default_bank_id: str) -> "BankRecord":
+        """Build a record from a banks.json entry (old flat or nested credit_policy layout)."""
+        policy = raw.get("credit_policy") or {
+            "min": raw.get("min_credit_score", 500),
+            "max": raw.get("max_per_loan", 1000),
+            "risk_score_threshold": 300,
+        }
+        return cls(
+            bank_id=raw.get("bank_id") or default_bank_id,
+            bank_name=raw.get("bank_name", "Unnamed Bank"),
+            wallet_address=raw["wallet_address"],
+            min_credit_score=int(policy.get("min", 500)),
+            max_per_loan=float(policy.get("max", 1000)),
+            risk_score_threshold=int(policy.get("risk_score_threshold", 300)),
+            balance_xrp=float(raw.get("balance_xrp", 0.0)),
+            balance_drops=int(raw["balance_drops"]) if "balance_drops" in raw else None,
+            active=bool(raw.get("active", True)),
+            issued_tokens=raw.get("issued_tokens", []),
+            trustlines=raw.get("trustlines", []),
+            seed=raw.get("seed"),
+            extra_policy={k: v for k, v in policy.items() if k not in POLICY_KEYS},
+        )
+
+    def copy(self) -> "BankRecord":
+        return BankRecord(**{name: getattr(self, name) for name in self.__slots__})
+
+    @property
+    def balance_xrp(self) -> float:
+        return from_units(self.balance_drops)
+
+    @balance_xrp.setter
+    def balance_xrp(self, value: float) -> None:
+        self.balance_drops = to_units(value)
+
+    @property
+    def credit_policy(self) -> Dict:
+        return {
+            **self.extra_policy,
+            "min": self.min_credit_score,
+            "max": self.max_per_loan,
+            "risk_score_threshold": self.risk_score_threshold,
+        }
+
+    def to_json(self) -> Dict:
+        """Public representation for API responses (never includes the seed)."""
+        return {
+            "bank_id": self.bank_id,
+            "bank_name": self.bank_name,
+            "wallet_address": self.wallet_address,
+            "credit_policy": self.credit_policy,
+            "issued_tokens": self.issued_tokens,
+            "trustlines": self.trustlines,
+            "balance_xrp": self.balance_xrp,
+            "active": self.active,
+        }
+
+    def to_storage(self) -> Dict:
+        """Representation persisted to banks.json (keeps the seed for auto-signing)."""
+        data = self.to_json()
+        data["balance_drops"] = self.balance_drops
+        if self.seed:
+            data["seed"] = self.seed
+        return data
+
+    def __repr__(self) -> str:
+        return f"BankRecord(bank_id={self.bank_id!r}, bank_name={self.bank_name!r}, wallet_address={self.wallet_address!r})"
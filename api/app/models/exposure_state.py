@@ -15,3 +15,4 @@ class ExposureState(BaseModel):
     business_id: str
     bank_id: str
     current_exposure: float
+    bank_exposure: float = 0.0  # Total outstanding principal across all of the bank's borrowers
@@ -0,0 +1,70 @@
+from typing import Dict, Optional
+
+from ..utils.amounts import from_units
+
+
+class LoanRecord:
+    """
+    Represents an outstanding loan backed by an XRPL escrow.
+
+    Use case:
+    - One record per escrow created from a bank (or platform) wallet to a borrower.
+    - Identified on-ledger by the escrow owner and the EscrowCreate sequence.
+
+    Purpose:
+    - Compact, attribute-based storage for large loan books.
+    - Explicit JSON conversion at the API boundary.
+    """
+    __slots__ = (
+        "owner",
+        "sequence",
+        "destination",
+        "amount_drops",
+        "finish_after",
+        "bank_id",
+        "status",
+        "tx_hash",
+    )
+
+    def __init__(
+        self,
+        owner: str,
+        sequence: int,
+        destination: str,
+        amount_drops: int,
+        finish_after: Optional[int] = None,
+        bank_id: Optional[str] = None,
+        status: str = "escrowed",
+        tx_hash: Optional[str] = None,
+    ):
+        self.owner = owner
+        self.sequence = sequence
+        self.destination = destination
+        self.amount_drops = amount_drops
+        self.finish_after = finish_after
+        self.bank_id = bank_id
+        self.status = status
+        self.tx_hash = tx_hash
+
+    @property
+    def key(self) -> tuple:
+        return (self.owner, self.sequence)
+
+    @property
+    def amount_xrp(self) -> float:
+        return from_units(self.amount_drops)
+
+    def to_json(self) -> Dict:
+        return {
+            "owner": self.owner,
+            "sequence": self.sequence,
+            "destination": self.destination,
+            "amount_xrp": self.amount_xrp,
+            "finish_after": self.finish_after,
+            "bank_id": self.bank_id,
+            "status": self.status,
+            "tx_hash": self.tx_hash,
+        }
+
+    def __repr__(self) -> str:
+        return f"LoanRecord(owner={self.owner!r}, sequence={self.sequence}, amount_drops={self.amount_drops}, status={self.status!r})"
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 class CreditPolicy(BaseModel):
@@ -14,4 +16,5 @@ class CreditPolicy(BaseModel):
     """
     max_duration_days: int
     max_default_rate: float
-    max_exposure: float
\ No newline at end of file
+    max_exposure: float
+    max_bank_exposure: Optional[float] = None  # Cap on the bank's outstanding principal across all borrowers
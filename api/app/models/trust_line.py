@@ -0,0 +1,65 @@
+from typing import Dict
+
+
+class TrustLineRecord:
+    """
+    Represents one trust line between a holder and the platform issuer.
+
+    Use case:
+    - One record per (holder, currency) line on the issuer account, e.g. a
+      borrower's CORRIDOR_ELIGIBLE credential.
+    - Built from the issuer's account_lines and updated from TrustSet transactions.
+
+    Purpose:
+    - Lets issuance and credit scoring answer "does this borrower hold the
+      credential, and with which limit" without a ledger call.
+    """
+    __slots__ = (
+        "holder",
+        "currency",
+        "limit",
+        "issuer_limit",
+        "balance",
+        "frozen",
+    )
+
+    def __init__(
+        self,
+        holder: str,
+        currency: str,
+        limit: str = "0",
+        issuer_limit: str = "0",
+        balance: str = "0",
+        frozen: bool = False,
+    ):
+        self.holder = holder
+        self.currency = currency
+        self.limit = limit  # the holder's limit (set by the holder's TrustSet)
+        self.issuer_limit = issuer_limit
+        self.balance = balance  # from the issuer's side, as of the last account_lines read
+        self.frozen = frozen
+
+    @classmethod
+    def from_account_line(cls, line: Dict) -> "TrustLineRecord":
+        """Build from an account_lines entry read on the issuer account."""
+        return cls(
+            holder=line["account"],
+            currency=line["currency"],
+            limit=line.get("limit_peer", "0"),
+            issuer_limit=line.get("limit", "0"),
+            balance=line.get("balance", "0"),
+            frozen=bool(line.get("freeze")),
+        )
+
+    def to_json(self) -> Dict:
+        return {
+            "holder": self.holder,
+            "currency": self.currency,
+            "limit": self.limit,
+            "issuer_limit": self.issuer_limit,
+            "balance": self.balance,
+            "frozen": self.frozen,
+        }
+
+    def __repr__(self) -> str:
+        return f"TrustLineRecord(holder={self.holder!r}, currency={self.currency!r}, limit={self.limit!r}, frozen={self.frozen})"
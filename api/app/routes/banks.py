@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 import logging
 
 from ..services.bank_service import BankService
+from ..services.container import get_bank_service
 from ..utils.validators import validate_xrpl_address
 
 logger = logging.getLogger(__name__)
@@ -16,11 +17,10 @@ class BankRegistration(BaseModel):
     min_credit_score: int = Field(default=500, ge=300, le=850)
 
 @router.post("/register")
-async def register_bank(req: BankRegistration):
+async def register_bank(req: BankRegistration, service: BankService = Depends(get_bank_service)):
     """Register a bank on the platform."""
     try:
         validate_xrpl_address(req.wallet_address)
-        service = BankService()
         bank = await run_in_threadpool(
             service.register_bank,
             req.bank_name,
@@ -28,7 +28,7 @@ async def register_bank(req: BankRegistration):
             req.max_per_loan,
             req.min_credit_score
         )
-        return {"status": "registered", "bank": bank}
+        return {"status": "registered", "bank": bank.to_json()}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -1,11 +1,18 @@
 # routes/credentials.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, field_validator
+from datetime import datetime, timezone
+from typing import List, Optional
 from ..services.credential_service import CredentialService
 from ..services.credit_service import CreditService
+from ..services.container import get_credential_service, get_credit_service
 from ..utils.validators import validate_xrpl_address
+import hmac
+import json
 import logging
+import os
 import re
 
 logger = logging.getLogger(__name__)
@@ -19,6 +26,15 @@ def validate_xrpl_address(address: str) -> str:
         raise ValueError("Invalid XRPL address format")
     return address
 
+def validate_expiry(expires_at: Optional[datetime]) -> Optional[datetime]:
+    if expires_at is None:
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at <= datetime.now(timezone.utc):
+        raise ValueError("expires_at must be in the future")
+    return expires_at
+
 # -------------------
 # Pydantic Models
 # -------------------
@@ -31,29 +47,82 @@ class IssueRequest(BaseModel):
         max_length=40,
         pattern=r'^[A-Z0-9_]+$'
     )
+    expires_at: Optional[datetime] = None  # credential is frozen by the issuer once this passes
     
     @field_validator('principal_address')
     @classmethod
     def validate_address(cls, v: str) -> str:
         return validate_xrpl_address(v)
 
+    @field_validator('expires_at')
+    @classmethod
+    def validate_expires_at(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return validate_expiry(v)
+
+class BatchIssueRequest(BaseModel):
+    # Addresses are validated per item so one bad entry does not reject the batch
+    principal_addresses: List[str] = Field(..., min_length=1, max_length=10_000)
+    amount: str = Field(default="1000000", pattern=r'^\d+(\.\d+)?$')
+    currency: str = Field(
+        default="CORRIDOR_ELIGIBLE",
+        min_length=3,
+        max_length=40,
+        pattern=r'^[A-Z0-9_]+$'
+    )
+    expires_at: Optional[datetime] = None
+
+    @field_validator('expires_at')
+    @classmethod
+    def validate_expires_at(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return validate_expiry(v)
+
+class ReissueRequest(BaseModel):
+    principal_address: str = Field(..., min_length=25, max_length=35)
+    currency: str = Field(
+        default="CORRIDOR_ELIGIBLE",
+        min_length=3,
+        max_length=40,
+        pattern=r'^[A-Z0-9_]+$'
+    )
+    expires_at: Optional[datetime] = None
+
+    @field_validator('principal_address')
+    @classmethod
+    def validate_address(cls, v: str) -> str:
+        return validate_xrpl_address(v)
+
+    @field_validator('expires_at')
+    @classmethod
+    def validate_expires_at(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return validate_expiry(v)
+
+# -------------------
+# Issuer authorisation
+# -------------------
+def require_issuer(x_issuer_token: Optional[str] = Header(default=None)) -> None:
+    """Issuer-only actions need ISSUER_ADMIN_TOKEN in the X-Issuer-Token header; unset disables them."""
+    expected = os.getenv("ISSUER_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Issuer actions are disabled (ISSUER_ADMIN_TOKEN is not set)")
+    if not x_issuer_token or not hmac.compare_digest(x_issuer_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid issuer token")
+
 # -------------------
 # Endpoints
 # -------------------
 @router.post("/issue")
-async def issue_credential(req: IssueRequest):
+async def issue_credential(req: IssueRequest, service: CredentialService = Depends(get_credential_service)):
     """
     Issue a new credit credential (trust line) to a principal.
     """
     try:
-        service = CredentialService()
-        
         # Submit the XRPL TrustSet in a threadpool for async safety
         result = await run_in_threadpool(
             service.submit_trust_set,
             req.principal_address,
             req.amount,
-            req.currency
+            req.currency,
+            req.expires_at
         )
 
         return {
@@ -61,7 +130,8 @@ async def issue_credential(req: IssueRequest):
             "transaction": result.get("transaction"),
             "issuer": result.get("issuer"),
             "message": result.get("message", "Transaction prepared successfully. Principal must sign and submit this transaction."),
-            "original_currency": result.get("original_currency")
+            "original_currency": result.get("original_currency"),
+            "expires_at": req.expires_at.isoformat() if req.expires_at else None
         }
 
     except ValueError as e:
@@ -71,14 +141,52 @@ async def issue_credential(req: IssueRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/issue/batch")
+async def issue_credentials_batch(req: BatchIssueRequest, service: CredentialService = Depends(get_credential_service)):
+    """
+    Prepare TrustSet credentials for many principals.
+    Streams NDJSON: one line per address (in completion order, with its input
+    "index"), then a summary line.
+    """
+    async def _lines():
+        counts = {}
+        try:
+            async for item in service.prepare_trust_set_batch(
+                req.principal_addresses, req.amount, req.currency, expires_at=req.expires_at
+            ):
+                counts[item["status"]] = counts.get(item["status"], 0) + 1
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            logger.error(f"Batch credential issuance failed: {e}", exc_info=True)
+            counts["error"] = counts.get("error", 0) + 1
+            yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+        yield json.dumps({"summary": {"total": len(req.principal_addresses), **counts}, "issuer": service.issuer_wallet.classic_address}) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@router.post("/reissue", dependencies=[Depends(require_issuer)])
+async def reissue_credential(req: ReissueRequest, service: CredentialService = Depends(get_credential_service)):
+    """
+    Re-issue a revoked credential: the issuer clears the freeze it set on the trust line.
+    """
+    try:
+        result = await run_in_threadpool(service.reissue, req.principal_address, req.currency, req.expires_at)
+        return {**result, "expires_at": req.expires_at.isoformat() if req.expires_at else None}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Credential re-issue failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/score/{address}")
-async def get_credit_score(address: str):
+async def get_credit_score(address: str, credit_svc: CreditService = Depends(get_credit_service)):
     """
     Get credit score for an XRPL address.
     """
     try:
         validate_xrpl_address(address)
-        credit_svc = CreditService()
         credit = await run_in_threadpool(credit_svc.get_credit_score, address)
         return credit
     except ValueError as e:
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+import logging
+
+from app.services.container import get_dashboard_service
+from app.services.dashboard_service import DashboardService
+from app.utils.validators import validate_xrpl_address
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["dashboard"],
+)
+
+
+@router.get("/{address}")
+async def get_dashboard(
+    address: str,
+    history_limit: int = Query(10, ge=1, le=50),
+    dashboard: DashboardService = Depends(get_dashboard_service),
+):
+    """
+    Everything the borrower dashboard shows, in one round trip.
+
+    Notes:
+    - Credit score, eligible amount, recent payments and live escrows are
+      fetched concurrently and share one ledger read
+    - Each section has its own timeout; a section that misses it is null and
+      named in "errors", the rest is still returned
+    """
+    try:
+        validate_xrpl_address(address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await dashboard.build(address, history_limit=history_limit)
+    except Exception as e:
+        logger.error(f"Dashboard build failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to build dashboard")
@@ -1,33 +1,43 @@
 # api/app/routes/liquidity.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional
+from typing import Callable, List, Literal, Optional
+import asyncio
+import json
 import logging
+import math
 from datetime import datetime, timezone, timedelta
 
-from ..services.proof_verifier import ProofVerifier
+from ..services.proof_verifier import ProofVerifier, ProofReplayError
 from ..services.credit_service import CreditService
-from ..services.escrow_service import EscrowService
-from ..services.bank_service import BankService
+from ..services.bank_service import BankCapacityTaken, BankService
 from ..services.xrpl_client import XRPLClient
 from ..services.policy_engine import PolicyEngine
+from ..services.syndication import SyndicationAllocator, Tranche
+from ..services.exposure_ledger import exposure_ledger
+from ..services.escrow_index import escrow_index
+from ..services.container import ServiceContainer, get_credit_service, get_loan_jobs, get_proof_verifier, get_services, get_xrpl_client
+from ..services.loan_jobs import JobQueueFull, LoanJobQueue
 from ..agent.bank_agent import BankAgent
+from ..models.bank import BankRecord
 from ..models.proof import ProofPayload as ProofPayloadModel
-from ..models.exposure_state import ExposureState
 from ..models.policy import CreditPolicy
-from ..agent.bank_agent import BankAgent
 from ..utils.validators import validate_xrpl_address
 
-from xrpl.transaction import autofill, submit_and_wait
+from xrpl.transaction import autofill
 from xrpl.models.transactions import EscrowCreate, EscrowFinish
-from xrpl.utils import xrp_to_drops
+from xrpl.utils import xrp_to_drops, datetime_to_ripple_time
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Liquidity"])
 
 DEFAULT_ESCROW_DAYS = 30  # Repayment deadline (not when funds are available)
 MAX_XRP_AMOUNT = 1_000_000_000
+JOB_RETRY_AFTER_SECONDS = 5  # suggested wait when the loan job queue is full
+JOB_HEARTBEAT_SECONDS = 15  # keep-alive comment interval on job event streams
+CAPACITY_RETRY_AFTER_SECONDS = 2  # suggested wait when concurrent requests took every matching bank
 
 # XRPL Explorer URLs by network
 EXPLORER_URLS = {
@@ -50,6 +60,8 @@ class LiquidityRequest(BaseModel):
     amount_xrp: float = Field(..., gt=0, le=MAX_XRP_AMOUNT, description="Amount of XRP to request")
     unlock_time: Optional[datetime] = Field(None, description=f"UTC datetime when escrow can be released (defaults to {DEFAULT_ESCROW_DAYS} days)")
     proof_data: Optional[dict] = Field(None, description="Optional performance proof data")
+    syndicate: bool = Field(False, description="Split the request across several banks when no single bank can fund it")
+    wait_for_validation: bool = Field(True, description="Wait for ledger validation; false returns after submission with validation 'pending'")
 
     @field_validator('principal_address')
     @classmethod
@@ -66,16 +78,26 @@ class LiquidityRequest(BaseModel):
             self.principal_did = f"did:xrpl:{self.principal_address}"
         return self
 
+class ProofBatchRequest(BaseModel):
+    proofs: List[dict] = Field(..., min_length=1, max_length=1000)
+
+
 class EscrowFinishRequest(BaseModel):
     borrower_wallet: str = Field(..., min_length=25, max_length=35)
-    escrow_sequence: int = Field(..., gt=0)
-    owner_wallet: str = Field(..., min_length=25, max_length=35, description="Wallet address of the bank that created the escrow")
+    escrow_sequence: Optional[int] = Field(None, gt=0, description="Looked up from the escrow index if omitted")
+    owner_wallet: Optional[str] = Field(None, min_length=25, max_length=35, description="Wallet address of the bank that created the escrow (looked up if omitted)")
 
 # -------------------
 # Endpoints
 # -------------------
 @router.post("/request")
-async def request_liquidity(req: LiquidityRequest):
+async def request_liquidity(
+    req: LiquidityRequest,
+    request: Request,
+    mode: Literal["sync", "job"] = Query("sync", description="job: queue the request and return 202 with a job to follow"),
+    services: ServiceContainer = Depends(get_services),
+    jobs: LoanJobQueue = Depends(get_loan_jobs),
+):
     """
     Request liquidity: decentralized flow.
     
@@ -83,251 +105,539 @@ async def request_liquidity(req: LiquidityRequest):
     - AI agent auto-approves based on credit score
     - Returns prepared escrow transaction for bank to sign
     - Bank controls their wallet, signs their own escrow
+
+    mode=job validates the request, queues it and returns 202 with the job
+    (Location: /jobs/{job_id}); the same result is delivered through polling
+    or the job's event stream. A full queue returns 503 with Retry-After.
     """
+    # Step 0: Reject a replayed proof before any ledger work
+    proof_payload = _parse_proof(req.proof_data)
+    if proof_payload is not None:
+        try:
+            services.proofs.check_replay(proof_payload)
+        except ProofReplayError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    if mode == "job":
+        async def _run(progress: Callable[[str], None]) -> dict:
+            # Take the bank snapshot when the job starts, not when it was queued
+            return await _process_liquidity(req, proof_payload, services, services.bank_service(), progress)
+
+        try:
+            job = await jobs.submit(_run)
+        except JobQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(JOB_RETRY_AFTER_SECONDS)})
+        return JSONResponse(
+            job.to_json(),
+            status_code=202,
+            headers={"Location": str(request.url_for("get_loan_job", job_id=job.id))},
+        )
+
     try:
-        credit_svc = CreditService()
-        escrow_svc = EscrowService()
-        bank_svc = BankService()
-        xrpl_client = XRPLClient()
-        
-        # Step 1: Check eligibility
-        eligibility = await run_in_threadpool(
+        return await _process_liquidity(req, proof_payload, services, services.bank_service())
+    except ProofReplayError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except BankCapacityTaken as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": str(CAPACITY_RETRY_AFTER_SECONDS)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Liquidity request failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to process liquidity request: {str(e)}")
+
+
+async def _process_liquidity(
+    req: LiquidityRequest,
+    proof_payload: Optional[ProofPayloadModel],
+    services: ServiceContainer,
+    bank_svc: BankService,
+    progress: Callable[[str], None] = lambda stage: None,
+) -> dict:
+    """
+    Eligibility, matching and escrow submission for one request; shared by
+    the synchronous endpoint and the job workers. progress(stage) is called
+    as the pipeline moves on.
+    """
+    credit_svc, xrpl_client, proof_verifier = services.credit, services.xrpl, services.proofs
+
+    progress("eligibility")
+    # Step 1: Check eligibility
+    # Step 2: Verify optional proof, overlapped with the eligibility ledger reads
+    eligibility, verification = await asyncio.gather(
+        run_in_threadpool(
             credit_svc.check_eligibility,
             req.principal_address,
             req.amount_xrp
-        )
-        if not eligibility["eligible"]:
-            return {
-                "status": "rejected",
-                "reason": eligibility["reason"],
-                "credit": eligibility["credit"]
-            }
-        
-        # Step 2: Verify optional proof
-        if req.proof_data:
-            try:
-                proof_payload = ProofPayloadModel(**req.proof_data)
-                verifier = ProofVerifier()
-                await run_in_threadpool(verifier.verify, proof_payload)
-            except Exception as e:
-                logger.warning(f"Proof verification failed: {e}")
-        
-        # Step 3: Compute unlock timestamp
-        if req.unlock_time:
-            unlock_timestamp = int(req.unlock_time.timestamp())
-        else:
-            unlock_timestamp = int((datetime.now(timezone.utc) + timedelta(days=DEFAULT_ESCROW_DAYS)).timestamp())
-        
-        logger.info(f"Liquidity request: address={req.principal_address}, amount={req.amount_xrp}, score={eligibility['credit']['score']}")
-        
-        # Debug: log all available banks
-        all_banks = await run_in_threadpool(bank_svc.get_all_banks)
-        logger.info(f"Available banks: {[(b['bank_name'], b['wallet_address'], b.get('balance_xrp', 0)) for b in all_banks]}")
+        ),
+        _verify_optional_proof(proof_verifier, proof_payload)
+    )
+    if not eligibility["eligible"]:
+        return {
+            "status": "rejected",
+            "reason": eligibility["reason"],
+            "credit": eligibility["credit"]
+        }
+
+    # A proof counts as used once it verified and the request goes on to a bank
+    if verification is not None:
+        proof_verifier.record_use(proof_payload)
+    
+    # Step 3: Compute unlock timestamp
+    if req.unlock_time:
+        unlock_timestamp = int(req.unlock_time.timestamp())
+    else:
+        unlock_timestamp = int((datetime.now(timezone.utc) + timedelta(days=DEFAULT_ESCROW_DAYS)).timestamp())
+    
+    logger.info(f"Liquidity request: address={req.principal_address}, amount={req.amount_xrp}, score={eligibility['credit']['score']}")
+    
+    # Debug: log all available banks
+    all_banks = await run_in_threadpool(bank_svc.get_all_banks)
+    logger.info(f"Available banks: {[(b.bank_name, b.wallet_address, b.balance_xrp) for b in all_banks]}")
+    
+    # -----------------------------
+    # Step 4: Find a matching bank
+    # -----------------------------
+    progress("matching")
+    # BankService is responsible for selecting eligible banks based on:
+    # - requested amount
+    # - borrower credit score
+    matching_banks = await run_in_threadpool(
+        bank_svc.find_matching_banks,
+        req.amount_xrp,
+        eligibility["credit"]["score"]
+    )
+    
+    logger.info(f"Matching banks found: {len(matching_banks)} out of {len(all_banks)}")
+    for bank in matching_banks:
+        logger.info(f"  Matched: {bank.bank_name} ({bank.wallet_address})")
+    
+    # If no banks match, log why
+    if not matching_banks and all_banks:
+        logger.warning(f"No banks matched. Debug:")
+        for bank in all_banks:
+            logger.warning(f"  Bank: {bank.bank_name}")
+            logger.warning(f"    - Policy min: {bank.min_credit_score}, requested score: {eligibility['credit']['score']} (pass: {bank.min_credit_score <= eligibility['credit']['score']})")
+            logger.warning(f"    - Policy max: {bank.max_per_loan}, requested amount: {req.amount_xrp} (pass: {bank.max_per_loan >= req.amount_xrp})")
+            logger.warning(f"    - Balance: {bank.balance_xrp} XRP, requested: {req.amount_xrp} (pass: {bank.balance_xrp >= req.amount_xrp})")
+            logger.warning(f"    - Active: {bank.active}")
+    
+    # -----------------------------
+    # Step 5: Prepare escrow
+    # -----------------------------
+    # Auto-signing banks must win a cross-worker reservation on their balance;
+    # losing every race is a retryable rejection, not a reason to fall back
+    best_bank, reservation_id = await run_in_threadpool(
+        bank_svc.claim_bank,
+        matching_banks,
+        req.amount_xrp
+    )
+    if best_bank:
+        outcome = None
+        try:
+            outcome = await _escrow_from_bank(req, best_bank, unlock_timestamp, eligibility, services, bank_svc, progress)
+            return outcome
+        finally:
+            # The funds stay held once the escrow went out; every other exit frees them
+            if outcome is not None and outcome["status"] == "approved":
+                bank_svc.commit(reservation_id)
+            else:
+                bank_svc.release(reservation_id)
+    else:
+        # Try splitting the request across several banks before falling back
+        if req.syndicate and all_banks:
+            reserved = await run_in_threadpool(bank_svc.reserved_drops)
+            plan = SyndicationAllocator().allocate(
+                req.amount_xrp,
+                all_banks,
+                eligibility["credit"]["score"],
+                reserved
+            )
+            if plan.complete:
+                return await _syndicate(req, plan.tranches, unlock_timestamp, eligibility, services, bank_svc, progress)
+
+        # Fallback to platform wallet if no banks match
+        logger.info("No banks matched, using platform wallet fallback")
+        progress("submitting")
+        platform_wallet = xrpl_client._wallet
         
-        # -----------------------------
-        # Step 4: Find a matching bank
-        # -----------------------------
-        # BankService is responsible for selecting eligible banks based on:
-        # - requested amount
-        # - borrower credit score
-        matching_banks = await run_in_threadpool(
-            bank_svc.find_matching_banks,
-            req.amount_xrp,
-            eligibility["credit"]["score"]
+        escrow_tx = EscrowCreate(
+            account=platform_wallet.classic_address,
+            destination=req.principal_address,
+            amount=xrp_to_drops(req.amount_xrp),
+            finish_after=unlock_timestamp
         )
         
-        logger.info(f"Matching banks found: {len(matching_banks)} out of {len(all_banks)}")
-        for bank in matching_banks:
-            logger.info(f"  Matched: {bank['bank_name']} ({bank['wallet_address']})")
+        prepared_tx = await run_in_threadpool(autofill, escrow_tx, xrpl_client.client)
+        response = await run_in_threadpool(xrpl_client.submit, prepared_tx, platform_wallet, req.wait_for_validation)
         
-        # If no banks match, log why
-        if not matching_banks and all_banks:
-            logger.warning(f"No banks matched. Debug:")
-            for bank in all_banks:
-                policy = bank["credit_policy"]
-                balance = bank.get("balance_xrp", 0)
-                logger.warning(f"  Bank: {bank['bank_name']}")
-                logger.warning(f"    - Policy min: {policy['min']}, requested score: {eligibility['credit']['score']} (pass: {policy['min'] <= eligibility['credit']['score']})")
-                logger.warning(f"    - Policy max: {policy['max']}, requested amount: {req.amount_xrp} (pass: {policy['max'] >= req.amount_xrp})")
-                logger.warning(f"    - Balance: {balance} XRP, requested: {req.amount_xrp} (pass: {balance >= req.amount_xrp})")
-                logger.warning(f"    - Active: {bank.get('active', True)}")
+        tx_hash = response.get("hash")
+        tx_url = xrpl_client.get_transaction_url(tx_hash)
+        logger.info(f"Escrow created directly: {tx_hash}")
         
-        # -----------------------------
-        # Step 5: Prepare escrow
-        # -----------------------------
-        if matching_banks:
-            best_bank = matching_banks[0]
-            logger.info(f"Matched with bank: {best_bank['bank_name']} ({best_bank['wallet_address']})")
-            logger.info(f"Bank data keys: {best_bank.keys()}")
-            logger.info(f"Bank seed present: {'seed' in best_bank}")
-            logger.info(f"Bank seed value: {best_bank.get('seed', 'NOT FOUND')}")
-            
-            escrow_tx = EscrowCreate(
-                account=best_bank["wallet_address"],
-                destination=req.principal_address,
-                amount=xrp_to_drops(req.amount_xrp),
-                finish_after=unlock_timestamp
+        return {
+            "status": "approved",
+            "tx_hash": tx_hash,
+            "tx_url": tx_url,
+            "validation": _validation(response),
+            "amount_xrp": req.amount_xrp,
+            "credit": eligibility["credit"],
+            "unlock_timestamp": unlock_timestamp,
+            "message": "Escrow created successfully. Funds will be available after unlock time."
+        }
+
+
+class LiquidityRequestForAgent:
+    """The fields BankAgent reads from a liquidity request, for one bank's share of it."""
+
+    def __init__(self, req: LiquidityRequest, amount_xrp: float, unlock_timestamp: int, credit: dict):
+        self.credentials = req.proof_data or {}
+        self.business_id = req.principal_address
+        self.amount_xrp = amount_xrp
+        self.amount = amount_xrp
+        self.unlock_time = datetime.fromtimestamp(unlock_timestamp, tz=timezone.utc)
+        self.duration_days = math.ceil((self.unlock_time - datetime.now(timezone.utc)).total_seconds() / 86400)
+        self.metrics = {"default_rate": credit.get("factors", {}).get("default_rate", 1.0)}
+
+
+def _bank_agent(bank: BankRecord, principal_address: str, services: ServiceContainer, bank_svc: BankService) -> BankAgent:
+    """BankAgent for one bank: its credit policy and the borrower's outstanding principal with it."""
+    # Create policy from bank's credit policy
+    policy = bank.credit_policy
+    credit_policy = CreditPolicy(
+        max_duration_days=policy.get("max_duration_days", 365),
+        max_default_rate=policy.get("max_default_rate", 0.1),
+        max_exposure=policy.get("max_exposure", float(bank.balance_xrp)),
+        max_bank_exposure=policy.get("max_total_exposure")
+    )
+    return BankAgent(
+        proof_verifier=services.proofs,
+        policy_engine=PolicyEngine(credit_policy),
+        exposure_state=exposure_ledger.state_for(principal_address, bank.bank_id),
+        xrpl_client=services.xrpl,
+        bank_service=bank_svc
+    )
+
+
+async def _escrow_from_bank(
+    req: LiquidityRequest,
+    best_bank: BankRecord,
+    unlock_timestamp: int,
+    eligibility: dict,
+    services: ServiceContainer,
+    bank_svc: BankService,
+    progress: Callable[[str], None],
+) -> dict:
+    """Prepare the escrow from the claimed bank and let its BankAgent sign it when it has a seed."""
+    xrpl_client = services.xrpl
+    progress("signing")
+    logger.info(f"Matched with bank: {best_bank.bank_name} ({best_bank.wallet_address})")
+
+    escrow_tx = EscrowCreate(
+        account=best_bank.wallet_address,
+        destination=req.principal_address,
+        amount=xrp_to_drops(req.amount_xrp),
+        finish_after=unlock_timestamp
+    )
+
+    prepared_tx = await run_in_threadpool(autofill, escrow_tx, xrpl_client.client)
+    tx_dict = prepared_tx.to_dict()
+
+    # Try to auto-sign if bank has seed configured
+    bank_seed = best_bank.seed
+    logger.info(f"Checking auto-sign: seed configured for {best_bank.bank_name}? {bank_seed is not None}")
+
+    if bank_seed:
+        logger.info(f"✅ Auto-signing enabled! BankAgent evaluating request for {best_bank.bank_name}")
+        exposure = None
+        agent_decision = {}
+        try:
+            # Initialize BankAgent to make approval decision
+            bank_agent = await run_in_threadpool(_bank_agent, best_bank, req.principal_address, services, bank_svc)
+            agent_request = LiquidityRequestForAgent(req, req.amount_xrp, unlock_timestamp, eligibility["credit"])
+
+            # Hold the loan against the bank's exposure caps so concurrent requests cannot pass them together
+            exposure = await run_in_threadpool(
+                bank_svc.reserve_exposure,
+                best_bank,
+                req.principal_address,
+                req.amount_xrp,
+                bank_agent.policy_engine.policy,
+                exposure_ledger
             )
-            
-            prepared_tx = await run_in_threadpool(autofill, escrow_tx, xrpl_client.client)
-            tx_dict = prepared_tx.to_dict()
-            
-            # Try to auto-sign if bank has seed configured
-            bank_seed = best_bank.get("seed")
-            logger.info(f"Checking auto-sign: bank_seed is None? {bank_seed is None}, bank_seed value: '{bank_seed}'")
-            
-            if bank_seed:
-                logger.info(f"✅ Auto-signing enabled! BankAgent evaluating request for {best_bank['bank_name']}")
-                logger.info(f"BankAgent evaluating request for {best_bank['bank_name']}")
-                # Initialize BankAgent to make approval decision
-                from ..models.exposure_state import ExposureState
-                from ..services.policy_engine import PolicyEngine
-                from ..models.policy import CreditPolicy
-                
-                try:
-                    proof_verifier = ProofVerifier()
-                    
-                    # Create policy from bank's credit policy
-                    bank_policy_data = best_bank.get("credit_policy", {})
-                    credit_policy = CreditPolicy(
-                        max_duration_days=bank_policy_data.get("max_duration_days", 365),
-                        max_default_rate=bank_policy_data.get("max_default_rate", 0.1),
-                        max_exposure=bank_policy_data.get("max_exposure", float(best_bank.get("balance_xrp", 50000)))
-                    )
-                    policy_engine = PolicyEngine(credit_policy)
-                    
-                    # Create exposure state for this business-bank pair
-                    exposure_state = ExposureState(
-                        business_id=req.principal_address,
-                        bank_id=best_bank.get("bank_id", "unknown"),
-                        current_exposure=0.0  # Assume no prior exposure for simplicity
-                    )
-                    bank_agent = BankAgent(
-                        proof_verifier=proof_verifier,
-                        policy_engine=policy_engine,
-                        exposure_state=exposure_state,
-                        xrpl_client=xrpl_client,
-                        bank_service=bank_svc
-                    )
-                    
-                    # Create a request object for the BankAgent evaluation
-                    class LiquidityRequestForAgent:
-                        def __init__(self, req, principal_address, amount_xrp, unlock_time):
-                            self.credentials = req.proof_data or {}
-                            self.business_id = principal_address
-                            self.amount_xrp = amount_xrp
-                            self.amount = amount_xrp
-                            self.unlock_time = unlock_time
-                    
-                    agent_request = LiquidityRequestForAgent(
-                        req, req.principal_address, req.amount_xrp, 
-                        datetime.fromtimestamp(unlock_timestamp, tz=timezone.utc)
-                    )
-                    
-                    # BankAgent evaluates and auto-signs if approved
-                    agent_decision = await run_in_threadpool(
-                        bank_agent.evaluate_and_auto_sign_escrow,
-                        agent_request,
-                        tx_dict,
-                        best_bank,
-                        bank_seed
-                    )
-                    
-                    logger.info(f"BankAgent decision result: {agent_decision}")
-                except Exception as e:
-                    logger.error(f"BankAgent evaluation error: {e}", exc_info=True)
-                    agent_decision = {"approved": False, "status": "error", "reason": str(e)}
-                
-                if agent_decision.get("approved"):
-                    # Bank approved and signed
-                    tx_hash = agent_decision["tx_hash"]
-                    tx_url = xrpl_client.get_transaction_url(tx_hash)
-                    
-                    return {
-                        "status": "approved",
-                        "tx_hash": tx_hash,
-                        "tx_url": tx_url,
-                        "amount_xrp": req.amount_xrp,
-                        "credit": eligibility["credit"],
-                        "unlock_timestamp": unlock_timestamp,
-                        "matched_bank": {
-                            "name": best_bank["bank_name"],
-                            "wallet": best_bank["wallet_address"]
-                        },
-                        "auto_signed": True,
-                        "bank_decision": agent_decision["status"],
-                        "message": f"{best_bank['bank_name']} automatically approved and signed the escrow."
-                    }
-                else:
-                    # Bank rejected the request
-                    logger.info(f"Bank decision: NOT approved - {agent_decision.get('status')}")
-                    return {
-                        "status": "rejected",
-                        "bank_name": best_bank["bank_name"],
-                        "reason": agent_decision.get("reason", "Unknown"),
-                        "credit": eligibility["credit"],
-                        "bank_decision": agent_decision.get("status", "rejected"),
-                        "message": agent_decision.get("message", "Request was rejected by the bank.")
-                    }
+            if exposure is None:
+                agent_decision = await run_in_threadpool(bank_agent.evaluate_escrow, agent_request, best_bank)
+                if agent_decision is None:
+                    raise BankCapacityTaken(f"{best_bank.bank_name} exposure is held by concurrent requests; retry shortly")
             else:
-                # No seed configured, return for manual signing
-                return {
-                    "status": "matched",
-                    "transaction": tx_dict,
-                    "amount_xrp": req.amount_xrp,
-                    "credit": eligibility["credit"],
-                    "unlock_timestamp": unlock_timestamp,
-                    "matched_bank": {
-                        "name": best_bank["bank_name"],
-                        "wallet": best_bank["wallet_address"]
-                    },
-                    "auto_signed": False,
-                    "message": f"Matched with {best_bank['bank_name']}. Escrow transaction prepared for manual signing (no seed configured)."
-                }
-        else:
-            # Fallback to platform wallet if no banks match
-            logger.info("No banks matched, using platform wallet fallback")
-            platform_wallet = xrpl_client._wallet
-            
-            escrow_tx = EscrowCreate(
-                account=platform_wallet.classic_address,
-                destination=req.principal_address,
-                amount=xrp_to_drops(req.amount_xrp),
-                finish_after=unlock_timestamp
-            )
-            
-            prepared_tx = await run_in_threadpool(autofill, escrow_tx, xrpl_client.client)
-            response = await run_in_threadpool(xrpl_client.submit, prepared_tx, platform_wallet)
-            
-            tx_hash = response.get("hash")
+                # BankAgent evaluates and auto-signs if approved
+                agent_decision = await run_in_threadpool(
+                    bank_agent.evaluate_and_auto_sign_escrow,
+                    agent_request,
+                    tx_dict,
+                    best_bank,
+                    req.wait_for_validation
+                )
+
+            logger.info(f"BankAgent decision result: {agent_decision}")
+        except BankCapacityTaken:
+            raise
+        except Exception as e:
+            logger.error(f"BankAgent evaluation error: {e}", exc_info=True)
+            agent_decision = {"approved": False, "status": "error", "reason": str(e)}
+        finally:
+            if agent_decision.get("approved"):
+                bank_svc.commit_exposure(exposure)
+            else:
+                bank_svc.release_exposure(exposure)
+
+        if agent_decision.get("approved"):
+            # Bank approved and signed
+            tx_hash = agent_decision["tx_hash"]
             tx_url = xrpl_client.get_transaction_url(tx_hash)
-            logger.info(f"Escrow created directly: {tx_hash}")
-            
+
             return {
                 "status": "approved",
                 "tx_hash": tx_hash,
                 "tx_url": tx_url,
+                "validation": _validation(agent_decision),
                 "amount_xrp": req.amount_xrp,
                 "credit": eligibility["credit"],
                 "unlock_timestamp": unlock_timestamp,
-                "message": "Escrow created successfully. Funds will be available after unlock time."
+                "matched_bank": {
+                    "name": best_bank.bank_name,
+                    "wallet": best_bank.wallet_address
+                },
+                "auto_signed": True,
+                "bank_decision": agent_decision["status"],
+                "message": f"{best_bank.bank_name} automatically approved and signed the escrow."
+            }
+        else:
+            # Bank rejected the request
+            logger.info(f"Bank decision: NOT approved - {agent_decision.get('status')}")
+            return {
+                "status": "rejected",
+                "bank_name": best_bank.bank_name,
+                "reason": agent_decision.get("reason", "Unknown"),
+                "credit": eligibility["credit"],
+                "bank_decision": agent_decision.get("status", "rejected"),
+                "message": agent_decision.get("message", "Request was rejected by the bank.")
             }
+    else:
+        # No seed configured, return for manual signing
+        return {
+            "status": "matched",
+            "transaction": tx_dict,
+            "amount_xrp": req.amount_xrp,
+            "credit": eligibility["credit"],
+            "unlock_timestamp": unlock_timestamp,
+            "matched_bank": {
+                "name": best_bank.bank_name,
+                "wallet": best_bank.wallet_address
+            },
+            "auto_signed": False,
+            "message": f"Matched with {best_bank.bank_name}. Escrow transaction prepared for manual signing (no seed configured)."
+        }
 
-    except HTTPException:
-        raise
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+def _parse_proof(proof_data: Optional[dict]) -> Optional[ProofPayloadModel]:
+    if not proof_data:
+        return None
+    try:
+        return ProofPayloadModel(**proof_data)
     except Exception as e:
-        logger.error(f"Liquidity request failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to process liquidity request: {str(e)}")
+        logger.warning(f"Proof verification failed: {e}")
+        return None
+
+
+async def _verify_optional_proof(verifier: ProofVerifier, proof_payload: Optional[ProofPayloadModel]) -> Optional[dict]:
+    """Verify the proof if given; failures are logged, not fatal to the request."""
+    if proof_payload is None:
+        return None
+    try:
+        return await verifier.verify_async(proof_payload)
+    except Exception as e:
+        logger.warning(f"Proof verification failed: {e}")
+        return None
+
+
+def _validation(result: dict) -> str:
+    """'validated' for wait-mode results, 'pending' for fire-and-track ones (poll /api/transactions/{hash})."""
+    return "validated" if result.get("validated") else "pending"
+
+
+async def _syndicate(
+    req: LiquidityRequest,
+    tranches: List[Tranche],
+    unlock_timestamp: int,
+    eligibility: dict,
+    services: ServiceContainer,
+    bank_svc: BankService,
+    progress: Callable[[str], None],
+) -> dict:
+    """
+    Fund the request from several banks. A submitted escrow cannot be taken
+    back, so every auto-signing bank's BankAgent approves its tranche and its
+    balance is reserved before any escrow goes out.
+    """
+    progress("syndicating")
+    logger.info(f"Syndicating {req.amount_xrp} XRP across {len(tranches)} banks")
+    # Building an agent and evaluating it read the exposure ledger (SQLite): keep them off the event loop
+    seeded = [i for i, tranche in enumerate(tranches) if tranche.bank.seed]
+    built = await asyncio.gather(*[
+        run_in_threadpool(_bank_agent, tranches[i].bank, req.principal_address, services, bank_svc)
+        for i in seeded
+    ])
+    agents = dict(zip(seeded, built))
+    requests = {i: LiquidityRequestForAgent(req, tranches[i].amount_xrp, unlock_timestamp, eligibility["credit"]) for i in agents}
+    for i, agent in agents.items():
+        rejection = await run_in_threadpool(agent.evaluate_escrow, requests[i], tranches[i].bank)
+        if rejection is not None:
+            logger.info(f"Syndication rejected by {tranches[i].bank.bank_name}: {rejection['reason']}")
+            return {
+                "status": "rejected",
+                "bank_name": tranches[i].bank.bank_name,
+                "reason": rejection["reason"],
+                "credit": eligibility["credit"],
+                "bank_decision": rejection["status"],
+                "message": rejection["message"]
+            }
+
+    reservations = {}
+    exposures = {}
+    results: List[dict] = []
+    try:
+        for i in agents:
+            bank = tranches[i].bank
+            reservation_id = await run_in_threadpool(bank_svc.reserve, bank, tranches[i].amount_xrp)
+            if not reservation_id:
+                raise BankCapacityTaken(f"{bank.bank_name} capacity taken by a concurrent request; retry shortly")
+            reservations[i] = reservation_id
+            exposure = await run_in_threadpool(
+                bank_svc.reserve_exposure, bank, req.principal_address, tranches[i].amount_xrp,
+                agents[i].policy_engine.policy, exposure_ledger
+            )
+            if exposure is None:
+                raise BankCapacityTaken(f"{bank.bank_name} exposure is held by concurrent requests; retry shortly")
+            exposures[i] = exposure
+        results = await asyncio.gather(*[
+            run_in_threadpool(
+                _submit_tranche, tranche, agents.get(i), requests.get(i),
+                req.principal_address, unlock_timestamp, services.xrpl, req.wait_for_validation
+            )
+            for i, tranche in enumerate(tranches)
+        ])
+    finally:
+        # The funds stay held for tranches whose escrow went out; every other exit frees them
+        for i, reservation_id in reservations.items():
+            if i < len(results) and results[i]["status"] == "approved":
+                bank_svc.commit(reservation_id)
+                bank_svc.commit_exposure(exposures.get(i))
+            else:
+                bank_svc.release(reservation_id)
+                bank_svc.release_exposure(exposures.get(i))
+
+    failed = [t for t in results if t["status"] == "failed"]
+    return {
+        "status": "partially_syndicated" if failed else "syndicated",
+        "amount_xrp": req.amount_xrp,
+        "credit": eligibility["credit"],
+        "unlock_timestamp": unlock_timestamp,
+        "tranches": results,
+        "message": (
+            f"Request split across {len(tranches)} banks."
+            + (f" {len(failed)} tranche(s) failed to submit." if failed else "")
+        )
+    }
+
+
+def _submit_tranche(
+    tranche: Tranche,
+    agent: Optional[BankAgent],
+    agent_request: Optional["LiquidityRequestForAgent"],
+    principal_address: str,
+    unlock_timestamp: int,
+    xrpl_client: XRPLClient,
+    wait: bool = True
+) -> dict:
+    """Prepare one syndicated escrow and let the bank's BankAgent sign it (agent is None without a seed)."""
+    bank = tranche.bank
+    summary = {
+        "bank_name": bank.bank_name,
+        "wallet": bank.wallet_address,
+        "amount_xrp": tranche.amount_xrp,
+    }
+    try:
+        escrow_tx = EscrowCreate(
+            account=bank.wallet_address,
+            destination=principal_address,
+            amount=str(tranche.amount_drops),
+            finish_after=unlock_timestamp
+        )
+        prepared_tx = autofill(escrow_tx, xrpl_client.client)
+        if agent is None:
+            return {**summary, "status": "matched", "auto_signed": False, "transaction": prepared_tx.to_dict()}
+
+        decision = agent.evaluate_and_auto_sign_escrow(agent_request, prepared_tx.to_dict(), bank, wait)
+        if not decision.get("approved"):
+            return {**summary, "status": "failed", "reason": decision.get("reason"), "bank_decision": decision.get("status")}
+        tx_hash = decision["tx_hash"]
+        return {
+            **summary,
+            "status": "approved",
+            "auto_signed": True,
+            "tx_hash": tx_hash,
+            "tx_url": xrpl_client.get_transaction_url(tx_hash),
+            "validation": _validation(decision),
+            "bank_decision": decision["status"],
+        }
+    except Exception as e:
+        logger.error(f"Syndicated tranche failed for {bank.bank_name}: {e}", exc_info=True)
+        return {**summary, "status": "failed", "reason": str(e)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_loan_job(job_id: str, jobs: LoanJobQueue = Depends(get_loan_jobs)):
+    """Poll a queued liquidity request; result holds the /request response once it succeeded."""
+    job = await jobs.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job.to_json()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_loan_job(job_id: str, request: Request, jobs: LoanJobQueue = Depends(get_loan_jobs)):
+    """
+    Server-Sent Events for a queued liquidity request: one event per status or
+    stage change, ending with the succeeded / failed event. A reconnecting
+    client's Last-Event-ID resumes after the events it already has.
+    """
+    job = await jobs.find(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    try:
+        after = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        after = 0
+
+    async def _events():
+        async for event in job.follow(after=after, heartbeat=JOB_HEARTBEAT_SECONDS):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"id: {event['seq']}\nevent: {event['status']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/credit-score/{address}")
-async def get_credit_score(address: str):
+async def get_credit_score(address: str, credit_svc: CreditService = Depends(get_credit_service)):
     """Get credit score for an XRPL address."""
     try:
         validate_xrpl_address(address)
-        credit_svc = CreditService()
         credit = await run_in_threadpool(credit_svc.get_credit_score, address)
         return credit
     except ValueError as e:
@@ -337,18 +647,51 @@ async def get_credit_score(address: str):
         raise HTTPException(status_code=500, detail="Failed to fetch credit score")
 
 
+@router.get("/escrows")
+async def list_escrows(destination: Optional[str] = None, owner: Optional[str] = None):
+    """List live escrows from the local escrow index (no ledger scan)."""
+    if not destination and not owner:
+        raise HTTPException(status_code=400, detail="Provide destination or owner")
+    try:
+        if destination:
+            validate_xrpl_address(destination)
+            escrows = escrow_index.for_destination(destination)
+            if owner:
+                escrows = [e for e in escrows if e.owner == owner]
+        else:
+            validate_xrpl_address(owner)
+            escrows = escrow_index.for_owner(owner)
+        return {"escrows": [e.to_json() for e in escrows], "count": len(escrows)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _find_matured_escrow(borrower_wallet: str, owner_wallet: Optional[str]) -> tuple:
+    """Pick the earliest escrow to the borrower whose FinishAfter has passed."""
+    now = datetime_to_ripple_time(datetime.now(timezone.utc))
+    for escrow in escrow_index.for_destination(borrower_wallet):
+        if owner_wallet and escrow.owner != owner_wallet:
+            continue
+        if escrow.finish_after is None or escrow.finish_after <= now:
+            return escrow.owner, escrow.sequence
+    raise ValueError("No matured escrow found for this borrower. Supply escrow_sequence and owner_wallet.")
+
+
 @router.post("/finish-escrow")
-async def finish_escrow(req: EscrowFinishRequest):
+async def finish_escrow(req: EscrowFinishRequest, xrpl_client: XRPLClient = Depends(get_xrpl_client)):
     """Prepare EscrowFinish transaction for borrower to sign."""
     try:
         validate_xrpl_address(req.borrower_wallet)
-        validate_xrpl_address(req.owner_wallet)
+        owner_wallet, escrow_sequence = req.owner_wallet, req.escrow_sequence
+        if owner_wallet:
+            validate_xrpl_address(owner_wallet)
+        if not (owner_wallet and escrow_sequence):
+            owner_wallet, escrow_sequence = _find_matured_escrow(req.borrower_wallet, owner_wallet)
         
-        xrpl_client = XRPLClient()
         escrow_tx = EscrowFinish(
             account=req.borrower_wallet,
-            owner=req.owner_wallet,
-            offer_sequence=req.escrow_sequence
+            owner=owner_wallet,
+            offer_sequence=escrow_sequence
         )
         
         prepared_tx = await run_in_threadpool(autofill, escrow_tx, xrpl_client.client)
@@ -366,15 +709,37 @@ async def finish_escrow(req: EscrowFinishRequest):
 
 
 @router.post("/verify-proof")
-async def verify_proof(proof_data: dict):
+async def verify_proof(proof_data: dict, verifier: ProofVerifier = Depends(get_proof_verifier)):
     """Standalone endpoint to verify proof data."""
     try:
         proof_payload = ProofPayloadModel(**proof_data)
-        verifier = ProofVerifier()
-        result = await run_in_threadpool(verifier.verify, proof_payload)
+        result = await verifier.verify_async(proof_payload)
         return {"status": "success", "result": result}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Proof verification failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to verify proof")
+
+
+@router.post("/verify-proof/batch")
+async def verify_proof_batch(req: ProofBatchRequest, verifier: ProofVerifier = Depends(get_proof_verifier)):
+    """
+    Verify many proofs at once; uncached signatures are checked together
+    off the event loop. Results are in input order; a proof that fails
+    verification gets {"valid": false, "error": ...} instead of failing the batch.
+    """
+    payloads, results = [], [None] * len(req.proofs)
+    for i, proof_data in enumerate(req.proofs):
+        try:
+            payloads.append((i, ProofPayloadModel(**proof_data)))
+        except ValueError as e:
+            results[i] = {"valid": False, "error": str(e)}
+    try:
+        verified = await verifier.verify_batch_async([proof for _, proof in payloads]) if payloads else []
+    except Exception as e:
+        logger.error(f"Batch proof verification failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to verify proofs")
+    for (i, _), result in zip(payloads, verified):
+        results[i] = result
+    return {"status": "success", "results": results, "count": len(results)}
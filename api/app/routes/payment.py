@@ -1,6 +1,18 @@
-from fastapi import APIRouter, Query, HTTPException
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Literal, Optional
+import logging
 
+from app.services.container import get_history_service
 from app.services.payment_history_service import PaymentHistoryService
+from app.services.payment_store import HistoryFilter
+from app.utils.amounts import to_units
+from app.utils.export import csv_chunks, gzip_chunks, ndjson_chunks
+from app.utils.validators import validate_xrpl_address
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
 router = APIRouter(
     prefix="/payments",
@@ -8,29 +20,208 @@ router = APIRouter(
 )
 
 
+def _posix(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _parse_types(types: Optional[str]) -> Optional[set]:
+    if not types:
+        return None
+    requested = {t.strip() for t in types.split(",") if t.strip()}
+    unknown = requested - PaymentHistoryService.SUPPORTED_TX_TYPES
+    if unknown:
+        raise ValueError(
+            f"Unsupported transaction types: {', '.join(sorted(unknown))} "
+            f"(expected a subset of {', '.join(sorted(PaymentHistoryService.SUPPORTED_TX_TYPES))})"
+        )
+    return requested
+
+
 @router.get("/history")
 def get_payment_history(
     address: str = Query(..., description="XRPL account address"),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from a previous page's X-Next-Cursor header"),
+    types: Optional[str] = Query(None, description="Comma-separated transaction types, e.g. Payment,EscrowFinish"),
+    date_from: Optional[datetime] = Query(None, description="Inclusive lower bound (UTC if no offset)"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive upper bound (UTC if no offset)"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    source: Literal["local", "ledger"] = Query("local", description="local history store, or walk the ledger directly"),
+    service: PaymentHistoryService = Depends(get_history_service),
 ):
     """
-    Return recent XRPL-backed payment history.
+    Return XRPL-backed payment history, filtered and cursor-paginated.
 
     Notes:
     - Only validated transactions
     - Most recent first
-    - No pagination (v1)
+    - Filters are applied while pages are walked, so a page holds up to
+      `limit` matching entries
+    - The next page's cursor is returned in the X-Next-Cursor header; it is
+      bound to the address, filters and source it was issued for
     """
     try:
-        service = PaymentHistoryService()
-        result = service.get_payment_history(
+        validate_xrpl_address(address)
+        filters = HistoryFilter(
+            types=_parse_types(types),
+            date_from=_posix(date_from),
+            date_to=_posix(date_to),
+            min_amount=to_units(min_amount) if min_amount is not None else None,
+            max_amount=to_units(max_amount) if max_amount is not None else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        result = service.page(
             address=address,
             limit=limit,
+            cursor=cursor,
+            filters=filters,
+            source=source,
         )
-        # Hide marker for now
-        return result["payments"]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch payment history: {e}",
         )
+    # The body stays a plain list for existing clients
+    headers = {"X-Next-Cursor": result["cursor"]} if result["cursor"] else {}
+    return JSONResponse(result["payments"], headers=headers)
+
+
+MAX_FEED_ADDRESSES = 50
+
+
+@router.get("/feed")
+def get_portfolio_feed(
+    addresses: str = Query(..., description=f"Comma-separated XRPL addresses (max {MAX_FEED_ADDRESSES})"),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque token from a previous page's X-Next-Cursor header"),
+    service: PaymentHistoryService = Depends(get_history_service),
+):
+    """
+    Return one newest-first activity feed across several addresses.
+
+    Notes:
+    - Each entry carries the address whose history it came from; a transfer
+      between two listed addresses appears once for each
+    - The next page's cursor is returned in the X-Next-Cursor header and is
+      bound to the address set
+    """
+    requested = [a.strip() for a in addresses.split(",") if a.strip()]
+    try:
+        if not requested:
+            raise ValueError("At least one address is required")
+        if len(set(requested)) > MAX_FEED_ADDRESSES:
+            raise ValueError(f"At most {MAX_FEED_ADDRESSES} addresses per feed")
+        for address in requested:
+            validate_xrpl_address(address)
+        result = service.feed(requested, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch portfolio feed: {e}",
+        )
+    headers = {"X-Next-Cursor": result["cursor"]} if result["cursor"] else {}
+    return JSONResponse(result["payments"], headers=headers)
+
+@router.get("/summary")
+def get_payment_summary(
+    address: str = Query(..., description="XRPL account address"),
+    period: Literal["day", "week"] = Query("day"),
+    date_from: Optional[datetime] = Query(None, description="Inclusive; the bucket containing it is included"),
+    date_to: Optional[datetime] = Query(None, description="Exclusive upper bound on bucket start"),
+    service: PaymentHistoryService = Depends(get_history_service),
+):
+    """
+    Return per-day or per-week activity for an address, oldest bucket first.
+
+    Notes:
+    - Read from rollups maintained while history syncs, so the cost depends
+      on the number of buckets, not on history length
+    - Inflow / outflow count completed transactions only, per currency
+    """
+    try:
+        validate_xrpl_address(address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return service.summary(
+            address=address,
+            period=period,
+            since=_posix(date_from),
+            until=_posix(date_to),
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch payment summary: {e}",
+        )
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_chunks),
+    "csv": ("text/csv", csv_chunks),
+}
+
+
+@router.get("/export")
+def export_payment_history(
+    address: str = Query(..., description="XRPL account address"),
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    gzip: bool = Query(False, description="Compress the export as a .gz file"),
+    service: PaymentHistoryService = Depends(get_history_service),
+):
+    """
+    Stream an account's complete payment history as NDJSON or CSV.
+
+    Notes:
+    - Walks every account_tx page from the ledger, most recent first
+    - Each page is written as soon as it arrives; memory does not grow with
+      history length
+    - Errors before the first page return 500; a failure mid-stream aborts
+      the connection
+    """
+    try:
+        validate_xrpl_address(address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    pages = service.iter_pages(address)
+    try:
+        # Fetch the first page up front so ledger errors still get a status code
+        first = next(pages)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to export payment history: {e}",
+        )
+
+    def _pages():
+        yield first
+        try:
+            yield from pages
+        except Exception as e:
+            logger.error(f"Export for {address} aborted mid-stream: {e}")
+            # Re-raise so the server drops the connection instead of ending the
+            # body cleanly: a truncated export must not look complete
+            raise
+
+    media_type, encode = EXPORT_FORMATS[format]
+    body = encode(_pages())
+    filename = f"{address}-history.{format}"
+    if gzip:
+        body, media_type, filename = gzip_chunks(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import logging
+
+from ..services.xrpl_client import XRPLClient
+from ..services.container import get_xrpl_client
+from ..services.validation_tracker import TransactionFailed
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Transactions"])
+
+
+def _summary(outcome: dict) -> dict:
+    return {k: outcome.get(k) for k in ("hash", "status", "engine_result", "ledger_index")}
+
+
+@router.get("/{tx_hash}")
+async def get_transaction_status(tx_hash: str, xrpl_client: XRPLClient = Depends(get_xrpl_client)):
+    """Poll the outcome of a fire-and-track submission (falls back to a ledger lookup)."""
+    outcome = xrpl_client.tracker.status(tx_hash)
+    if outcome:
+        return _summary(outcome)
+    try:
+        result = await run_in_threadpool(xrpl_client.get_transaction, tx_hash)
+    except Exception as e:
+        logger.error(f"Transaction lookup failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch transaction")
+    if result.get("error"):
+        raise HTTPException(status_code=404, detail=f"Transaction not found: {result.get('error')}")
+    engine_result = (result.get("meta") or {}).get("TransactionResult")
+    if not result.get("validated"):
+        status = "pending"
+    else:
+        status = "validated" if engine_result == "tesSUCCESS" else "failed"
+    return {"hash": tx_hash, "status": status, "engine_result": engine_result, "ledger_index": result.get("ledger_index")}
+
+
+@router.get("/{tx_hash}/wait")
+async def wait_for_transaction(
+    tx_hash: str,
+    timeout: float = Query(30, gt=0, le=120),
+    xrpl_client: XRPLClient = Depends(get_xrpl_client),
+):
+    """Hold the request open until a tracked transaction validates, fails or times out."""
+    tracker = xrpl_client.tracker
+    try:
+        return _summary(await tracker.wait_async(tx_hash, timeout))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Transaction is not being tracked")
+    except TransactionFailed as e:
+        return _summary(e.outcome)
+    except asyncio.TimeoutError:
+        return _summary(tracker.status(tx_hash) or {"hash": tx_hash, "status": "pending"})
@@ -0,0 +1,273 @@
+# api/services/bank_registry.py
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+from .state_backend import StateBackend, get_state_backend
+from ..models.bank import BankRecord
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+BANKS_FILE = DATA_DIR / "banks.json"
+REGISTRY_COUNTER = "bank_registry"
+WRITE_LEASE = "bank-registry-write"
+WRITE_LEASE_TTL_SECONDS = 30  # a worker that dies mid-write frees the lease after this
+WRITE_LOCK_TIMEOUT_SECONDS = 10
+
+
+class BankIndex:
+    """
+    Immutable snapshot of the bank registry.
+
+    A request that grabs an index keeps seeing the same banks even if
+    banks.json is swapped underneath it.
+    """
+    __slots__ = ("by_wallet", "banks", "generation")
+
+    def __init__(self, banks: Iterable[BankRecord], generation: int):
+        by_wallet: Dict[str, BankRecord] = {}
+        for bank in banks:
+            by_wallet[bank.wallet_address] = bank
+        self.by_wallet = by_wallet
+        # Pre-sorted by permissiveness so matching does not sort per request
+        self.banks: Tuple[BankRecord, ...] = tuple(sorted(by_wallet.values(), key=lambda b: b.min_credit_score))
+        self.generation = generation
+
+    def get(self, wallet_address: str) -> Optional[BankRecord]:
+        return self.by_wallet.get(wallet_address)
+
+    def __len__(self) -> int:
+        return len(self.banks)
+
+
+class BankRegistry:
+    """
+    Process-wide owner of the bank list.
+
+    Responsibilities:
+    - Parse banks.json once at startup
+    - Watch the file's mtime and atomically swap in a fresh BankIndex on change
+    - Persist registrations and balance refreshes with an atomic file write,
+      under a state-backend lease and against a fresh read of the file, so
+      concurrent writers in other workers cannot drop each other's changes
+    - Bump a shared counter on writes so other worker processes reload too
+    - Tell listeners about every new index, whether loaded or written here
+    """
+
+    def __init__(self, path: Path = BANKS_FILE, check_interval: float = 1.0, state: StateBackend | None = None):
+        """
+        :param path: location of banks.json
+        :param check_interval: minimum seconds between mtime checks on the request path
+        :param state: shared state backend (defaults to the process-wide one)
+        """
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._state = state
+        self._seen_version = 0
+        self._index = BankIndex((), generation=0)
+        self._mtime_ns: Optional[int] = None
+        self._loaded = False
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._listeners: List[Callable[[BankIndex], None]] = []
+
+    # -------------------------
+    # Read side
+    # -------------------------
+    def snapshot(self) -> BankIndex:
+        """Return the current index, reloading first if banks.json changed."""
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._index
+
+    @property
+    def generation(self) -> int:
+        return self._index.generation
+
+    def add_listener(self, listener: Callable[[BankIndex], None]) -> None:
+        """Register a callable invoked with each new index (keep it quick: it runs under the registry lock)."""
+        self._listeners.append(listener)
+
+    def _notify(self, index: BankIndex) -> None:
+        for listener in self._listeners:
+            try:
+                listener(index)
+            except Exception as e:
+                logger.warning(f"Bank registry listener failed: {e}", exc_info=True)
+
+    @property
+    def state(self) -> StateBackend:
+        if self._state is None:
+            self._state = get_state_backend()
+        return self._state
+
+    # -------------------------
+    # Loading
+    # -------------------------
+    def load(self) -> BankIndex:
+        """(Re)build the index from disk. A broken file keeps the previous index."""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> BankIndex:
+        # Caller holds self._lock
+        self._last_check = time.monotonic()
+        version = self.state.get_counter(REGISTRY_COUNTER)
+        mtime_ns = None
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+            with open(self.path, "r") as f:
+                raw_banks = json.load(f)
+            records = [BankRecord.from_json(b, default_bank_id=_default_bank_id(b)) for b in raw_banks]
+        except FileNotFoundError:
+            if not self._loaded:
+                logger.warning(f"{self.path.name} not found, starting with empty bank list")
+            self._loaded = True
+            return self._index
+        except Exception as e:
+            logger.error(f"Failed to load {self.path.name}, keeping previous bank list: {e}")
+            # Remember the broken version so it is not reparsed on every check
+            self._mtime_ns = mtime_ns
+            self._seen_version = version
+            self._loaded = True
+            return self._index
+
+        self._index = BankIndex(records, generation=self._index.generation + 1)
+        self._mtime_ns = mtime_ns
+        self._seen_version = version
+        self._loaded = True
+        logger.info(f"Loaded banks (generation {self._index.generation}): {list(self._index.by_wallet.keys())}")
+        self._notify(self._index)
+        return self._index
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the file's mtime or the shared registry counter moved since the last load."""
+        self._last_check = time.monotonic()
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime_ns == self._mtime_ns and self.state.get_counter(REGISTRY_COUNTER) == self._seen_version:
+            return False
+        self.load()
+        return True
+
+    # -------------------------
+    # Write side
+    # -------------------------
+    def upsert(self, bank: BankRecord) -> BankIndex:
+        """Add or replace a bank, persist, and swap in the new index."""
+        with self._exclusive():
+            banks = dict(self._index.by_wallet)
+            banks[bank.wallet_address] = bank
+            return self._swap(banks.values())
+
+    def update_balances(self, balances: Dict[str, int]) -> BankIndex:
+        """
+        Apply fresh balances (drops by wallet address) to the current banks.
+
+        Runs under the write lock against the file as it is now, so banks
+        registered while the balances were being fetched, by any worker, are kept.
+        """
+        with self._exclusive():
+            banks = []
+            for bank in self._index.banks:
+                if bank.wallet_address in balances:
+                    bank = bank.copy()
+                    bank.balance_drops = balances[bank.wallet_address]
+                banks.append(bank)
+            return self._swap(banks)
+
+    def replace_all(self, banks: Iterable[BankRecord]) -> BankIndex:
+        """Persist the given banks and make them the current index."""
+        with self._exclusive(reload=False):
+            return self._swap(banks)
+
+    @contextmanager
+    def _exclusive(self, reload: bool = True) -> Iterator[None]:
+        """
+        Hold the registry lock in this process and the write lease across
+        workers, and (re)read banks.json under them so the write starts from
+        what is on disk rather than this worker's possibly stale index.
+        """
+        holder = uuid4().hex
+        deadline = time.monotonic() + WRITE_LOCK_TIMEOUT_SECONDS
+        with self._lock:
+            while not self.state.acquire_lease(WRITE_LEASE, holder, WRITE_LEASE_TTL_SECONDS):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"{self.path.name} is being written by another worker")
+                time.sleep(0.05)
+            try:
+                if reload:
+                    self._load()
+                yield
+            finally:
+                self.state.release_lease(WRITE_LEASE, holder)
+
+    def _swap(self, banks: Iterable[BankRecord]) -> BankIndex:
+        index = BankIndex(banks, generation=self._index.generation + 1)
+        try:
+            self._write(index)
+        except Exception as e:
+            # Keep the index matching the file every other worker reads
+            logger.error(f"Failed to save {self.path.name}: {e}")
+            raise
+        self._index = index
+        self._notify(index)
+        return index
+
+    def _write(self, index: BankIndex) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump([b.to_storage() for b in index.banks], f, indent=2)
+        os.replace(tmp_path, self.path)
+        # Our own write must not trigger a reload on the next check
+        self._mtime_ns = self.path.stat().st_mtime_ns
+        self._seen_version = self.state.incr_counter(REGISTRY_COUNTER)
+        logger.info(f"{self.path.name} updated")
+
+    # -------------------------
+    # File watching
+    # -------------------------
+    def start_watching(self, interval: float = 2.0) -> None:
+        """Poll banks.json in a daemon thread so edits are picked up without traffic."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.warning(f"Bank registry watcher error: {e}")
+
+        self._watcher = threading.Thread(target=_watch, name="bank-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+
+def _default_bank_id(raw: Dict) -> str:
+    """Stable id for entries without a bank_id, so every load and worker agrees on it."""
+    return str(uuid5(NAMESPACE_URL, f"xrpl:{raw.get('wallet_address', '')}"))
+
+
+bank_registry = BankRegistry()
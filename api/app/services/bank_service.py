@@ -1,73 +1,44 @@
 # api/services/bank_service.py
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
-from pathlib import Path
-import json
+import threading
+import time
 from uuid import uuid4
 
 from .xrpl_client import XRPLClient
+from .bank_registry import BankRegistry, BankIndex, bank_registry
+from .state_backend import StateBackend, get_state_backend
+from .exposure_ledger import PLATFORM_BANK_ID, ExposureLedger
+from ..models.bank import BankRecord
+from ..models.policy import CreditPolicy
+from ..utils.amounts import to_units
 from ..utils.validators import validate_xrpl_address
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-DATA_DIR = Path(__file__).resolve().parents[2] / "data"
-BANKS_FILE = DATA_DIR / "banks.json"
+RESERVATION_TTL_SECONDS = 300  # Hold funds while a claimed escrow is being signed and submitted
+# A refresh only settles commitments older than this: their escrow has had time to
+# validate (LastLedgerSequence window) and leave the balance the refresh reads
+SETTLE_MARGIN_SECONDS = 120
 
-_banks: Dict[str, Dict] = {}
 
+class BankCapacityTaken(Exception):
+    """Every matching bank's capacity was claimed by concurrent requests; retry shortly."""
 
-class BankService:
-    def __init__(self):
-        self.xrpl = XRPLClient()
-        self._load_banks()
 
-    # -------------------------
-    # Load / save JSON
-    # -------------------------
-    def _load_banks(self):
-        """Load banks from banks.json into memory."""
-        global _banks
-        try:
-            with open(BANKS_FILE, "r") as f:
-                raw_banks = json.load(f)
-                _banks = {}
-                for b in raw_banks:
-                    # Ensure backward compatibility with older JSONs
-                    bank_id = b.get("bank_id") or str(uuid4())
-                    wallet_address = b["wallet_address"]
-                    bank_data = {
-                        "bank_id": bank_id,
-                        "bank_name": b.get("bank_name", "Unnamed Bank"),
-                        "wallet_address": wallet_address,
-                        "credit_policy": b.get("credit_policy", {
-                            "min": b.get("min_credit_score", 500),
-                            "max": b.get("max_per_loan", 1000),
-                            "risk_score_threshold": 300
-                        }),
-                        "issued_tokens": b.get("issued_tokens", []),
-                        "trustlines": b.get("trustlines", []),
-                        "balance_xrp": b.get("balance_xrp", 0.0),
-                        "active": b.get("active", True),
-                        "seed": b.get("seed")  # Include seed for auto-signing
-                    }
-                    _banks[wallet_address] = bank_data
-                logger.info(f"Loaded banks: {list(_banks.keys())}")
-        except FileNotFoundError:
-            logger.warning("banks.json not found, starting with empty bank list")
-            _banks = {}
-        except Exception as e:
-            logger.error(f"Failed to load banks.json: {e}")
-            _banks = {}
-
-    def _save_banks(self):
-        """Persist in-memory banks to banks.json."""
-        try:
-            with open(BANKS_FILE, "w") as f:
-                json.dump(list(_banks.values()), f, indent=2)
-                logger.info("banks.json updated")
-        except Exception as e:
-            logger.error(f"Failed to save banks.json: {e}")
+class BankService:
+    def __init__(
+        self,
+        registry: BankRegistry | None = None,
+        state: StateBackend | None = None,
+        xrpl_client: XRPLClient | None = None,
+    ):
+        self.xrpl = xrpl_client if xrpl_client is not None else XRPLClient()
+        self.registry = registry or bank_registry
+        self.state = state or get_state_backend()
+        # One consistent view of the banks for the lifetime of this service
+        self.index: BankIndex = self.registry.snapshot()
 
     # -------------------------
     # Register a new bank
@@ -79,66 +50,198 @@ class BankService:
         max_per_loan: float,
         min_credit_score: int = 500,
         issued_tokens: Optional[List[Dict]] = None
-    ) -> Dict:
+    ) -> BankRecord:
         validate_xrpl_address(wallet_address)
         account_info = self.xrpl.get_account_info(wallet_address)
         balance_drops = int(account_info.get("account_data", {}).get("Balance", 0))
-        balance_xrp = float(balance_drops) / 1_000_000
-
-        bank_data = {
-            "bank_id": str(uuid4()),
-            "bank_name": bank_name,
-            "wallet_address": wallet_address,
-            "credit_policy": {
-                "min": min_credit_score,
-                "max": max_per_loan,
-                "risk_score_threshold": 300
-            },
-            "issued_tokens": issued_tokens or [],
-            "trustlines": [],
-            "balance_xrp": balance_xrp,
-            "active": True
-        }
-
-        _banks[wallet_address] = bank_data
-        self._save_banks()
+
+        bank = BankRecord(
+            bank_id=str(uuid4()),
+            bank_name=bank_name,
+            wallet_address=wallet_address,
+            min_credit_score=min_credit_score,
+            max_per_loan=max_per_loan,
+            issued_tokens=issued_tokens,
+            balance_drops=balance_drops,
+        )
+
+        self.index = self.registry.upsert(bank)
         logger.info(f"Bank registered: {bank_name} ({wallet_address})")
-        return bank_data
+        return bank
 
     # -------------------------
     # Find banks for liquidity request
     # -------------------------
-    def find_matching_banks(self, amount_xrp: float, credit_score: int) -> List[Dict]:
-        matches = []
-        for bank in _banks.values():
-            policy = bank["credit_policy"]
-            if (
-                policy["max"] >= amount_xrp
-                and policy["min"] <= credit_score
-                and bank["balance_xrp"] >= amount_xrp
-                and bank.get("active", True)
-            ):
-                matches.append(bank)
-        # Sort by permissiveness (min_credit_score ascending)
-        return sorted(matches, key=lambda x: x["credit_policy"]["min"])
+    def find_matching_banks(self, amount_xrp: float, credit_score: int) -> List[BankRecord]:
+        reserved = self.state.reserved_drops()
+        amount_drops = to_units(amount_xrp)
+        # The index is already sorted by permissiveness (min_credit_score ascending)
+        return [
+            bank for bank in self.index.banks
+            if bank.max_per_loan >= amount_xrp
+            and bank.min_credit_score <= credit_score
+            and bank.balance_drops - reserved.get(bank.bank_id, 0) >= amount_drops
+            and bank.active
+        ]
+
+    # -------------------------
+    # Cross-worker balance reservations
+    # -------------------------
+    def reserve(self, bank: BankRecord, amount_xrp: float) -> Optional[str]:
+        """Hold amount_xrp of the bank's balance; None if concurrent requests already claimed it."""
+        return self.state.reserve(
+            bank.bank_id,
+            to_units(amount_xrp),
+            bank.balance_drops,
+            RESERVATION_TTL_SECONDS
+        )
+
+    def release(self, reservation_id: Optional[str]) -> None:
+        if reservation_id:
+            self.state.release(reservation_id)
+
+    def commit(self, reservation_id: Optional[str]) -> None:
+        """The escrow was submitted: keep the funds held until a balance refresh reflects it."""
+        if reservation_id:
+            self.state.commit(reservation_id)
+
+    # -------------------------
+    # Cross-worker exposure reservations
+    # -------------------------
+    def reserve_exposure(
+        self,
+        bank: BankRecord,
+        business_id: str,
+        amount_xrp: float,
+        policy: CreditPolicy,
+        ledger: ExposureLedger
+    ) -> Optional[List[str]]:
+        """
+        Hold amount_xrp against the borrower's cap with the bank (max_exposure) and,
+        when the policy sets one, the bank-wide cap (max_bank_exposure), so concurrent
+        requests cannot together exceed them. None if either cap has no room left.
+        """
+        started = time.time()
+        pair_key = f"exposure:{bank.bank_id}:{business_id}"
+        bank_key = f"exposure:{bank.bank_id}"
+        # Escrows committed this long before the ledger read below are already in it
+        for key in (pair_key, bank_key):
+            self.state.settle(key, started - SETTLE_MARGIN_SECONDS)
+        exposure = ledger.state_for(business_id, bank.bank_id)
+
+        caps = [(pair_key, policy.max_exposure - exposure.current_exposure)]
+        if policy.max_bank_exposure is not None:
+            caps.append((bank_key, policy.max_bank_exposure - exposure.bank_exposure))
+        held: List[str] = []
+        for key, room_xrp in caps:
+            reservation_id = self.state.reserve(key, to_units(amount_xrp), to_units(max(room_xrp, 0)), RESERVATION_TTL_SECONDS)
+            if reservation_id is None:
+                self.release_exposure(held)
+                return None
+            held.append(reservation_id)
+        return held
+
+    def release_exposure(self, reservation: Optional[List[str]]) -> None:
+        for reservation_id in reservation or ():
+            self.release(reservation_id)
+
+    def commit_exposure(self, reservation: Optional[List[str]]) -> None:
+        """The escrow was submitted: keep the exposure held until the ledger has logged it."""
+        for reservation_id in reservation or ():
+            self.commit(reservation_id)
+
+    def claim_bank(self, banks: List[BankRecord], amount_xrp: float) -> Tuple[Optional[BankRecord], Optional[str]]:
+        """
+        Pick the first bank that can still take the loan.
+        Auto-signing banks must win a reservation; manual-signing banks are returned as-is.
+        Returns (None, None) for no banks; raises BankCapacityTaken when every
+        bank lost its reservation to a concurrent request.
+        """
+        for bank in banks:
+            if not bank.seed:
+                return bank, None
+            reservation_id = self.reserve(bank, amount_xrp)
+            if reservation_id:
+                return bank, reservation_id
+            logger.info(f"Bank {bank.bank_name} capacity taken by a concurrent request")
+        if banks:
+            raise BankCapacityTaken(f"All {len(banks)} matching banks are committed to concurrent requests; retry shortly")
+        return None, None
+
+    def bank_id_for(self, wallet_address: str) -> str:
+        """Map an escrow owner / issuer wallet to its bank_id (platform wallet included)."""
+        bank = self.registry.snapshot().get(wallet_address)
+        if bank:
+            return bank.bank_id
+        if wallet_address == self.xrpl.address:
+            return PLATFORM_BANK_ID
+        return wallet_address
+
+    def reserved_drops(self) -> Dict[str, int]:
+        return self.state.reserved_drops()
 
     # -------------------------
     # List all banks
     # -------------------------
-    def get_all_banks(self) -> List[Dict]:
-        return list(_banks.values())
+    def get_all_banks(self) -> List[BankRecord]:
+        return list(self.index.banks)
 
     # -------------------------
     # Optional: Update balances dynamically
     # -------------------------
     def refresh_balances(self):
-        """Update balance_xrp for all banks from XRPL."""
-        for bank in _banks.values():
-            wallet_address = bank["wallet_address"]
+        """
+        Update balance_drops for all banks from XRPL, and settle the
+        commitments the new balances already account for.
+        """
+        started = time.time()
+        balances: Dict[str, int] = {}
+        for bank in self.index.banks:
+            wallet_address = bank.wallet_address
             try:
                 account_info = self.xrpl.get_account_info(wallet_address)
-                balance_drops = int(account_info.get("account_data", {}).get("Balance", 0))
-                bank["balance_xrp"] = float(balance_drops) / 1_000_000
+                balances[wallet_address] = int(account_info.get("account_data", {}).get("Balance", 0))
             except Exception as e:
                 logger.warning(f"Failed to refresh balance for {wallet_address}: {e}")
-        self._save_banks()
+        # Fetch outside the registry lock, apply under it
+        self.index = self.registry.update_balances(balances)
+        for wallet_address in balances:
+            bank = self.index.get(wallet_address)
+            if bank is not None:
+                self.state.settle(bank.bank_id, started - SETTLE_MARGIN_SECONDS)
+
+
+class BalanceRefresher:
+    """
+    Refreshes bank balances from the ledger on an interval.
+
+    Run it in one worker (see LeaderLease): the refreshed balances reach the
+    other workers through banks.json and the registry counter.
+    """
+
+    def __init__(self, build: Callable[[], BankService] = BankService):
+        self.build = build
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, interval: float = 60.0) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.is_set():
+                try:
+                    self.build().refresh_balances()
+                except Exception as e:
+                    logger.warning(f"Bank balance refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=_run, name="bank-balance-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,139 @@
+# api/services/container.py
+import logging
+import threading
+
+from fastapi import Request
+
+from .bank_registry import BankRegistry, bank_registry
+from .bank_service import BankService
+from .credential_service import CredentialService
+from .credit_service import CreditService
+from .dashboard_service import DashboardService
+from .escrow_service import EscrowService
+from .loan_jobs import LoanJobQueue
+from .payment_history_service import PaymentHistoryService
+from .payment_store import PaymentStore
+from .proof_verifier import ProofVerifier
+from .state_backend import StateBackend, get_state_backend
+from .wallet_cache import WalletCache, wallet_cache
+from .xrpl_client import XRPLClient
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class ServiceContainer:
+    """
+    The app's long-lived services, built once and shared by every request.
+
+    Responsibilities:
+    - Construct the stateless services (credit, credentials, escrows, proofs,
+      payment history, dashboard) once, all on the one XRPLClient
+    - Hand out BankService per request: it pins a snapshot of the bank
+      registry for its lifetime, so only its collaborators are shared
+    - Own the loan job queue that runs liquidity requests in the background
+    - Warm the expensive first reads (issuer wallet, fee, bank index, bank
+      signing keys) before the first request pays for them
+
+    PolicyEngine is not held here: it is built per bank from that bank's
+    credit policy.
+    """
+
+    def __init__(
+        self,
+        xrpl_client: XRPLClient | None = None,
+        registry: BankRegistry | None = None,
+        state: StateBackend | None = None,
+        wallets: WalletCache | None = None,
+        store: PaymentStore | None = None,
+    ):
+        self.xrpl = xrpl_client if xrpl_client is not None else XRPLClient()
+        self.registry = registry if registry is not None else bank_registry
+        self.state = state if state is not None else get_state_backend()
+        self.wallets = wallets if wallets is not None else wallet_cache
+
+        self.credit = CreditService()
+        self.credentials = CredentialService()
+        self.escrows = EscrowService()
+        self.proofs = ProofVerifier()
+        self.history = PaymentHistoryService(xrpl_client=self.xrpl, store=store)
+        self.dashboard = DashboardService(
+            credit=self.credit,
+            history=self.history,
+            registry=self.registry,
+            state=self.state,
+        )
+        self.loan_jobs = LoanJobQueue(state=self.state)
+
+    def bank_service(self) -> BankService:
+        return BankService(registry=self.registry, state=self.state, xrpl_client=self.xrpl)
+
+    def warm_up(self) -> None:
+        """Blocking; failures are logged so a slow node does not stop startup."""
+        index = self.registry.snapshot()
+        keys = sum(1 for bank in index.banks if bank.seed and self.wallets.for_bank(bank))
+        try:
+            fee = self.xrpl.fee()
+        except Exception as e:
+            logger.warning(f"Fee warm-up failed: {e}")
+            fee = None
+        logger.info(f"Services warm: {len(index)} banks, {keys} signing keys, fee {fee} drops")
+
+
+_build_lock = threading.Lock()
+
+
+def services_for(request: Request) -> ServiceContainer:
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        # App driven without its lifespan (e.g. a bare ASGI transport in tests);
+        # concurrent first requests must not each build a container
+        with _build_lock:
+            services = getattr(request.app.state, "services", None)
+            if services is None:
+                services = request.app.state.services = ServiceContainer()
+    return services
+
+
+# -------------------------
+# FastAPI dependencies
+# (async so FastAPI resolves them on the loop rather than in its threadpool)
+# -------------------------
+async def get_services(request: Request) -> ServiceContainer:
+    return services_for(request)
+
+
+async def get_xrpl_client(request: Request) -> XRPLClient:
+    return services_for(request).xrpl
+
+
+async def get_credit_service(request: Request) -> CreditService:
+    return services_for(request).credit
+
+
+async def get_credential_service(request: Request) -> CredentialService:
+    return services_for(request).credentials
+
+
+async def get_escrow_service(request: Request) -> EscrowService:
+    return services_for(request).escrows
+
+
+async def get_proof_verifier(request: Request) -> ProofVerifier:
+    return services_for(request).proofs
+
+
+async def get_history_service(request: Request) -> PaymentHistoryService:
+    return services_for(request).history
+
+
+async def get_dashboard_service(request: Request) -> DashboardService:
+    return services_for(request).dashboard
+
+
+async def get_bank_service(request: Request) -> BankService:
+    return services_for(request).bank_service()
+
+
+async def get_loan_jobs(request: Request) -> LoanJobQueue:
+    return services_for(request).loan_jobs
@@ -0,0 +1,448 @@
+# api/services/credential_expiry.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from xrpl.ledger import get_latest_validated_ledger_sequence
+from xrpl.models.amounts import IssuedCurrencyAmount
+from xrpl.models.requests import AccountInfo
+from xrpl.models.transactions import TrustSet, TrustSetFlag
+
+from .validation_tracker import TransactionFailed
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+CREDENTIALS_DIR = DATA_DIR / "credentials"
+LEDGER_OFFSET = 20  # LastLedgerSequence window, same as xrpl-py autofill
+
+CredentialKey = Tuple[str, str]  # (holder, currency)
+RevokeBatch = Callable[[List[CredentialKey]], List[CredentialKey]]  # returns the keys that failed
+
+
+def to_timestamp(expires_at: datetime) -> float:
+    """POSIX seconds for an expiry; naive datetimes are taken as UTC."""
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.timestamp()
+
+
+class CredentialExpirySweeper:
+    """
+    Revokes issued credentials when their expiry passes.
+
+    Responsibilities:
+    - Keep every scheduled credential in a min-heap keyed by expiry
+      (O(log n) schedule, lazy deletion on cancel / reschedule)
+    - Sleep until the earliest expiry (or `poll` seconds, to pick up schedules
+      made by other workers) instead of scanning on a fixed interval
+    - Hand expired credentials to a revoke callable in batches, with a cap on
+      batches in flight, and retry failed revocations with a backoff
+    - Share schedules between API workers and across restarts through one
+      SQLite (WAL) event log, compacted into a snapshot on load
+
+    Every worker records schedules; only one should sweep (main.py runs
+    start / stop under a LeaderLease).
+    """
+
+    def __init__(
+        self,
+        revoke_batch: Optional[RevokeBatch] = None,
+        clock: Callable[[], float] = time.time,
+        directory: Path = CREDENTIALS_DIR,
+        batch_size: int = 50,
+        max_in_flight: int = 4,
+        retry_delay: float = 60.0,
+        max_attempts: int = 5,
+        poll: float = 5.0,
+        busy_timeout_ms: int = 5000
+    ):
+        """
+        :param revoke_batch: revokes a batch of (holder, currency) credentials and
+            returns the ones that could not be revoked; raising fails the whole batch
+        :param clock: current time in POSIX seconds
+        :param max_in_flight: revocation batches running at once
+        :param poll: longest the sweeper sleeps before reading other workers' schedules
+        """
+        self.revoke_batch = revoke_batch
+        self.clock = clock
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.poll = poll
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._cursor = 0  # id of the last log event applied
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._heap: List[Tuple[float, str, str]] = []
+        self._expiry: Dict[CredentialKey, float] = {}
+        self._in_flight: Dict[CredentialKey, float] = {}
+        self._attempts: Dict[CredentialKey, int] = {}
+        self._batches = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = False
+        self.revoked = 0
+        self.failed = 0
+
+    @property
+    def db_path(self) -> Path:
+        return self.directory / "expiries.db"
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    # -------------------------
+    # Scheduling
+    # -------------------------
+    def schedule(self, holder: str, currency: str, expires_at: datetime) -> None:
+        """Revoke (holder, currency) at expires_at; replaces any earlier schedule for it."""
+        deadline = to_timestamp(expires_at)
+        self._append({"type": "schedule", "holder": holder, "currency": currency, "expires_at": deadline})
+
+    def cancel(self, holder: str, currency: str) -> bool:
+        with self._lock:
+            self._catch_up()
+            if (holder, currency) not in self._expiry:
+                return False
+            self._append({"type": "cancel", "holder": holder, "currency": currency})
+            return True
+
+    def expires_at(self, holder: str, currency: str) -> Optional[float]:
+        with self._lock:
+            self._catch_up()
+            return self._expiry.get((holder, currency))
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            self._catch_up()
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def on_index_event(self, event: str, line) -> None:
+        """TrustLineIndex listener: a removed line has nothing left to revoke."""
+        if event == "removed":
+            self.cancel(line.holder, line.currency)
+
+    def _push(self, key: CredentialKey, deadline: float) -> None:
+        earliest = self._heap[0][0] if self._heap else None
+        self._expiry[key] = deadline
+        heapq.heappush(self._heap, (deadline, key[0], key[1]))
+        if earliest is None or deadline < earliest:
+            self._changed.notify_all()  # the sweeper may be sleeping until a later expiry
+
+    def _discard_stale(self) -> None:
+        # Entries superseded by cancel() or a reschedule stay in the heap until they reach the top
+        while self._heap:
+            deadline, holder, currency = self._heap[0]
+            if self._expiry.get((holder, currency)) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    # -------------------------
+    # Sweeping
+    # -------------------------
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Dispatch every credential expired by now; returns how many were dispatched."""
+        now = self.clock() if now is None else now
+        expired: List[CredentialKey] = []
+        with self._lock:
+            self._catch_up()
+            while True:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                deadline, holder, currency = heapq.heappop(self._heap)
+                del self._expiry[(holder, currency)]
+                self._in_flight[(holder, currency)] = deadline
+                expired.append((holder, currency))
+            for i in range(0, len(expired), self.batch_size):
+                self._batches += 1
+                self._pool.submit(self._run_batch, expired[i:i + self.batch_size]).add_done_callback(self._batch_done)
+        if expired:
+            logger.info(f"{len(expired)} credentials expired; {len(self._expiry)} still scheduled")
+        return len(expired)
+
+    @property
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="credential-revoke")
+        return self._executor
+
+    def _run_batch(self, batch: List[CredentialKey]) -> None:
+        try:
+            failed = set(self.revoke_batch(batch)) if self.revoke_batch else set(batch)
+            error = "revocation failed"
+        except Exception as e:
+            failed, error = set(batch), str(e)
+        with self._lock:
+            now = self.clock()
+            for key in batch:
+                deadline = self._in_flight.pop(key, None)
+                if key in self._expiry:
+                    continue  # rescheduled while the revocation was running
+                if key not in failed:
+                    self.revoked += 1
+                    self._attempts.pop(key, None)
+                    # Carries the deadline so it cannot drop a schedule another worker renewed meanwhile
+                    self._append({"type": "revoked", "holder": key[0], "currency": key[1], "expires_at": deadline})
+                    continue
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    # Left unrevoked in the log, so the next start tries again
+                    self.failed += 1
+                    self._attempts.pop(key, None)
+                    logger.error(f"Giving up on revoking {key[1]} for {key[0]} after {attempts} attempts: {error}")
+                    continue
+                self._attempts[key] = attempts
+                retry_at = max(deadline or now, now) + self.retry_delay * attempts
+                self._append({"type": "retry", "holder": key[0], "currency": key[1], "expires_at": retry_at})
+                logger.warning(f"Revoking {key[1]} for {key[0]} failed (attempt {attempts}): {error}")
+            self._batches -= 1
+            self._changed.notify_all()
+
+    def _batch_done(self, future) -> None:
+        # Batches cancelled by stop() never reach _run_batch
+        if future.cancelled():
+            with self._lock:
+                self._batches -= 1
+                self._changed.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every dispatched revocation batch has completed."""
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._batches, timeout)
+
+    # -------------------------
+    # Background sweeper
+    # -------------------------
+    def start(self, revoke_batch: Optional[RevokeBatch] = None) -> None:
+        if revoke_batch is not None:
+            self.revoke_batch = revoke_batch
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop = False
+        self._sweeper = threading.Thread(target=self._run, name="credential-expiry", daemon=True)
+        self._sweeper.start()
+
+    def _run(self) -> None:
+        with self._changed:
+            while not self._stop:
+                deadline = self.next_expiry()
+                delay = self.poll if deadline is None else min(deadline - self.clock(), self.poll)
+                if delay <= 0:
+                    try:
+                        self.sweep()
+                    except Exception as e:
+                        logger.error(f"Credential expiry sweep failed: {e}", exc_info=True)
+                        self._changed.wait(1.0)
+                    continue
+                # Woken early by an earlier schedule() in this worker, a retry or stop()
+                self._changed.wait(delay)
+
+    def stop(self) -> None:
+        with self._changed:
+            self._stop = True
+            self._changed.notify_all()
+        if self._sweeper:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._lock:
+            # Unfinished revocations go back on the heap for whichever worker sweeps next
+            for key, deadline in self._in_flight.items():
+                if key not in self._expiry:
+                    self._push(key, deadline)
+            self._in_flight.clear()
+            self._attempts.clear()
+            self._changed.notify_all()
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            # AUTOINCREMENT: ids are never reused after compaction, so a cursor stays valid
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    body TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS snapshot (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    through INTEGER NOT NULL,
+                    state TEXT NOT NULL
+                );
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def _append(self, event: dict) -> None:
+        """Log the event for every worker, then apply the log up to and including it."""
+        with self._lock:
+            self._conn().execute("INSERT INTO events (body) VALUES (?)", (json.dumps(event),))
+            self._catch_up()
+
+    def _catch_up(self) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            self._replay(conn)
+        finally:
+            conn.execute("COMMIT")
+
+    def _replay(self, conn: sqlite3.Connection) -> None:
+        # Caller holds self._lock and a transaction on conn
+        row = conn.execute("SELECT through, state FROM snapshot WHERE id = 1").fetchone()
+        if row is not None and row[0] > self._cursor:
+            # Another worker compacted events this one had not applied yet
+            self._restore(row[0], json.loads(row[1]))
+        for event_id, body in conn.execute("SELECT id, body FROM events WHERE id > ? ORDER BY id", (self._cursor,)):
+            try:
+                self._apply(json.loads(body))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping corrupt credential expiry event {event_id}: {e}")
+            self._cursor = event_id
+
+    def _apply(self, event: dict) -> None:
+        key = (event["holder"], event["currency"])
+        if event["type"] == "schedule":
+            self._attempts.pop(key, None)
+            self._push(key, float(event["expires_at"]))
+        elif event["type"] == "retry":
+            self._push(key, float(event["expires_at"]))
+        elif event["type"] == "cancel":
+            self._expiry.pop(key, None)
+            self._attempts.pop(key, None)
+        elif event["type"] == "revoked" and self._expiry.get(key) == event.get("expires_at"):
+            del self._expiry[key]
+
+    def _restore(self, through: int, expiry: List[list]) -> None:
+        # Revocations this worker is running stay off the heap
+        self._expiry = {
+            (holder, currency): deadline for holder, currency, deadline in expiry
+            if self._in_flight.get((holder, currency)) != deadline
+        }
+        self._heap = [(deadline, holder, currency) for (holder, currency), deadline in self._expiry.items()]
+        heapq.heapify(self._heap)
+        self._cursor = through
+        self._changed.notify_all()
+
+    def compact(self) -> None:
+        """Replace the events applied so far with a snapshot of the live schedules."""
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Under the write lock nobody appends, so the snapshot covers the whole log
+                self._replay(conn)
+                state = [[holder, currency, deadline] for (holder, currency), deadline in self._expiry.items()]
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshot (id, through, state) VALUES (1, ?, ?)",
+                    (self._cursor, json.dumps(state)),
+                )
+                conn.execute("DELETE FROM events WHERE id <= ?", (self._cursor,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def load(self) -> None:
+        """Restore the shared schedules, then compact the log."""
+        with self._lock:
+            self._restore(0, [])
+            self.compact()
+            logger.info(f"Credential expiry loaded: {len(self._expiry)} credentials scheduled")
+
+
+def build_credential_revoker(xrpl_client, trust_lines, signing) -> RevokeBatch:
+    """
+    Revoke callable wired to the live ledger.
+
+    Only the holder can lower its own limit, so the issuer freezes the line
+    (TrustSet with tfSetFreeze and an issuer-side limit of zero); the holder can
+    no longer send the credential currency anywhere but back to the issuer.
+    Lines missing from the trust-line index or already frozen are skipped.
+
+    The whole batch is signed by the issuer with consecutive Sequences from one
+    account_info read, so batches are serialised up to submission and only the
+    wait for validation overlaps.
+    """
+    submitting = threading.Lock()
+
+    def _revoke(batch: List[CredentialKey]) -> List[CredentialKey]:
+        if trust_lines.ready:
+            batch = [key for key in batch if (line := trust_lines.get(*key)) is not None and not line.frozen]
+        if not batch:
+            return []
+        issuer = xrpl_client.address
+        failed: List[CredentialKey] = []
+        submitted: Dict[str, CredentialKey] = {}
+        with submitting:
+            info = xrpl_client.client.request(AccountInfo(account=issuer, ledger_index="current")).result
+            sequence = info["account_data"]["Sequence"]
+            fee = xrpl_client.fee()
+            last_ledger_sequence = get_latest_validated_ledger_sequence(xrpl_client.client) + LEDGER_OFFSET
+            txs = [
+                TrustSet(
+                    account=issuer,
+                    limit_amount=IssuedCurrencyAmount(currency=currency, issuer=holder, value="0"),
+                    flags=TrustSetFlag.TF_SET_FREEZE,
+                    sequence=sequence + i,
+                    fee=fee,
+                    last_ledger_sequence=last_ledger_sequence
+                )
+                for i, (holder, currency) in enumerate(batch)
+            ]
+            signed = signing.sign_many([(tx, xrpl_client.wallet) for tx in txs])
+            for i, (key, blob) in enumerate(zip(batch, signed)):
+                try:
+                    if "error" in blob:
+                        raise ValueError(blob["error"])
+                    submitted[blob["hash"]] = key
+                    xrpl_client.submit_signed(blob, wait=False)
+                except Exception as e:
+                    # Later Sequences cannot apply past the gap; retry them with the next sweep
+                    submitted.pop(blob.get("hash"), None)
+                    failed.extend(batch[i:])
+                    logger.warning(f"Revocation submit stopped at {key[0]}: {e}")
+                    break
+        for tx_hash, key in submitted.items():
+            try:
+                xrpl_client.tracker.wait(tx_hash)
+            except TransactionFailed as e:
+                logger.warning(f"Revocation of {key[1]} for {key[0]} {e.outcome.get('status')}: {e.outcome.get('engine_result')}")
+                failed.append(key)
+            except TimeoutError:
+                # Still pending past its LastLedgerSequence window; the next sweep
+                # skips the line if the freeze did land
+                logger.warning(f"Revocation of {key[1]} for {key[0]} still pending ({tx_hash}); retrying next sweep")
+                failed.append(key)
+        logger.info(f"Revoked {len(batch) - len(failed)}/{len(batch)} expired credentials")
+        return failed
+
+    return _revoke
+
+
+credential_expiry = CredentialExpirySweeper()
@@ -1,16 +1,22 @@
 # /api/app/services/credential_service.py
 
-from xrpl.wallet import Wallet
-from xrpl.models.transactions import TrustSet
+from xrpl.models.transactions import TrustSet, TrustSetFlag
 from xrpl.models.amounts import IssuedCurrencyAmount
 from xrpl.transaction import submit_and_wait, autofill
 from xrpl.clients import JsonRpcClient
+from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrpl.asyncio.ledger import get_fee, get_latest_validated_ledger_sequence
+from xrpl.models.requests import AccountInfo
 from .xrpl_client import XRPLClient
+from .trustline_index import TrustLineIndex, trustline_index
+from .credential_expiry import CredentialExpirySweeper, credential_expiry
 from ..utils.validators import validate_xrpl_address, validate_amount, validate_currency
 
 from dotenv import load_dotenv
+from datetime import datetime
 from pathlib import Path
-import os
+from typing import AsyncIterator, List, Optional
+import asyncio
 import logging
 
 # =====================
@@ -25,15 +31,19 @@ logger.setLevel(logging.INFO)
 BASE_DIR = Path(__file__).resolve().parents[2]  # /api
 load_dotenv(BASE_DIR / ".env")
 
+BATCH_CONCURRENCY = 64  # concurrent account_info reads per batch
+LEDGER_OFFSET = 20  # LastLedgerSequence window, same as xrpl-py autofill
+
 
 class CredentialService:
-    def __init__(self):
-        self.xrpl_client: JsonRpcClient = XRPLClient().client
-        seed = os.getenv("ISSUER_SEED")
-        if not seed:
-            raise ValueError("ISSUER_SEED not found in environment variables")
-        self.issuer_wallet = Wallet.from_seed(seed)
-        logger.info(f"Issuer wallet loaded: {self.issuer_wallet.classic_address}")
+    def __init__(self, trust_lines: TrustLineIndex | None = None, expiry: CredentialExpirySweeper | None = None):
+        self.trust_lines = trust_lines if trust_lines is not None else trustline_index
+        self.expiry = expiry if expiry is not None else credential_expiry
+        xrpl = XRPLClient()
+        self.xrpl = xrpl
+        self.xrpl_client: JsonRpcClient = xrpl.client
+        # The issuer keypair is derived once by the XRPLClient singleton
+        self.issuer_wallet = xrpl.wallet
 
 
     # =====================
@@ -76,12 +86,25 @@ class CredentialService:
     # Prepare TrustSet transaction for wallet signing
     # Returns unsigned transaction ready for principal to sign
     # =====================
-    def submit_trust_set(self, principal_address: str, amount: str = "1000000", currency: str = "CORRIDOR_ELIGIBLE") -> dict:
+    def submit_trust_set(
+        self,
+        principal_address: str,
+        amount: str = "1000000",
+        currency: str = "CORRIDOR_ELIGIBLE",
+        expires_at: datetime | None = None
+    ) -> dict:
         validate_xrpl_address(principal_address)
         validate_amount(amount)
         validate_currency(currency)
 
         formatted_currency = self._format_currency(currency)
+        if self._revoked(principal_address, formatted_currency):
+            logger.info(f"TrustSet for {principal_address} skipped: credential revoked (currency: {formatted_currency})")
+            return self._still_revoked(currency)
+        if self.trust_lines.is_issued(principal_address, formatted_currency, amount):
+            logger.info(f"TrustSet for {principal_address} skipped: line already exists (currency: {formatted_currency})")
+            self._schedule_expiry(principal_address, formatted_currency, expires_at)
+            return self._already_issued(currency)
         
         tx = TrustSet(
             account=principal_address,
@@ -93,8 +116,6 @@ class CredentialService:
         )
 
         try:
-            from xrpl.models.requests import AccountInfo
-            
             account_info_req = AccountInfo(account=principal_address, ledger_index="validated")
             account_info = self.xrpl_client.request(account_info_req)
             
@@ -112,6 +133,7 @@ class CredentialService:
             logger.info(f"Prepared TrustSet transaction for {principal_address} (currency: {formatted_currency})")
             
             tx_dict = prepared_tx.to_dict()
+            self._schedule_expiry(principal_address, formatted_currency, expires_at)
             
             return {
                 "transaction": tx_dict,
@@ -133,3 +155,160 @@ class CredentialService:
                 raise ValueError(f"Failed to prepare transaction. Account may not be funded. Error: {error_msg}")
             
             raise ValueError(f"Failed to prepare transaction: {error_msg}")
+
+    # =====================
+    # Revoke the credential when it expires (see CredentialExpirySweeper)
+    # Scheduled at preparation; a line the principal never signs is skipped at expiry
+    # =====================
+    def _schedule_expiry(self, principal_address: str, formatted_currency: str, expires_at: datetime | None) -> None:
+        if expires_at is not None:
+            self.expiry.schedule(principal_address, formatted_currency, expires_at)
+
+    # =====================
+    # Re-issue a revoked (frozen) credential
+    # Only the issuer can clear the freeze it set; the holder's own TrustSet leaves it on,
+    # so preparing a TrustSet never lifts it: the /reissue route does, for the issuer only
+    # =====================
+    def reissue(
+        self,
+        principal_address: str,
+        currency: str = "CORRIDOR_ELIGIBLE",
+        expires_at: datetime | None = None
+    ) -> dict:
+        validate_xrpl_address(principal_address)
+        validate_currency(currency)
+
+        formatted_currency = self._format_currency(currency)
+        if not self._revoked(principal_address, formatted_currency):
+            return {
+                "status": "not_revoked",
+                "message": "Principal holds no revoked credential in this currency. Nothing to re-issue.",
+                "original_currency": currency
+            }
+        tx_hash = self._lift_freeze(principal_address, formatted_currency)
+        self._schedule_expiry(principal_address, formatted_currency, expires_at)
+        return {
+            "status": "reissued",
+            "tx_hash": tx_hash,
+            "message": "Issuer freeze cleared. The principal can use the credential again.",
+            "original_currency": currency
+        }
+
+    def _revoked(self, principal_address: str, formatted_currency: str) -> bool:
+        line = self.trust_lines.get(principal_address, formatted_currency)
+        return line is not None and line.frozen
+
+    def _still_revoked(self, currency: str) -> dict:
+        return {
+            "transaction": None,
+            "issuer": self.issuer_wallet.classic_address,
+            "status": "revoked",
+            "message": "The issuer revoked this credential. It must be re-issued by the issuer before it can be used again.",
+            "original_currency": currency
+        }
+
+    def _lift_freeze(self, principal_address: str, formatted_currency: str) -> str:
+        tx = TrustSet(
+            account=self.issuer_wallet.classic_address,
+            limit_amount=IssuedCurrencyAmount(
+                currency=formatted_currency,
+                issuer=principal_address,
+                value="0"
+            ),
+            flags=TrustSetFlag.TF_CLEAR_FREEZE
+        )
+        # Validated before returning; the trust-line index sees it through its submit listener
+        result = self.xrpl.submit(tx, wait=True)
+        logger.info(f"Cleared freeze on {formatted_currency} for {principal_address} on re-issue")
+        return result.get("hash")
+
+    def _already_issued(self, currency: str) -> dict:
+        return {
+            "transaction": None,
+            "issuer": self.issuer_wallet.classic_address,
+            "status": "already_issued",
+            "message": "Principal already holds this credential with the same limit. Nothing to sign.",
+            "original_currency": currency
+        }
+
+    # =====================
+    # Prepare TrustSets for many principals at once
+    # One fee read and one ledger read per batch; account_info per unique
+    # address gives both the existence check and the Sequence
+    # =====================
+    async def prepare_trust_set_batch(
+        self,
+        principal_addresses: List[str],
+        amount: str = "1000000",
+        currency: str = "CORRIDOR_ELIGIBLE",
+        concurrency: int = BATCH_CONCURRENCY,
+        client: Optional[AsyncJsonRpcClient] = None,
+        expires_at: Optional[datetime] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Yield one result per input address as soon as it is ready (completion order),
+        each tagged with its input "index".
+        """
+        validate_amount(amount)
+        validate_currency(currency)
+        formatted_currency = self._format_currency(currency)
+        client = client or AsyncJsonRpcClient(self.xrpl_client.url)
+
+        valid = {}
+        for index, address in enumerate(principal_addresses):
+            try:
+                validate_xrpl_address(address)
+            except ValueError as e:
+                yield {"index": index, "principal_address": address, "status": "invalid", "message": str(e)}
+                continue
+            if self._revoked(address, formatted_currency):
+                yield {"index": index, "principal_address": address, "status": "revoked"}
+                continue
+            if self.trust_lines.is_issued(address, formatted_currency, amount):
+                self._schedule_expiry(address, formatted_currency, expires_at)
+                yield {"index": index, "principal_address": address, "status": "already_issued"}
+                continue
+            valid.setdefault(address, []).append(index)
+
+        if not valid:
+            return
+        fee, validated_ledger = await asyncio.gather(
+            get_fee(client),
+            get_latest_validated_ledger_sequence(client)
+        )
+        last_ledger_sequence = validated_ledger + LEDGER_OFFSET
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _prepare(address: str) -> tuple:
+            async with semaphore:
+                try:
+                    response = await client.request(AccountInfo(account=address, ledger_index="current"))
+                except Exception as e:
+                    return address, {"status": "error", "message": f"account_info failed: {e}"}
+            result = response.result
+            if result.get("error") or result.get("error_code"):
+                if "actNotFound" in (result.get("error"), result.get("error_code")):
+                    return address, {"status": "not_found", "message": f"Principal account {address} does not exist or is not funded."}
+                return address, {"status": "error", "message": result.get("error_message") or result.get("error")}
+            tx = TrustSet(
+                account=address,
+                limit_amount=IssuedCurrencyAmount(
+                    currency=formatted_currency,
+                    issuer=self.issuer_wallet.classic_address,
+                    value=amount
+                ),
+                sequence=result["account_data"]["Sequence"],
+                fee=fee,
+                last_ledger_sequence=last_ledger_sequence
+            )
+            return address, {"status": "prepared", "transaction": tx.to_dict()}
+
+        prepared = 0
+        for next_done in asyncio.as_completed([_prepare(address) for address in valid]):
+            address, outcome = await next_done
+            if outcome["status"] == "prepared":
+                prepared += 1
+                self._schedule_expiry(address, formatted_currency, expires_at)
+            for index in valid[address]:
+                yield {"index": index, "principal_address": address, **outcome}
+        logger.info(f"Prepared {prepared}/{len(valid)} TrustSet transactions in batch (currency: {formatted_currency})")
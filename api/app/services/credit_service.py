@@ -1,12 +1,14 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import logging
 from datetime import datetime, timezone
-from .xrpl_client import XRPLClient
+from .xrpl_client import XRPLClient, entry_tx
 from .risk_model import RiskModel
 from ..utils.validators import validate_xrpl_address
 
 logger = logging.getLogger(__name__)
 
+CREDIT_TX_WINDOW = 50  # most recent account_tx entries the score is built from
+
 
 class CreditService:
     def __init__(self):
@@ -14,10 +16,13 @@ class CreditService:
         self.risk_model = RiskModel()
         self.issuer_address = self.xrpl.address
 
-    def get_credit_score(self, address: str) -> Dict:
+    def get_credit_score(self, address: str, transactions: Optional[List[dict]] = None) -> Dict:
         """
         Calculate credit score from on-chain XRPL data (fully decentralized).
         No trust line required - reputation is built from transaction history.
+
+        transactions: the address's latest CREDIT_TX_WINDOW account_tx entries,
+        when the caller already fetched them (skips the ledger read).
         
         Returns:
             {
@@ -29,11 +34,12 @@ class CreditService:
         """
         validate_xrpl_address(address)
         
-        lines = self.xrpl.get_account_lines(address)
-        txs = self.xrpl.get_account_transactions(address, limit=50)
+        if transactions is None:
+            transactions = self.xrpl.get_account_transactions(address, limit=CREDIT_TX_WINDOW)["transactions"]
+        txs = transactions[:CREDIT_TX_WINDOW]
         
         successful_payments = self._count_successful_payments(txs)
-        trust_lines_count = len(lines)
+        trust_lines_count = self._count_trust_lines(address)
         
         score = 500
         score += min(100, trust_lines_count * 25)
@@ -99,11 +105,19 @@ class CreditService:
         }
 
 
+    def _count_trust_lines(self, address: str) -> int:
+        """
+        All of the address's trust lines, whatever the issuer. The issuer's
+        TrustLineIndex only holds lines to the platform issuer, so it cannot
+        answer this.
+        """
+        return len(self.xrpl.get_account_lines(address))
+
     def _count_successful_payments(self, transactions: list) -> int:
         """Count successful Payment transactions."""
         count = 0
         for tx in transactions:
-            tx_data = tx.get("tx", {}) if isinstance(tx, dict) else {}
+            tx_data = entry_tx(tx) if isinstance(tx, dict) else {}
             if tx_data.get("TransactionType") == "Payment":
                 meta = tx.get("meta", {})
                 result = meta.get("TransactionResult")
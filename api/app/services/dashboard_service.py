@@ -0,0 +1,138 @@
+# api/services/dashboard_service.py
+from typing import Awaitable, Callable, Dict, List
+import asyncio
+import logging
+import os
+
+from .bank_registry import BankRegistry, bank_registry
+from .credit_service import CREDIT_TX_WINDOW, CreditService
+from .escrow_index import EscrowIndex, escrow_index
+from .payment_history_service import PaymentHistoryService
+from .state_backend import StateBackend, get_state_backend
+from .syndication import SyndicationAllocator
+from ..utils.amounts import from_units, to_units
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Seconds each dashboard section may take before it is returned empty
+SECTION_TIMEOUT = float(os.getenv("DASHBOARD_SECTION_TIMEOUT") or 3)
+
+
+class DashboardService:
+    """
+    Builds the borrower dashboard payload in one call.
+
+    Responsibilities:
+    - Fetch the address's latest account_tx page once and share it between the
+      credit score and (for an address not yet in the history store) the
+      payment list
+    - Run credit, eligibility, payments and escrows concurrently, each under
+      its own timeout
+    - Return whatever finished: a slow or failing section comes back as null
+      with its reason under "errors" instead of failing the whole dashboard
+    """
+
+    def __init__(
+        self,
+        credit: CreditService | None = None,
+        history: PaymentHistoryService | None = None,
+        escrows: EscrowIndex | None = None,
+        registry: BankRegistry | None = None,
+        state: StateBackend | None = None,
+        section_timeout: float = SECTION_TIMEOUT,
+    ):
+        self.credit = credit if credit is not None else CreditService()
+        self.history = history if history is not None else PaymentHistoryService(xrpl_client=self.credit.xrpl)
+        self.escrows = escrows if escrows is not None else escrow_index
+        self.registry = registry if registry is not None else bank_registry
+        self.state = state if state is not None else get_state_backend()
+        self.section_timeout = section_timeout
+        self.allocator = SyndicationAllocator()
+
+    async def build(self, address: str, history_limit: int = 10) -> Dict:
+        """
+        Output shape:
+        {
+            "address": str,
+            "credit": dict | None,          # CreditService.get_credit_score
+            "eligibility": dict | None,     # max_amount, credit_limit, bank_capacity (XRP)
+            "payments": List[dict] | None,  # newest first, Payment fields
+            "escrows": List[dict] | None,   # live escrows to this address
+            "errors": Dict[section, str]
+        }
+        """
+        # One ledger read feeds both the score and a cold payment list
+        ledger_page = asyncio.ensure_future(asyncio.to_thread(
+            self.credit.xrpl.get_account_transactions, address, CREDIT_TX_WINDOW
+        ))
+        credit = asyncio.ensure_future(self._credit(address, ledger_page))
+
+        sections: Dict[str, Callable[[], Awaitable]] = {
+            "credit": lambda: asyncio.shield(credit),
+            "eligibility": lambda: self._eligibility(credit),
+            "payments": lambda: self._payments(address, history_limit, ledger_page),
+            "escrows": lambda: asyncio.to_thread(self._escrows, address),
+        }
+        results = await asyncio.gather(*(self._run(name, make()) for name, make in sections.items()))
+
+        payload: Dict = {"address": address, "errors": {}}
+        for name, (value, error) in zip(sections, results):
+            payload[name] = value
+            if error:
+                payload["errors"][name] = error
+        for task in (credit, ledger_page):
+            if not task.done():
+                task.cancel()
+        return payload
+
+    async def _run(self, name: str, section: Awaitable):
+        try:
+            return await asyncio.wait_for(section, timeout=self.section_timeout), None
+        except asyncio.TimeoutError:
+            logger.warning(f"Dashboard section {name} timed out after {self.section_timeout}s")
+            return None, "timeout"
+        except Exception as e:
+            logger.warning(f"Dashboard section {name} failed: {e}")
+            return None, str(e)
+
+    # -------------------------
+    # Sections
+    # -------------------------
+    async def _credit(self, address: str, ledger_page: "asyncio.Future") -> Dict:
+        page = await asyncio.shield(ledger_page)
+        return await asyncio.to_thread(self.credit.get_credit_score, address, page["transactions"])
+
+    async def _eligibility(self, credit: "asyncio.Future") -> Dict:
+        score = await asyncio.shield(credit)
+        capacity = await asyncio.to_thread(self._bank_capacity_drops, score["score"])
+        credit_limit = to_units(score["max_eligible"])
+        return {
+            "max_amount": from_units(min(credit_limit, capacity)),
+            "credit_limit": score["max_eligible"],
+            "bank_capacity": from_units(capacity),
+        }
+
+    def _bank_capacity_drops(self, credit_score: int) -> int:
+        """What the largest syndicate the allocator would form could lend this borrower."""
+        reserved = self.state.reserved_drops()
+        capacities = sorted(
+            (
+                self.allocator.capacity_drops(bank, credit_score, reserved.get(bank.bank_id, 0))
+                for bank in self.registry.snapshot().banks
+            ),
+            reverse=True,
+        )
+        return sum(capacities[:self.allocator.max_banks])
+
+    async def _payments(self, address: str, limit: int, ledger_page: "asyncio.Future") -> List[dict]:
+        if self.history.store.sync_state(address) is not None:
+            return (await asyncio.to_thread(self.history.history, address, limit))["payments"]
+        # Not in the store yet: serve from the shared ledger page and sync behind it
+        self.history.refresh_in_background(address)
+        page = await asyncio.shield(ledger_page)
+        rows = (self.history._map_row(entry, address) for entry in page["transactions"])
+        return [self.history._row_to_payment(row) for row in rows if row][:limit]
+
+    def _escrows(self, address: str) -> List[dict]:
+        return [escrow.to_json() for escrow in self.escrows.for_destination(address)]
@@ -0,0 +1,272 @@
+# api/services/escrow_index.py
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import threading
+
+from .xrpl_client import XRPLClient, tx_fields
+from ..models.loan import LoanRecord
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+EscrowKey = Tuple[str, int]
+
+
+def _amount_drops(amount) -> int:
+    return int(amount) if isinstance(amount, str) else 0
+
+
+class EscrowIndex:
+    """
+    Local index of live escrows owned by bank and platform wallets.
+
+    Responsibilities:
+    - Backfill from paginated account_objects(type=escrow) per owner wallet,
+      including wallets that start being tracked after startup (track())
+    - Stay current from validated EscrowCreate / EscrowFinish / EscrowCancel transactions
+    - Answer lookups by owner+sequence, destination, owner and FinishAfter locally
+    - Pass every synced transaction of a tracked wallet on to transaction listeners
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_key: Dict[EscrowKey, LoanRecord] = {}
+        self._by_destination: Dict[str, Set[EscrowKey]] = {}
+        self._by_owner: Dict[str, Set[EscrowKey]] = {}
+        self._maturities: List[Tuple[int, str, int]] = []  # (finish_after, owner, sequence), sorted
+        self._ledger_cursor: Dict[str, int] = {}  # owner -> last validated ledger applied
+        self._pending_owners: Set[str] = set()  # tracked, not backfilled yet
+        self._listeners: List[Callable[[str, LoanRecord], None]] = []
+        self._tx_listeners: List[Callable[[dict], None]] = []
+        self._syncer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def get(self, owner: str, sequence: int) -> Optional[LoanRecord]:
+        return self._by_key.get((owner, sequence))
+
+    def for_destination(self, destination: str) -> List[LoanRecord]:
+        with self._lock:
+            keys = self._by_destination.get(destination, ())
+            return sorted((self._by_key[k] for k in keys), key=lambda e: e.finish_after or 0)
+
+    def for_owner(self, owner: str) -> List[LoanRecord]:
+        with self._lock:
+            keys = self._by_owner.get(owner, ())
+            return sorted((self._by_key[k] for k in keys), key=lambda e: e.finish_after or 0)
+
+    def maturing_before(self, finish_after: int) -> List[LoanRecord]:
+        """Escrows whose FinishAfter (XRPL epoch seconds) is at or before the given time."""
+        with self._lock:
+            end = bisect_left(self._maturities, (finish_after + 1,))
+            return [self._by_key[(owner, seq)] for _, owner, seq in self._maturities[:end]]
+
+    def owners(self) -> List[str]:
+        return list(self._by_owner.keys())
+
+    def by_owner(self) -> Dict[str, List[LoanRecord]]:
+        """Live escrows for every backfilled owner (owners without escrows map to [])."""
+        with self._lock:
+            owners = set(self._ledger_cursor) | set(self._by_owner)
+            return {owner: [self._by_key[k] for k in self._by_owner.get(owner, ())] for owner in owners}
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def add_listener(self, listener: Callable[[str, LoanRecord], None]) -> None:
+        """
+        Register a callable invoked with (event, escrow) on every change: "added",
+        "finished" / "cancelled" when a transaction removed it, or "removed".
+        """
+        self._listeners.append(listener)
+
+    def add_transaction_listener(self, listener: Callable[[dict], None]) -> None:
+        """Register a callable invoked with every account_tx entry sync() reads, e.g. payments to a bank wallet."""
+        self._tx_listeners.append(listener)
+
+    # -------------------------
+    # Mutations
+    # -------------------------
+    def add(self, escrow: LoanRecord) -> None:
+        with self._lock:
+            if escrow.key in self._by_key:
+                self._remove(escrow.key)
+            self._by_key[escrow.key] = escrow
+            self._by_destination.setdefault(escrow.destination, set()).add(escrow.key)
+            self._by_owner.setdefault(escrow.owner, set()).add(escrow.key)
+            if escrow.finish_after is not None:
+                insort(self._maturities, (escrow.finish_after, escrow.owner, escrow.sequence))
+        self._notify("added", escrow)
+
+    def remove(self, owner: str, sequence: int, event: str = "removed") -> Optional[LoanRecord]:
+        with self._lock:
+            escrow = self._remove((owner, sequence))
+        if escrow:
+            self._notify(event, escrow)
+        return escrow
+
+    def _remove(self, key: EscrowKey) -> Optional[LoanRecord]:
+        escrow = self._by_key.pop(key, None)
+        if escrow is None:
+            return None
+        self._discard(self._by_destination, escrow.destination, key)
+        self._discard(self._by_owner, escrow.owner, key)
+        if escrow.finish_after is not None:
+            entry = (escrow.finish_after, escrow.owner, escrow.sequence)
+            i = bisect_left(self._maturities, entry)
+            if i < len(self._maturities) and self._maturities[i] == entry:
+                del self._maturities[i]
+        return escrow
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[EscrowKey]], name: str, key: EscrowKey) -> None:
+        keys = index.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[name]
+
+    def _notify(self, event: str, escrow: LoanRecord) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event, escrow)
+            except Exception as e:
+                logger.warning(f"Escrow index listener failed: {e}", exc_info=True)
+
+    # -------------------------
+    # Transaction stream
+    # -------------------------
+    def apply_transaction(self, result: dict, bank_id_for: Callable[[str], str]) -> bool:
+        """Apply one validated transaction (submit result or account_tx entry)."""
+        tx = tx_fields(result)
+        meta = result.get("meta") or {}
+        if meta and meta.get("TransactionResult") != "tesSUCCESS":
+            return False
+        tx_type = tx.get("TransactionType")
+        if tx_type == "EscrowCreate":
+            owner = tx["Account"]
+            if owner not in self._by_owner and owner not in self._ledger_cursor:
+                return False
+            self.add(LoanRecord(
+                owner=owner,
+                sequence=tx.get("Sequence") or tx.get("TicketSequence"),
+                destination=tx["Destination"],
+                amount_drops=_amount_drops(tx.get("Amount")),
+                finish_after=tx.get("FinishAfter"),
+                bank_id=bank_id_for(owner),
+                tx_hash=result.get("hash") or tx.get("hash"),
+            ))
+            return True
+        if tx_type == "EscrowFinish":
+            return self.remove(tx["Owner"], tx["OfferSequence"], "finished") is not None
+        if tx_type == "EscrowCancel":
+            return self.remove(tx["Owner"], tx["OfferSequence"], "cancelled") is not None
+        return False
+
+    def attach(self, xrpl_client: XRPLClient, bank_id_for: Callable[[str], str]) -> None:
+        """Apply every successful XRPLClient submission to the index."""
+        xrpl_client.add_submit_listener(lambda result: self.apply_transaction(result, bank_id_for))
+
+    # -------------------------
+    # Backfill & sync
+    # -------------------------
+    def track(self, owners: Iterable[str]) -> None:
+        """Start following more owner wallets (e.g. newly registered banks); the next sync backfills them."""
+        with self._lock:
+            self._pending_owners.update(o for o in owners if o not in self._ledger_cursor)
+
+    def backfill(self, xrpl_client: XRPLClient, owners: Iterable[str], bank_id_for: Callable[[str], str]) -> None:
+        """Replace each owner's escrows with what account_objects reports on the validated ledger."""
+        known_sequences = {e.tx_hash: e.sequence for e in self._by_key.values() if e.tx_hash}
+        for owner in owners:
+            try:
+                page = xrpl_client.get_account_objects(owner, "escrow")
+            except Exception as e:
+                logger.warning(f"Escrow backfill failed for {owner}: {e}")
+                continue
+
+            escrows = []
+            for obj in page["objects"]:
+                # account_objects also lists escrows where the account is only the destination
+                if obj.get("Account") != owner:
+                    continue
+                sequence = known_sequences.get(obj.get("PreviousTxnID")) or self._resolve_sequence(xrpl_client, obj)
+                if sequence is None:
+                    logger.warning(f"Could not resolve escrow sequence for {obj.get('index')}")
+                    continue
+                escrows.append(LoanRecord(
+                    owner=owner,
+                    sequence=sequence,
+                    destination=obj["Destination"],
+                    amount_drops=_amount_drops(obj.get("Amount")),
+                    finish_after=obj.get("FinishAfter"),
+                    bank_id=bank_id_for(owner),
+                    tx_hash=obj.get("PreviousTxnID"),
+                ))
+
+            with self._lock:
+                for key in list(self._by_owner.get(owner, ())):
+                    self._remove(key)
+                for escrow in escrows:
+                    self.add(escrow)
+                self._ledger_cursor[owner] = page.get("ledger_index") or 0
+            logger.info(f"Escrow index backfilled {len(escrows)} escrows for {owner}")
+
+    def _resolve_sequence(self, xrpl_client: XRPLClient, obj: dict) -> Optional[int]:
+        """Escrow objects do not carry OfferSequence; read it from the creating transaction."""
+        created_by = tx_fields(xrpl_client.get_transaction(obj["PreviousTxnID"]))
+        if created_by.get("TransactionType") != "EscrowCreate":
+            return None
+        return created_by.get("Sequence") or created_by.get("TicketSequence")
+
+    def sync(self, xrpl_client: XRPLClient, bank_id_for: Callable[[str], str], page_size: int = 200) -> int:
+        """Backfill newly tracked owners, then apply validated transactions newer than each owner's cursor; returns how many were applied."""
+        with self._lock:
+            pending, self._pending_owners = self._pending_owners, set()
+        if pending:
+            self.backfill(xrpl_client, pending, bank_id_for)
+            with self._lock:
+                # Owners whose backfill failed are retried on the next sync
+                self._pending_owners.update(o for o in pending if o not in self._ledger_cursor)
+        applied = 0
+        for owner, cursor in list(self._ledger_cursor.items()):
+            last_seen = cursor
+            try:
+                for entry in xrpl_client.iter_account_transactions(owner, cursor, page_size):
+                    if self.apply_transaction(entry, bank_id_for):
+                        applied += 1
+                    for listener in self._tx_listeners:
+                        try:
+                            listener(entry)
+                        except Exception as e:
+                            logger.warning(f"Escrow index transaction listener failed: {e}", exc_info=True)
+                    last_seen = max(last_seen, entry.get("ledger_index") or 0)
+            except Exception as e:
+                logger.warning(f"Escrow index sync failed for {owner}: {e}")
+            self._ledger_cursor[owner] = last_seen
+        return applied
+
+    def start_syncing(self, xrpl_client: XRPLClient, bank_id_for: Callable[[str], str], interval: float = 10.0) -> None:
+        """Poll account_tx in a daemon thread to pick up escrows signed outside this API."""
+        if self._syncer and self._syncer.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.sync(xrpl_client, bank_id_for)
+
+        self._syncer = threading.Thread(target=_run, name="escrow-index-sync", daemon=True)
+        self._syncer.start()
+
+    def stop_syncing(self) -> None:
+        self._stop.set()
+        if self._syncer:
+            self._syncer.join(timeout=5)
+            self._syncer = None
+
+
+escrow_index = EscrowIndex()
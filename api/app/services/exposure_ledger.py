@@ -0,0 +1,422 @@
+# api/services/exposure_ledger.py
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .xrpl_client import tx_fields
+from ..models.exposure_state import ExposureState
+from ..models.loan import LoanRecord
+from ..utils.amounts import amount_to_units, from_units
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+EXPOSURE_DIR = DATA_DIR / "exposure"
+PLATFORM_BANK_ID = "platform"
+DEDUPE_SECONDS = 7 * 86_400  # how long a logged event key suppresses the same event from another worker
+
+
+def amount_to_drops(amount) -> int:
+    """Drops for XRP amounts; issued-currency values are counted 1:1 against XRP principal."""
+    return amount_to_units(amount)
+
+
+class ExposureLedger:
+    """
+    Outstanding principal per (business, bank) and per bank.
+
+    Responsibilities:
+    - Apply EscrowCreate / EscrowFinish / EscrowCancel / Clawback / repayment results incrementally
+    - Answer exposure reads from memory for PolicyEngine and BankAgent
+    - Share one ordered event log (SQLite, WAL) between every API worker: each
+      worker appends what it observes and replays everyone's events in log
+      order, so all workers hold the same state
+    - Compact the log into a snapshot every `snapshot_every` events
+    - Reconcile with the on-ledger escrow objects at startup
+
+    An EscrowFinish releases funds to the borrower, so the principal stays
+    outstanding (status "finished") until it is paid back: a Payment from the
+    borrower to the bank's wallet, a Clawback and an EscrowCancel reduce it.
+    The same escrow event seen by several workers is logged once.
+    """
+
+    def __init__(self, directory: Path = EXPOSURE_DIR, snapshot_every: int = 1000, busy_timeout_ms: int = 5000):
+        self.directory = Path(directory)
+        self.snapshot_every = snapshot_every
+        self.busy_timeout_ms = busy_timeout_ms
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._loans: Dict[Tuple[str, int], LoanRecord] = {}
+        self._pair: Dict[Tuple[str, str], int] = {}
+        self._bank: Dict[str, int] = {}
+        self._cursor = 0  # id of the last log event applied to the in-memory state
+        self._events_since_snapshot = 0
+
+    @property
+    def db_path(self) -> Path:
+        return self.directory / "ledger.db"
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def exposure(self, business_id: str, bank_id: str) -> float:
+        with self._lock:
+            self._catch_up()
+            return from_units(self._pair.get((business_id, bank_id), 0))
+
+    def bank_exposure(self, bank_id: str) -> float:
+        with self._lock:
+            self._catch_up()
+            return from_units(self._bank.get(bank_id, 0))
+
+    def state_for(self, business_id: str, bank_id: str) -> ExposureState:
+        with self._lock:
+            self._catch_up()
+            return ExposureState(
+                business_id=business_id,
+                bank_id=bank_id,
+                current_exposure=from_units(self._pair.get((business_id, bank_id), 0)),
+                bank_exposure=from_units(self._bank.get(bank_id, 0))
+            )
+
+    def get_loan(self, owner: str, sequence: int) -> Optional[LoanRecord]:
+        with self._lock:
+            self._catch_up()
+            return self._loans.get((owner, sequence))
+
+    def loans(self) -> Iterable[LoanRecord]:
+        with self._lock:
+            self._catch_up()
+            return list(self._loans.values())
+
+    # -------------------------
+    # Events
+    # -------------------------
+    def record_escrow_create(
+        self,
+        owner: str,
+        sequence: int,
+        destination: str,
+        amount_drops: int,
+        bank_id: str,
+        finish_after: Optional[int] = None,
+        tx_hash: Optional[str] = None
+    ) -> None:
+        self._apply({
+            "type": "EscrowCreate", "owner": owner, "sequence": sequence, "destination": destination,
+            "amount_drops": amount_drops, "bank_id": bank_id, "finish_after": finish_after, "tx_hash": tx_hash,
+        })
+
+    def record_escrow_finish(self, owner: str, sequence: int) -> None:
+        self._apply({"type": "EscrowFinish", "owner": owner, "sequence": sequence})
+
+    def record_escrow_cancel(self, owner: str, sequence: int) -> None:
+        self._apply({"type": "EscrowCancel", "owner": owner, "sequence": sequence})
+
+    def record_clawback(self, business_id: str, bank_id: str, amount_drops: int, tx_hash: Optional[str] = None) -> None:
+        self._apply({
+            "type": "Clawback", "business_id": business_id, "bank_id": bank_id,
+            "amount_drops": amount_drops, "tx_hash": tx_hash,
+        })
+
+    def record_repayment(self, business_id: str, bank_id: str, amount_drops: int, tx_hash: Optional[str] = None) -> None:
+        self._apply({
+            "type": "Repayment", "business_id": business_id, "bank_id": bank_id,
+            "amount_drops": amount_drops, "tx_hash": tx_hash,
+        })
+
+    def apply_transaction(self, result: dict, bank_id_for: Callable[[str], str]) -> bool:
+        """
+        Update exposure from a validated submit result or account_tx entry.
+
+        :param bank_id_for: maps an owner/issuer wallet address to a bank_id
+        :return: True if the transaction changed exposure
+        """
+        tx = tx_fields(result)
+        meta = result.get("meta") or {}
+        if meta and meta.get("TransactionResult") != "tesSUCCESS":
+            return False
+        tx_type = tx.get("TransactionType")
+        if tx_type == "EscrowCreate":
+            self.record_escrow_create(
+                owner=tx["Account"],
+                sequence=tx.get("Sequence") or tx.get("TicketSequence"),
+                destination=tx["Destination"],
+                amount_drops=amount_to_drops(tx.get("Amount")),
+                bank_id=bank_id_for(tx["Account"]),
+                finish_after=tx.get("FinishAfter"),
+                tx_hash=result.get("hash") or tx.get("hash")
+            )
+        elif tx_type == "EscrowFinish":
+            self.record_escrow_finish(tx["Owner"], tx["OfferSequence"])
+        elif tx_type == "EscrowCancel":
+            self.record_escrow_cancel(tx["Owner"], tx["OfferSequence"])
+        elif tx_type == "Clawback":
+            amount = tx.get("Amount")
+            holder = amount.get("issuer") if isinstance(amount, dict) else tx.get("Holder")
+            if not holder:
+                return False
+            self.record_clawback(
+                holder, bank_id_for(tx["Account"]), amount_to_drops(amount),
+                tx_hash=result.get("hash") or tx.get("hash")
+            )
+        elif tx_type == "Payment":
+            # A borrower paying the lending bank's wallet repays their principal with it
+            bank_id = bank_id_for(tx["Destination"])
+            if not self.exposure(tx["Account"], bank_id):
+                return False
+            self.record_repayment(
+                tx["Account"], bank_id, amount_to_drops(meta.get("delivered_amount") or tx.get("Amount")),
+                tx_hash=result.get("hash") or tx.get("hash")
+            )
+        else:
+            return False
+        return True
+
+    def on_index_event(self, event: str, escrow: LoanRecord) -> None:
+        """
+        EscrowIndex listener: follows escrows whichever wallet submitted the
+        transaction, e.g. a borrower finishing their own escrow.
+        """
+        if event == "added":
+            self.record_escrow_create(
+                owner=escrow.owner,
+                sequence=escrow.sequence,
+                destination=escrow.destination,
+                amount_drops=escrow.amount_drops,
+                bank_id=escrow.bank_id,
+                finish_after=escrow.finish_after,
+                tx_hash=escrow.tx_hash
+            )
+        elif event == "finished":
+            self.record_escrow_finish(escrow.owner, escrow.sequence)
+        elif event == "cancelled":
+            self.record_escrow_cancel(escrow.owner, escrow.sequence)
+
+    # -------------------------
+    # State transitions
+    # -------------------------
+    def _apply(self, event: dict) -> None:
+        """Append the event to the shared log, then replay the log up to and including it."""
+        with self._lock:
+            conn = self._conn()
+            key = self._event_key(event)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if key is None or conn.execute(
+                    "INSERT OR IGNORE INTO seen (event_key, logged_at) VALUES (?, ?)", (key, time.time())
+                ).rowcount:
+                    conn.execute("INSERT INTO events (body) VALUES (?)", (json.dumps(event),))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._catch_up()
+            if self._events_since_snapshot >= self.snapshot_every:
+                self.snapshot()
+
+    @staticmethod
+    def _event_key(event: dict) -> Optional[str]:
+        # Escrow events are facts about one escrow: the first worker to see one logs it.
+        # Clawbacks and repayments are counted, so they are only deduplicated by their transaction hash.
+        if event["type"] in ("Clawback", "Repayment"):
+            return f"Clawback:{event['tx_hash']}" if event.get("tx_hash") else None
+        return f"{event['type']}:{event['owner']}:{event['sequence']}"
+
+    def _mutate(self, event: dict) -> None:
+        kind = event["type"]
+        if kind == "EscrowCreate":
+            key = (event["owner"], event["sequence"])
+            if key in self._loans:
+                return
+            loan = LoanRecord(
+                owner=event["owner"],
+                sequence=event["sequence"],
+                destination=event["destination"],
+                amount_drops=event["amount_drops"],
+                finish_after=event.get("finish_after"),
+                bank_id=event["bank_id"],
+                tx_hash=event.get("tx_hash"),
+            )
+            self._loans[key] = loan
+            self._add(loan.destination, loan.bank_id, loan.amount_drops)
+        elif kind == "EscrowFinish":
+            loan = self._loans.get((event["owner"], event["sequence"]))
+            if loan and loan.status == "escrowed":
+                loan.status = "finished"
+        elif kind == "EscrowCancel":
+            # A cancel also overrides a "finished" that reconcile() could only infer
+            loan = self._loans.pop((event["owner"], event["sequence"]), None)
+            if loan:
+                self._add(loan.destination, loan.bank_id, -loan.amount_drops)
+        elif kind in ("Clawback", "Repayment"):
+            pair = (event["business_id"], event["bank_id"])
+            recovered = min(event["amount_drops"], self._pair.get(pair, 0))
+            self._add(event["business_id"], event["bank_id"], -recovered)
+
+    def _add(self, business_id: str, bank_id: str, delta: int) -> None:
+        pair = (business_id, bank_id)
+        pair_total = self._pair.get(pair, 0) + delta
+        if pair_total:
+            self._pair[pair] = pair_total
+        else:
+            self._pair.pop(pair, None)
+        bank_total = self._bank.get(bank_id, 0) + delta
+        if bank_total:
+            self._bank[bank_id] = bank_total
+        else:
+            self._bank.pop(bank_id, None)
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            # AUTOINCREMENT: ids are never reused after compaction, so a cursor stays valid.
+            # seen outlives compaction so a late duplicate is still recognised.
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    body TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS seen (
+                    event_key TEXT PRIMARY KEY,
+                    logged_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS snapshot (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    through INTEGER NOT NULL,
+                    state TEXT NOT NULL
+                );
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def _catch_up(self) -> None:
+        """Apply the events other workers (and this one) appended since the last read."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            self._replay(conn)
+        finally:
+            conn.execute("COMMIT")
+
+    def _replay(self, conn: sqlite3.Connection) -> None:
+        # Caller holds self._lock and a read (or write) transaction on conn
+        row = conn.execute("SELECT through, state FROM snapshot WHERE id = 1").fetchone()
+        if row is not None and row[0] > self._cursor:
+            # Another worker compacted events this process had not applied yet
+            self._restore(row[0], json.loads(row[1]))
+        replayed = 0
+        for event_id, body in conn.execute("SELECT id, body FROM events WHERE id > ? ORDER BY id", (self._cursor,)):
+            try:
+                self._mutate(json.loads(body))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping corrupt exposure event {event_id}: {e}")
+            self._cursor = event_id
+            replayed += 1
+        self._events_since_snapshot += replayed
+
+    def _restore(self, through: int, state: dict) -> None:
+        self._loans.clear()
+        self._pair.clear()
+        self._bank.clear()
+        for raw in state.get("loans", []):
+            loan = LoanRecord(
+                owner=raw["owner"],
+                sequence=raw["sequence"],
+                destination=raw["destination"],
+                amount_drops=raw["amount_drops"],
+                finish_after=raw.get("finish_after"),
+                bank_id=raw.get("bank_id"),
+                status=raw.get("status", "escrowed"),
+                tx_hash=raw.get("tx_hash"),
+            )
+            self._loans[loan.key] = loan
+        for business_id, bank_id, drops in state.get("pairs", []):
+            self._add(business_id, bank_id, drops)
+        self._cursor = through
+        self._events_since_snapshot = 0
+
+    def snapshot(self) -> None:
+        """Write the full state and drop the events it covers, for every worker at once."""
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Under the write lock nobody appends, so the snapshot covers the whole log
+                self._replay(conn)
+                state = {
+                    "loans": [loan.to_json() | {"amount_drops": loan.amount_drops} for loan in self._loans.values()],
+                    "pairs": [[b, k, v] for (b, k), v in self._pair.items()],
+                }
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshot (id, through, state) VALUES (1, ?, ?)",
+                    (self._cursor, json.dumps(state)),
+                )
+                conn.execute("DELETE FROM events WHERE id <= ?", (self._cursor,))
+                conn.execute("DELETE FROM seen WHERE logged_at < ?", (time.time() - DEDUPE_SECONDS,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._events_since_snapshot = 0
+
+    def load(self) -> None:
+        """Restore from the shared snapshot, then replay the events logged after it."""
+        with self._lock:
+            self._restore(0, {})
+            self._catch_up()
+            logger.info(f"Exposure ledger loaded: {len(self._loans)} loans, {len(self._bank)} banks, through event {self._cursor}")
+
+    # -------------------------
+    # Startup reconciliation
+    # -------------------------
+    def reconcile(self, live_escrows: Dict[str, List[LoanRecord]]) -> None:
+        """
+        Log what happened on-ledger while no worker was listening.
+
+        :param live_escrows: owner wallet -> its live escrows (e.g. from EscrowIndex);
+            owners missing from the mapping keep their local state
+        Live escrows the ledger does not know are recorded as created. Escrowed
+        loans whose escrow is gone are marked finished: an escrow object does not
+        say whether it was finished or cancelled, and keeping the principal
+        outstanding errs on the side of less credit.
+        """
+        live = {escrow.key for escrows in live_escrows.values() for escrow in escrows}
+        gone = [
+            loan for loan in self.loans()
+            if loan.owner in live_escrows and loan.status == "escrowed" and loan.key not in live
+        ]
+        for escrows in live_escrows.values():
+            for escrow in escrows:
+                self.on_index_event("added", escrow)
+        for loan in gone:
+            self.record_escrow_finish(loan.owner, loan.sequence)
+        with self._lock:
+            logger.info(f"Exposure ledger reconciled: {len(self._loans)} loans across {len(self._bank)} banks")
+
+    def attach(self, xrpl_client, bank_id_for: Callable[[str], str], escrow_index=None) -> None:
+        """
+        Apply every successful XRPLClient submission to the ledger (the escrow index does not see clawbacks),
+        and the transactions escrow_index syncs for bank wallets, which include borrowers' repayments.
+        """
+        xrpl_client.add_submit_listener(lambda result: self.apply_transaction(result, bank_id_for))
+        if escrow_index is not None:
+            escrow_index.add_transaction_listener(lambda entry: self.apply_transaction(entry, bank_id_for))
+
+
+exposure_ledger = ExposureLedger()
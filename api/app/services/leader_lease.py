@@ -0,0 +1,106 @@
+# api/services/leader_lease.py
+from typing import Callable, Optional
+from uuid import uuid4
+import logging
+import os
+import socket
+import threading
+
+from .state_backend import StateBackend, get_state_backend
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class LeaderLease:
+    """
+    Runs a background component in exactly one API worker process.
+
+    Responsibilities:
+    - Try to take a named lease in the shared state backend every `renew`
+      seconds and keep renewing it while this process holds it
+    - Call on_acquire when this process becomes the holder, and on_lose when
+      a renewal fails or on stop, so the component runs in one worker only
+    - Let the lease lapse after `ttl` seconds if the holder dies, so another
+      worker takes over
+
+    With the memory backend (one process) the lease is always won.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        on_acquire: Callable[[], None],
+        on_lose: Callable[[], None],
+        state: StateBackend | None = None,
+        ttl: float = 30.0,
+        renew: float = 10.0,
+    ):
+        """
+        :param name: lease name shared by every worker running the component
+        :param ttl: seconds a lease outlives its last renewal
+        :param renew: seconds between acquire / renew attempts (well inside ttl)
+        """
+        self.name = name
+        self.on_acquire = on_acquire
+        self.on_lose = on_lose
+        self._state = state
+        self.ttl = ttl
+        self.renew = renew
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.held = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def state(self) -> StateBackend:
+        if self._state is None:
+            self._state = get_state_backend()
+        return self._state
+
+    def check(self) -> bool:
+        """One acquire / renew attempt; starts or stops the component on a change."""
+        try:
+            won = self.state.acquire_lease(self.name, self.holder, self.ttl)
+        except Exception as e:
+            logger.warning(f"Lease {self.name} renewal failed: {e}")
+            won = False
+        if won and not self.held:
+            self.held = True
+            logger.info(f"Lease {self.name} acquired by {self.holder}")
+            self.on_acquire()
+        elif not won and self.held:
+            self.held = False
+            logger.warning(f"Lease {self.name} lost by {self.holder}")
+            self.on_lose()
+        return won
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while True:
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"Lease {self.name} holder error: {e}", exc_info=True)
+                if self._stop.wait(self.renew):
+                    return
+
+        self._thread = threading.Thread(target=_run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.held:
+            self.held = False
+            self.on_lose()
+            try:
+                self.state.release_lease(self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"Lease {self.name} release failed: {e}")
@@ -0,0 +1,302 @@
+# api/services/ledger_export.py
+"""
+Columnar export of normalised ledger activity for offline analytics.
+
+Run from /api (needs pyarrow, which the API itself does not):
+    python -m app.services.ledger_export [--format parquet|arrow] [address ...]
+
+With no addresses, every address tracked by the payment history store is
+exported. Re-running picks up after the last ledger exported per address.
+"""
+from datetime import timezone
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import argparse
+import json
+import logging
+import os
+
+from app.services.payment_history_service import PaymentHistoryService
+from app.services.xrpl_client import XRPLClient, entry_tx, xrpl_time_to_datetime
+from app.utils.amounts import DROPS_PER_XRP
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+EXPORT_DIR = DATA_DIR / "exports" / "ledger"
+STATE_FILE = "_state.json"
+
+AMOUNT_PRECISION = 38
+AMOUNT_SCALE = 15  # decimal128(38, 15): exact for XRP and for issued values below 10^23
+
+# Fixed vocabularies, so every batch and file shares one dictionary
+TX_TYPES = sorted(PaymentHistoryService.SUPPORTED_TX_TYPES)
+STATUSES = ["Completed", "Failed"]
+
+COLUMNS = (
+    "address", "ledger_index", "tx_index", "hash", "timestamp", "type", "status", "result",
+    "currency", "issuer", "amount", "amount_drops", "counterparty", "fee_drops",
+)
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Ledger export needs pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def export_schema(pa):
+    return pa.schema([
+        ("address", pa.string()),
+        ("ledger_index", pa.int64()),
+        ("tx_index", pa.int32()),
+        ("hash", pa.string()),
+        ("timestamp", pa.timestamp("s", tz="UTC")),
+        ("type", pa.dictionary(pa.int8(), pa.string())),
+        ("status", pa.dictionary(pa.int8(), pa.string())),
+        ("result", pa.string()),
+        ("currency", pa.string()),
+        ("issuer", pa.string()),
+        ("amount", pa.decimal128(AMOUNT_PRECISION, AMOUNT_SCALE)),
+        ("amount_drops", pa.int64()),
+        ("counterparty", pa.string()),
+        ("fee_drops", pa.int64()),
+    ])
+
+
+def normalize_entry(address: str, entry: dict) -> Optional[dict]:
+    """
+    Flatten one account_tx entry into an export row, or None if it is not a
+    supported, dated transaction. Amounts stay exact: integer drops for XRP,
+    a Decimal for every currency.
+    """
+    tx = entry_tx(entry)
+    meta = entry.get("meta")
+    if not tx or not isinstance(meta, dict) or "date" not in tx:
+        return None
+    tx_type = tx.get("TransactionType")
+    if tx_type not in PaymentHistoryService.SUPPORTED_TX_TYPES:
+        return None
+
+    raw = PaymentHistoryService._amount_field(tx)
+    currency = issuer = None
+    amount: Optional[Decimal] = None
+    drops: Optional[int] = None
+    if isinstance(raw, str):
+        currency, drops = "XRP", int(raw)
+        amount = Decimal(drops) / DROPS_PER_XRP
+    elif isinstance(raw, dict):
+        currency, issuer = raw.get("currency"), raw.get("issuer")
+        try:
+            amount = Decimal(raw.get("value", "0"))
+        except InvalidOperation:
+            amount = None
+        if amount is not None and abs(amount) >= Decimal(10) ** (AMOUNT_PRECISION - AMOUNT_SCALE):
+            logger.warning(f"{tx.get('hash')}: amount {amount} exceeds the export precision, left null")
+            amount = None
+    if amount is not None:
+        amount = amount.quantize(Decimal(1).scaleb(-AMOUNT_SCALE))
+
+    result = meta.get("TransactionResult")
+    return {
+        "address": address,
+        "ledger_index": tx.get("ledger_index") or entry.get("ledger_index") or 0,
+        "tx_index": meta.get("TransactionIndex", 0),
+        "hash": tx.get("hash"),
+        "timestamp": xrpl_time_to_datetime(tx["date"]).replace(tzinfo=timezone.utc),
+        "type": tx_type,
+        "status": "Completed" if result == "tesSUCCESS" else "Failed",
+        "result": result,
+        "currency": currency,
+        "issuer": issuer,
+        "amount": amount,
+        "amount_drops": drops,
+        "counterparty": tx.get("Destination") if tx.get("Account") == address else tx.get("Account"),
+        "fee_drops": int(tx["Fee"]) if "Fee" in tx else None,
+    }
+
+
+class LedgerExportJob:
+    """
+    Batch export of per-address ledger activity as Parquet or Arrow IPC files.
+
+    Responsibilities:
+    - Pull each address's validated history oldest first, starting after the
+      last ledger exported for it (state kept in _state.json)
+    - Normalise entries into one fixed schema: exact amounts, dictionary-encoded
+      type and status
+    - Write Hive-style date partitions (date=YYYY-MM-DD/), holding at most one
+      open file and batch_rows buffered rows at a time
+    - Make files visible and advance an address's state only once its run has
+      finished; file names are derived from the run's start ledger, so a run
+      repeated after a crash overwrites rather than duplicates
+    """
+
+    def __init__(
+        self,
+        out_dir: Path = EXPORT_DIR,
+        xrpl_client: XRPLClient | None = None,
+        fmt: str = "parquet",
+        batch_rows: int = 50_000,
+        page_size: int = 400,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+        self.out_dir = Path(out_dir)
+        self._xrpl = xrpl_client
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self.page_size = page_size
+        self.state_path = self.out_dir / STATE_FILE
+
+    @property
+    def xrpl(self) -> XRPLClient:
+        if self._xrpl is None:
+            self._xrpl = XRPLClient()
+        return self._xrpl
+
+    # -------------------------
+    # State
+    # -------------------------
+    def load_state(self) -> Dict[str, int]:
+        """Last ledger exported per address."""
+        try:
+            with open(self.state_path) as f:
+                return {address: int(ledger) for address, ledger in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state: Dict[str, int]) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    # -------------------------
+    # Run
+    # -------------------------
+    def run(self, addresses: Iterable[str]) -> Dict[str, int]:
+        """Export every address incrementally; returns rows written per address."""
+        pa = _pyarrow()
+        for stale in self.out_dir.glob("date=*/*.tmp"):
+            stale.unlink()  # left by an interrupted run
+        state = self.load_state()
+        written = {}
+        for address in addresses:
+            rows, synced_through = self._export_address(pa, address, state.get(address, 0))
+            written[address] = rows
+            if synced_through > state.get(address, 0):
+                state[address] = synced_through
+                self._save_state(state)
+            logger.info(f"Exported {rows} rows for {address} through ledger {state.get(address, 0)}")
+        return written
+
+    def _export_address(self, pa, address: str, after_ledger: int):
+        schema = export_schema(pa)
+        suffix = FORMATS[self.fmt]
+        stem = f"part-{address}-{after_ledger + 1}"
+        finished: List[Path] = []
+        writer = sink = tmp_path = None
+        day = None
+        buffer: List[dict] = []
+        rows = 0
+        synced_through = after_ledger
+
+        def flush():
+            if buffer:
+                # Both writer kinds take a Table: one row group / record batch per flush
+                writer.write_table(self._to_table(pa, schema, buffer))
+                buffer.clear()
+
+        def close():
+            if writer is not None:
+                flush()
+                writer.close()
+                if sink is not None:
+                    sink.close()
+                finished.append(tmp_path)
+
+        try:
+            for entry in self.xrpl.iter_account_transactions(address, after_ledger=after_ledger, page_size=self.page_size):
+                synced_through = max(synced_through, entry.get("ledger_index") or 0)
+                row = normalize_entry(address, entry)
+                if row is None:
+                    continue
+                row_day = row["timestamp"].strftime("%Y-%m-%d")
+                if row_day != day:
+                    # Oldest first: a day, once passed, never comes back in this run
+                    close()
+                    day = row_day
+                    partition = self.out_dir / f"date={day}"
+                    partition.mkdir(parents=True, exist_ok=True)
+                    tmp_path = partition / f"{stem}{suffix}.tmp"
+                    writer, sink = self._open(pa, schema, tmp_path)
+                buffer.append(row)
+                rows += 1
+                if len(buffer) >= self.batch_rows:
+                    flush()
+            close()
+        except Exception:
+            for path in finished + ([tmp_path] if tmp_path is not None else []):
+                path.unlink(missing_ok=True)
+            raise
+
+        for path in finished:
+            os.replace(path, path.with_suffix(""))
+        return rows, synced_through
+
+    def _open(self, pa, schema, path: Path):
+        if self.fmt == "parquet":
+            return pa.parquet.ParquetWriter(str(path), schema, compression="zstd"), None
+        sink = pa.OSFile(str(path), "wb")
+        return pa.ipc.new_file(sink, schema), sink
+
+    @staticmethod
+    def _to_table(pa, schema, rows: List[dict]):
+        columns = {name: [row[name] for row in rows] for name in COLUMNS}
+        arrays = []
+        for field in schema:
+            if field.name == "type":
+                arrays.append(_dictionary(pa, columns["type"], TX_TYPES))
+            elif field.name == "status":
+                arrays.append(_dictionary(pa, columns["status"], STATUSES))
+            else:
+                arrays.append(pa.array(columns[field.name], type=field.type))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _dictionary(pa, values: List[str], vocabulary: List[str]):
+    codes = {value: i for i, value in enumerate(vocabulary)}
+    return pa.DictionaryArray.from_arrays(
+        pa.array([codes[v] for v in values], type=pa.int8()),
+        pa.array(vocabulary, type=pa.string()),
+    )
+
+
+def _main(argv: Optional[List[str]] = None) -> None:
+    from app.services.payment_store import get_payment_store
+
+    parser = argparse.ArgumentParser(description="Export ledger activity as Parquet/Arrow for analytics")
+    parser.add_argument("addresses", nargs="*", help="defaults to every address in the payment history store")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    addresses = args.addresses or get_payment_store().addresses()
+    job = LedgerExportJob(out_dir=args.out, fmt=args.format, batch_rows=args.batch_rows)
+    written = job.run(addresses)
+    print(f"Exported {sum(written.values())} rows for {len(written)} addresses to {args.out}")
+
+
+if __name__ == "__main__":
+    _main()
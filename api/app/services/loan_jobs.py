@@ -0,0 +1,337 @@
+# api/services/loan_jobs.py
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from uuid import uuid4
+import asyncio
+import logging
+import os
+import time
+
+from .state_backend import StateBackend, get_state_backend
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+JOB_WORKERS = int(os.getenv("LOAN_JOB_WORKERS") or 4)  # liquidity requests processed at once
+JOB_QUEUE_SIZE = int(os.getenv("LOAN_JOB_QUEUE_SIZE") or 100)  # waiting jobs before new ones are refused
+JOB_RETENTION_SECONDS = float(os.getenv("LOAN_JOB_RETENTION_SECONDS") or 3600)  # finished jobs stay pollable this long
+JOB_DRAIN_SECONDS = float(os.getenv("LOAN_JOB_DRAIN_SECONDS") or 30)  # running jobs get this long to finish on shutdown
+JOB_POLL_SECONDS = float(os.getenv("LOAN_JOB_POLL_SECONDS") or 0.5)  # how often a job run by another worker is re-read
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+UNKNOWN = "unknown"  # interrupted mid-pipeline: its ledger submission may still land
+
+# A job body: gets a progress(stage) callback, returns the job's result
+JobRunner = Callable[[Callable[[str], None]], Awaitable[dict]]
+# Stores one event of a job in the shared state backend: (job_id, event, done)
+EventRecorder = Callable[[str, dict, bool], Future]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class LoanJob:
+    """
+    One queued liquidity request and its event history.
+
+    Every status or stage change is appended to events (numbered from 1),
+    handed to record so other workers can read it, and wakes anyone following
+    the job; the last event of a finished job carries its result or error.
+    """
+
+    def __init__(self, job_id: str, record: Optional[EventRecorder] = None):
+        self.id = job_id
+        self._record = record
+        self.recorded: Optional[Future] = None  # the latest event's write
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self.finished_at: Optional[float] = None  # monotonic, for retention
+        self.events: List[dict] = []
+        self._changed = asyncio.Event()
+        self._publish()
+        self.created_at = self.updated_at  # the queued event's time, as other workers read it
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED, UNKNOWN)
+
+    def advance(self, stage: str) -> None:
+        if not self.done:
+            self.stage = stage
+            self._publish()
+
+    def start(self) -> None:
+        self.status = RUNNING
+        self._publish()
+
+    def succeed(self, result: dict) -> None:
+        self.status, self.result = SUCCEEDED, result
+        self.finished_at = time.monotonic()
+        self._publish()
+
+    def fail(self, error: str) -> None:
+        self.status, self.error = FAILED, error
+        self.finished_at = time.monotonic()
+        self._publish()
+
+    def interrupt(self) -> None:
+        """Cancelled while running: the outcome is not known, so it is not reported as failed."""
+        self.status = UNKNOWN
+        self.error = (
+            f"Server shut down during stage '{self.stage}'; an escrow may still have been submitted. "
+            "Check the borrower's escrows before retrying."
+        )
+        self.finished_at = time.monotonic()
+        self._publish()
+
+    def _publish(self) -> None:
+        self.updated_at = datetime.now(timezone.utc)
+        event = {"seq": len(self.events) + 1, "job_id": self.id, "status": self.status, "stage": self.stage, "at": self.updated_at.isoformat()}
+        if self.status == SUCCEEDED:
+            event["result"] = self.result
+        elif self.status in (FAILED, UNKNOWN):
+            event["error"] = self.error
+        self.events.append(event)
+        if self._record is not None:
+            self.recorded = self._record(self.id, event, self.done)
+        # Wake current followers; later ones wait on a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self, after: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield events with seq > after as they happen, until the job is done.
+        Yields None when nothing happened for heartbeat seconds.
+        """
+        seen = after
+        while True:
+            for event in self.events[seen:]:
+                seen = event["seq"]
+                yield event
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+
+    def to_json(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class SharedJob:
+    """
+    A job accepted by another worker, read back from its events in the state backend.
+
+    Polls the backend every poll seconds while followed; it has the same
+    to_json and follow as LoanJob, so routes serve either one.
+    """
+
+    def __init__(self, job_id: str, events: List[dict], state: StateBackend, poll: float = JOB_POLL_SECONDS):
+        self.id = job_id
+        self.state = state
+        self.poll = poll
+        self.events: List[dict] = []
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self._apply(events)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED, UNKNOWN)
+
+    def _apply(self, events: List[dict]) -> None:
+        for event in events:
+            self.events.append(event)
+            self.status, self.stage = event["status"], event["stage"]
+            self.updated_at = datetime.fromisoformat(event["at"])
+            self.result = event.get("result", self.result)
+            self.error = event.get("error", self.error)
+        self.created_at = datetime.fromisoformat(self.events[0]["at"])
+
+    async def follow(self, after: int = 0, heartbeat: float = 15.0) -> AsyncIterator[Optional[dict]]:
+        """Same contract as LoanJob.follow, fed by polling the state backend."""
+        seen = after
+        idle = 0.0
+        while True:
+            for event in self.events[seen:]:
+                seen = event["seq"]
+                idle = 0.0
+                yield event
+            if self.done:
+                return
+            if idle >= heartbeat:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(self.poll)
+            idle += self.poll
+            self._apply(await asyncio.to_thread(self.state.job_events, self.id, len(self.events)))
+
+    to_json = LoanJob.to_json
+
+
+class LoanJobQueue:
+    """
+    Bounded queue of liquidity requests drained by a fixed pool of workers.
+
+    Responsibilities:
+    - Accept jobs without waiting for the ledger, refusing them (JobQueueFull)
+      once max_queued are waiting, so load turns into back-pressure instead
+      of open connections
+    - Run at most `workers` pipelines at once on the event loop; their
+      blocking ledger calls go to the threadpool as in the synchronous path
+    - Keep finished jobs pollable for `retention` seconds
+    - On shutdown, let running jobs finish for up to `drain` seconds; jobs
+      still running after that end as "unknown", never "failed", since their
+      ledger submission may still go through
+
+    - Record every job event in the state backend, so polls and event streams
+      can reach any API worker, not just the one running the job
+
+    Jobs run in the process that accepted them; if that process dies, its
+    running jobs stay at their last recorded event until retention drops them.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_QUEUE_SIZE,
+        retention: float = JOB_RETENTION_SECONDS,
+        drain: float = JOB_DRAIN_SECONDS,
+        state: Optional[StateBackend] = None,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self.drain = drain
+        self.state = state if state is not None else get_state_backend()
+        # One writer thread keeps each job's events in order and off the event loop
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loan-job-events")
+        self._closing = False
+        self._jobs: Dict[str, LoanJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Start the workers on the running loop (idempotent; submit calls it too)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._work(), name=f"loan-job-{i}") for i in range(self.workers)]
+        logger.info(f"Loan job queue started with {self.workers} workers")
+
+    async def stop(self, drain: Optional[float] = None) -> None:
+        """
+        Refuse new jobs, fail the queued ones and wait up to drain seconds
+        (default self.drain) for running ones; then cancel the workers.
+        """
+        drain = self.drain if drain is None else drain
+        self._closing = True
+        tasks, self._tasks = self._tasks, []
+        if self._queue is not None:
+            while not self._queue.empty():
+                job, _ = self._queue.get_nowait()
+                job.fail("Server shut down before the job ran")
+                self._queue.task_done()
+            if tasks:
+                try:
+                    await asyncio.wait_for(self._queue.join(), drain)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Loan jobs still running after {drain}s; marking them unknown")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Flush the final events so other workers see how the jobs ended
+        await asyncio.wrap_future(self._writer.submit(lambda: None))
+        self._loop = None
+
+    async def submit(self, run: JobRunner) -> LoanJob:
+        """Queue a job; returns once its first event is recorded, so any worker can find it."""
+        if self._closing and self._loop is not None:
+            raise JobQueueFull("Server is shutting down; retry later")
+        self.start()
+        if self._queue.full():
+            raise JobQueueFull(f"{self.max_queued} loan jobs already waiting; retry later")
+        self._prune()
+        job = LoanJob(uuid4().hex, record=self._record)
+        self._queue.put_nowait((job, run))
+        self._jobs[job.id] = job
+        logger.info(f"Loan job {job.id} queued ({self._queue.qsize()} waiting)")
+        await asyncio.wrap_future(job.recorded)
+        return job
+
+    def get(self, job_id: str) -> Optional[LoanJob]:
+        """A job this worker accepted."""
+        return self._jobs.get(job_id)
+
+    async def find(self, job_id: str) -> Optional[Union[LoanJob, SharedJob]]:
+        """A job accepted by any worker sharing the state backend (None if unknown or expired)."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        events = await asyncio.to_thread(self.state.job_events, job_id)
+        return SharedJob(job_id, events, self.state) if events else None
+
+    def _record(self, job_id: str, event: dict, done: bool) -> Future:
+        return self._writer.submit(self._store_event, job_id, event, done)
+
+    def _store_event(self, job_id: str, event: dict, done: bool) -> None:
+        try:
+            self.state.append_job_event(job_id, event, done)
+        except Exception as e:
+            # The job still runs and is served by this worker; only other workers miss the event
+            logger.error(f"Could not record event {event['seq']} of loan job {job_id}: {e}")
+
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def _work(self) -> None:
+        while True:
+            job, run = await self._queue.get()
+            try:
+                job.start()
+                job.succeed(await run(job.advance))
+                logger.info(f"Loan job {job.id} finished: {(job.result or {}).get('status')}")
+            except asyncio.CancelledError:
+                job.interrupt()
+                logger.warning(f"Loan job {job.id} interrupted at stage {job.stage}")
+                raise
+            except Exception as e:
+                logger.error(f"Loan job {job.id} failed: {e}", exc_info=True)
+                job.fail(str(e))
+            finally:
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self._writer.submit(self._prune_shared, time.time() - self.retention)
+
+    def _prune_shared(self, before: float) -> None:
+        try:
+            self.state.prune_jobs(before)
+        except Exception as e:
+            logger.warning(f"Could not prune recorded loan jobs: {e}")
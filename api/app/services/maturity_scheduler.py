@@ -0,0 +1,406 @@
+# api/services/maturity_scheduler.py
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from xrpl.ledger import get_latest_validated_ledger_sequence
+from xrpl.models.requests import AccountInfo
+from xrpl.models.transactions import EscrowFinish
+from xrpl.utils import posix_to_ripple_time
+
+from ..models.loan import LoanRecord
+from .validation_tracker import TransactionFailed
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+LEDGER_OFFSET = 20  # LastLedgerSequence window, same as xrpl-py autofill
+
+FinishFailure = Tuple[LoanRecord, Exception]
+FinishBatch = Callable[[List[LoanRecord]], List[FinishFailure]]  # returns the escrows that failed
+
+
+def ripple_now() -> int:
+    """Current time in XRPL epoch seconds (the unit of FinishAfter)."""
+    return posix_to_ripple_time(time.time())
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel over integer seconds.
+
+    Each level has 2**bits slots; level L slot s holds entries whose deadline
+    shares every bit above level L with the current time. Adding and removing
+    are O(1); advancing one second empties one level-0 slot and, when a level
+    wraps, cascades a single slot of the level above. With bits=8 and four
+    levels the wheel spans 2**32 seconds, the full range of XRPL timestamps.
+    """
+
+    def __init__(self, now: int, bits: int = 8, levels: int = 4):
+        self.bits = bits
+        self.levels = levels
+        self.mask = (1 << bits) - 1
+        self.now = now  # next second to expire
+        self._slots: List[List[Dict[Hashable, Tuple[int, object]]]] = [
+            [{} for _ in range(1 << bits)] for _ in range(levels)
+        ]
+        self._where: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def add(self, key: Hashable, deadline: int, item: object) -> None:
+        if key in self._where:
+            self.remove(key)
+        level, slot = self._position(max(deadline, self.now))
+        self._slots[level][slot][key] = (deadline, item)
+        self._where[key] = (level, slot)
+
+    def remove(self, key: Hashable) -> Optional[object]:
+        position = self._where.pop(key, None)
+        if position is None:
+            return None
+        level, slot = position
+        return self._slots[level][slot].pop(key)[1]
+
+    def _position(self, deadline: int) -> Tuple[int, int]:
+        for level in range(self.levels):
+            shift = self.bits * (level + 1)
+            if deadline >> shift == self.now >> shift:
+                return level, (deadline >> (self.bits * level)) & self.mask
+        # Beyond the wheel's span: park in the last slot of the top level and re-place on cascade
+        return self.levels - 1, self.mask
+
+    def advance(self, until: int) -> List[Tuple[Hashable, object]]:
+        """Expire every entry with deadline <= until and return (key, item) pairs."""
+        expired: List[Tuple[Hashable, object]] = []
+        if not self._where:
+            self.now = max(self.now, until + 1)
+            return expired
+        while self.now <= until:
+            bucket = self._slots[0][self.now & self.mask]
+            if bucket:
+                for key, (_, item) in bucket.items():
+                    del self._where[key]
+                    expired.append((key, item))
+                bucket.clear()
+            self.now += 1
+            self._cascade()
+            if not self._where:
+                self.now = max(self.now, until + 1)
+                break
+        return expired
+
+    def _cascade(self) -> None:
+        for level in range(1, self.levels):
+            if (self.now >> (self.bits * (level - 1))) & self.mask:
+                return
+            bucket = self._slots[level][(self.now >> (self.bits * level)) & self.mask]
+            if bucket:
+                entries = list(bucket.items())
+                bucket.clear()
+                for key, (deadline, item) in entries:
+                    del self._where[key]
+                    self.add(key, deadline, item)
+
+
+class MaturityScheduler:
+    """
+    Submits EscrowFinish for every tracked escrow as soon as its FinishAfter passes.
+
+    Responsibilities:
+    - Track escrow maturities in a TimingWheel (O(1) add/remove, O(1) work per tick)
+    - Group matured escrows per signing wallet and hand them to finish_batch in batches on a worker pool
+    - Cap in-flight batches per wallet; finish_batch serialises signing per wallet
+      so only the wait for validation overlaps
+    - Retry failed finishes with a backoff, dropping escrows that disappear from the index
+    - Stop and start again (e.g. as a lease moves between workers) without
+      losing escrows that were queued but not yet submitted
+    """
+
+    def __init__(
+        self,
+        finish_batch: FinishBatch,
+        signer_for: Callable[[LoanRecord], str],
+        clock: Callable[[], int] = ripple_now,
+        batch_size: int = 25,
+        max_workers: int = 8,
+        max_per_wallet: int = 1,
+        retry_delay: int = 30,
+        max_attempts: int = 5,
+        is_live: Optional[Callable[[LoanRecord], bool]] = None
+    ):
+        """
+        :param finish_batch: submits EscrowFinish for escrows sharing a signing wallet
+            and waits for them; returns (escrow, error) for each one that failed
+        :param signer_for: address of the wallet that will sign the escrow's EscrowFinish
+        :param clock: current time in XRPL epoch seconds
+        :param is_live: checked right before submitting; escrows it rejects are skipped
+        """
+        self.finish_batch = finish_batch
+        self.signer_for = signer_for
+        self.clock = clock
+        self.batch_size = batch_size
+        self.max_per_wallet = max_per_wallet
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.is_live = is_live
+        self._wheel = TimingWheel(clock())
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._queues: Dict[str, Deque[LoanRecord]] = {}
+        self._active: Dict[str, int] = {}
+        self._in_flight = 0
+        self._attempts: Dict[tuple, int] = {}
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = self._new_executor()
+        self._batches: Dict[Future, Tuple[str, List[LoanRecord]]] = {}
+        self._ticker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.finished = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._wheel)
+
+    # -------------------------
+    # Tracking
+    # -------------------------
+    def track(self, escrow: LoanRecord) -> bool:
+        """Schedule an escrow; escrows without FinishAfter (condition-only) are ignored."""
+        if escrow.finish_after is None:
+            return False
+        with self._lock:
+            self._wheel.add(escrow.key, escrow.finish_after, escrow)
+        return True
+
+    def untrack(self, owner: str, sequence: int) -> None:
+        with self._lock:
+            self._wheel.remove((owner, sequence))
+            self._attempts.pop((owner, sequence), None)
+
+    def on_index_event(self, event: str, escrow: LoanRecord) -> None:
+        """EscrowIndex listener: follow escrows as they are created and finished."""
+        if event == "added":
+            self.track(escrow)
+        else:
+            self.untrack(escrow.owner, escrow.sequence)
+
+    # -------------------------
+    # Ticking
+    # -------------------------
+    def tick(self, now: Optional[int] = None) -> int:
+        """Expire matured escrows and dispatch them; returns how many matured."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            matured = self._wheel.advance(now)
+            for _, escrow in matured:
+                self._queues.setdefault(self.signer_for(escrow), deque()).append(escrow)
+            self._dispatch()
+        if matured:
+            logger.info(f"{len(matured)} escrows matured; {len(self._wheel)} still scheduled")
+        return len(matured)
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="escrow-finish")
+
+    def _dispatch(self) -> None:
+        if self._executor is None:
+            return  # stopped: matured escrows wait in their queues
+        for wallet, queue in list(self._queues.items()):
+            while queue and self._active.get(wallet, 0) < self.max_per_wallet:
+                batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                self._active[wallet] = self._active.get(wallet, 0) + 1
+                self._in_flight += 1
+                future = self._executor.submit(self._run_batch, wallet, batch)
+                self._batches[future] = (wallet, batch)
+                future.add_done_callback(self._forget_batch)
+            if not queue:
+                del self._queues[wallet]
+
+    def _forget_batch(self, future: Future) -> None:
+        if not future.cancelled():
+            with self._lock:
+                self._batches.pop(future, None)
+
+    def _release_slot(self, wallet: str) -> None:
+        self._active[wallet] -= 1
+        if not self._active[wallet]:
+            del self._active[wallet]
+        self._in_flight -= 1
+
+    def _run_batch(self, wallet: str, batch: List[LoanRecord]) -> None:
+        finished: List[LoanRecord] = []
+        failed: List[FinishFailure] = []
+        try:
+            # Escrows finished or cancelled by someone else since they matured are skipped
+            live = [escrow for escrow in batch if not self.is_live or self.is_live(escrow)]
+            if live:
+                try:
+                    failed = list(self.finish_batch(live))
+                except Exception as e:
+                    failed = [(escrow, e) for escrow in live]
+                failed_keys = {escrow.key for escrow, _ in failed}
+                finished = [escrow for escrow in live if escrow.key not in failed_keys]
+        finally:
+            with self._lock:
+                for escrow in finished:
+                    self._attempts.pop(escrow.key, None)
+                self.finished += len(finished)
+                self._reschedule(failed)
+                self._release_slot(wallet)
+                self._dispatch()
+                self._idle.notify_all()
+
+    def _reschedule(self, failed: List[FinishFailure]) -> None:
+        now = self.clock()
+        for escrow, error in failed:
+            attempts = self._attempts.get(escrow.key, 0) + 1
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                self._attempts.pop(escrow.key, None)
+                logger.error(f"Giving up on EscrowFinish for {escrow.owner}:{escrow.sequence} after {attempts} attempts: {error}")
+                continue
+            self._attempts[escrow.key] = attempts
+            self._wheel.add(escrow.key, now + self.retry_delay * attempts, escrow)
+            logger.warning(f"EscrowFinish for {escrow.owner}:{escrow.sequence} failed (attempt {attempts}): {error}")
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every dispatched batch has completed."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._in_flight and not self._queues, timeout)
+
+    # -------------------------
+    # Background ticker
+    # -------------------------
+    def start(self, interval: float = 1.0) -> None:
+        if self._ticker and self._ticker.is_alive():
+            return
+        self._stop.clear()
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Maturity scheduler tick failed: {e}", exc_info=True)
+
+        self._ticker = threading.Thread(target=_run, name="escrow-maturity", daemon=True)
+        self._ticker.start()
+
+    def stop(self) -> None:
+        """Stop ticking and submitting; batches not yet started go back on the wheel."""
+        self._stop.set()
+        if self._ticker:
+            self._ticker.join(timeout=5)
+            self._ticker = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            requeued = 0
+            for future, (wallet, batch) in list(self._batches.items()):
+                if future.cancelled():
+                    del self._batches[future]
+                    self._release_slot(wallet)
+                    for escrow in batch:
+                        self._wheel.add(escrow.key, escrow.finish_after, escrow)
+                    requeued += len(batch)
+            for queue in self._queues.values():
+                for escrow in queue:
+                    self._wheel.add(escrow.key, escrow.finish_after, escrow)
+                requeued += len(queue)
+            self._queues.clear()
+            self._idle.notify_all()
+        if requeued:
+            logger.info(f"Maturity scheduler stopped; {requeued} matured escrows kept for the next start")
+
+
+def build_maturity_scheduler(xrpl_client, index, registry, wallet_cache, signing) -> MaturityScheduler:
+    """
+    Scheduler wired to the live ledger: each escrow is finished by its owning
+    bank's wallet when that bank has a seed configured, else by the platform wallet.
+
+    Each batch is signed with consecutive Sequences from one account_info read
+    and submitted without waiting; the batch then waits on the validation
+    tracker. Signing is serialised per wallet, so several batches for one
+    wallet can be in flight while only their waits overlap.
+    """
+    submitting: Dict[str, threading.Lock] = {}
+    submitting_guard = threading.Lock()
+
+    def _signing_bank(escrow: LoanRecord):
+        bank = registry.snapshot().get(escrow.owner)
+        return bank if bank and bank.seed else None
+
+    def _signer_for(escrow: LoanRecord) -> str:
+        bank = _signing_bank(escrow)
+        return bank.wallet_address if bank else xrpl_client.address
+
+    def _finish_batch(batch: List[LoanRecord]) -> List[FinishFailure]:
+        # EscrowFinish may be signed by any account, so the whole batch goes out
+        # under the wallet it was grouped by even if the registry moved since
+        bank = _signing_bank(batch[0])
+        wallet = (wallet_cache.wallet_for(bank) if bank else None) or xrpl_client.wallet
+        account = wallet.classic_address
+        with submitting_guard:
+            lock = submitting.setdefault(account, threading.Lock())
+        failed: List[FinishFailure] = []
+        submitted: Dict[str, LoanRecord] = {}
+        with lock:
+            info = xrpl_client.client.request(AccountInfo(account=account, ledger_index="current")).result
+            sequence = info["account_data"]["Sequence"]
+            fee = xrpl_client.fee()
+            last_ledger_sequence = get_latest_validated_ledger_sequence(xrpl_client.client) + LEDGER_OFFSET
+            txs = [
+                EscrowFinish(
+                    account=account,
+                    owner=escrow.owner,
+                    offer_sequence=escrow.sequence,
+                    sequence=sequence + i,
+                    fee=fee,
+                    last_ledger_sequence=last_ledger_sequence
+                )
+                for i, escrow in enumerate(batch)
+            ]
+            signed = signing.sign_many([(tx, wallet) for tx in txs])
+            for i, (escrow, blob) in enumerate(zip(batch, signed)):
+                try:
+                    if "error" in blob:
+                        raise ValueError(blob["error"])
+                    submitted[blob["hash"]] = escrow
+                    xrpl_client.submit_signed(blob, wait=False)
+                except Exception as e:
+                    # Later Sequences cannot apply past the gap; they are retried with a backoff
+                    submitted.pop(blob.get("hash"), None)
+                    failed.extend((later, e) for later in batch[i:])
+                    logger.warning(f"EscrowFinish submit for {account} stopped at {escrow.owner}:{escrow.sequence}: {e}")
+                    break
+        for tx_hash, escrow in submitted.items():
+            try:
+                xrpl_client.tracker.wait(tx_hash)
+            except TransactionFailed as e:
+                failed.append((escrow, RuntimeError(f"{e.outcome.get('status')}: {e.outcome.get('engine_result')}")))
+            except TimeoutError:
+                # Still pending past its LastLedgerSequence window; the retry is
+                # skipped by is_live if the finish did land
+                failed.append((escrow, TimeoutError(f"{tx_hash} still pending")))
+        return failed
+
+    return MaturityScheduler(
+        finish_batch=_finish_batch,
+        signer_for=_signer_for,
+        max_per_wallet=4,
+        is_live=lambda escrow: index.get(escrow.owner, escrow.sequence) is not None,
+    )
@@ -0,0 +1,104 @@
+# api/services/oracle_registry.py
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+ORACLES_FILE = Path(os.getenv("ORACLE_KEYS_FILE", DATA_DIR / "oracles.json"))
+
+# XRPL public keys: 33 bytes hex, ED-prefixed for Ed25519, 02/03 for secp256k1
+_PUBLIC_KEY = re.compile(r"^(ED|02|03)[0-9A-F]{64}$")
+
+
+class OracleRegistry:
+    """
+    Trusted oracle public keys by proof source.
+
+    Responsibilities:
+    - Parse oracles.json ({"<source>": ["<public key hex>", ...]}) once
+    - Re-read it when its mtime changes, at most every check_interval seconds
+    - Keep several keys per source so an oracle can rotate keys without downtime
+    """
+
+    def __init__(self, path: Path = ORACLES_FILE, check_interval: float = 5.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._keys: Dict[str, Tuple[str, ...]] = {}
+        self._mtime_ns: Optional[int] = None
+        self._loaded = False
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def keys_for(self, source: str) -> Tuple[str, ...]:
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._keys.get(source, ())
+
+    def sources(self) -> Tuple[str, ...]:
+        return tuple(self._keys)
+
+    def register(self, source: str, public_key: str) -> None:
+        """Trust a key in memory only (tests, tooling); the next change to oracles.json replaces it."""
+        public_key = self._normalise(public_key)
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            keys = self._keys.get(source, ())
+            if public_key not in keys:
+                self._keys = {**self._keys, source: keys + (public_key,)}
+
+    @staticmethod
+    def _normalise(public_key: str) -> str:
+        public_key = public_key.strip().upper()
+        if not _PUBLIC_KEY.match(public_key):
+            raise ValueError(f"Invalid oracle public key: {public_key[:8]}...")
+        return public_key
+
+    def load(self) -> None:
+        """(Re)read oracles.json. A broken file keeps the previous keys."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime_ns = self.path.stat().st_mtime_ns
+                with open(self.path, "r") as f:
+                    raw = json.load(f)
+                keys = {
+                    source: tuple(dict.fromkeys(self._normalise(k) for k in public_keys))
+                    for source, public_keys in raw.items()
+                }
+            except FileNotFoundError:
+                if not self._loaded:
+                    logger.warning(f"{self.path.name} not found, no oracle sources are trusted")
+                self._loaded = True
+                return
+            except Exception as e:
+                logger.error(f"Failed to load {self.path.name}, keeping previous oracle keys: {e}")
+                self._loaded = True
+                return
+            # Swap the whole dict so readers never see a half-built mapping
+            self._keys = keys
+            self._mtime_ns = mtime_ns
+            self._loaded = True
+        logger.info(f"Oracle registry loaded {sum(len(k) for k in keys.values())} keys for {len(keys)} sources")
+
+    def reload_if_changed(self) -> None:
+        self._last_check = time.monotonic()
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns != self._mtime_ns:
+            self.load()
+
+
+oracle_registry = OracleRegistry()
@@ -1,10 +1,42 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from datetime import datetime
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
 
-from app.services.xrpl_client import XRPLClient, xrpl_time_to_datetime
+from app.services.xrpl_client import XRPLClient, entry_tx, xrpl_time_to_datetime
+from app.services.payment_store import ROLLUP_FIELDS, HistoryFilter, PaymentStore, Position, get_payment_store
 from app.models.payment import Payment
+from app.utils.amounts import amount_to_units, from_units
+from app.utils.cursors import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Seconds a synced address is served from the store before a background refresh
+SYNC_INTERVAL = float(os.getenv("PAYMENT_SYNC_INTERVAL") or 5)
+SYNC_BATCH = 500  # rows per store transaction while syncing
+LEDGER_PAGE_SIZE = 100  # account_tx page size when walking the ledger directly
+EXPORT_PAGE_SIZE = 400  # account_tx page size for full-history exports (server max)
+LEDGER_MAX_PAGES = 10  # account_tx pages scanned per request before returning a partial page
+FEED_MIN_PAGE = 10  # smallest per-address store page when merging a portfolio feed
+FEED_SYNC_WORKERS = 8  # addresses synced concurrently before a feed is merged
+
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="payment-sync")
+_feed_pool = ThreadPoolExecutor(max_workers=FEED_SYNC_WORKERS, thread_name_prefix="payment-feed")
+_sync_locks: dict = {}
+_sync_locks_guard = threading.Lock()
+
+
+def _sync_lock(address: str) -> threading.Lock:
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(address, threading.Lock())
 
 
 class PaymentHistoryService:
@@ -15,6 +47,8 @@ class PaymentHistoryService:
     - Fetch validated transactions from XRPL
     - Filter relevant transaction types
     - Normalise XRPL data into Payment domain model
+    - Materialise history into the local PaymentStore, synced incrementally
+      from each address's last seen ledger, and serve pages from it
     """
 
     SUPPORTED_TX_TYPES = {
@@ -24,8 +58,16 @@ class PaymentHistoryService:
         "Clawback",
     }
 
-    def __init__(self, xrpl_client: XRPLClient | None = None):
-        self.xrpl = xrpl_client or XRPLClient()
+    def __init__(self, xrpl_client: XRPLClient | None = None, store: PaymentStore | None = None):
+        self._xrpl = xrpl_client
+        self.store = store if store is not None else get_payment_store()
+
+    @property
+    def xrpl(self) -> XRPLClient:
+        # Store reads never touch the ledger; only build the client when syncing
+        if self._xrpl is None:
+            self._xrpl = XRPLClient()
+        return self._xrpl
 
     # =========================================================
     # Public API
@@ -63,6 +105,288 @@ class PaymentHistoryService:
             "marker": raw.get("marker"),
         }
 
+    def iter_pages(self, address: str, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[List[Payment]]:
+        """
+        Walk an account's full history, newest first, one account_tx page at a time.
+
+        Only the current page is held in memory, so exports of any length run in
+        constant space and the first page is available after one round trip.
+        """
+        marker = None
+        while True:
+            raw = self.xrpl.get_account_transactions(address=address, limit=page_size, marker=marker)
+            yield [p for p in map(self._map_tx_entry, raw["transactions"]) if p]
+            marker = raw.get("marker")
+            if not marker:
+                return
+
+    def page(
+        self,
+        address: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        filters: Optional[HistoryFilter] = None,
+        source: str = "local",
+    ) -> dict:
+        """
+        Return one page of filtered history and an opaque cursor for the next one.
+
+        source="local" reads the PaymentStore by keyset; source="ledger" walks
+        account_tx pages directly. Cursors are signed and bound to the address,
+        filters and source they were issued for.
+
+        Output shape:
+        {
+            "payments": List[dict],   # Payment fields
+            "cursor": str | None
+        }
+        """
+        filters = filters or HistoryFilter()
+        binding = {"a": address, "f": filters.fingerprint(), "s": source}
+        state = {}
+        if cursor:
+            state = decode_cursor(cursor)
+            if any(state.get(key) != value for key, value in binding.items()):
+                raise ValueError("Cursor does not match this query")
+        position = tuple(state["p"]) if state.get("p") else None
+
+        if source == "ledger":
+            result = self.walk_ledger(address, limit, marker=state.get("m"), after=position, filters=filters)
+            resume = result["resume"]
+            next_state = {"m": resume[0], "p": list(resume[1]) if resume[1] else None} if resume else None
+        else:
+            result = self.history(address, limit, before=position, filters=filters)
+            next_state = {"p": list(result["next"])} if result["next"] else None
+        return {
+            "payments": result["payments"],
+            "cursor": encode_cursor({**binding, **next_state}) if next_state else None,
+        }
+
+    def feed(self, addresses: List[str], limit: int = 50, cursor: Optional[str] = None) -> dict:
+        """
+        Newest-first activity across several addresses, merged into one page.
+
+        Unknown addresses are synced concurrently; the per-address store pages
+        are then k-way merged with a heap on (ledger_index, tx_index, address).
+        Pages are read lazily and sized so the window fills from roughly one
+        page per address; only addresses that dominate it are read further.
+        A transaction between two portfolio addresses appears once for each.
+
+        Output shape:
+        {
+            "payments": List[dict],   # Payment fields plus "address"
+            "cursor": str | None
+        }
+        """
+        addresses = sorted(set(addresses))
+        binding = {"f": hashlib.blake2b(",".join(addresses).encode(), digest_size=8).hexdigest()}
+        after = None
+        if cursor:
+            state = decode_cursor(cursor)
+            if state.get("f") != binding["f"] or "p" not in state:
+                raise ValueError("Cursor does not match this query")
+            after = tuple(state["p"])
+
+        unsynced = [address for address in addresses if not self._ensure_synced(address, sync_missing=False)]
+        # First-time syncs hit the ledger; run them side by side
+        list(_feed_pool.map(self.sync, unsynced))
+
+        page_size = max(FEED_MIN_PAGE, -(-(limit + 1) // max(len(addresses), 1)))
+        streams = [self._iter_store(address, self._resume_before(address, after), page_size) for address in addresses]
+        merged = heapq.merge(
+            *streams, key=lambda row: (row["ledger_index"], row["tx_index"], row["address"]), reverse=True
+        )
+        rows = list(islice(merged, limit + 1))
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_state = [rows[-1]["ledger_index"], rows[-1]["tx_index"], rows[-1]["address"]] if more else None
+        return {
+            "payments": [{**self._row_to_payment(row), "address": row["address"]} for row in rows],
+            "cursor": encode_cursor({**binding, "p": next_state}) if next_state else None,
+        }
+
+    def _iter_store(self, address: str, before: Optional[Position], page_size: int) -> Iterator[dict]:
+        """Lazily walk an address's stored rows, newest first, one keyset page at a time."""
+        while True:
+            rows, before = self.store.page(address, limit=page_size, before=before)
+            yield from rows
+            if before is None:
+                return
+
+    @staticmethod
+    def _resume_before(address: str, after: Optional[tuple]) -> Optional[Position]:
+        """
+        Keyset bound for one address after the feed position (ledger, tx_index, address).
+        Addresses sorting below the last one returned still owe their row at that
+        exact position, so their bound is one step past it.
+        """
+        if after is None:
+            return None
+        ledger_index, tx_index, last_address = after
+        return (ledger_index, tx_index + 1) if address < last_address else (ledger_index, tx_index)
+
+    def history(
+        self,
+        address: str,
+        limit: int = 50,
+        before: Optional[Position] = None,
+        filters: Optional[HistoryFilter] = None,
+    ) -> dict:
+        """
+        Return a page of history from the local store, newest first.
+
+        The first request for an address syncs it from the ledger; after that
+        pages are local reads and a stale address is refreshed in the background.
+
+        Output shape:
+        {
+            "payments": List[dict],   # Payment fields
+            "next": (ledger_index, tx_index) | None
+        }
+        """
+        self._ensure_synced(address)
+        rows, next_position = self.store.page(address, limit=limit, before=before, filters=filters)
+        return {
+            "payments": [self._row_to_payment(row) for row in rows],
+            "next": next_position,
+        }
+
+    def summary(
+        self,
+        address: str,
+        period: str = "day",
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> dict:
+        """
+        Activity per day or week from the precomputed rollups, oldest first.
+        Cost depends on the number of buckets, not on history length.
+
+        Output shape:
+        {
+            "address": str,
+            "period": "day" | "week",
+            "buckets": List[dict],            # start, currency, inflow, outflow, payments, escrows, failures
+            "totals": Dict[currency, dict]    # same counters summed over the buckets
+        }
+        """
+        self._ensure_synced(address)
+        buckets, totals = [], {}
+        for row in self.store.rollups(address, period=period, since=since, until=until):
+            total = totals.setdefault(row["currency"], dict.fromkeys(ROLLUP_FIELDS, 0))
+            for field in ROLLUP_FIELDS:
+                total[field] += row[field]
+            buckets.append(self._rollup_to_json(row))
+        return {
+            "address": address,
+            "period": period,
+            "buckets": buckets,
+            "totals": {currency: self._counters_to_json(total) for currency, total in totals.items()},
+        }
+
+    def walk_ledger(
+        self,
+        address: str,
+        limit: int = 50,
+        marker: Optional[dict] = None,
+        after: Optional[Position] = None,
+        filters: Optional[HistoryFilter] = None,
+        max_pages: int = LEDGER_MAX_PAGES,
+    ) -> dict:
+        """
+        Collect up to limit matching entries from account_tx, newest first,
+        filtering each page as it arrives.
+
+        :param marker: account_tx marker of the page to start on
+        :param after: skip entries at or above this position (the last one already returned)
+        :return: {"payments": List[dict], "resume": (marker, position | None) | None}
+        """
+        filters = filters or HistoryFilter()
+        collected: List[dict] = []
+        for _ in range(max_pages):
+            raw = self.xrpl.get_account_transactions(address=address, limit=LEDGER_PAGE_SIZE, marker=marker)
+            for entry in raw["transactions"]:
+                position = self._position(entry)
+                if after is not None and position >= after:
+                    continue
+                row = self._map_row(entry, address)
+                if row is None:
+                    continue
+                if filters.date_from is not None and row["date"] < filters.date_from:
+                    # Newest first: nothing further down can fall inside the range
+                    return {"payments": collected, "resume": None}
+                if filters.matches(row):
+                    collected.append(self._row_to_payment(row))
+                    if len(collected) == limit:
+                        return {"payments": collected, "resume": (marker, position)}
+            marker = raw.get("marker")
+            if not marker:
+                return {"payments": collected, "resume": None}
+            after = None
+        # Page budget spent on a sparse filter: hand back what matched and where to go on
+        return {"payments": collected, "resume": (marker, None)}
+
+    # =========================================================
+    # Sync
+    # =========================================================
+    def sync(self, address: str) -> int:
+        """
+        Pull validated transactions newer than the address's cursor into the store.
+        Returns the number of rows written. Concurrent syncs of one address run once.
+        """
+        lock = _sync_lock(address)
+        if not lock.acquire(blocking=False):
+            # Another thread is syncing this address; wait for it instead of repeating it
+            with lock:
+                return 0
+        try:
+            state = self.store.sync_state(address)
+            after = state[0] if state else 0
+            written, batch, last_ledger = 0, [], after
+            for entry in self.xrpl.iter_account_transactions(address, after, page_size=400):
+                ledger_index = entry.get("ledger_index") or 0
+                if batch and ledger_index != last_ledger and len(batch) >= SYNC_BATCH:
+                    # Commit whole ledgers only, so the cursor never splits one
+                    written += self.store.apply(address, batch, synced_through=last_ledger)
+                    batch = []
+                row = self._map_row(entry, address)
+                if row:
+                    batch.append(row)
+                last_ledger = max(last_ledger, ledger_index)
+            written += self.store.apply(address, batch, synced_through=last_ledger)
+            if written:
+                logger.info(f"Synced {written} history rows for {address} through ledger {last_ledger}")
+            return written
+        finally:
+            lock.release()
+
+    def _ensure_synced(self, address: str, sync_missing: bool = True) -> bool:
+        """
+        Sync an unknown address now (unless sync_missing is False); refresh a
+        stale one in the background. Returns whether the address had been synced before.
+        """
+        state = self.store.sync_state(address)
+        if state is None:
+            if sync_missing:
+                self.sync(address)
+            return False
+        if time.time() - state[1] >= SYNC_INTERVAL:
+            self.refresh_in_background(address)
+        return True
+
+    def refresh_in_background(self, address: str) -> None:
+        lock = _sync_lock(address)
+        if lock.locked():
+            return
+
+        def _run():
+            try:
+                self.sync(address)
+            except Exception as e:
+                logger.warning(f"Background history sync failed for {address}: {e}")
+
+        _refresh_pool.submit(_run)
+
     # =========================================================
     # Internal helpers
     # =========================================================
@@ -71,10 +395,19 @@ class PaymentHistoryService:
         Convert a single XRPL tx entry into a Payment model.
         Returns None if tx is not relevant.
         """
-        tx = entry.get("tx")
+        row = self._map_row(entry)
+        return Payment(**self._row_to_payment(row)) if row else None
+
+    def _map_row(self, entry: dict, address: Optional[str] = None) -> Optional[dict]:
+        """
+        Convert a single XRPL tx entry into a PaymentStore row.
+        Returns None if tx is not relevant. direction ("in" / "out") is set
+        relative to address when one is given.
+        """
+        tx = entry_tx(entry)
         meta = entry.get("meta")
 
-        if not tx or not meta:
+        if not tx or not isinstance(meta, dict):
             return None
 
         tx_type = tx.get("TransactionType")
@@ -103,40 +436,87 @@ class PaymentHistoryService:
         # -------------------------
         # Amount handling
         # -------------------------
-        amount = self._extract_amount(tx)
+        amount = self._extract_units(tx)
 
         # -------------------------
-        # Construct domain object
+        # Direction (a clawback moves funds from the holder to the issuer)
         # -------------------------
-        return Payment(
-            id=tx["hash"],
-            date=dt.strftime("%Y-%m-%d"),
-            time=dt.strftime("%H:%M:%S"),
-            amount=float(amount),
-            type=tx_type,
-            status=status,
-            txHash=tx["hash"],
-        )
+        direction = None
+        if address is not None:
+            sent = tx.get("Account") == address
+            if tx_type == "Clawback":
+                sent = not sent
+            direction = "out" if sent else "in"
 
-    def _extract_amount(self, tx: dict) -> Decimal:
-        """
-        Extract amount from XRPL transaction.
+        # -------------------------
+        # Construct store row
+        # -------------------------
+        return {
+            "ledger_index": tx.get("ledger_index") or entry.get("ledger_index") or 0,
+            "tx_index": meta.get("TransactionIndex", 0),
+            "hash": tx["hash"],
+            "date": int(dt.replace(tzinfo=timezone.utc).timestamp()),
+            "type": tx_type,
+            "status": status,
+            "amount": amount,
+            "currency": self._extract_currency(tx),
+            "direction": direction,
+        }
 
-        Handles:
-        - XRP (drops → XRP)
-        - Issued currencies
-        """
-        amount = tx.get("Amount")
+    @staticmethod
+    def _position(entry: dict) -> Position:
+        tx = entry.get("tx_json") or entry.get("tx") or {}
+        ledger_index = entry.get("ledger_index") or tx.get("ledger_index") or 0
+        return ledger_index, (entry.get("meta") or {}).get("TransactionIndex", 0)
+
+    @staticmethod
+    def _row_to_payment(row: dict) -> dict:
+        """Payment fields for a store row (plain dict; no model on the read path)."""
+        dt = datetime.fromtimestamp(row["date"], tz=timezone.utc)
+        return {
+            "id": row["hash"],
+            "date": dt.strftime("%Y-%m-%d"),
+            "time": dt.strftime("%H:%M:%S"),
+            "amount": from_units(row["amount"]),
+            "type": row["type"],
+            "status": row["status"],
+            "txHash": row["hash"],
+        }
+
+    @staticmethod
+    def _counters_to_json(counters: dict) -> dict:
+        return {
+            "inflow": from_units(counters["inflow"]),
+            "outflow": from_units(counters["outflow"]),
+            "payments": counters["payments"],
+            "escrows": counters["escrows"],
+            "failures": counters["failures"],
+        }
 
-        if amount is None:
-            return Decimal("0")
+    def _rollup_to_json(self, row: dict) -> dict:
+        return {
+            "start": datetime.fromtimestamp(row["bucket"], tz=timezone.utc).strftime("%Y-%m-%d"),
+            "currency": row["currency"],
+            **self._counters_to_json(row),
+        }
 
-        # XRP payment (drops)
-        if isinstance(amount, str):
-            return Decimal(amount) / Decimal("1000000")
+    @staticmethod
+    def _amount_field(tx: dict):
+        # API v2 reports a Payment's Amount as DeliverMax
+        return tx.get("Amount", tx.get("DeliverMax"))
 
-        # Issued currency
+    def _extract_currency(self, tx: dict) -> str:
+        amount = self._amount_field(tx)
         if isinstance(amount, dict):
-            return Decimal(amount.get("value", "0"))
+            return amount.get("currency", "")
+        return "XRP"
 
-        return Decimal("0")
+    def _extract_units(self, tx: dict) -> int:
+        """
+        Extract amount from XRPL transaction as fixed-point units.
+
+        Handles:
+        - XRP (drops are units as-is)
+        - Issued currencies (value scaled to units)
+        """
+        return amount_to_units(self._amount_field(tx))
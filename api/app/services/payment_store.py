@@ -0,0 +1,342 @@
+# api/services/payment_store.py
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_PAYMENTS_DB = DATA_DIR / "payments.db"
+
+SCHEMA_VERSION = 3  # 2: amount stored as integer units (app.utils.amounts); 3: direction + rollups
+
+Position = Tuple[int, int]  # (ledger_index, tx_index): total order of validated transactions
+
+DAY = 86_400
+# Bucket start (POSIX seconds, UTC) for a row's date; weeks start on Monday
+PERIODS = {
+    "day": lambda date: date - date % DAY,
+    "week": lambda date: date - date % DAY - ((date // DAY + 3) % 7) * DAY,
+}
+ROLLUP_FIELDS = ("inflow", "outflow", "payments", "escrows", "failures")
+# SQLite INTEGER is signed 64-bit: amounts past this (issued-currency values of
+# about 9.22e12 and up, at six decimals) cannot be stored as units
+MAX_STORED_UNITS = 2 ** 63 - 1
+
+
+def _clamp_units(units: int) -> int:
+    return max(-MAX_STORED_UNITS, min(units, MAX_STORED_UNITS))
+
+
+
+class HistoryFilter:
+    """
+    Optional constraints on a history walk.
+
+    Applied inside the page walk (SQL WHERE on the store, per entry on the
+    ledger), so a filtered page never needs the full history first.
+    """
+    __slots__ = ("types", "date_from", "date_to", "min_amount", "max_amount")
+
+    def __init__(
+        self,
+        types: Optional[Iterable[str]] = None,
+        date_from: Optional[int] = None,
+        date_to: Optional[int] = None,
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None
+    ):
+        """
+        :param types: transaction types to keep (None = all)
+        :param date_from: POSIX seconds, inclusive
+        :param date_to: POSIX seconds, exclusive
+        :param min_amount: units, inclusive
+        :param max_amount: units, inclusive
+        """
+        self.types: Optional[FrozenSet[str]] = frozenset(types) if types else None
+        self.date_from = date_from
+        self.date_to = date_to
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+
+    @property
+    def empty(self) -> bool:
+        return all(getattr(self, name) is None for name in self.__slots__)
+
+    def matches(self, row: dict) -> bool:
+        if self.types is not None and row["type"] not in self.types:
+            return False
+        if self.date_from is not None and row["date"] < self.date_from:
+            return False
+        if self.date_to is not None and row["date"] >= self.date_to:
+            return False
+        if self.min_amount is not None and row["amount"] < self.min_amount:
+            return False
+        if self.max_amount is not None and row["amount"] > self.max_amount:
+            return False
+        return True
+
+    def sql(self) -> Tuple[str, list]:
+        clauses, params = [], []
+        if self.types is not None:
+            clauses.append(f"type IN ({', '.join('?' * len(self.types))})")
+            params.extend(sorted(self.types))
+        for column, op, value in (
+            ("date", ">=", self.date_from), ("date", "<", self.date_to),
+            ("amount", ">=", self.min_amount), ("amount", "<=", self.max_amount),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(_clamp_units(value) if column == "amount" else value)
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def fingerprint(self) -> str:
+        """Stable digest of the constraints; cursors are bound to the filter they were issued for."""
+        parts = [",".join(sorted(self.types)) if self.types is not None else ""]
+        parts += ["" if getattr(self, name) is None else repr(getattr(self, name)) for name in self.__slots__[1:]]
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+_COLUMNS = ("address", "ledger_index", "tx_index", "hash", "date", "type", "status", "amount", "currency", "direction")
+
+
+class PaymentStore:
+    """
+    Local, materialised payment history per tracked address.
+
+    Responsibilities:
+    - Keep mapped history rows in SQLite (WAL) keyed by (address, ledger_index, tx_index)
+    - Remember, per address, the last ledger synced so syncs are incremental
+    - Serve newest-first pages by keyset on (ledger_index, tx_index), so page N
+      costs the same as page 1
+    - Maintain daily and weekly rollups per address and currency in the same
+      transaction as the rows they count, so summaries read O(buckets)
+
+    The store only caches ledger data: a schema change drops the tables and
+    addresses resync on their next read. Rows whose amount is outside the
+    64-bit range of an INTEGER column are skipped with a warning.
+    """
+
+    def __init__(self, path: Path = DEFAULT_PAYMENTS_DB, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            conn.executescript("DROP TABLE IF EXISTS payments; DROP TABLE IF EXISTS sync_state; DROP TABLE IF EXISTS rollups;")
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS payments (
+                address TEXT NOT NULL,
+                ledger_index INTEGER NOT NULL,
+                tx_index INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                date INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                currency TEXT NOT NULL,
+                direction TEXT,
+                PRIMARY KEY (address, ledger_index, tx_index)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(address, date);
+            CREATE INDEX IF NOT EXISTS idx_payments_type ON payments(address, type, ledger_index, tx_index);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                address TEXT PRIMARY KEY,
+                ledger_index INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rollups (
+                address TEXT NOT NULL,
+                period TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                currency TEXT NOT NULL,
+                inflow INTEGER NOT NULL DEFAULT 0,
+                outflow INTEGER NOT NULL DEFAULT 0,
+                payments INTEGER NOT NULL DEFAULT 0,
+                escrows INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (address, period, bucket, currency)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # -------------------------
+    # Sync state
+    # -------------------------
+    def sync_state(self, address: str) -> Optional[Tuple[int, float]]:
+        """(last synced ledger, synced_at) or None if the address was never synced."""
+        row = self._conn().execute(
+            "SELECT ledger_index, synced_at FROM sync_state WHERE address = ?", (address,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def addresses(self) -> List[str]:
+        return [row[0] for row in self._conn().execute("SELECT address FROM sync_state")]
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def apply(self, address: str, rows: Iterable[dict], synced_through: int) -> int:
+        """Upsert rows, fold new ones into the rollups and move the address's cursor, in one transaction."""
+        conn = self._conn()
+        rows = [row for row in rows if self._storable(address, row)]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Rows seen before (an overlapping resync) are rewritten but not counted twice
+            existing = self._existing_positions(conn, address, rows)
+            self._add_to_rollups(conn, address, [r for r in rows if (r["ledger_index"], r["tx_index"]) not in existing])
+            conn.executemany(
+                f"INSERT OR REPLACE INTO payments ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [tuple(row[c] if c != "address" else address for c in _COLUMNS) for row in rows],
+            )
+            conn.execute(
+                "INSERT INTO sync_state (address, ledger_index, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(address) DO UPDATE SET ledger_index = MAX(ledger_index, excluded.ledger_index), "
+                "synced_at = excluded.synced_at",
+                (address, synced_through, time.time()),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    @staticmethod
+    def _storable(address: str, row: dict) -> bool:
+        if abs(row["amount"]) <= MAX_STORED_UNITS:
+            return True
+        logger.warning(
+            f"Skipping {row['hash']} for {address}: amount {row['amount']} units ({row['currency']}) "
+            f"exceeds the payment store's 64-bit range"
+        )
+        return False
+
+    @staticmethod
+    def _existing_positions(conn: sqlite3.Connection, address: str, rows: List[dict]) -> set:
+        if not rows:
+            return set()
+        ledgers = [r["ledger_index"] for r in rows]
+        return {
+            (row[0], row[1]) for row in conn.execute(
+                "SELECT ledger_index, tx_index FROM payments WHERE address = ? AND ledger_index BETWEEN ? AND ?",
+                (address, min(ledgers), max(ledgers)),
+            )
+        }
+
+    @staticmethod
+    def _add_to_rollups(conn: sqlite3.Connection, address: str, rows: List[dict]) -> None:
+        deltas: Dict[Tuple[str, int, str], List[int]] = {}
+        for row in rows:
+            failed = row["status"] == "Failed"
+            counts = (
+                row["amount"] if not failed and row["direction"] == "in" else 0,
+                row["amount"] if not failed and row["direction"] == "out" else 0,
+                1 if not failed and row["type"] == "Payment" else 0,
+                1 if not failed and row["type"] == "EscrowCreate" else 0,
+                1 if failed else 0,
+            )
+            for period, bucket_of in PERIODS.items():
+                delta = deltas.setdefault((period, bucket_of(row["date"]), row["currency"]), [0] * len(ROLLUP_FIELDS))
+                for i, value in enumerate(counts):
+                    # Saturate rather than overflow the INTEGER column on huge issued-currency flows
+                    delta[i] = _clamp_units(delta[i] + value)
+        if not deltas:
+            return
+        conn.executemany(
+            f"INSERT INTO rollups (address, period, bucket, currency, {', '.join(ROLLUP_FIELDS)}) "
+            f"VALUES (?, ?, ?, ?, {', '.join('?' * len(ROLLUP_FIELDS))}) "
+            f"ON CONFLICT(address, period, bucket, currency) DO UPDATE SET "
+            + ", ".join(f"{f} = {f} + excluded.{f}" for f in ROLLUP_FIELDS),
+            [(address, *key, *delta) for key, delta in deltas.items()],
+        )
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def page(
+        self,
+        address: str,
+        limit: int = 50,
+        before: Optional[Position] = None,
+        filters: Optional[HistoryFilter] = None
+    ) -> Tuple[List[dict], Optional[Position]]:
+        """
+        Newest-first rows strictly older than before that pass filters; returns
+        (rows, position of the last row) where the position is None once
+        history is exhausted.
+        """
+        sql = "SELECT * FROM payments WHERE address = ?"
+        params: list = [address]
+        if before is not None:
+            sql += " AND (ledger_index, tx_index) < (?, ?)"
+            params.extend(before)
+        if filters is not None:
+            where, filter_params = filters.sql()
+            sql += where
+            params.extend(filter_params)
+        sql += " ORDER BY ledger_index DESC, tx_index DESC LIMIT ?"
+        params.append(limit + 1)
+        rows = [dict(row) for row in self._conn().execute(sql, params)]
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return rows, ((rows[-1]["ledger_index"], rows[-1]["tx_index"]) if more else None)
+
+    def rollups(
+        self,
+        address: str,
+        period: str = "day",
+        since: Optional[int] = None,
+        until: Optional[int] = None
+    ) -> List[dict]:
+        """Rollup buckets for an address, oldest first; since / until are POSIX seconds (bucket starts)."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown rollup period: {period} (expected one of {', '.join(PERIODS)})")
+        sql = "SELECT bucket, currency, " + ", ".join(ROLLUP_FIELDS) + " FROM rollups WHERE address = ? AND period = ?"
+        params: list = [address, period]
+        if since is not None:
+            sql += " AND bucket >= ?"
+            params.append(PERIODS[period](since))
+        if until is not None:
+            sql += " AND bucket < ?"
+            params.append(until)
+        sql += " ORDER BY bucket, currency"
+        return [dict(row) for row in self._conn().execute(sql, params)]
+
+    def count(self, address: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM payments WHERE address = ?", (address,)).fetchone()[0]
+
+
+_payment_store: Optional[PaymentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_payment_store() -> PaymentStore:
+    """Process-wide store at PAYMENTS_DB_PATH (default data/payments.db)."""
+    global _payment_store
+    if _payment_store is None:
+        with _store_lock:
+            if _payment_store is None:
+                path = Path(os.getenv("PAYMENTS_DB_PATH", str(DEFAULT_PAYMENTS_DB)))
+                _payment_store = PaymentStore(path)
+                logger.info(f"Payment history store at {path}")
+    return _payment_store
@@ -10,7 +10,7 @@ class PolicyEngine:
     Responsibilities:
     - Check maximum duration
     - Check maximum default rate
-    - Check cumulative exposure
+    - Check cumulative exposure, per business and per bank
     - Return True/False for approval
     """
 
@@ -29,17 +29,35 @@ class PolicyEngine:
         :param exposure: current exposure of the business to the bank
         :return: True if request is allowed, False otherwise
         """
-        # Check duration
-        if request.duration_days > self.policy.max_duration_days:
-            return False
-
-        # Check default rate metric
-        default_rate = request.metrics.get("default_rate", 1.0)
-        if default_rate > self.policy.max_default_rate:
+        # Check duration and default rate metric
+        if not self.terms_allow(request.duration_days, request.metrics.get("default_rate", 1.0)):
             return False
 
         # Check cumulative exposure
-        if (exposure.current_exposure + request.requested_amount) > self.policy.max_exposure:
+        if not self.exposure_allows(request.requested_amount, exposure):
             return False
 
         return True
+
+    def terms_allow(self, duration_days: float, default_rate: float) -> bool:
+        """
+        Check the loan term against max_duration_days and the borrower's default rate against max_default_rate.
+
+        :param duration_days: days until the escrow unlocks
+        :param default_rate: borrower's default rate (0..1)
+        """
+        return duration_days <= self.policy.max_duration_days and default_rate <= self.policy.max_default_rate
+
+    def exposure_allows(self, amount: float, exposure: ExposureState) -> bool:
+        """
+        Check that lending amount keeps the business-bank exposure within max_exposure
+        and, when the policy sets one, the bank's total within max_bank_exposure.
+
+        :param amount: requested principal in XRP
+        :param exposure: current exposure read from the exposure ledger
+        """
+        if (exposure.current_exposure + amount) > self.policy.max_exposure:
+            return False
+        if self.policy.max_bank_exposure is not None and (exposure.bank_exposure + amount) > self.policy.max_bank_exposure:
+            return False
+        return True
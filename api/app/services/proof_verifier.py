@@ -1,7 +1,201 @@
 # api/services/proof_verifier.py
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from xrpl.core.keypairs import is_valid_message
+
+from .oracle_registry import OracleRegistry, oracle_registry
+from .replay_guard import ReplayGuard
 from ..models.proof import ProofPayload
 
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SignatureItem = Tuple[bytes, str, Tuple[str, ...]]  # (message, signature hex, candidate public keys)
+
+DEFAULT_MAX_AGE_MINUTES = 60
+MAX_CLOCK_SKEW = timedelta(minutes=5)  # how far ahead of us a proof timestamp may be
+
+
+class ProofReplayError(ValueError):
+    """The proof was already presented within the replay window."""
+
+
+def canonical_message(proof: ProofPayload) -> bytes:
+    """
+    The bytes an oracle signs: metrics, source and timestamp as compact,
+    key-sorted JSON (timestamp in the model's JSON form).
+    """
+    body = proof.model_dump(mode="json", include={"metrics", "source", "timestamp"})
+    return json.dumps(body, sort_keys=True, separators=(",", ":")).encode()
+
+
+def proof_digest(proof: ProofPayload) -> bytes:
+    """Replay key: the signed content only, so a re-signed copy is still the same proof."""
+    return hashlib.blake2b(canonical_message(proof), digest_size=32).digest()
+
+
+# -------------------------
+# Worker-side function (runs in the pool processes; keep it picklable)
+# -------------------------
+def verify_signatures(items: List[SignatureItem]) -> List[Optional[str]]:
+    """For each item, the public key that signed the message, or None if none did."""
+    results = []
+    for message, signature, public_keys in items:
+        matched = None
+        try:
+            signature_bytes = bytes.fromhex(signature)
+        except ValueError:
+            signature_bytes = None
+        if signature_bytes:
+            for public_key in public_keys:
+                try:
+                    if is_valid_message(message, signature_bytes, public_key):
+                        matched = public_key
+                        break
+                except Exception:
+                    continue  # malformed signature for this key type
+        results.append(matched)
+    return results
+
+
+class SignatureVerifier:
+    """
+    Checks oracle signatures and remembers the outcome.
+
+    Responsibilities:
+    - Cache outcomes (valid and invalid) in an LRU keyed by a digest of
+      message, signature and candidate keys, so a re-submitted proof is free
+    - Verify cache misses in batches on a process pool, off the event loop
+      and off the GIL that request threads share
+    - Verify a single synchronous miss inline; one signature is cheaper than a pool round trip
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 64, cache_size: int = 100_000):
+        """
+        :param max_workers: pool size (default PROOF_VERIFY_WORKERS or the CPU count); 0 verifies inline
+        :param batch_size: signatures sent to a worker per task
+        :param cache_size: verified outcomes kept
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv("PROOF_VERIFY_WORKERS") or os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and self.max_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=get_context("spawn"))
+            logger.info(f"Proof verification pool started with {self.max_workers} workers")
+        return self._pool
+
+    # -------------------------
+    # Cache
+    # -------------------------
+    @staticmethod
+    def digest(item: SignatureItem) -> bytes:
+        message, signature, public_keys = item
+        h = hashlib.blake2b(digest_size=20)
+        for part in (message, signature.upper().encode(), ",".join(public_keys).encode()):
+            h.update(len(part).to_bytes(4, "big"))
+            h.update(part)
+        return h.digest()
+
+    def _lookup(self, items: Sequence[SignatureItem]) -> Tuple[List[Optional[str]], Dict[bytes, Tuple[SignatureItem, List[int]]]]:
+        """Results with cache hits filled in, plus the misses (deduplicated by digest)."""
+        results: List[Optional[str]] = [None] * len(items)
+        misses: Dict[bytes, Tuple[SignatureItem, List[int]]] = {}
+        with self._lock:
+            for i, item in enumerate(items):
+                key = self.digest(item)
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = cached or None  # "" marks a cached invalid signature
+                    self.hits += 1
+                else:
+                    misses.setdefault(key, (item, []))[1].append(i)
+            self.misses += len(misses)
+        return results, misses
+
+    def _store(self, results: List[Optional[str]], misses: Dict[bytes, Tuple[SignatureItem, List[int]]], matched: List[Optional[str]]) -> List[Optional[str]]:
+        with self._lock:
+            for (key, (_, indices)), public_key in zip(misses.items(), matched):
+                self._cache[key] = public_key or ""
+                for i in indices:
+                    results[i] = public_key
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    # -------------------------
+    # Verification
+    # -------------------------
+    def _submit(self, items: List[SignatureItem], inline_single: bool = True) -> List[Future]:
+        if (inline_single and len(items) == 1) or self.pool is None:
+            future: Future = Future()
+            future.set_result(verify_signatures(items))
+            return [future]
+        size = max(1, min(self.batch_size, -(-len(items) // self.max_workers)))
+        return [self.pool.submit(verify_signatures, items[i:i + size]) for i in range(0, len(items), size)]
+
+    def verify(self, item: SignatureItem) -> Optional[str]:
+        return self.verify_many([item])[0]
+
+    def verify_many(self, items: Sequence[SignatureItem]) -> List[Optional[str]]:
+        """Signing public key per item (None if invalid), in input order."""
+        results, misses = self._lookup(items)
+        if not misses:
+            return results
+        pending = [item for item, _ in misses.values()]
+        matched = [m for future in self._submit(pending) for m in future.result()]
+        return self._store(results, misses, matched)
+
+    async def verify_many_async(self, items: Sequence[SignatureItem]) -> List[Optional[str]]:
+        results, misses = self._lookup(items)
+        if not misses:
+            return results
+        pending = [item for item, _ in misses.values()]
+        if self.pool is None:
+            matched = await asyncio.to_thread(verify_signatures, pending)
+        else:
+            # Even a single miss goes to the pool: inline it would stall the event loop
+            chunks = await asyncio.gather(*[asyncio.wrap_future(f) for f in self._submit(pending, inline_single=False)])
+            matched = [m for chunk in chunks for m in chunk]
+        return self._store(results, misses, matched)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+signature_verifier = SignatureVerifier()
+replay_guard = ReplayGuard(window=(timedelta(minutes=DEFAULT_MAX_AGE_MINUTES) + MAX_CLOCK_SKEW).total_seconds())
+
+
 class ProofVerifier:
     """
     Service that verifies ProofPayload objects submitted with liquidity requests.
@@ -9,6 +203,8 @@ class ProofVerifier:
     Responsibilities:
     - Validate structure and types
     - Optionally check timestamp freshness
+    - Check the signature against the trusted keys registered for the proof's source
+    - Reject proofs already used within max_age (check_replay, record_use)
     - Compute confidence score based on default_rate
     """
 
@@ -18,21 +214,87 @@ class ProofVerifier:
         (0.1, 75),
     ]
 
-    def __init__(self, max_age_minutes: int = 60):
+    def __init__(
+        self,
+        max_age_minutes: int = DEFAULT_MAX_AGE_MINUTES,
+        registry: OracleRegistry | None = None,
+        signatures: SignatureVerifier | None = None,
+        require_signature: bool | None = None,
+        replays: ReplayGuard | None = None
+    ):
         """
         :param max_age_minutes: maximum allowed age for the proof timestamp
+        :param registry: trusted oracle keys (defaults to the process-wide registry)
+        :param signatures: signature checker and cache (defaults to the process-wide one)
+        :param require_signature: reject unsigned proofs (default PROOF_REQUIRE_SIGNATURE, false)
+        :param replays: digest window for check_replay / record_use (defaults to the process-wide guard)
         """
         self.max_age = timedelta(minutes=max_age_minutes)
+        self.registry = registry if registry is not None else oracle_registry
+        self.signatures = signatures if signatures is not None else signature_verifier
+        if require_signature is None:
+            require_signature = os.getenv("PROOF_REQUIRE_SIGNATURE", "false").lower() == "true"
+        self.require_signature = require_signature
+        self.replays = replays if replays is not None else replay_guard
+        # A proof stays acceptable for max_age after its timestamp (plus skew); remember it that long
+        self.replays.widen((self.max_age + MAX_CLOCK_SKEW).total_seconds())
 
     def verify(self, proof: ProofPayload) -> dict:
         """
         Verify a ProofPayload object and compute confidence score.
 
         :param proof: ProofPayload instance containing metrics, timestamp, source, signature
-        :return: dict with keys 'valid', 'confidence_score', 'default_rate', 'reason'
+        :return: dict with keys 'valid', 'confidence_score', 'default_rate', 'reason', 'signed', 'oracle_key'
         :raises ValueError: if proof is invalid
         """
+        default_rate = self._check_payload(proof)
+        item = self._signature_item(proof)
+        oracle_key = self.signatures.verify(item) if item else None
+        return self._result(proof, default_rate, oracle_key)
 
+    async def verify_async(self, proof: ProofPayload) -> dict:
+        """verify() for the event loop: cache hits return at once, misses run off the loop."""
+        result = (await self.verify_batch_async([proof]))[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+        return result
+
+    def verify_batch(self, proofs: Sequence[ProofPayload]) -> List[dict]:
+        """
+        Verify many proofs, checking all uncached signatures in one batch.
+        Invalid proofs yield {"valid": False, "error": ...} instead of raising.
+        """
+        checked, items = self._prepare_batch(proofs)
+        matched = iter(self.signatures.verify_many([item for item in items if item]))
+        return self._finish_batch(proofs, checked, items, matched)
+
+    async def verify_batch_async(self, proofs: Sequence[ProofPayload]) -> List[dict]:
+        checked, items = self._prepare_batch(proofs)
+        matched = iter(await self.signatures.verify_many_async([item for item in items if item]))
+        return self._finish_batch(proofs, checked, items, matched)
+
+    def check_replay(self, proof: ProofPayload) -> None:
+        """
+        Raise ProofReplayError if the proof was already used within the
+        window. Records nothing, so a forged copy or a request that fails
+        later cannot burn a genuine proof. Constant time; call it before any
+        ledger work.
+        """
+        if self.replays.seen(proof_digest(proof)):
+            raise ProofReplayError("Proof was already used in another request")
+
+    def record_use(self, proof: ProofPayload) -> None:
+        """
+        Mark a verified proof as used. Raises ProofReplayError if a concurrent
+        request recorded it first; call it once the proof has been accepted.
+        """
+        if not self.replays.check_and_record(proof_digest(proof)):
+            raise ProofReplayError("Proof was already used in another request")
+
+    # -------------------------
+    # Steps
+    # -------------------------
+    def _check_payload(self, proof: ProofPayload) -> float:
         # --- Type & structure checks ---
         if not isinstance(proof.metrics, dict):
             raise ValueError("Proof metrics must be a dictionary")
@@ -52,6 +314,24 @@ class ProofVerifier:
             age = datetime.utcnow() - proof.timestamp
             if age > self.max_age:
                 raise ValueError(f"Proof timestamp is too old: {age} > {self.max_age}")
+            if -age > MAX_CLOCK_SKEW:
+                raise ValueError("Proof timestamp is in the future")
+
+        return default_rate
+
+    def _signature_item(self, proof: ProofPayload) -> Optional[SignatureItem]:
+        if not proof.signature:
+            if self.require_signature:
+                raise ValueError("Proof is not signed")
+            return None
+        public_keys = self.registry.keys_for(proof.source)
+        if not public_keys:
+            raise ValueError(f"Proof source is not a trusted oracle: {proof.source}")
+        return canonical_message(proof), proof.signature, public_keys
+
+    def _result(self, proof: ProofPayload, default_rate: float, oracle_key: Optional[str]) -> dict:
+        if proof.signature and oracle_key is None:
+            raise ValueError(f"Proof signature is invalid for source {proof.source}")
 
         # --- Compute confidence score ---
         score = 50  # default
@@ -70,5 +350,30 @@ class ProofVerifier:
             "valid": score >= 50,
             "confidence_score": score,
             "default_rate": default_rate,
-            "reason": reason
+            "reason": reason,
+            "signed": oracle_key is not None,
+            "oracle_key": oracle_key
         }
+
+    def _prepare_batch(self, proofs: Sequence[ProofPayload]) -> Tuple[list, List[Optional[SignatureItem]]]:
+        checked, items = [], []
+        for proof in proofs:
+            try:
+                default_rate, item = self._check_payload(proof), self._signature_item(proof)
+            except ValueError as e:
+                default_rate, item = e, None
+            checked.append(default_rate)
+            items.append(item)
+        return checked, items
+
+    def _finish_batch(self, proofs, checked, items, matched) -> List[dict]:
+        results = []
+        for proof, default_rate, item in zip(proofs, checked, items):
+            if isinstance(default_rate, ValueError):
+                results.append({"valid": False, "error": str(default_rate)})
+                continue
+            try:
+                results.append(self._result(proof, default_rate, next(matched) if item else None))
+            except ValueError as e:
+                results.append({"valid": False, "error": str(e)})
+        return results
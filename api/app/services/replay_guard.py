@@ -0,0 +1,152 @@
+# api/services/replay_guard.py
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Tuple
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over pre-hashed keys (digests of at least 16 bytes).
+
+    The k bit positions are derived from the digest by double hashing, so
+    adding and testing cost k byte operations and no further hashing.
+    """
+    __slots__ = ("bits", "hashes", "_array", "count")
+
+    def __init__(self, capacity: int, fp_rate: float):
+        bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.bits = bits
+        self.hashes = max(1, round(bits / capacity * math.log(2)))
+        self._array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes):
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, digest: bytes) -> None:
+        array = self._array
+        for position in self._positions(digest):
+            array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._array)
+
+
+class ReplayGuard:
+    """
+    Remembers digests seen within a sliding time window.
+
+    Responsibilities:
+    - Hold the window in a ring of Bloom filters, each covering window / partitions
+      seconds; the oldest filter is dropped whole once it falls out of the window,
+      so memory stays fixed regardless of traffic
+    - Keep the most recent digests in a small exact LRU, answered before the filters
+    - Answer check_and_record in constant time (partitions x hashes bit tests)
+
+    A digest older than the window is forgotten, so the window must cover the
+    longest time a payload stays acceptable. A Bloom hit can be a false positive
+    (rate fp_rate per filter); those are reported as replays like real ones.
+    State is per process.
+    """
+
+    def __init__(
+        self,
+        window: float,
+        partitions: int = 4,
+        capacity: int = 100_000,
+        fp_rate: float = 1e-6,
+        exact_size: int = 10_000,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        :param window: seconds a digest is remembered for (at least)
+        :param capacity: digests per partition before the false-positive rate degrades
+        :param exact_size: digests kept in the exact LRU
+        """
+        self.window = float(window)
+        self.partitions = partitions
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.exact_size = exact_size
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._filters: Deque[Tuple[float, BloomFilter]] = deque()
+        self._recent: "OrderedDict[bytes, float]" = OrderedDict()
+        self.replays = 0
+
+    @property
+    def span(self) -> float:
+        return self.window / self.partitions
+
+    def widen(self, window: float) -> None:
+        """Grow the window (never shrinks); filters created from now on use the new span."""
+        with self._lock:
+            self.window = max(self.window, float(window))
+
+    # -------------------------
+    # Checks
+    # -------------------------
+    def check_and_record(self, digest: bytes) -> bool:
+        """Record digest; False if it was already seen within the window."""
+        now = self.clock()
+        with self._lock:
+            self._rotate(now)
+            if self._seen(digest, now):
+                self.replays += 1
+                return False
+            self._recent[digest] = now
+            if len(self._recent) > self.exact_size:
+                self._recent.popitem(last=False)
+            current = self._filters[-1][1]
+            current.add(digest)
+            if current.count == self.capacity:
+                logger.warning(f"Replay guard partition reached {self.capacity} digests; false positives will rise")
+            return True
+
+    def seen(self, digest: bytes) -> bool:
+        now = self.clock()
+        with self._lock:
+            self._rotate(now)
+            return self._seen(digest, now)
+
+    def _seen(self, digest: bytes, now: float) -> bool:
+        seen_at = self._recent.get(digest)
+        if seen_at is not None:
+            if now - seen_at <= self.window:
+                return True
+            del self._recent[digest]
+        return any(digest in bloom for _, bloom in self._filters)
+
+    def _rotate(self, now: float) -> None:
+        span = self.span
+        while self._filters and self._filters[0][0] + span < now - self.window:
+            self._filters.popleft()
+        if not self._filters or self._filters[-1][0] + span <= now:
+            self._filters.append((now, BloomFilter(self.capacity, self.fp_rate)))
+        while self._recent:
+            digest, seen_at = next(iter(self._recent.items()))
+            if now - seen_at <= self.window:
+                break
+            self._recent.popitem(last=False)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(bloom.size_bytes for _, bloom in self._filters)
+
+    def __len__(self) -> int:
+        return sum(bloom.count for _, bloom in self._filters)
@@ -0,0 +1,187 @@
+# api/services/signing_service.py
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+import asyncio
+import logging
+import os
+import threading
+
+from xrpl.core.binarycodec import encode
+from xrpl.models.transactions.transaction import Transaction
+from xrpl.transaction import sign
+from xrpl.wallet import Wallet
+
+from .bank_registry import BankRegistry, bank_registry
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SigningItem = Tuple[Union[Transaction, dict], Wallet]  # (prepared transaction, derived wallet)
+
+
+class SigningError(Exception):
+    pass
+
+
+# -------------------------
+# Worker-side functions (run in the pool processes; keep them picklable)
+# -------------------------
+_worker_keys: Dict[str, Tuple[str, str]] = {}
+
+
+def install_keys(keys: Dict[str, Tuple[str, str]]) -> None:
+    """Pool initializer: hold {account: (public_key, private_key)} for the worker's lifetime."""
+    _worker_keys.clear()
+    _worker_keys.update(keys)
+
+
+def sign_batch(items: List[Tuple[dict, str]], keys: Optional[Dict[str, Tuple[str, str]]] = None) -> List[dict]:
+    """
+    Sign (tx_json, account) pairs with the keys installed in this worker
+    (or the given keys when signing inline).
+
+    Keys arrive already derived (see WalletCache), so workers never see seeds,
+    and only once per pool, so tasks carry no key material.
+    Returns {"tx_blob", "hash", "last_ledger_sequence"} or {"error"} per item.
+    """
+    keys = keys if keys is not None else _worker_keys
+    results = []
+    for tx_json, account in items:
+        try:
+            public_key, private_key = keys[account]
+            signed = sign(Transaction.from_xrpl(tx_json), Wallet(public_key, private_key))
+            results.append({
+                "tx_blob": encode(signed.to_xrpl()),
+                "hash": signed.get_hash(),
+                "last_ledger_sequence": signed.last_ledger_sequence,
+            })
+        except Exception as e:
+            results.append({"error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+class SigningService:
+    """
+    Signs prepared (autofilled) transactions off the request threads.
+
+    Responsibilities:
+    - Produce signatures in a process pool, so signing scales with cores
+    - Install the signing keys in the workers once, when the pool starts;
+      tasks name the signing account and never carry key material
+    - Restart the pool when a key is added or changed, and drop the keys of
+      banks that left the registry or lost their seed when it reloads
+    - Accept transactions in batches and split them into per-worker chunks
+    - Return signed blobs only; submission is XRPLClient.submit_signed's job
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 32, registry: BankRegistry | None = None):
+        """
+        :param max_workers: pool size (default SIGNING_WORKERS or the CPU count); 0 signs inline
+        :param batch_size: transactions sent to a worker per task
+        :param registry: bank registry whose reloads retire bank keys (defaults to the process-wide one)
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv("SIGNING_WORKERS") or os.cpu_count() or 1)
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.registry = registry or bank_registry
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Tuple[str, str]] = {}
+        self._bank_accounts: Set[str] = set()  # keys that belong to registry banks
+        self._generation = self.registry.generation
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_stale = False
+
+    @property
+    def pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is not None and self._pool_stale:
+                # Let tasks already queued on the old workers finish with their keys
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            if self._pool is None:
+                # spawn: forking a process that already runs XRPL/registry threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_context("spawn"),
+                    initializer=install_keys,
+                    initargs=(dict(self._keys),),
+                )
+                self._pool_stale = False
+                logger.info(f"Signing pool started with {self.max_workers} workers and {len(self._keys)} keys")
+            return self._pool
+
+    def _install(self, wallets: Sequence[Wallet]) -> None:
+        """Add new or changed keys to the keyring (the pool restarts to pick them up)."""
+        with self._lock:
+            generation = self.registry.generation
+            if generation != self._generation:
+                self._generation = generation
+                index = self.registry.snapshot()
+                for account in list(self._bank_accounts):
+                    bank = index.get(account)
+                    if bank is None or not bank.seed:
+                        self._keys.pop(account, None)
+                        self._bank_accounts.discard(account)
+                        self._pool_stale = True
+            for wallet in wallets:
+                account = wallet.classic_address
+                if self._keys.get(account) == (wallet.public_key, wallet.private_key):
+                    continue
+                self._keys[account] = (wallet.public_key, wallet.private_key)
+                if self.registry.snapshot().get(account) is not None:
+                    self._bank_accounts.add(account)
+                self._pool_stale = True
+
+    @staticmethod
+    def _as_json(tx: Union[Transaction, dict]) -> dict:
+        return tx.to_xrpl() if isinstance(tx, Transaction) else tx
+
+    def _chunks(self, items: Sequence[SigningItem]) -> List[List[Tuple[dict, str]]]:
+        self._install([wallet for _, wallet in items])
+        prepared = [(self._as_json(tx), wallet.classic_address) for tx, wallet in items]
+        size = max(1, min(self.batch_size, -(-len(prepared) // max(1, self.max_workers))))
+        return [prepared[i:i + size] for i in range(0, len(prepared), size)]
+
+    def submit_many(self, items: Sequence[SigningItem]) -> List[Future]:
+        """Queue items for signing; one future per chunk, each resolving to a list of results."""
+        futures = []
+        for chunk in self._chunks(items):
+            pool = self.pool
+            if pool is None:
+                future: Future = Future()
+                future.set_result(sign_batch(chunk, self._keys))
+            else:
+                try:
+                    future = pool.submit(sign_batch, chunk)
+                except RuntimeError:
+                    # Another thread restarted the pool with a new key meanwhile
+                    future = self.pool.submit(sign_batch, chunk)
+            futures.append(future)
+        return futures
+
+    def sign_many(self, items: Sequence[SigningItem]) -> List[dict]:
+        """Sign a batch; results are in input order and failed items carry an "error" key."""
+        return [result for future in self.submit_many(items) for result in future.result()]
+
+    async def sign_many_async(self, items: Sequence[SigningItem]) -> List[dict]:
+        chunks = await asyncio.gather(*[asyncio.wrap_future(f) for f in self.submit_many(items)])
+        return [result for chunk in chunks for result in chunk]
+
+    def sign(self, tx: Union[Transaction, dict], wallet: Wallet) -> dict:
+        result = self.sign_many([(tx, wallet)])[0]
+        if "error" in result:
+            raise SigningError(result["error"])
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+signing_service = SigningService()
@@ -0,0 +1,399 @@
+# api/services/state_backend.py
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DEFAULT_STATE_DB = DATA_DIR / "state.db"
+
+
+class StateBackend(ABC):
+    """
+    State shared by every API worker process.
+
+    Responsibilities:
+    - Balance reservations so two workers never commit the same bank funds
+    - Commitments: reservations whose escrow was submitted, held until a
+      balance refresh has seen the funds leave the bank's account
+    - Versioned counters (e.g. bank registry generation) for cross-worker invalidation
+    - Shared settings generated once by whichever worker needs them first (e.g. a signing key)
+    - Named leases, so exactly one worker runs a background job
+    - Loan job events, so any worker can answer for a job another one runs
+    """
+
+    # -------------------------
+    # Reservations
+    # -------------------------
+    @abstractmethod
+    def reserve(self, bank_id: str, amount_drops: int, limit_drops: int, ttl_seconds: float) -> Optional[str]:
+        """Atomically hold amount_drops against bank_id if the live total stays within limit_drops."""
+
+    @abstractmethod
+    def release(self, reservation_id: str) -> None:
+        """Drop a reservation (no-op if it already expired)."""
+
+    @abstractmethod
+    def commit(self, reservation_id: str) -> None:
+        """Turn a reservation into a commitment that does not expire (no-op if it is gone)."""
+
+    @abstractmethod
+    def settle(self, bank_id: str, before: float) -> int:
+        """Drop bank_id's commitments made before `before` (epoch seconds); returns how many."""
+
+    @abstractmethod
+    def reserved_drops(self) -> Dict[str, int]:
+        """Return the live reserved plus committed total per bank_id."""
+
+    # -------------------------
+    # Counters
+    # -------------------------
+    @abstractmethod
+    def get_counter(self, name: str) -> int:
+        """Return the current value of a counter (0 if unset)."""
+
+    @abstractmethod
+    def incr_counter(self, name: str) -> int:
+        """Increment a counter and return the new value."""
+
+    # -------------------------
+    # Settings
+    # -------------------------
+    @abstractmethod
+    def setdefault(self, name: str, value: str) -> str:
+        """Store value under name unless a value is already stored; return the stored one."""
+
+    # -------------------------
+    # Leases
+    # -------------------------
+    @abstractmethod
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Take or renew the lease if it is free, expired or already holder's."""
+
+    @abstractmethod
+    def release_lease(self, name: str, holder: str) -> None:
+        """Give the lease up if holder has it."""
+
+    # -------------------------
+    # Job events
+    # -------------------------
+    @abstractmethod
+    def append_job_event(self, job_id: str, event: dict, done: bool) -> None:
+        """Record a job's next event (event["seq"] numbers it); done marks the job's last one."""
+
+    @abstractmethod
+    def job_events(self, job_id: str, after: int = 0) -> List[dict]:
+        """Return the job's events with seq > after, oldest first ([] for an unknown job)."""
+
+    @abstractmethod
+    def prune_jobs(self, before: float) -> int:
+        """Drop every event of jobs that finished before `before` (epoch seconds); returns how many events."""
+
+
+class MemoryStateBackend(StateBackend):
+    """Single-process backend (default). Safe across threads, not across workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, tuple] = {}
+        self._commitments: Dict[str, tuple] = {}
+        self._counters: Dict[str, int] = {}
+        self._settings: Dict[str, str] = {}
+        self._leases: Dict[str, tuple] = {}
+        self._job_events: Dict[str, List[dict]] = {}
+        self._jobs_finished: Dict[str, float] = {}
+
+    def _purge(self, now: float) -> None:
+        expired = [rid for rid, (_, _, exp) in self._reservations.items() if exp <= now]
+        for rid in expired:
+            del self._reservations[rid]
+
+    def reserve(self, bank_id: str, amount_drops: int, limit_drops: int, ttl_seconds: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            held = sum(amt for bid, amt, _ in self._reservations.values() if bid == bank_id)
+            held += sum(amt for bid, amt, _ in self._commitments.values() if bid == bank_id)
+            if held + amount_drops > limit_drops:
+                return None
+            reservation_id = uuid4().hex
+            self._reservations[reservation_id] = (bank_id, amount_drops, now + ttl_seconds)
+            return reservation_id
+
+    def release(self, reservation_id: str) -> None:
+        with self._lock:
+            self._reservations.pop(reservation_id, None)
+
+    def commit(self, reservation_id: str) -> None:
+        with self._lock:
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is not None:
+                self._commitments[reservation_id] = (reservation[0], reservation[1], time.time())
+
+    def settle(self, bank_id: str, before: float) -> int:
+        with self._lock:
+            settled = [cid for cid, (bid, _, at) in self._commitments.items() if bid == bank_id and at < before]
+            for cid in settled:
+                del self._commitments[cid]
+            return len(settled)
+
+    def reserved_drops(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        with self._lock:
+            self._purge(time.time())
+            for bank_id, amount, _ in (*self._reservations.values(), *self._commitments.values()):
+                totals[bank_id] = totals.get(bank_id, 0) + amount
+        return totals
+
+    def get_counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def incr_counter(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def setdefault(self, name: str, value: str) -> str:
+        with self._lock:
+            return self._settings.setdefault(name, value)
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] != holder and current[1] > now:
+                return False
+            self._leases[name] = (holder, now + ttl_seconds)
+            return True
+
+    def release_lease(self, name: str, holder: str) -> None:
+        with self._lock:
+            if self._leases.get(name, (None,))[0] == holder:
+                del self._leases[name]
+
+    def append_job_event(self, job_id: str, event: dict, done: bool) -> None:
+        with self._lock:
+            self._job_events.setdefault(job_id, []).append(dict(event))
+            if done:
+                self._jobs_finished[job_id] = time.time()
+
+    def job_events(self, job_id: str, after: int = 0) -> List[dict]:
+        with self._lock:
+            return [dict(event) for event in self._job_events.get(job_id, []) if event["seq"] > after]
+
+    def prune_jobs(self, before: float) -> int:
+        with self._lock:
+            expired = [job_id for job_id, at in self._jobs_finished.items() if at < before]
+            dropped = 0
+            for job_id in expired:
+                del self._jobs_finished[job_id]
+                dropped += len(self._job_events.pop(job_id, []))
+            return dropped
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Multi-process backend on a SQLite database in WAL mode.
+
+    Every uvicorn/gunicorn worker opens the same file; reservations run in a
+    BEGIN IMMEDIATE transaction so the check-and-insert is atomic across processes.
+    """
+
+    def __init__(self, path: Path = DEFAULT_STATE_DB, busy_timeout_ms: int = 5000):
+        self.path = Path(path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reservations (
+                id TEXT PRIMARY KEY,
+                bank_id TEXT NOT NULL,
+                amount_drops INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reservations_bank ON reservations(bank_id, expires_at);
+            CREATE TABLE IF NOT EXISTS commitments (
+                id TEXT PRIMARY KEY,
+                bank_id TEXT NOT NULL,
+                amount_drops INTEGER NOT NULL,
+                committed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_commitments_bank ON commitments(bank_id, committed_at);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                done INTEGER NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_events_done ON job_events(done, recorded_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, bank_id: str, amount_drops: int, limit_drops: int, ttl_seconds: float) -> Optional[str]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM reservations WHERE bank_id = ? AND expires_at <= ?", (bank_id, now))
+            (held,) = conn.execute(
+                "SELECT (SELECT COALESCE(SUM(amount_drops), 0) FROM reservations WHERE bank_id = ?)"
+                " + (SELECT COALESCE(SUM(amount_drops), 0) FROM commitments WHERE bank_id = ?)",
+                (bank_id, bank_id),
+            ).fetchone()
+            if held + amount_drops > limit_drops:
+                conn.execute("COMMIT")
+                return None
+            reservation_id = uuid4().hex
+            conn.execute(
+                "INSERT INTO reservations (id, bank_id, amount_drops, expires_at) VALUES (?, ?, ?, ?)",
+                (reservation_id, bank_id, amount_drops, now + ttl_seconds),
+            )
+            conn.execute("COMMIT")
+            return reservation_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, reservation_id: str) -> None:
+        self._conn().execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+
+    def commit(self, reservation_id: str) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO commitments (id, bank_id, amount_drops, committed_at) "
+                "SELECT id, bank_id, amount_drops, ? FROM reservations WHERE id = ?",
+                (time.time(), reservation_id),
+            )
+            conn.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def settle(self, bank_id: str, before: float) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM commitments WHERE bank_id = ? AND committed_at < ?", (bank_id, before)
+        )
+        return cursor.rowcount
+
+    def reserved_drops(self) -> Dict[str, int]:
+        rows = self._conn().execute(
+            "SELECT bank_id, SUM(amount_drops) FROM ("
+            " SELECT bank_id, amount_drops FROM reservations WHERE expires_at > ?"
+            " UNION ALL SELECT bank_id, amount_drops FROM commitments"
+            ") GROUP BY bank_id",
+            (time.time(),),
+        ).fetchall()
+        return {bank_id: int(total) for bank_id, total in rows}
+
+    def get_counter(self, name: str) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def incr_counter(self, name: str) -> int:
+        # One statement, so the value returned is the one this increment wrote
+        [(value,)] = self._conn().execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value",
+            (name,),
+        ).fetchall()
+        return value
+
+    def setdefault(self, name: str, value: str) -> str:
+        conn = self._conn()
+        # The first writer wins; everyone reads back the winner's value
+        conn.execute("INSERT OR IGNORE INTO settings (name, value) VALUES (?, ?)", (name, value))
+        return conn.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()[0]
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE leases.holder = excluded.holder OR leases.expires_at <= ?",
+            (name, holder, now + ttl_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, name: str, holder: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+    def append_job_event(self, job_id: str, event: dict, done: bool) -> None:
+        self._conn().execute(
+            "INSERT OR IGNORE INTO job_events (job_id, seq, event, done, recorded_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, event["seq"], json.dumps(event, default=str), int(done), time.time()),
+        )
+
+    def job_events(self, job_id: str, after: int = 0) -> List[dict]:
+        rows = self._conn().execute(
+            "SELECT event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        ).fetchall()
+        return [json.loads(event) for (event,) in rows]
+
+    def prune_jobs(self, before: float) -> int:
+        cursor = self._conn().execute(
+            "DELETE FROM job_events WHERE job_id IN "
+            "(SELECT job_id FROM job_events WHERE done = 1 AND recorded_at < ?)",
+            (before,),
+        )
+        return cursor.rowcount
+
+
+_state_backend: Optional[StateBackend] = None
+_state_lock = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+    """
+    Return the process-wide backend selected by STATE_BACKEND (memory | sqlite).
+    Multi-worker deployments must use sqlite so all workers share one view.
+    """
+    global _state_backend
+    if _state_backend is None:
+        with _state_lock:
+            if _state_backend is None:
+                kind = os.getenv("STATE_BACKEND", "memory").lower()
+                if kind == "sqlite":
+                    path = Path(os.getenv("STATE_DB_PATH", str(DEFAULT_STATE_DB)))
+                    _state_backend = SQLiteStateBackend(path)
+                    logger.info(f"Using SQLite state backend at {path}")
+                else:
+                    _state_backend = MemoryStateBackend()
+    return _state_backend
@@ -0,0 +1,127 @@
+# api/services/syndication.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import heapq
+import logging
+
+from ..models.bank import BankRecord
+from ..utils.amounts import from_units, to_units
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Tranche:
+    bank: BankRecord
+    amount_drops: int
+
+    @property
+    def amount_xrp(self) -> float:
+        return from_units(self.amount_drops)
+
+
+@dataclass
+class SyndicationPlan:
+    requested_drops: int
+    tranches: List[Tranche] = field(default_factory=list)
+
+    @property
+    def allocated_drops(self) -> int:
+        return sum(t.amount_drops for t in self.tranches)
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.tranches) and self.allocated_drops == self.requested_drops
+
+
+class SyndicationAllocator:
+    """
+    Splits a single liquidity request across several banks when no single
+    bank can fund it alone.
+
+    Responsibilities:
+    - Filter banks by active flag, credit score floor and risk threshold
+    - Cap each bank's share at min(policy max, balance)
+    - Pick the fewest banks that cover the amount (largest capacity first)
+    - Return integer-drop tranches that sum exactly to the request
+    """
+
+    def __init__(self, max_banks: int = 5, min_tranche_xrp: float = 1.0):
+        """
+        :param max_banks: maximum number of banks allowed in one syndicate
+        :param min_tranche_xrp: banks that can contribute less than this are skipped
+        """
+        self.max_banks = max_banks
+        self.min_tranche_drops = to_units(min_tranche_xrp)
+
+    def capacity_drops(self, bank: BankRecord, credit_score: int, reserved_drops: int = 0) -> int:
+        """Return how many drops a bank can lend to this borrower (0 if ineligible)."""
+        if not bank.active:
+            return 0
+        if bank.min_credit_score > credit_score or bank.risk_score_threshold > credit_score:
+            return 0
+        available = bank.balance_drops - reserved_drops
+        return max(0, min(to_units(bank.max_per_loan), available))
+
+    def allocate(
+        self,
+        amount_xrp: float,
+        banks: List[BankRecord],
+        credit_score: int,
+        reserved_drops: Optional[Dict[str, int]] = None
+    ) -> SyndicationPlan:
+        """
+        Build a syndication plan for amount_xrp.
+
+        The plan is empty when the eligible banks cannot cover the amount
+        within max_banks participants. reserved_drops (per bank_id) is
+        subtracted from each bank's balance.
+        """
+        reserved_drops = reserved_drops or {}
+        requested = to_units(amount_xrp)
+        plan = SyndicationPlan(requested_drops=requested)
+        if requested <= 0:
+            return plan
+
+        candidates = []
+        for i, bank in enumerate(banks):
+            cap = self.capacity_drops(bank, credit_score, reserved_drops.get(bank.bank_id, 0))
+            if cap >= self.min_tranche_drops and cap > 0:
+                candidates.append((cap, -i, bank))
+
+        # The k largest capacities cover the amount iff any k banks do, so
+        # largest-first gives the minimum number of participants.
+        top = heapq.nlargest(self.max_banks, candidates, key=lambda c: (c[0], c[1]))
+
+        remaining = requested
+        for cap, _, bank in top:
+            if remaining <= 0:
+                break
+            share = min(cap, remaining)
+            plan.tranches.append(Tranche(bank=bank, amount_drops=share))
+            remaining -= share
+
+        if remaining > 0:
+            logger.info(f"Syndication could not cover {amount_xrp} XRP: short by {from_units(remaining)} XRP")
+            return SyndicationPlan(requested_drops=requested)
+
+        self._rebalance_tail(plan)
+        return plan
+
+    def _rebalance_tail(self, plan: SyndicationPlan) -> None:
+        """Shift drops from earlier tranches so the last one is not below the minimum tranche."""
+        if len(plan.tranches) < 2:
+            return
+        last = plan.tranches[-1]
+        shortfall = self.min_tranche_drops - last.amount_drops
+        if shortfall <= 0:
+            return
+        for tranche in plan.tranches[:-1]:
+            spare = tranche.amount_drops - self.min_tranche_drops
+            if spare <= 0:
+                continue
+            moved = min(spare, shortfall)
+            tranche.amount_drops -= moved
+            last.amount_drops += moved
+            shortfall -= moved
+            if shortfall <= 0:
+                break
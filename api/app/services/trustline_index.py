@@ -0,0 +1,197 @@
+# api/services/trustline_index.py
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, List, Optional
+import logging
+import threading
+
+from xrpl.models.transactions import TrustSetFlag
+
+from .xrpl_client import XRPLClient, tx_fields
+from ..models.trust_line import TrustLineRecord
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def _same_amount(a: str, b: str) -> bool:
+    try:
+        return Decimal(a) == Decimal(b)
+    except (InvalidOperation, TypeError):
+        return False
+
+
+class TrustLineIndex:
+    """
+    Local index of the trust lines held against the platform issuer.
+
+    Responsibilities:
+    - Backfill from paginated account_lines on the issuer account
+    - Stay current from validated TrustSet transactions (holder- and issuer-side)
+    - Answer "already issued" and per-holder line counts without a ledger call
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lines: Dict[str, Dict[str, TrustLineRecord]] = {}  # holder -> currency -> line
+        self.issuer: Optional[str] = None
+        self._ledger_cursor: Optional[int] = None
+        self._listeners: List[Callable[[str, TrustLineRecord], None]] = []
+        self._syncer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        """True once a backfill completed; callers fall back to the ledger before that."""
+        return self._ledger_cursor is not None
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def get(self, holder: str, currency: str) -> Optional[TrustLineRecord]:
+        return self._lines.get(holder, {}).get(currency)
+
+    def lines_for(self, holder: str) -> List[TrustLineRecord]:
+        return list(self._lines.get(holder, {}).values())
+
+    def count_for(self, holder: str) -> int:
+        return len(self._lines.get(holder, ()))
+
+    def is_issued(self, holder: str, currency: str, limit: str) -> bool:
+        """The holder already trusts the issuer for currency with exactly this limit, and it is not frozen (revoked)."""
+        line = self.get(holder, currency)
+        return line is not None and not line.frozen and _same_amount(line.limit, limit)
+
+    def __len__(self) -> int:
+        return sum(len(lines) for lines in self._lines.values())
+
+    def add_listener(self, listener: Callable[[str, TrustLineRecord], None]) -> None:
+        """Register a callable invoked with ("updated" | "removed", line) on every change."""
+        self._listeners.append(listener)
+
+    # -------------------------
+    # Mutations
+    # -------------------------
+    def _put(self, line: TrustLineRecord) -> None:
+        with self._lock:
+            self._lines.setdefault(line.holder, {})[line.currency] = line
+        self._notify("updated", line)
+
+    def _drop(self, holder: str, currency: str) -> None:
+        with self._lock:
+            lines = self._lines.get(holder)
+            line = lines.pop(currency, None) if lines else None
+            if lines is not None and not lines:
+                del self._lines[holder]
+        if line:
+            self._notify("removed", line)
+
+    def _notify(self, event: str, line: TrustLineRecord) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event, line)
+            except Exception as e:
+                logger.warning(f"Trust line index listener failed: {e}", exc_info=True)
+
+    # -------------------------
+    # Transaction stream
+    # -------------------------
+    def apply_transaction(self, result: dict) -> bool:
+        """Apply one validated TrustSet (submit result or account_tx entry)."""
+        if self.issuer is None:
+            return False
+        tx = tx_fields(result)
+        meta = result.get("meta") or {}
+        if tx.get("TransactionType") != "TrustSet":
+            return False
+        if meta and meta.get("TransactionResult") != "tesSUCCESS":
+            return False
+        amount = tx.get("LimitAmount") or {}
+        currency, value = amount.get("currency"), amount.get("value", "0")
+        if tx.get("Account") != self.issuer and amount.get("issuer") == self.issuer:
+            # Holder sets (or removes) its limit towards the issuer
+            holder = tx["Account"]
+            line = self.get(holder, currency)
+            if _same_amount(value, "0") and (line is None or (_same_amount(line.balance, "0") and _same_amount(line.issuer_limit, "0"))):
+                self._drop(holder, currency)
+                return line is not None
+            line = self._copy(line) if line else TrustLineRecord(holder, currency)
+            line.limit = value
+        elif tx.get("Account") == self.issuer and amount.get("issuer"):
+            # Issuer-side TrustSet: its own limit and freeze flag on the holder's line
+            holder = amount["issuer"]
+            line = self.get(holder, currency)
+            line = self._copy(line) if line else TrustLineRecord(holder, currency)
+            line.issuer_limit = value
+            flags = tx.get("Flags") or 0
+            if flags & TrustSetFlag.TF_SET_FREEZE:
+                line.frozen = True
+            elif flags & TrustSetFlag.TF_CLEAR_FREEZE:
+                line.frozen = False
+        else:
+            return False
+        self._put(line)
+        return True
+
+    @staticmethod
+    def _copy(line: TrustLineRecord) -> TrustLineRecord:
+        # Readers may hold the old record; never mutate it in place
+        return TrustLineRecord(line.holder, line.currency, line.limit, line.issuer_limit, line.balance, line.frozen)
+
+    def attach(self, xrpl_client: XRPLClient) -> None:
+        """Apply every successful XRPLClient submission to the index."""
+        xrpl_client.add_submit_listener(self.apply_transaction)
+
+    # -------------------------
+    # Backfill & sync
+    # -------------------------
+    def backfill(self, xrpl_client: XRPLClient) -> None:
+        """Replace the index with the issuer's trust lines on the validated ledger."""
+        issuer = xrpl_client.address
+        page = xrpl_client.get_trust_lines(issuer)
+        lines: Dict[str, Dict[str, TrustLineRecord]] = {}
+        for raw in page["lines"]:
+            line = TrustLineRecord.from_account_line(raw)
+            lines.setdefault(line.holder, {})[line.currency] = line
+        with self._lock:
+            self.issuer = issuer
+            self._lines = lines
+            self._ledger_cursor = page.get("ledger_index") or 0
+        logger.info(f"Trust line index backfilled {len(page['lines'])} lines for issuer {issuer}")
+
+    def sync(self, xrpl_client: XRPLClient, page_size: int = 200) -> int:
+        """Apply validated issuer transactions newer than the cursor; returns how many changed a line."""
+        if self._ledger_cursor is None:
+            return 0
+        applied = 0
+        last_seen = self._ledger_cursor
+        try:
+            for entry in xrpl_client.iter_account_transactions(self.issuer, self._ledger_cursor, page_size):
+                if self.apply_transaction(entry):
+                    applied += 1
+                last_seen = max(last_seen, entry.get("ledger_index") or 0)
+        except Exception as e:
+            logger.warning(f"Trust line index sync failed: {e}")
+        self._ledger_cursor = last_seen
+        return applied
+
+    def start_syncing(self, xrpl_client: XRPLClient, interval: float = 10.0) -> None:
+        """Poll the issuer's account_tx in a daemon thread; borrowers sign TrustSets outside this API."""
+        if self._syncer and self._syncer.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.sync(xrpl_client)
+
+        self._syncer = threading.Thread(target=_run, name="trustline-index-sync", daemon=True)
+        self._syncer.start()
+
+    def stop_syncing(self) -> None:
+        self._stop.set()
+        if self._syncer:
+            self._syncer.join(timeout=5)
+            self._syncer = None
+
+
+trustline_index = TrustLineIndex()
@@ -0,0 +1,260 @@
+# api/services/validation_tracker.py
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+
+from xrpl.models.requests import Ledger, Tx
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PENDING = "pending"
+VALIDATED = "validated"
+FAILED = "failed"
+EXPIRED = "expired"
+
+LEDGER_CLOSE_SECONDS = 4.0  # slow end of the usual ledger close interval
+WAIT_MARGIN_SECONDS = 20.0  # poll lag on top of the last ledger a tx can land in
+DEFAULT_WAIT_SECONDS = 120.0  # for transactions submitted without LastLedgerSequence
+
+
+class TransactionFailed(Exception):
+    """A tracked transaction was validated with a non-tesSUCCESS result, or expired unvalidated."""
+
+    def __init__(self, outcome: dict):
+        super().__init__(f"Transaction {outcome.get('hash')} {outcome.get('status')}: {outcome.get('engine_result')}")
+        self.outcome = outcome
+
+
+class PendingTx:
+    __slots__ = ("tx_hash", "engine_result", "last_ledger_sequence", "submitted_ledger", "submitted_at", "future")
+
+    def __init__(self, tx_hash: str, engine_result: str, last_ledger_sequence: Optional[int], submitted_ledger: Optional[int]):
+        self.tx_hash = tx_hash
+        self.engine_result = engine_result
+        self.last_ledger_sequence = last_ledger_sequence
+        self.submitted_ledger = submitted_ledger
+        self.submitted_at = time.time()
+        self.future: Future = Future()
+
+
+class ValidationTracker:
+    """
+    Confirms submitted-but-unvalidated transactions in batches, one pass per ledger close.
+
+    Responsibilities:
+    - Register hashes returned by fire-and-track submits with their LastLedgerSequence
+    - Per validated ledger, fetch its transaction hashes once and resolve every pending match
+    - Expire transactions whose LastLedgerSequence passed without them being included
+    - Let callers block, await or poll for the final outcome
+    """
+
+    def __init__(
+        self,
+        client,
+        on_validated: Optional[Callable[[dict], None]] = None,
+        poll_interval: float = 1.0,
+        max_catch_up: int = 20,
+        history: int = 10_000
+    ):
+        """
+        :param client: xrpl JsonRpcClient used for ledger / tx reads
+        :param on_validated: called with the full tx result of every tesSUCCESS validation
+        :param max_catch_up: ledgers scanned per poll before falling back to per-hash lookups
+        :param history: finished outcomes kept for polling
+        """
+        self.client = client
+        self.on_validated = on_validated
+        self.poll_interval = poll_interval
+        self.max_catch_up = max_catch_up
+        self.history = history
+        self._lock = threading.Lock()
+        self._pending: Dict[str, PendingTx] = {}
+        self._outcomes: "OrderedDict[str, dict]" = OrderedDict()
+        self._last_checked: Optional[int] = None
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    # -------------------------
+    # Registration & lookups
+    # -------------------------
+    def track(
+        self,
+        tx_hash: str,
+        engine_result: str,
+        last_ledger_sequence: Optional[int] = None,
+        submitted_ledger: Optional[int] = None
+    ) -> Future:
+        """Start tracking a submitted transaction; the returned future resolves to its outcome."""
+        with self._lock:
+            pending = self._pending.get(tx_hash)
+            if pending is None:
+                pending = PendingTx(tx_hash, engine_result, last_ledger_sequence, submitted_ledger)
+                self._pending[tx_hash] = pending
+        self._ensure_polling()
+        return pending.future
+
+    def status(self, tx_hash: str) -> Optional[dict]:
+        """Current outcome for a tracked hash, or None if it was never tracked here."""
+        with self._lock:
+            if tx_hash in self._outcomes:
+                return self._outcomes[tx_hash]
+            pending = self._pending.get(tx_hash)
+        if pending is None:
+            return None
+        return {"hash": tx_hash, "status": PENDING, "engine_result": pending.engine_result}
+
+    def wait_timeout(self, tx_hash: str) -> float:
+        """
+        Seconds a wait for tx_hash should take at most: until its
+        LastLedgerSequence has closed, plus a margin for the poller.
+        """
+        with self._lock:
+            pending = self._pending.get(tx_hash)
+        if pending is None or not pending.last_ledger_sequence or not pending.submitted_ledger:
+            return DEFAULT_WAIT_SECONDS
+        ledgers = max(0, pending.last_ledger_sequence - pending.submitted_ledger)
+        return ledgers * LEDGER_CLOSE_SECONDS + WAIT_MARGIN_SECONDS
+
+    def wait(self, tx_hash: str, timeout: Optional[float] = None) -> dict:
+        """
+        Block until the transaction validates; raises TransactionFailed if it
+        did not succeed and TimeoutError if it is still pending after timeout
+        (default wait_timeout(tx_hash)).
+        """
+        with self._lock:
+            pending = self._pending.get(tx_hash)
+            outcome = self._outcomes.get(tx_hash)
+        if outcome is None and pending is None:
+            raise KeyError(tx_hash)
+        if outcome is None:
+            outcome = pending.future.result(timeout if timeout is not None else self.wait_timeout(tx_hash))
+        if outcome["status"] != VALIDATED:
+            raise TransactionFailed(outcome)
+        return outcome
+
+    async def wait_async(self, tx_hash: str, timeout: Optional[float] = None) -> dict:
+        """Awaitable wait(); does not tie up a threadpool worker while pending."""
+        with self._lock:
+            pending = self._pending.get(tx_hash)
+            outcome = self._outcomes.get(tx_hash)
+        if outcome is None:
+            if pending is None:
+                raise KeyError(tx_hash)
+            if timeout is None:
+                timeout = self.wait_timeout(tx_hash)
+            outcome = await asyncio.wait_for(asyncio.wrap_future(pending.future), timeout)
+        if outcome["status"] != VALIDATED:
+            raise TransactionFailed(outcome)
+        return outcome
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    # -------------------------
+    # Resolution
+    # -------------------------
+    def poll_once(self) -> int:
+        """Scan ledgers validated since the last pass; returns how many transactions were resolved."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending = dict(self._pending)
+        validated = self.client.request(Ledger(ledger_index="validated")).result["ledger_index"]
+        start = self._last_checked
+        if start is None:
+            known = [p.submitted_ledger for p in pending.values() if p.submitted_ledger]
+            start = min(known) if known else validated - 1
+        if validated <= start:
+            return 0
+
+        resolved = 0
+        if validated - start <= self.max_catch_up:
+            for ledger_index in range(start + 1, validated + 1):
+                ledger = self.client.request(Ledger(ledger_index=ledger_index, transactions=True)).result
+                for tx_hash in set(ledger["ledger"].get("transactions", [])) & pending.keys():
+                    resolved += self._resolve_from_ledger(pending.pop(tx_hash))
+        else:
+            # Too far behind to walk every ledger; look the remaining hashes up directly
+            for tx_hash in list(pending):
+                result = self.client.request(Tx(transaction=tx_hash)).result
+                if result.get("validated"):
+                    resolved += self._finish(pending.pop(tx_hash), result)
+
+        for p in pending.values():
+            if p.last_ledger_sequence and p.last_ledger_sequence <= validated:
+                resolved += self._finish(p, None)
+        with self._lock:
+            # Start from the next submit's own ledger after an idle period
+            self._last_checked = validated if self._pending else None
+        return resolved
+
+    def _resolve_from_ledger(self, pending: PendingTx) -> int:
+        result = self.client.request(Tx(transaction=pending.tx_hash)).result
+        return self._finish(pending, result)
+
+    def _finish(self, pending: PendingTx, result: Optional[dict]) -> int:
+        if result is None:
+            outcome = {"hash": pending.tx_hash, "status": EXPIRED, "engine_result": pending.engine_result}
+        else:
+            engine_result = (result.get("meta") or {}).get("TransactionResult")
+            outcome = {
+                "hash": pending.tx_hash,
+                "status": VALIDATED if engine_result == "tesSUCCESS" else FAILED,
+                "engine_result": engine_result,
+                "ledger_index": result.get("ledger_index"),
+                "result": result,
+            }
+        with self._lock:
+            self._pending.pop(pending.tx_hash, None)
+            self._outcomes[pending.tx_hash] = outcome
+            while len(self._outcomes) > self.history:
+                self._outcomes.popitem(last=False)
+        if outcome["status"] == VALIDATED and self.on_validated:
+            try:
+                self.on_validated(result)
+            except Exception as e:
+                logger.warning(f"Validation callback failed for {pending.tx_hash}: {e}", exc_info=True)
+        else:
+            logger.info(f"Tracked transaction {pending.tx_hash} {outcome['status']} ({outcome['engine_result']})")
+        pending.future.set_result(outcome)
+        return 1
+
+    # -------------------------
+    # Background poller
+    # -------------------------
+    def _ensure_polling(self) -> None:
+        self._wake.set()
+        if self._poller and self._poller.is_alive():
+            return
+        with self._lock:
+            if self._poller and self._poller.is_alive():
+                return
+            self._stop.clear()
+            self._poller = threading.Thread(target=self._run, name="validation-tracker", daemon=True)
+            self._poller.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._pending:
+                # Sleep until the next track() instead of polling an idle ledger
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning(f"Validation tracker poll failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._poller:
+            self._poller.join(timeout=5)
+            self._poller = None
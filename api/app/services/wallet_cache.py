@@ -0,0 +1,121 @@
+# api/services/wallet_cache.py
+from typing import Dict, Optional
+import hashlib
+import logging
+import os
+import threading
+
+from xrpl.wallet import Wallet
+
+from .bank_registry import BankRegistry, bank_registry
+from ..models.bank import BankRecord
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Per-process salt: seed fingerprints are only comparable inside this process
+_FINGERPRINT_KEY = os.urandom(32)
+
+
+def _fingerprint(seed: str) -> bytes:
+    return hashlib.blake2b(seed.encode(), key=_FINGERPRINT_KEY, digest_size=16).digest()
+
+
+def derive_wallet(seed: str) -> Wallet:
+    """Derive a keypair from a seed and return a Wallet that does not retain the seed."""
+    derived = Wallet.from_seed(seed)
+    return Wallet(derived.public_key, derived.private_key, master_address=derived.classic_address)
+
+
+class KeyHandle:
+    """
+    A derived keypair held for signing.
+
+    Refuses pickling and copying and has a repr without key material, so a
+    cached key cannot end up in logs, JSON or a process pool by accident.
+    """
+    __slots__ = ("bank_id", "generation", "_fingerprint", "_wallet")
+
+    def __init__(self, bank_id: str, generation: int, fingerprint: bytes, wallet: Wallet):
+        self.bank_id = bank_id
+        self.generation = generation
+        self._fingerprint = fingerprint
+        self._wallet = wallet
+
+    @property
+    def wallet(self) -> Wallet:
+        return self._wallet
+
+    @property
+    def address(self) -> str:
+        return self._wallet.classic_address
+
+    def __reduce__(self):
+        raise TypeError("KeyHandle cannot be serialized")
+
+    def __copy__(self):
+        raise TypeError("KeyHandle cannot be copied")
+
+    def __deepcopy__(self, memo):
+        raise TypeError("KeyHandle cannot be copied")
+
+    def __repr__(self) -> str:
+        return f"KeyHandle(bank_id={self.bank_id!r}, address={self.address!r})"
+
+
+class WalletCache:
+    """
+    Derived bank keypairs keyed by bank_id.
+
+    Responsibilities:
+    - Run Wallet.from_seed once per bank instead of once per signed transaction
+    - Re-check a bank's seed when the registry generation moves (banks.json changed)
+      and re-derive only if the seed itself changed
+    - Never key, log or store the raw seed (entries keep a salted fingerprint)
+    """
+
+    def __init__(self, registry: BankRegistry | None = None):
+        self.registry = registry or bank_registry
+        self._lock = threading.Lock()
+        self._handles: Dict[str, KeyHandle] = {}
+        self.derivations = 0
+
+    def for_bank(self, bank: BankRecord) -> Optional[KeyHandle]:
+        """Keypair for a bank's configured seed, or None for manual-signing banks."""
+        if not bank.seed:
+            self.evict(bank.bank_id)
+            return None
+        generation = self.registry.generation
+        handle = self._handles.get(bank.bank_id)
+        if handle is not None and handle.generation == generation:
+            return handle
+
+        fingerprint = _fingerprint(bank.seed)
+        with self._lock:
+            handle = self._handles.get(bank.bank_id)
+            if handle is not None and handle._fingerprint == fingerprint:
+                handle.generation = generation
+                return handle
+            handle = KeyHandle(bank.bank_id, generation, fingerprint, derive_wallet(bank.seed))
+            self._handles[bank.bank_id] = handle
+            self.derivations += 1
+        logger.info(f"Derived signing key for bank {bank.bank_id} ({handle.address})")
+        return handle
+
+    def wallet_for(self, bank: BankRecord) -> Optional[Wallet]:
+        handle = self.for_bank(bank)
+        return handle.wallet if handle else None
+
+    def evict(self, bank_id: str) -> None:
+        with self._lock:
+            self._handles.pop(bank_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+wallet_cache = WalletCache()
@@ -1,15 +1,25 @@
 # api/services/xrpl_client.py
 import os
+import logging
 import threading
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
 from xrpl.clients import JsonRpcClient
 from xrpl.wallet import Wallet
-from xrpl.transaction import submit_and_wait
+from xrpl.core.binarycodec import encode
+from xrpl.ledger import get_fee
+from xrpl.transaction import submit_and_wait, autofill, autofill_and_sign
 from xrpl.models.transactions import TrustSet, Payment, EscrowCreate, EscrowFinish, Clawback
-from xrpl.models.requests import AccountInfo, AccountLines, AccountTx
+from xrpl.models.requests import AccountInfo, AccountLines, AccountObjects, AccountTx, SubmitOnly, Tx
+
+from .signing_service import signing_service
+from .validation_tracker import TransactionFailed, ValidationTracker
+from ..utils.amounts import format_value, to_units
+
+logger = logging.getLogger(__name__)
 
 # ============================
 # Load environment variables
@@ -17,6 +27,8 @@ from xrpl.models.requests import AccountInfo, AccountLines, AccountTx
 BASE_DIR = Path(__file__).resolve().parents[2]  # /api
 load_dotenv(BASE_DIR / ".env")
 
+FEE_CACHE_SECONDS = float(os.getenv("XRPL_FEE_CACHE_SECONDS") or 10)  # ~2-3 ledgers
+
 # =====================
 # Exceptions
 # =====================
@@ -34,6 +46,29 @@ XRPL_EPOCH = datetime(2000, 1, 1)
 def xrpl_time_to_datetime(xrpl_time: int) -> datetime:
     return XRPL_EPOCH + timedelta(seconds=xrpl_time)
 
+# =====================
+# Result layout helpers (API v1 "tx" vs API v2 "tx_json")
+# =====================
+def tx_fields(result: dict) -> dict:
+    """Return the transaction body of a submit/tx result."""
+    return result.get("tx_json") or result.get("tx") or result
+
+def entry_tx(entry: dict) -> dict:
+    """
+    Return an account_tx entry's transaction with hash, ledger_index and date
+    filled in from the envelope when the API version puts them there.
+    """
+    tx = entry.get("tx") or entry.get("tx_json")
+    if not tx:
+        return {}
+    if "hash" in tx and "ledger_index" in tx:
+        return tx
+    merged = dict(tx)
+    for key in ("hash", "ledger_index", "date"):
+        if key not in merged and key in entry:
+            merged[key] = entry[key]
+    return merged
+
 # =====================
 # XRPL Client Singleton
 # =====================
@@ -63,6 +98,10 @@ class XRPLClient:
         if not seed:
             raise RuntimeError("ISSUER_SEED is not set")
         self._wallet = Wallet.from_seed(seed)
+        self._submit_listeners = []
+        self._tracker = ValidationTracker(self._client, on_validated=self._notify_submitted)
+        self._fee = None  # (drops, fetched_at)
+        self._fee_lock = threading.Lock()
 
     @property
     def client(self) -> JsonRpcClient:
@@ -76,18 +115,121 @@ class XRPLClient:
     def address(self) -> str:
         return self._wallet.classic_address
 
+    @property
+    def tracker(self) -> ValidationTracker:
+        return self._tracker
+
+    # -------------------------
+    # Fee oracle
+    # -------------------------
+    def fee(self, max_age: float = FEE_CACHE_SECONDS) -> str:
+        """
+        Open-ledger transaction cost in drops, re-read from the server at most
+        once per max_age seconds. Concurrent callers share one read.
+        """
+        cached = self._fee
+        if cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+        with self._fee_lock:
+            cached = self._fee
+            if cached and time.monotonic() - cached[1] < max_age:
+                return cached[0]
+            try:
+                drops = get_fee(self._client)
+            except Exception as e:
+                raise XRPLClientError(f"Failed to fetch fee: {e}") from e
+            self._fee = (drops, time.monotonic())
+            return drops
+
     # -------------------------
     # Core submit helper
     # -------------------------
-    def submit(self, tx, wallet: Wallet | None = None) -> dict:
+    def add_submit_listener(self, listener) -> None:
+        """Register a callable invoked with every validated, successful submit result."""
+        if listener not in self._submit_listeners:
+            self._submit_listeners.append(listener)
+
+    def _notify_submitted(self, result: dict) -> None:
+        for listener in self._submit_listeners:
+            try:
+                listener(result)
+            except Exception as e:
+                logger.warning(f"Submit listener failed: {e}", exc_info=True)
+
+    def submit(self, tx, wallet: Wallet | None = None, wait: bool = True) -> dict:
+        """
+        Sign and submit tx.
+
+        wait=True blocks until the transaction is validated. wait=False returns
+        after the preliminary engine result with {"hash", "engine_result",
+        "validated": False, ...}; the hash is handed to self.tracker, which
+        notifies submit listeners once it validates.
+        """
         wallet_to_use = wallet or self._wallet
+        if not wait:
+            return self._submit_and_track(tx, wallet_to_use)
         try:
             result = submit_and_wait(tx, self._client, wallet_to_use)
             if not result.is_successful():
                 raise XRPLSubmissionError(f"Transaction failed: {result.result}")
-            return result.result
         except Exception as e:
             raise XRPLSubmissionError(f"XRPL submission error: {e}") from e
+        self._notify_submitted(result.result)
+        return result.result
+
+    def _submit_and_track(self, tx, wallet: Wallet) -> dict:
+        try:
+            signed = autofill_and_sign(tx, self._client, wallet)
+        except Exception as e:
+            raise XRPLSubmissionError(f"XRPL submission error: {e}") from e
+        return self.submit_signed(
+            {"tx_blob": encode(signed.to_xrpl()), "hash": signed.get_hash(), "last_ledger_sequence": signed.last_ledger_sequence},
+            wait=False
+        )
+
+    def submit_signed(self, signed: dict, wait: bool = True) -> dict:
+        """
+        Submit a blob produced by SigningService and track it to validation.
+
+        :param signed: {"tx_blob", "hash", "last_ledger_sequence"}
+        :param wait: block until validated (returns the validated tx result);
+            False returns after the preliminary engine result, as does a wait
+            that outlives the LastLedgerSequence window ("validated": False)
+        """
+        try:
+            response = self._client.request(SubmitOnly(tx_blob=signed["tx_blob"]))
+        except Exception as e:
+            raise XRPLSubmissionError(f"XRPL submission error: {e}") from e
+        result = response.result
+        engine_result = result.get("engine_result", "")
+        # tes/ter may still validate; tec/tef/tel/tem will not be applied as requested
+        if not engine_result.startswith(("tes", "ter")):
+            raise XRPLSubmissionError(f"Transaction rejected: {engine_result} {result.get('engine_result_message', '')}")
+        tx_hash = signed["hash"]
+        self._tracker.track(
+            tx_hash,
+            engine_result,
+            last_ledger_sequence=signed.get("last_ledger_sequence"),
+            submitted_ledger=result.get("validated_ledger_index")
+        )
+        pending = {
+            "hash": tx_hash,
+            "engine_result": engine_result,
+            "engine_result_message": result.get("engine_result_message"),
+            "validated": False,
+            "last_ledger_sequence": signed.get("last_ledger_sequence"),
+            "tx_json": result.get("tx_json", {}),
+        }
+        if not wait:
+            return pending
+        try:
+            # Bounded by LastLedgerSequence: past it the tx can no longer validate
+            return self._tracker.wait(tx_hash)["result"]
+        except TransactionFailed as e:
+            raise XRPLSubmissionError(f"Transaction failed: {e.outcome.get('engine_result')}") from e
+        except TimeoutError:
+            logger.warning(f"Transaction {tx_hash} still unvalidated after {self._tracker.wait_timeout(tx_hash):.0f}s; returning it as pending")
+            return pending
 
     # -------------------------
     # Account info / transactions
@@ -101,28 +243,88 @@ class XRPLClient:
             raise XRPLClientError(f"Failed to fetch account info: {e}") from e
 
     def get_account_lines(self, address: str) -> list:
+        return self.get_trust_lines(address)["lines"]
+
+    def get_trust_lines(self, address: str, limit: int = 400) -> dict:
+        """
+        Return every trust line of address, walking all pages.
+
+        Output shape: {"lines": list, "ledger_index": int}
+        """
+        lines = []
+        marker = None
+        ledger_index = None
         try:
-            req = AccountLines(account=address, ledger_index="validated")
-            response = self._client.request(req)
-            return response.result.get("lines", [])
+            while True:
+                req = AccountLines(
+                    account=address,
+                    # Pin later pages to the ledger of the first one for a consistent view
+                    ledger_index=ledger_index or "validated",
+                    limit=limit,
+                    marker=marker
+                )
+                response = self._client.request(req)
+                lines.extend(response.result.get("lines", []))
+                ledger_index = ledger_index or response.result.get("ledger_index")
+                marker = response.result.get("marker")
+                if not marker:
+                    return {"lines": lines, "ledger_index": ledger_index}
         except Exception as e:
             raise XRPLClientError(f"Failed to fetch account lines: {e}") from e
 
+    def get_account_objects(self, address: str, object_type: str | None = None, limit: int = 200) -> dict:
+        """
+        Return every ledger object owned by address, walking all pages.
+
+        Output shape: {"objects": list, "ledger_index": int}
+        """
+        objects = []
+        marker = None
+        ledger_index = None
+        try:
+            while True:
+                req = AccountObjects(
+                    account=address,
+                    type=object_type,
+                    # Pin later pages to the ledger of the first one for a consistent view
+                    ledger_index=ledger_index or "validated",
+                    limit=limit,
+                    marker=marker
+                )
+                response = self._client.request(req)
+                objects.extend(response.result.get("account_objects", []))
+                ledger_index = ledger_index or response.result.get("ledger_index")
+                marker = response.result.get("marker")
+                if not marker:
+                    return {"objects": objects, "ledger_index": ledger_index}
+        except Exception as e:
+            raise XRPLClientError(f"Failed to fetch account objects: {e}") from e
+
+    def get_transaction(self, tx_hash: str) -> dict:
+        try:
+            response = self._client.request(Tx(transaction=tx_hash))
+            return response.result
+        except Exception as e:
+            raise XRPLClientError(f"Failed to fetch transaction: {e}") from e
+
     def get_account_transactions(
         self,
         address: str | None = None,
         limit: int = 50,
-        marker: dict | None = None
+        marker: dict | None = None,
+        ledger_index_min: int = -1,
+        ledger_index_max: int = -1,
+        forward: bool = False
     ) -> dict:
         try:
             req = AccountTx(
                 account=address or self.address,
-                ledger_index_min=-1,
-                ledger_index_max=-1,
+                ledger_index_min=ledger_index_min,
+                ledger_index_max=ledger_index_max,
                 limit=limit,
                 marker=marker,
                 binary=False,
-                forward=False
+                forward=forward
             )
             response = self._client.request(req)
             return {
@@ -132,6 +334,27 @@ class XRPLClient:
         except Exception as e:
             raise XRPLClientError(f"Failed to fetch account transactions: {e}") from e
 
+    def iter_account_transactions(self, address: str, after_ledger: int, page_size: int = 200):
+        """
+        Yield validated account_tx entries newer than after_ledger, oldest first,
+        walking every page. Entries are normalised with entry_tx() under "tx_json".
+        """
+        marker = None
+        while True:
+            page = self.get_account_transactions(
+                address=address,
+                limit=page_size,
+                marker=marker,
+                ledger_index_min=after_ledger + 1,
+                forward=True
+            )
+            for entry in page["transactions"]:
+                tx = entry_tx(entry)
+                yield {**entry, "tx_json": tx, "hash": tx.get("hash"), "ledger_index": tx.get("ledger_index")}
+            marker = page.get("marker")
+            if not marker:
+                return
+
     # -------------------------
     # Trustline
     # -------------------------
@@ -142,7 +365,8 @@ class XRPLClient:
         currency: str,
         issuer: str,
         expiration: datetime | None = None,
-        wallet: Wallet | None = None
+        wallet: Wallet | None = None,
+        wait: bool = True
     ) -> dict:
         wallet_to_use = wallet or self._wallet
         try:
@@ -154,7 +378,7 @@ class XRPLClient:
                     "value": str(limit_amount)
                 }
             )
-            result = self.submit(tx, wallet_to_use)
+            result = self.submit(tx, wallet_to_use, wait=wait)
             if expiration:
                 result["expires_at"] = expiration.isoformat()
             return result
@@ -169,21 +393,26 @@ class XRPLClient:
         destination: str,
         amount: float,
         currency: str = "XRP",
-        wallet: Wallet | None = None
+        wallet: Wallet | None = None,
+        wait: bool = True
     ) -> dict:
         wallet_to_use = wallet or self._wallet
         try:
             if currency.upper() == "XRP":
-                amount_value = str(int(amount * 1_000_000))  # convert XRP to drops
+                amount_value = str(to_units(amount))  # XRP units are drops
             else:
-                amount_value = {"currency": currency, "issuer": wallet_to_use.classic_address, "value": str(amount)}
+                amount_value = {
+                    "currency": currency,
+                    "issuer": wallet_to_use.classic_address,
+                    "value": format_value(amount),
+                }
 
             tx = Payment(
                 account=wallet_to_use.classic_address,
                 amount=amount_value,
                 destination=destination
             )
-            return self.submit(tx, wallet_to_use)
+            return self.submit(tx, wallet_to_use, wait=wait)
         except Exception as e:
             raise XRPLSubmissionError(f"Failed to submit payment: {e}") from e
 
@@ -195,17 +424,18 @@ class XRPLClient:
         destination: str,
         amount: float,
         finish_after: int,  # Unix timestamp
-        wallet: Wallet | None = None
+        wallet: Wallet | None = None,
+        wait: bool = True
     ) -> dict:
         wallet_to_use = wallet or self._wallet
         try:
             tx = EscrowCreate(
                 account=wallet_to_use.classic_address,
                 destination=destination,
-                amount=str(int(amount * 1_000_000)),  # convert XRP to drops
+                amount=str(to_units(amount)),  # XRP units are drops
                 finish_after=finish_after
             )
-            return self.submit(tx, wallet_to_use)
+            return self.submit(tx, wallet_to_use, wait=wait)
         except Exception as e:
             raise XRPLSubmissionError(f"Failed to create escrow: {e}") from e
 
@@ -213,7 +443,8 @@ class XRPLClient:
         self,
         owner: str,
         escrow_sequence: int,
-        wallet: Wallet | None = None
+        wallet: Wallet | None = None,
+        wait: bool = True
     ) -> dict:
         wallet_to_use = wallet or self._wallet
         try:
@@ -222,7 +453,7 @@ class XRPLClient:
                 offer_sequence=escrow_sequence,
                 account=wallet_to_use.classic_address
             )
-            return self.submit(tx, wallet_to_use)
+            return self.submit(tx, wallet_to_use, wait=wait)
         except Exception as e:
             raise XRPLSubmissionError(f"Failed to finish escrow: {e}") from e
 
@@ -233,7 +464,8 @@ class XRPLClient:
         self,
         from_account: str,
         amount: float,
-        wallet: Wallet | None = None
+        wallet: Wallet | None = None,
+        wait: bool = True
     ) -> dict:
         wallet_to_use = wallet or self._wallet
         try:
@@ -242,16 +474,16 @@ class XRPLClient:
                 from_account=from_account,
                 amount=str(amount)
             )
-            return self.submit(tx, wallet_to_use)
+            return self.submit(tx, wallet_to_use, wait=wait)
         except Exception as e:
             raise XRPLSubmissionError(f"Failed to clawback funds: {e}") from e
 
     # -------------------------
     # Helper: check bank trustline
     # -------------------------
-    def has_trustline(self, bank: dict, currency: str) -> bool:
+    def has_trustline(self, bank, currency: str) -> bool:
         """Return True if the bank has a trustline for the given currency."""
-        for t in bank.get("trustlines", []):
+        for t in bank.trustlines:
             if t["currency"].upper() == currency.upper():
                 return True
         return False
@@ -278,15 +510,19 @@ class XRPLClient:
         return f"{base_url}/{tx_hash}"
 
     # -------------------------
-    # Helper: create wallet from seed and sign transaction
+    # Helper: sign transaction with a bank wallet
     # -------------------------
-    def sign_and_submit_with_wallet(self, tx, wallet_seed: str) -> dict:
+    def sign_and_submit_with_wallet(self, tx, wallet: Wallet, wait: bool = True) -> dict:
         """
-        Sign and submit a transaction using a provided wallet seed.
-        Useful for auto-signing transactions from bank wallets.
+        Sign and submit a transaction with an already-derived wallet
+        (see WalletCache). Useful for auto-signing transactions from bank wallets.
+
+        Signing runs in the signing process pool; this thread only autofills,
+        then submits the signed blob.
         """
         try:
-            bank_wallet = Wallet.from_seed(wallet_seed)
-            return self.submit(tx, bank_wallet)
+            prepared = autofill(tx, self._client)
+            signed = signing_service.sign(prepared, wallet)
+            return self.submit_signed(signed, wait=wait)
         except Exception as e:
             raise XRPLSubmissionError(f"Failed to sign and submit with bank wallet: {e}") from e
@@ -0,0 +1,92 @@
+"""
+Fixed-point amounts.
+
+Every amount inside the services is an int of units at a fixed scale of 10^-6:
+for XRP a unit is exactly one drop, for issued currencies it is a millionth of
+the token. Values are converted to float (or an exact decimal string for
+XRPL submission) only at the API / ledger edge.
+
+Issued-currency values sent to the ledger do not go through units: XRPL
+carries them at 15 significant digits, so format_value keeps them exact.
+"""
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+from typing import Union
+
+AMOUNT_SCALE = 6
+UNITS_PER_VALUE = 10 ** AMOUNT_SCALE
+DROPS_PER_XRP = UNITS_PER_VALUE  # one unit of XRP is one drop
+
+Number = Union[int, float, str, Decimal]
+
+
+def to_units(value: Number) -> int:
+    """
+    Convert a human value (XRP, or token amount) to units, rounding half-even
+    past six decimals. Float error at these magnitudes is far below half a
+    unit, so rounding recovers the intended six-decimal value exactly
+    (unlike int(value * 1_000_000), which truncates 2.01 to 2009999 drops).
+    """
+    if isinstance(value, int):
+        return value * UNITS_PER_VALUE
+    if isinstance(value, float):
+        return round(value * UNITS_PER_VALUE)
+    if isinstance(value, str):
+        return value_to_units(value)
+    return int((value * UNITS_PER_VALUE).to_integral_value(ROUND_HALF_EVEN))
+
+
+def value_to_units(text: str) -> int:
+    """
+    Parse an XRPL decimal string ("12", "-0.5", "1.25e-3") into units.
+    Plain decimals with up to six places take an integer-only path; anything
+    else goes through Decimal.
+    """
+    whole, dot, frac = text.partition(".")
+    if len(frac) <= AMOUNT_SCALE and "e" not in text and "E" not in text:
+        try:
+            negative = whole.startswith("-")
+            units = abs(int(whole or "0")) * UNITS_PER_VALUE + (int(frac.ljust(AMOUNT_SCALE, "0")) if frac else 0)
+            return -units if negative else units
+        except ValueError:
+            pass
+    try:
+        return int((Decimal(text) * UNITS_PER_VALUE).to_integral_value(ROUND_HALF_EVEN))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {text}")
+
+
+def amount_to_units(amount) -> int:
+    """Units for an XRPL amount field: a drops string for XRP, or an issued-currency dict."""
+    if isinstance(amount, str):
+        return int(amount)  # drops are already units
+    if isinstance(amount, dict):
+        return value_to_units(amount.get("value", "0"))
+    return 0
+
+
+def from_units(units: int) -> float:
+    """API edge: units back to a float value."""
+    return units / UNITS_PER_VALUE
+
+
+def format_units(units: int) -> str:
+    """Exact decimal string for units ("1.5", "-0.000001", "20"), e.g. for IOU submission."""
+    sign = "-" if units < 0 else ""
+    whole, frac = divmod(abs(units), UNITS_PER_VALUE)
+    if not frac:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{frac:0{AMOUNT_SCALE}d}".rstrip("0")
+
+
+def format_value(value: Number) -> str:
+    """
+    Exact decimal string for an issued-currency value, without rounding it to
+    six places. Floats use their shortest repr (0.1 -> "0.1").
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        d = Decimal(value).normalize()
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+    return format(d, "f") if d else "0"
@@ -0,0 +1,59 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+from typing import Optional
+
+from ..services.state_backend import get_state_backend
+
+_MAC_BYTES = 16
+_secret: Optional[bytes] = None
+
+
+def _key() -> bytes:
+    """
+    CURSOR_SECRET, or else a key generated once and kept in the shared state
+    backend, so every worker signs and accepts the same tokens (with
+    STATE_BACKEND=sqlite they also stay valid across restarts).
+    """
+    global _secret
+    if _secret is None:
+        configured = os.getenv("CURSOR_SECRET")
+        _secret = (configured or get_state_backend().setdefault("cursor_secret", secrets.token_hex(32))).encode()
+    return _secret
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def encode_cursor(payload: dict) -> str:
+    """Serialise payload into an opaque, HMAC-signed token."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+    mac = hmac.new(_key(), body, hashlib.sha256).digest()[:_MAC_BYTES]
+    return f"{_b64encode(body)}.{_b64encode(mac)}"
+
+
+def decode_cursor(token: str) -> dict:
+    """Return the payload of a token produced by encode_cursor; ValueError if forged or malformed."""
+    try:
+        body_text, mac_text = token.split(".", 1)
+        body, mac = _b64decode(body_text), _b64decode(mac_text)
+    except (ValueError, AttributeError):
+        raise ValueError("Malformed cursor")
+    expected = hmac.new(_key(), body, hashlib.sha256).digest()[:_MAC_BYTES]
+    if not hmac.compare_digest(mac, expected):
+        raise ValueError("Invalid cursor")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise ValueError("Malformed cursor")
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, List
+
+from app.models.payment import Payment
+
+EXPORT_FIELDS = list(Payment.model_fields)
+
+
+def ndjson_chunks(pages: Iterable[List[Payment]]) -> Iterator[bytes]:
+    """One JSON object per line; one chunk per page."""
+    for page in pages:
+        if page:
+            yield "".join(json.dumps(p.model_dump(), separators=(",", ":")) + "\n" for p in page).encode()
+
+
+def csv_chunks(pages: Iterable[List[Payment]]) -> Iterator[bytes]:
+    """Header row first, then one chunk per page."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, lineterminator="\n")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    for page in pages:
+        if not page:
+            continue
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(p.model_dump() for p in page)
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a chunk stream into a single gzip member, flushing per chunk so output keeps flowing."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
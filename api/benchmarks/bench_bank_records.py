@@ -0,0 +1,74 @@
+# api/benchmarks/bench_bank_records.py
+"""
+Compare memory and matching-loop cost of nested-dict banks vs BankRecord.
+
+Run from /api:
+    python -m benchmarks.bench_bank_records
+"""
+import gc
+import time
+import tracemalloc
+
+from app.models.bank import BankRecord
+
+N_BANKS = 100_000
+
+
+def raw_bank(i: int) -> dict:
+    return {
+        "bank_id": f"bank{i:06d}",
+        "bank_name": f"Bank {i}",
+        "wallet_address": f"rBank{i:029d}",
+        "credit_policy": {"min": 300 + i % 400, "max": 1000.0 + i % 9000, "risk_score_threshold": 300},
+        "issued_tokens": [],
+        "trustlines": [],
+        "balance_xrp": float(i % 50_000),
+        "active": True,
+        "seed": None,
+    }
+
+
+def measure(build) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    banks = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return banks, current
+
+
+def match_dicts(banks, amount, score):
+    return [
+        b for b in banks
+        if b["credit_policy"]["max"] >= amount
+        and b["credit_policy"]["min"] <= score
+        and b["balance_xrp"] >= amount
+        and b.get("active", True)
+    ]
+
+
+def match_records(banks, amount, score):
+    return [
+        b for b in banks
+        if b.max_per_loan >= amount
+        and b.min_credit_score <= score
+        and b.balance_xrp >= amount
+        and b.active
+    ]
+
+
+def timed(fn, banks, repeats=20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(banks, 5000, 650)
+    return (time.perf_counter() - start) / repeats * 1e3
+
+
+if __name__ == "__main__":
+    raws = [raw_bank(i) for i in range(N_BANKS)]
+    dicts, dict_bytes = measure(lambda: [dict(r, credit_policy=dict(r["credit_policy"]), issued_tokens=[], trustlines=[]) for r in raws])
+    records, record_bytes = measure(lambda: [BankRecord.from_json(r, default_bank_id=r["bank_id"]) for r in raws])
+
+    print(f"banks={N_BANKS}")
+    print(f"  dict   memory={dict_bytes / 1e6:8.1f} MB  per-bank={dict_bytes / N_BANKS:6.0f} B  match={timed(match_dicts, dicts):7.2f} ms")
+    print(f"  record memory={record_bytes / 1e6:8.1f} MB  per-bank={record_bytes / N_BANKS:6.0f} B  match={timed(match_records, records):7.2f} ms")
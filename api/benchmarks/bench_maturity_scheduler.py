@@ -0,0 +1,41 @@
+# api/benchmarks/bench_maturity_scheduler.py
+"""
+Benchmark TimingWheel tracking and per-second ticks with up to 1M escrows.
+
+Run from /api:
+    python -m benchmarks.bench_maturity_scheduler
+"""
+import random
+import statistics
+import time
+
+from app.services.maturity_scheduler import TimingWheel
+
+START = 800_000_000  # XRPL epoch seconds
+
+
+def bench(n: int, horizon: int = 90 * 86_400, ticks: int = 20_000) -> None:
+    rng = random.Random(11)
+    wheel = TimingWheel(START)
+    start = time.perf_counter()
+    for i in range(n):
+        wheel.add(("rBank", i), START + rng.randrange(horizon), i)
+    add_us = (time.perf_counter() - start) / n * 1e6
+
+    samples = []
+    expired = 0
+    for now in range(START, START + ticks):
+        t0 = time.perf_counter()
+        expired += len(wheel.advance(now))
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(
+        f"escrows={n:>9}  add={add_us:>5.2f}us  tick median={statistics.median(samples):>6.1f}us  "
+        f"p99={p99:>7.1f}us  max={samples[-1]:>8.1f}us  expired={expired}"
+    )
+
+
+if __name__ == "__main__":
+    for n in (10_000, 100_000, 1_000_000):
+        bench(n)
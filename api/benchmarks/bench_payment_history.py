@@ -0,0 +1,53 @@
+# api/benchmarks/bench_payment_history.py
+"""
+History page latency from the local PaymentStore: first page and a deep
+keyset page, plus the rollup summary, over an address with 100k synced
+transactions.
+
+Run from /api:
+    python -m benchmarks.bench_payment_history
+"""
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import app.services.payment_history_service as payment_history
+from app.services.payment_history_service import PaymentHistoryService
+from app.services.payment_store import PaymentStore
+
+
+def make_rows(n: int) -> list:
+    return [
+        {"ledger_index": 1_000_000 + i // 4, "tx_index": i % 4, "hash": f"{i:064X}", "date": 1_700_000_000 + i,
+         "type": ("Payment", "EscrowCreate", "EscrowFinish", "Clawback")[i % 4], "status": "Completed",
+         "amount": (i % 1000) * 100_000, "currency": "XRP", "direction": ("in", "out")[i % 2]}
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeats: int) -> list:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PaymentStore(Path(tmp) / "payments.db")
+        rows = make_rows(100_000)
+        for i in range(0, len(rows), 5_000):
+            store.apply("rBiz", rows[i:i + 5_000], synced_through=rows[i + 4_999]["ledger_index"])
+        service = PaymentHistoryService(xrpl_client=object(), store=store)
+        payment_history.SYNC_INTERVAL = 1e9  # measure reads only
+
+        first = timed(lambda: service.history("rBiz", limit=50), 500)
+        deep = timed(lambda: service.history("rBiz", limit=50, before=(1_005_000, 0)), 500)
+        summary = timed(lambda: service.summary("rBiz", period="week"), 500)
+
+    print(f"first page (50 rows)      : median={statistics.median(first):.3f}ms p99={sorted(first)[494]:.3f}ms")
+    print(f"page at row 80k (50 rows) : median={statistics.median(deep):.3f}ms p99={sorted(deep)[494]:.3f}ms")
+    print(f"weekly summary            : median={statistics.median(summary):.3f}ms p99={sorted(summary)[494]:.3f}ms")
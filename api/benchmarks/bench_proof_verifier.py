@@ -0,0 +1,79 @@
+# api/benchmarks/bench_proof_verifier.py
+"""
+Cost of proof verification on the request path: a cold Ed25519 check vs a
+verified-result cache hit, and batch throughput inline vs on the pool.
+
+Run from /api:
+    python -m benchmarks.bench_proof_verifier
+"""
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from xrpl.core.keypairs import derive_keypair, generate_seed, sign
+
+from app.models.proof import ProofPayload
+from app.services.oracle_registry import OracleRegistry
+from app.services.proof_verifier import ProofVerifier, SignatureVerifier, canonical_message
+
+
+def make_proofs(private_key: str, n: int) -> list:
+    proofs = []
+    for i in range(n):
+        proof = ProofPayload(metrics={"default_rate": (i % 100) / 1000}, timestamp=datetime.utcnow(), source="oracle", signature=None)
+        proof.signature = sign(canonical_message(proof), private_key)
+        proofs.append(proof)
+    return proofs
+
+
+def percentile(samples: list, p: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def timed_async(verifier: ProofVerifier, proofs: list, repeats: int) -> list:
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        await verifier.verify_async(proofs[i % len(proofs)])
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+if __name__ == "__main__":
+    public_key, private_key = derive_keypair(generate_seed())
+    proofs = make_proofs(private_key, 200)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "oracles.json"
+        path.write_text(json.dumps({"oracle": [public_key]}))
+        registry = OracleRegistry(path)
+
+        inline = SignatureVerifier(max_workers=0)
+        verifier = ProofVerifier(registry=registry, signatures=inline)
+        cold = []
+        for proof in proofs[:50]:
+            start = time.perf_counter()
+            verifier.verify(proof)
+            cold.append((time.perf_counter() - start) * 1e6)
+        verifier.verify_batch(proofs)
+        hits = asyncio.run(timed_async(verifier, proofs, 50_000))
+
+        start = time.perf_counter()
+        ProofVerifier(registry=registry, signatures=SignatureVerifier(max_workers=0)).verify_batch(proofs)
+        batch_inline = time.perf_counter() - start
+        pooled = SignatureVerifier(max_workers=2)
+        pooled_verifier = ProofVerifier(registry=registry, signatures=pooled)
+        asyncio.run(pooled_verifier.verify_batch_async(proofs[:2]))  # start the workers
+        pooled.clear()
+        start = time.perf_counter()
+        asyncio.run(pooled_verifier.verify_batch_async(proofs))
+        batch_pool = time.perf_counter() - start
+        pooled.shutdown()
+
+    print(f"cold verify (inline)       : median={statistics.median(cold):>9.1f}us p99={percentile(cold, 0.99):>9.1f}us")
+    print(f"cached verify_async        : median={statistics.median(hits):>9.2f}us p99={percentile(hits, 0.99):>9.2f}us")
+    print(f"batch of {len(proofs)} inline         : {len(proofs) / batch_inline:>9.0f} proofs/s")
+    print(f"batch of {len(proofs)} on 2 workers   : {len(proofs) / batch_pool:>9.0f} proofs/s")
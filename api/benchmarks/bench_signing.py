@@ -0,0 +1,61 @@
+# api/benchmarks/bench_signing.py
+"""
+Compare the old inline path (Wallet.from_seed + sign per request) with
+SigningService batches of pre-derived wallets, inline and on a process pool.
+
+Run from /api:
+    python -m benchmarks.bench_signing
+"""
+import os
+import time
+
+from xrpl.core.binarycodec import encode
+from xrpl.models.transactions import EscrowCreate
+from xrpl.transaction import sign
+from xrpl.wallet import Wallet
+
+from app.services.signing_service import SigningService
+
+
+def make_items(n: int, banks: int = 8) -> list:
+    wallets = [Wallet.create() for _ in range(banks)]
+    return [
+        (
+            EscrowCreate(
+                account=wallets[i % banks].classic_address,
+                destination="rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe",
+                amount="1000000",
+                finish_after=800_000_000,
+                sequence=i + 1,
+                fee="12",
+                last_ledger_sequence=1000,
+            ),
+            wallets[i % banks],
+        )
+        for i in range(n)
+    ]
+
+
+def bench_inline_per_request(items: list) -> float:
+    start = time.perf_counter()
+    for tx, wallet in items:
+        encode(sign(tx, Wallet.from_seed(wallet.seed)).to_xrpl())
+    return len(items) / (time.perf_counter() - start)
+
+
+def bench_service(items: list, workers: int) -> float:
+    service = SigningService(max_workers=workers)
+    service.sign_many(items[:workers or 1])  # start the pool outside the timed region
+    start = time.perf_counter()
+    service.sign_many(items)
+    rate = len(items) / (time.perf_counter() - start)
+    service.shutdown()
+    return rate
+
+
+if __name__ == "__main__":
+    items = make_items(500)
+    print(f"inline, derive per request : {bench_inline_per_request(items):>8.0f} tx/s")
+    print(f"service, inline            : {bench_service(items, 0):>8.0f} tx/s")
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        print(f"service, {workers:>2} processes       : {bench_service(items, workers):>8.0f} tx/s")
@@ -0,0 +1,47 @@
+# api/benchmarks/bench_syndication.py
+"""
+Benchmark SyndicationAllocator.allocate over growing bank sets.
+
+Run from /api:
+    python -m benchmarks.bench_syndication
+"""
+import random
+import statistics
+import time
+
+from app.models.bank import BankRecord
+from app.services.syndication import SyndicationAllocator
+
+
+def make_banks(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        BankRecord(
+            bank_id=f"bank{i:06d}",
+            bank_name=f"Bank {i}",
+            wallet_address=f"rBank{i:029d}",
+            min_credit_score=rng.choice([300, 400, 500, 600]),
+            max_per_loan=rng.uniform(500, 20_000),
+            balance_xrp=rng.uniform(0, 50_000),
+            active=rng.random() > 0.05,
+        )
+        for i in range(n)
+    ]
+
+
+def bench(n: int, repeats: int = 200) -> None:
+    banks = make_banks(n)
+    allocator = SyndicationAllocator()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        allocator.allocate(40_000, banks, 650)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"banks={n:>8}  median={statistics.median(samples):>10.1f}us  p99={p99:>10.1f}us")
+
+
+if __name__ == "__main__":
+    for n in (10, 100, 1_000, 10_000, 100_000):
+        bench(n, repeats=200 if n <= 10_000 else 20)
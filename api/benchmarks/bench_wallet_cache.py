@@ -0,0 +1,56 @@
+# api/benchmarks/bench_wallet_cache.py
+"""
+Per-request key cost: Wallet.from_seed on every signed request vs a
+WalletCache hit keyed by bank_id.
+
+Run from /api:
+    python -m benchmarks.bench_wallet_cache
+"""
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from xrpl.wallet import Wallet
+
+from app.services.bank_registry import BankRegistry
+from app.services.state_backend import MemoryStateBackend
+from app.services.wallet_cache import WalletCache
+
+
+def make_registry(directory: Path, banks: int) -> BankRegistry:
+    raw = [
+        {"bank_id": f"bank{i}", "bank_name": f"Bank {i}", "wallet_address": f"rBank{i}", "seed": Wallet.create().seed,
+         "credit_policy": {"min": 500, "max": 1000, "risk_score_threshold": 300}}
+        for i in range(banks)
+    ]
+    path = directory / "banks.json"
+    path.write_text(json.dumps(raw))
+    return BankRegistry(path, check_interval=3600, state=MemoryStateBackend())
+
+
+def timed(fn, repeats: int) -> list:
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = make_registry(Path(tmp), banks=16)
+        banks = list(registry.snapshot().banks)
+        cache = WalletCache(registry)
+
+        derive = timed(lambda i: Wallet.from_seed(banks[i % len(banks)].seed), 400)
+        cache.for_bank(banks[0])
+        for bank in banks:
+            cache.for_bank(bank)
+        cached = timed(lambda i: cache.for_bank(banks[i % len(banks)]), 100_000)
+
+        print(f"Wallet.from_seed per request : median={statistics.median(derive):>9.1f}us")
+        print(f"WalletCache hit              : median={statistics.median(cached):>9.2f}us")
+        print(f"derivations during cached run: {cache.derivations} (one per bank)")
@@ -0,0 +1,12 @@
+class FakeLedger:
+    """Stands in for XRPLClient.iter_account_transactions over a fixed list of account_tx entries."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.calls = []
+
+    def iter_account_transactions(self, address, after_ledger, page_size=200):
+        self.calls.append(after_ledger)
+        for entry in sorted(self.entries, key=lambda e: (e["ledger_index"], e["meta"]["TransactionIndex"])):
+            if entry["ledger_index"] > after_ledger:
+                yield entry
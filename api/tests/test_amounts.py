@@ -0,0 +1,31 @@
+import os
+import sys
+from decimal import Decimal
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.utils.amounts import amount_to_units, format_units, format_value, from_units, to_units, value_to_units
+
+
+def test_float_values_convert_without_truncation():
+    assert [to_units(x / 100) for x in range(1, 2000)] == [x * 10_000 for x in range(1, 2000)]
+    assert to_units(3) == 3_000_000 and to_units(Decimal("0.0000005")) == 0 and to_units("1.5") == 1_500_000
+
+
+def test_xrpl_amount_fields_parse_to_units():
+    assert amount_to_units("1234") == 1234
+    assert amount_to_units({"currency": "USD", "issuer": "rBank", "value": "-12.5"}) == -12_500_000
+    assert value_to_units("1.25e-3") == 1250 and value_to_units(".5") == 500_000
+    assert value_to_units("0.0000015") == 2  # half-even past six places
+    with pytest.raises(ValueError):
+        value_to_units("abc")
+
+
+def test_units_format_back_exactly():
+    assert [format_units(u) for u in (20_000_000, 1_500_000, -1, 0)] == ["20", "1.5", "-0.000001", "0"]
+    assert from_units(2_010_000) == 2.01
+
+
+def test_issued_currency_values_are_not_rounded_to_six_places():
+    assert format_value(0.0000001) == "0.0000001"
+    assert format_value(Decimal("1234.123456789")) == "1234.123456789"
+    assert format_value(2.5) == "2.5" and format_value(100.0) == "100" and format_value(0) == "0"
@@ -0,0 +1,40 @@
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.bank import BankRecord
+
+
+def test_from_json_accepts_flat_legacy_layout():
+    bank = BankRecord.from_json(
+        {"wallet_address": "rLegacy", "min_credit_score": 600, "max_per_loan": 2500},
+        default_bank_id="generated",
+    )
+    assert bank.bank_id == "generated"
+    assert bank.credit_policy == {"min": 600, "max": 2500.0, "risk_score_threshold": 300}
+
+
+def test_seed_only_in_storage_representation():
+    bank = BankRecord(bank_id="b1", bank_name="Alpha", wallet_address="rAlpha", seed="sSecret")
+    assert "seed" not in bank.to_json()
+    assert bank.to_storage()["seed"] == "sSecret"
+    assert "sSecret" not in repr(bank)
+    assert not hasattr(bank, "__dict__")
+
+
+def test_balance_is_held_in_drops_and_round_trips_through_storage():
+    bank = BankRecord(bank_id="b1", bank_name="Alpha", wallet_address="rAlpha", balance_xrp=2.01)
+    assert bank.balance_drops == 2_010_000  # int(2.01 * 1_000_000) would give 2009999
+    restored = BankRecord.from_json(bank.to_storage(), default_bank_id="x")
+    assert restored.balance_drops == 2_010_000 and restored.to_json()["balance_xrp"] == 2.01
+    assert BankRecord.from_json({"wallet_address": "rOld", "balance_xrp": 7.5}, "x").balance_drops == 7_500_000
+
+
+def test_unknown_credit_policy_keys_survive_a_round_trip():
+    raw = {
+        "wallet_address": "rAlpha",
+        "credit_policy": {"min": 650, "max": 500, "risk_score_threshold": 400, "max_duration_days": 90, "sectors": ["retail"]},
+    }
+    bank = BankRecord.from_json(raw, default_bank_id="b1")
+    assert bank.extra_policy == {"max_duration_days": 90, "sectors": ["retail"]}
+    restored = BankRecord.from_json(bank.to_storage(), default_bank_id="x")
+    assert restored.credit_policy == {"max_duration_days": 90, "sectors": ["retail"], "min": 650, "max": 500.0, "risk_score_threshold": 400}
+    assert bank.copy().extra_policy == bank.extra_policy
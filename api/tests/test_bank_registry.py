@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.bank import BankRecord
+from app.services.bank_registry import BankRegistry
+from app.services.state_backend import SQLiteStateBackend
+
+
+def _write(path, banks, mtime_ns=None):
+    path.write_text(json.dumps(banks))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _raw(wallet, min_score=500):
+    return {"bank_id": wallet, "bank_name": wallet, "wallet_address": wallet,
+            "credit_policy": {"min": min_score, "max": 1000, "risk_score_threshold": 300}}
+
+
+def test_snapshot_is_stable_across_reload(tmp_path):
+    path = tmp_path / "banks.json"
+    _write(path, [_raw("rA")], mtime_ns=1_000_000_000)
+    registry = BankRegistry(path, check_interval=0)
+
+    before = registry.snapshot()
+    _write(path, [_raw("rA"), _raw("rB", min_score=300)], mtime_ns=2_000_000_000)
+    after = registry.snapshot()
+
+    assert [b.wallet_address for b in before.banks] == ["rA"]
+    assert [b.wallet_address for b in after.banks] == ["rB", "rA"]
+    assert after.generation == before.generation + 1
+
+
+def test_broken_file_keeps_previous_index(tmp_path):
+    path = tmp_path / "banks.json"
+    _write(path, [_raw("rA")], mtime_ns=1_000_000_000)
+    registry = BankRegistry(path, check_interval=0)
+    registry.snapshot()
+
+    path.write_text("[{not json")
+    os.utime(path, ns=(3_000_000_000, 3_000_000_000))
+    assert list(registry.snapshot().by_wallet) == ["rA"]
+
+
+def test_upsert_persists_without_triggering_reload(tmp_path):
+    path = tmp_path / "banks.json"
+    registry = BankRegistry(path, check_interval=0)
+    index = registry.upsert(BankRecord(bank_id="b1", bank_name="Alpha", wallet_address="rAlpha", seed="sSeed"))
+
+    assert registry.reload_if_changed() is False
+    assert registry.snapshot() is index
+    assert json.loads(path.read_text())[0]["seed"] == "sSeed"
+
+
+def test_broken_file_is_not_reparsed_until_it_changes(tmp_path, monkeypatch):
+    path = tmp_path / "banks.json"
+    path.write_text("[{not json")
+    registry = BankRegistry(path, check_interval=0)
+    registry.snapshot()
+
+    loads = []
+    monkeypatch.setattr(registry, "load", lambda: loads.append(1))
+    assert registry.reload_if_changed() is False and loads == []
+
+
+def test_missing_bank_id_is_derived_from_the_wallet(tmp_path):
+    path = tmp_path / "banks.json"
+    _write(path, [{"bank_name": "Alpha", "wallet_address": "rAlpha"}])
+    first = BankRegistry(path).snapshot().get("rAlpha").bank_id
+    second = BankRegistry(path).snapshot().get("rAlpha").bank_id
+    assert first == second
+
+
+def test_balance_update_keeps_banks_registered_meanwhile(tmp_path):
+    path = tmp_path / "banks.json"
+    registry = BankRegistry(path, check_interval=0)
+    registry.upsert(BankRecord(bank_id="a", bank_name="Alpha", wallet_address="rAlpha"))
+    fetched_from = registry.snapshot()
+    registry.upsert(BankRecord(bank_id="b", bank_name="Beta", wallet_address="rBeta"))
+
+    index = registry.update_balances({b.wallet_address: 5_000_000 for b in fetched_from.banks})
+    assert index.get("rAlpha").balance_drops == 5_000_000
+    assert index.get("rBeta") is not None
+
+
+def test_writers_in_different_workers_keep_each_others_banks(tmp_path):
+    path = tmp_path / "banks.json"
+    first = BankRegistry(path, check_interval=3600, state=SQLiteStateBackend(tmp_path / "state.db"))
+    second = BankRegistry(path, check_interval=3600, state=SQLiteStateBackend(tmp_path / "state.db"))
+    first.snapshot()
+    second.snapshot()
+
+    first.upsert(BankRecord(bank_id="a", bank_name="Alpha", wallet_address="rAlpha"))
+    # second's index predates Alpha; its writes start from the file instead
+    second.upsert(BankRecord(bank_id="b", bank_name="Beta", wallet_address="rBeta"))
+    second.update_balances({"rBeta": 7_000_000})
+
+    stored = {raw["wallet_address"] for raw in json.loads(path.read_text())}
+    assert stored == {"rAlpha", "rBeta"}
+
+
+def test_failed_write_keeps_the_previous_index(tmp_path, monkeypatch):
+    path = tmp_path / "banks.json"
+    registry = BankRegistry(path, check_interval=0)
+    registry.upsert(BankRecord(bank_id="a", bank_name="Alpha", wallet_address="rAlpha"))
+
+    def _fail(index):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(registry, "_write", _fail)
+    with pytest.raises(OSError):
+        registry.upsert(BankRecord(bank_id="b", bank_name="Beta", wallet_address="rBeta"))
+    assert list(registry.snapshot().by_wallet) == ["rAlpha"]
+    assert [raw["wallet_address"] for raw in json.loads(path.read_text())] == ["rAlpha"]
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from xrpl.wallet import Wallet
+
+from app.services import container as container_module
+from app.services import xrpl_client as xrpl_module
+from app.services.bank_registry import BankRegistry
+from app.services.container import ServiceContainer, get_bank_service, get_credit_service
+from app.services.payment_store import PaymentStore
+from app.services.state_backend import MemoryStateBackend
+from app.services.xrpl_client import XRPLClient
+
+
+def _container(tmp_path, monkeypatch):
+    monkeypatch.setenv("ISSUER_SEED", Wallet.create().seed)
+    monkeypatch.setattr(XRPLClient, "_instance", None)
+    state = MemoryStateBackend()
+    return ServiceContainer(
+        registry=BankRegistry(tmp_path / "banks.json", state=state),
+        state=state,
+        store=PaymentStore(tmp_path / "payments.db"),
+    )
+
+
+def test_services_are_built_once_and_share_one_client(tmp_path, monkeypatch):
+    services = _container(tmp_path, monkeypatch)
+    assert services.credit.xrpl is services.xrpl
+    assert services.history.xrpl is services.xrpl
+    assert services.dashboard.credit is services.credit
+    assert services.dashboard.history is services.history
+
+    # BankService pins a registry snapshot, so each request gets its own
+    first, second = services.bank_service(), services.bank_service()
+    assert first is not second
+    assert first.xrpl is services.xrpl and first.state is services.state
+
+    app = FastAPI()
+    app.state.services = services
+
+    @app.get("/probe")
+    async def probe(credit=Depends(get_credit_service), banks=Depends(get_bank_service)):
+        return {"credit": id(credit), "banks": id(banks)}
+
+    with TestClient(app) as client:
+        a, b = client.get("/probe").json(), client.get("/probe").json()
+    assert a["credit"] == b["credit"] == id(services.credit)
+
+
+def test_fee_is_read_once_per_window(tmp_path, monkeypatch):
+    services = _container(tmp_path, monkeypatch)
+    reads = []
+
+    def fake_get_fee(client):
+        reads.append(client)
+        return str(10 + len(reads))
+
+    monkeypatch.setattr(xrpl_module, "get_fee", fake_get_fee)
+    services.warm_up()
+    assert services.xrpl.fee() == "11"
+    assert len(reads) == 1
+    assert services.xrpl.fee(max_age=0) == "12"
+
+
+def test_concurrent_first_requests_build_one_container(monkeypatch):
+    built = []
+
+    class SlowContainer:
+        def __init__(self):
+            time.sleep(0.05)
+            built.append(self)
+
+    monkeypatch.setattr(container_module, "ServiceContainer", SlowContainer)
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: container_module.services_for(request), range(8)))
+    assert len(built) == 1 and all(r is built[0] for r in results)
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from xrpl.models.transactions import TrustSetFlag
+from xrpl.wallet import Wallet
+from app.services.credential_service import CredentialService
+from app.services.trustline_index import TrustLineIndex
+from app.services.xrpl_client import XRPLClient
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.result = result
+
+    def is_successful(self):
+        return "error" not in self.result
+
+
+class FakeAsyncClient:
+    """Answers fee / ledger / account_info and tracks concurrency and per-account reads."""
+
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self.reads = {}
+        self.in_flight = 0
+        self.peak = 0
+
+    async def request(self, req):
+        name = type(req).__name__
+        if name == "Fee":
+            return FakeResponse({"drops": {"open_ledger_fee": "12", "minimum_fee": "10", "base_fee": "10"}})
+        if name == "Ledger":
+            return FakeResponse({"ledger_index": 5000})
+        self.reads[req.account] = self.reads.get(req.account, 0) + 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        if req.account not in self.accounts:
+            return FakeResponse({"error": "actNotFound"})
+        return FakeResponse({"account_data": {"Sequence": self.accounts[req.account]}})
+
+    _request_impl = request
+
+
+def test_batch_prepares_with_shared_fee_and_one_read_per_address(monkeypatch):
+    monkeypatch.setenv("ISSUER_SEED", Wallet.create().seed)
+    monkeypatch.setattr(XRPLClient, "_instance", None)
+    service = CredentialService(trust_lines=TrustLineIndex())
+
+    funded = {Wallet.create().classic_address: 100 + i for i in range(40)}
+    missing = Wallet.create().classic_address
+    addresses = list(funded) + [missing, "not-an-address", list(funded)[0]]
+    client = FakeAsyncClient(funded)
+
+    async def _collect():
+        return [item async for item in service.prepare_trust_set_batch(addresses, "500", "CORRIDOR_ELIGIBLE", concurrency=8, client=client)]
+
+    items = sorted(asyncio.run(_collect()), key=lambda item: item["index"])
+    assert [item["index"] for item in items] == list(range(len(addresses)))
+    assert items[-3]["status"] == "not_found"
+    assert items[-2]["status"] == "invalid"
+    assert items[-1]["transaction"] == items[0]["transaction"]
+
+    prepared = [item for item in items if item["status"] == "prepared"]
+    assert len(prepared) == 41
+    for item in prepared:
+        tx = item["transaction"]
+        assert tx["sequence"] == funded[item["principal_address"]]
+        assert tx["fee"] == "12" and tx["last_ledger_sequence"] == 5020
+        assert tx["limit_amount"]["issuer"] == service.issuer_wallet.classic_address
+    assert max(client.reads.values()) == 1
+    assert client.peak <= 8
+
+
+def test_existing_credential_short_circuits(monkeypatch):
+    monkeypatch.setenv("ISSUER_SEED", Wallet.create().seed)
+    monkeypatch.setattr(XRPLClient, "_instance", None)
+    index = TrustLineIndex()
+    service = CredentialService(trust_lines=index)
+    holder = Wallet.create().classic_address
+    index.issuer = service.issuer_wallet.classic_address
+    index.apply_transaction({"tx_json": {
+        "TransactionType": "TrustSet", "Account": holder,
+        "LimitAmount": {"currency": service._format_currency("CORRIDOR_ELIGIBLE"), "issuer": index.issuer, "value": "1000000"},
+    }})
+
+    assert service.submit_trust_set(holder)["status"] == "already_issued"
+
+    client = FakeAsyncClient({})
+
+    async def _collect():
+        return [item async for item in service.prepare_trust_set_batch([holder], client=client)]
+
+    assert [item["status"] for item in asyncio.run(_collect())] == ["already_issued"]
+    assert client.reads == {}
+
+
+def test_only_an_explicit_reissue_clears_the_issuer_freeze(monkeypatch):
+    monkeypatch.setenv("ISSUER_SEED", Wallet.create().seed)
+    monkeypatch.setattr(XRPLClient, "_instance", None)
+    index = TrustLineIndex()
+    service = CredentialService(trust_lines=index)
+    holder = Wallet.create().classic_address
+    currency = service._format_currency("CORRIDOR_ELIGIBLE")
+    index.issuer = service.issuer_wallet.classic_address
+    index.apply_transaction({"tx_json": {
+        "TransactionType": "TrustSet", "Account": holder,
+        "LimitAmount": {"currency": currency, "issuer": index.issuer, "value": "1000000"},
+    }})
+    # Revoked by the expiry sweeper
+    index.apply_transaction({"tx_json": {
+        "TransactionType": "TrustSet", "Account": index.issuer, "Flags": int(TrustSetFlag.TF_SET_FREEZE),
+        "LimitAmount": {"currency": currency, "issuer": holder, "value": "0"},
+    }})
+    assert not index.is_issued(holder, currency, "1000000")
+
+    submitted = []
+
+    def _submit(tx, wallet=None, wait=True):
+        submitted.append(tx.to_xrpl())
+        result = {"hash": "H1", "tx_json": tx.to_xrpl()}
+        index.apply_transaction(result)  # what the submit listener does once it validates
+        return result
+
+    monkeypatch.setattr(service.xrpl, "submit", _submit)
+
+    # Preparing a TrustSet, alone or in a batch, leaves the revocation in place
+    assert service.submit_trust_set(holder)["status"] == "revoked"
+
+    async def _collect():
+        return [item async for item in service.prepare_trust_set_batch([holder], client=FakeAsyncClient({}))]
+
+    assert [item["status"] for item in asyncio.run(_collect())] == ["revoked"]
+    assert submitted == [] and index.get(holder, currency).frozen
+
+    assert service.reissue(holder)["status"] == "reissued"
+    assert len(submitted) == 1
+    assert submitted[0]["Account"] == index.issuer
+    assert submitted[0]["Flags"] & TrustSetFlag.TF_CLEAR_FREEZE
+    assert not index.get(holder, currency).frozen
+    assert service.submit_trust_set(holder)["status"] == "already_issued"
+    assert service.reissue(holder)["status"] == "not_revoked"
+
+
+def test_reissue_route_needs_the_issuer_token(monkeypatch):
+    from fastapi import HTTPException
+    from app.routes.credentials import require_issuer
+
+    monkeypatch.delenv("ISSUER_ADMIN_TOKEN", raising=False)
+    with pytest.raises(HTTPException) as disabled:
+        require_issuer("anything")
+    assert disabled.value.status_code == 403
+
+    monkeypatch.setenv("ISSUER_ADMIN_TOKEN", "s3cret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as rejected:
+            require_issuer(token)
+        assert rejected.value.status_code == 401
+    require_issuer("s3cret")
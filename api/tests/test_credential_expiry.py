@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.trust_line import TrustLineRecord
+from app.services.credential_expiry import CredentialExpirySweeper
+
+
+class FakeRevoker:
+    """Records revoked credentials, the batches they came in and peak concurrency."""
+
+    def __init__(self, fail_once=()):
+        self.revoked = []
+        self.batches = []
+        self.fail_once = set(fail_once)
+        self._lock = threading.Lock()
+        self._active = 0
+        self.peak = 0
+
+    def __call__(self, batch):
+        with self._lock:
+            self._active += 1
+            self.peak = max(self.peak, self._active)
+            self.batches.append(list(batch))
+        try:
+            time.sleep(0.01)
+            failed = [key for key in batch if key in self.fail_once]
+            self.fail_once -= set(failed)
+            with self._lock:
+                self.revoked.extend(key for key in batch if key not in failed)
+            return failed
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def _at(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+def _sweeper(tmp_path, revoker, **kwargs):
+    return CredentialExpirySweeper(revoker, clock=lambda: 0.0, directory=tmp_path, **kwargs)
+
+
+def test_sweep_revokes_only_expired_in_bounded_batches(tmp_path):
+    revoker = FakeRevoker()
+    sweeper = _sweeper(tmp_path, revoker, batch_size=10, max_in_flight=2)
+    for i in range(100):
+        sweeper.schedule(f"rHolder{i}", "USD", _at(1000 + i))
+
+    assert sweeper.next_expiry() == 1000
+    assert sweeper.sweep(now=1049) == 50
+    assert sweeper.wait_idle(timeout=5)
+    assert sorted(revoker.revoked) == sorted((f"rHolder{i}", "USD") for i in range(50))
+    assert max(len(batch) for batch in revoker.batches) == 10
+    assert revoker.peak <= 2
+    assert len(sweeper) == 50
+    assert sweeper.next_expiry() == 1050
+    assert sweeper.sweep(now=1049) == 0
+
+
+def test_cancel_and_reschedule_use_lazy_deletion(tmp_path):
+    revoker = FakeRevoker()
+    sweeper = _sweeper(tmp_path, revoker)
+    sweeper.schedule("rA", "USD", _at(100))
+    sweeper.schedule("rB", "USD", _at(200))
+    sweeper.schedule("rA", "USD", _at(300))  # renewed
+    assert sweeper.cancel("rB", "USD")
+    assert not sweeper.cancel("rB", "USD")
+
+    assert sweeper.next_expiry() == 300
+    assert sweeper.sweep(now=250) == 0
+    assert sweeper.sweep(now=300) == 1
+    sweeper.wait_idle(timeout=5)
+    assert revoker.revoked == [("rA", "USD")]
+
+
+def test_failed_revocation_is_retried_with_backoff(tmp_path):
+    revoker = FakeRevoker(fail_once={("rA", "USD")})
+    sweeper = _sweeper(tmp_path, revoker, retry_delay=30)
+    sweeper.schedule("rA", "USD", _at(100))
+
+    sweeper.sweep(now=100)
+    sweeper.wait_idle(timeout=5)
+    assert revoker.revoked == []
+    assert sweeper.next_expiry() == 130
+
+    sweeper.sweep(now=130)
+    sweeper.wait_idle(timeout=5)
+    assert revoker.revoked == [("rA", "USD")]
+    assert sweeper.revoked == 1 and len(sweeper) == 0
+
+
+def test_log_survives_restart_and_is_compacted(tmp_path):
+    sweeper = _sweeper(tmp_path, FakeRevoker())
+    sweeper.schedule("rA", "USD", _at(100))
+    sweeper.schedule("rB", "USD", _at(200))
+    sweeper.schedule("rC", "USD", _at(300))
+    sweeper.cancel("rB", "USD")
+    sweeper.sweep(now=100)
+    sweeper.wait_idle(timeout=5)
+    sweeper.stop()
+
+    restored = _sweeper(tmp_path, FakeRevoker())
+    restored.load()
+    assert len(restored) == 1
+    assert restored.expires_at("rC", "USD") == 300
+    with sqlite3.connect(restored.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+
+
+def test_workers_share_schedules_and_only_one_sweeps(tmp_path):
+    revoker = FakeRevoker()
+    recorder = _sweeper(tmp_path, None)
+    leader = _sweeper(tmp_path, revoker)
+    recorder.load()
+    leader.load()
+    recorder.schedule("rA", "USD", _at(100))
+    recorder.schedule("rB", "USD", _at(100))
+
+    assert leader.sweep(now=100) == 2
+    leader.wait_idle(timeout=5)
+    # Renewed after its revocation: every worker keeps the new schedule
+    recorder.schedule("rB", "USD", _at(500))
+    recorder.compact()
+
+    assert sorted(revoker.revoked) == [("rA", "USD"), ("rB", "USD")]
+    assert recorder.expires_at("rA", "USD") is None
+    assert recorder.expires_at("rB", "USD") == 500
+    assert leader.next_expiry() == 500
+
+
+def test_background_sweeper_wakes_for_an_earlier_expiry(tmp_path):
+    revoker = FakeRevoker()
+    sweeper = CredentialExpirySweeper(revoker, directory=tmp_path)
+    sweeper.schedule("rLate", "USD", _at(time.time() + 3600))
+    sweeper.start()
+    try:
+        sweeper.schedule("rSoon", "USD", _at(time.time() + 0.05))
+        deadline = time.time() + 5
+        while not revoker.revoked and time.time() < deadline:
+            time.sleep(0.01)
+        assert revoker.revoked == [("rSoon", "USD")]
+        assert len(sweeper) == 1
+    finally:
+        sweeper.stop()
+
+
+def test_removed_trust_line_cancels_its_expiry(tmp_path):
+    sweeper = _sweeper(tmp_path, FakeRevoker())
+    sweeper.schedule("rA", "USD", _at(100))
+    sweeper.on_index_event("removed", TrustLineRecord("rA", "USD"))
+    assert len(sweeper) == 0
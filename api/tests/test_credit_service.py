@@ -0,0 +1,30 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from xrpl.wallet import Wallet
+
+from app.services.credit_service import CreditService
+from app.services.xrpl_client import XRPLClient
+
+BORROWER = Wallet.create().classic_address
+
+
+class FakeLedger:
+    address = "rIssuer"
+
+    def get_account_lines(self, address):
+        return [{"account": "rIssuer", "currency": "USD"}, {"account": "rOtherGateway", "currency": "EUR"}]
+
+    def get_account_transactions(self, address, limit=50):
+        return {"transactions": []}
+
+
+def test_trust_line_factor_counts_lines_to_every_issuer(monkeypatch):
+    monkeypatch.setenv("ISSUER_SEED", Wallet.create().seed)
+    monkeypatch.setattr(XRPLClient, "_instance", None)
+    service = CreditService()
+    service.xrpl = FakeLedger()
+
+    credit = service.get_credit_score(BORROWER)
+    assert credit["factors"]["trust_lines"] == 2
+    assert credit["score"] == 550
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.bank import BankRecord
+from app.models.loan import LoanRecord
+from app.services.bank_registry import BankIndex
+from app.services.dashboard_service import DashboardService
+from app.services.escrow_index import EscrowIndex
+from app.services.payment_history_service import PaymentHistoryService
+from app.services.payment_store import PaymentStore
+from app.services.state_backend import MemoryStateBackend
+
+ADDRESS = "rBorrower"
+
+
+def _entry(ledger_index, tx_type="Payment"):
+    return {
+        "hash": f"H{ledger_index}",
+        "ledger_index": ledger_index,
+        "date": 800_000_000 + ledger_index,
+        "meta": {"TransactionResult": "tesSUCCESS", "TransactionIndex": 0},
+        "tx_json": {"TransactionType": tx_type, "Account": ADDRESS, "Destination": "rShop", "DeliverMax": "2000000"},
+    }
+
+
+class FakeLedger:
+    def __init__(self, entries, delay=0.0):
+        self.entries = entries
+        self.delay = delay
+        self.reads = 0
+
+    def get_account_transactions(self, address=None, limit=50, marker=None):
+        self.reads += 1
+        time.sleep(self.delay)
+        return {"transactions": self.entries[:limit], "marker": None}
+
+    def iter_account_transactions(self, address, after_ledger, page_size=200):
+        return iter(())
+
+
+class FakeCredit:
+    def __init__(self, xrpl, delay=0.0):
+        self.xrpl = xrpl
+        self.delay = delay
+        self.seen = None
+
+    def get_credit_score(self, address, transactions=None):
+        time.sleep(self.delay)
+        self.seen = transactions
+        return {"score": 700, "rating": "Good", "max_eligible": 5000.0, "factors": {}}
+
+
+class FakeRegistry:
+    def __init__(self, banks):
+        self.index = BankIndex(banks, generation=1)
+
+    def snapshot(self):
+        return self.index
+
+
+def _service(tmp_path, ledger, credit_delay=0.0, timeout=2.0):
+    escrows = EscrowIndex()
+    escrows.add(LoanRecord(owner="rBank", sequence=7, destination=ADDRESS, amount_drops=1_000_000_000, finish_after=1))
+    banks = [BankRecord(bank_id=f"b{i}", bank_name=f"B{i}", wallet_address=f"rB{i}", max_per_loan=1500.0,
+                        balance_xrp=balance, min_credit_score=500) for i, balance in enumerate((1000.0, 800.0))]
+    return DashboardService(
+        credit=FakeCredit(ledger, delay=credit_delay),
+        history=PaymentHistoryService(xrpl_client=ledger, store=PaymentStore(tmp_path / "payments.db")),
+        escrows=escrows,
+        registry=FakeRegistry(banks),
+        state=MemoryStateBackend(),
+        section_timeout=timeout,
+    )
+
+
+def test_sections_share_one_ledger_read(tmp_path):
+    ledger = FakeLedger([_entry(n) for n in range(30, 10, -1)] + [_entry(5, "TrustSet")])
+    service = _service(tmp_path, ledger)
+    payload = asyncio.run(service.build(ADDRESS, history_limit=5))
+
+    assert ledger.reads == 1
+    assert len(service.credit.seen) == 21
+    assert payload["errors"] == {}
+    assert [p["id"] for p in payload["payments"]] == ["H30", "H29", "H28", "H27", "H26"]
+    assert payload["escrows"][0]["amount_xrp"] == 1000.0
+    assert payload["eligibility"] == {"max_amount": 1800.0, "credit_limit": 5000.0, "bank_capacity": 1800.0}
+
+
+def test_a_slow_section_times_out_without_holding_back_the_rest(tmp_path):
+    service = _service(tmp_path, FakeLedger([_entry(10)]), credit_delay=1.0, timeout=0.2)
+
+    async def _timed():
+        started = time.perf_counter()
+        payload = await service.build(ADDRESS)
+        return payload, time.perf_counter() - started
+
+    payload, elapsed = asyncio.run(_timed())
+    assert elapsed < 0.9
+    assert payload["credit"] is None and payload["eligibility"] is None
+    assert payload["errors"] == {"credit": "timeout", "eligibility": "timeout"}
+    assert payload["payments"][0]["id"] == "H10" and len(payload["escrows"]) == 1
@@ -0,0 +1,75 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.bank import BankRecord
+from app.services.bank_registry import BankRegistry
+from app.services.escrow_index import EscrowIndex
+
+
+class FakeLedger:
+    def __init__(self, pages, txs):
+        self.pages = pages
+        self.txs = txs
+
+    def get_account_objects(self, address, object_type=None):
+        return {"objects": self.pages.get(address, []), "ledger_index": 100}
+
+    def get_transaction(self, tx_hash):
+        return {"tx_json": self.txs[tx_hash]}
+
+    def iter_account_transactions(self, address, since_ledger, page_size=200):
+        return iter(())
+
+
+def test_backfill_and_transaction_stream():
+    ledger = FakeLedger(
+        pages={"rBank": [
+            {"Account": "rBank", "Destination": "rBiz", "Amount": "5000000", "FinishAfter": 300, "PreviousTxnID": "H1"},
+            {"Account": "rBank", "Destination": "rOther", "Amount": "1000000", "FinishAfter": 100, "PreviousTxnID": "H2"},
+            {"Account": "rElse", "Destination": "rBank", "Amount": "9", "PreviousTxnID": "H3"},
+        ]},
+        txs={
+            "H1": {"TransactionType": "EscrowCreate", "Sequence": 11},
+            "H2": {"TransactionType": "EscrowCreate", "Sequence": 12},
+        },
+    )
+    index = EscrowIndex()
+    index.backfill(ledger, ["rBank"], bank_id_for=lambda owner: "bank001")
+
+    assert len(index) == 2
+    assert [e.sequence for e in index.for_owner("rBank")] == [12, 11]
+    assert [e.sequence for e in index.maturing_before(200)] == [12]
+
+    index.apply_transaction({"hash": "H4", "meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "EscrowCreate", "Account": "rBank", "Sequence": 13,
+        "Destination": "rBiz", "Amount": "2000000", "FinishAfter": 150,
+    }}, bank_id_for=lambda owner: "bank001")
+    index.apply_transaction({"meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "EscrowFinish", "Owner": "rBank", "OfferSequence": 12,
+    }}, bank_id_for=lambda owner: "bank001")
+
+    assert [e.sequence for e in index.for_destination("rBiz")] == [13, 11]
+    assert index.get("rBank", 12) is None
+    assert [e.sequence for e in index.maturing_before(200)] == [13]
+
+
+def test_banks_registered_after_startup_are_backfilled_and_followed(tmp_path):
+    ledger = FakeLedger(
+        pages={"rNew": [{"Account": "rNew", "Destination": "rBiz", "Amount": "3000000", "FinishAfter": 50, "PreviousTxnID": "H7"}]},
+        txs={"H7": {"TransactionType": "EscrowCreate", "Sequence": 21}},
+    )
+    index = EscrowIndex()
+    index.backfill(ledger, ["rBank"], bank_id_for=lambda owner: owner)
+    registry = BankRegistry(tmp_path / "banks.json", check_interval=0)
+    registry.add_listener(lambda banks: index.track(bank.wallet_address for bank in banks.banks))
+
+    registry.upsert(BankRecord(bank_id="new", bank_name="New", wallet_address="rNew"))
+    index.sync(ledger, bank_id_for=lambda owner: owner)
+    assert [e.sequence for e in index.for_owner("rNew")] == [21]
+
+    # Its escrows created from now on are no longer dropped
+    assert index.apply_transaction({"hash": "H8", "meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "EscrowCreate", "Account": "rNew", "Sequence": 22,
+        "Destination": "rBiz", "Amount": "1000000", "FinishAfter": 60,
+    }}, bank_id_for=lambda owner: owner)
+    assert len(index.for_owner("rNew")) == 2
@@ -0,0 +1,138 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.loan import LoanRecord
+from app.models.policy import CreditPolicy
+from app.services.escrow_index import EscrowIndex
+from app.services.exposure_ledger import ExposureLedger
+from app.services.policy_engine import PolicyEngine
+
+
+def _create_result(owner, sequence, destination, drops, tx_hash):
+    return {
+        "hash": tx_hash,
+        "tx_json": {
+            "TransactionType": "EscrowCreate", "Account": owner, "Sequence": sequence,
+            "Destination": destination, "Amount": str(drops), "FinishAfter": 800_000_000,
+        },
+    }
+
+
+def test_incremental_updates_and_restart(tmp_path):
+    ledger = ExposureLedger(tmp_path)
+    bank_id_for = {"rBank": "bank001"}.get
+    ledger.apply_transaction(_create_result("rBank", 7, "rBiz", 5_000_000_000, "H1"), bank_id_for)
+    ledger.apply_transaction(_create_result("rBank", 8, "rBiz", 1_000_000_000, "H2"), bank_id_for)
+    ledger.apply_transaction({"tx_json": {"TransactionType": "EscrowFinish", "Owner": "rBank", "OfferSequence": 7}}, bank_id_for)
+    ledger.apply_transaction({"tx_json": {"TransactionType": "EscrowCancel", "Owner": "rBank", "OfferSequence": 8}}, bank_id_for)
+    ledger.record_clawback("rBiz", "bank001", 500_000_000)
+
+    assert ledger.exposure("rBiz", "bank001") == 4500
+    assert ledger.bank_exposure("bank001") == 4500
+
+    restored = ExposureLedger(tmp_path)
+    restored.load()
+    assert restored.exposure("rBiz", "bank001") == 4500
+    assert restored.get_loan("rBank", 7).status == "finished"
+    assert restored.get_loan("rBank", 8) is None
+
+
+def test_reconcile_rebuilds_escrowed_positions(tmp_path):
+    ledger = ExposureLedger(tmp_path)
+    bank_id_for = {"rBank": "bank001"}.get
+    ledger.apply_transaction(_create_result("rBank", 7, "rBiz", 2_000_000, "H1"), bank_id_for)
+    ledger.apply_transaction(_create_result("rBank", 9, "rOld", 3_000_000, "H9"), bank_id_for)
+
+    # Escrow 9 no longer exists on-ledger; escrow 12 was created while we were down
+    ledger.reconcile({"rBank": [
+        LoanRecord("rBank", 7, "rBiz", 2_000_000, bank_id="bank001", tx_hash="H1"),
+        LoanRecord("rBank", 12, "rNew", 4_000_000, bank_id="bank001", tx_hash="H12"),
+    ]})
+
+    # A vanished escrow may have been finished by the borrower: its principal stays outstanding
+    assert ledger.get_loan("rBank", 9).status == "finished"
+    assert ledger.exposure("rBiz", "bank001") == 2
+    assert ledger.exposure("rOld", "bank001") == 3
+    assert ledger.exposure("rNew", "bank001") == 4
+    assert ledger.bank_exposure("bank001") == 9
+
+
+def test_borrower_finish_seen_through_escrow_index(tmp_path):
+    ledger = ExposureLedger(tmp_path)
+    index = EscrowIndex()
+    index.add_listener(ledger.on_index_event)
+    index.add(LoanRecord("rBank", 7, "rBiz", 2_000_000, bank_id="bank001", tx_hash="H1"))
+    index.add(LoanRecord("rBank", 8, "rBiz", 1_000_000, bank_id="bank001", tx_hash="H2"))
+
+    # Submitted by the borrower, so only the index sync sees them
+    index.apply_transaction({"meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "EscrowFinish", "Account": "rBiz", "Owner": "rBank", "OfferSequence": 7,
+    }}, bank_id_for=lambda owner: "bank001")
+    index.apply_transaction({"meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "EscrowCancel", "Account": "rBiz", "Owner": "rBank", "OfferSequence": 8,
+    }}, bank_id_for=lambda owner: "bank001")
+
+    assert ledger.get_loan("rBank", 7).status == "finished"
+    assert ledger.get_loan("rBank", 8) is None
+    assert ledger.exposure("rBiz", "bank001") == 2
+
+
+def test_workers_share_one_log(tmp_path):
+    first, second = ExposureLedger(tmp_path, snapshot_every=3), ExposureLedger(tmp_path, snapshot_every=3)
+    first.load()
+    second.load()
+    bank_id_for = {"rBank": "bank001"}.get
+    first.apply_transaction(_create_result("rBank", 7, "rBiz", 2_000_000, "H1"), bank_id_for)
+    # Both workers observe the same create; it is counted once
+    second.apply_transaction(_create_result("rBank", 7, "rBiz", 2_000_000, "H1"), bank_id_for)
+    second.apply_transaction(_create_result("rBank", 8, "rBiz", 1_000_000, "H2"), bank_id_for)
+    second.record_clawback("rBiz", "bank001", 500_000, tx_hash="C1")
+    second.record_clawback("rBiz", "bank001", 500_000, tx_hash="C1")
+    # second compacted the log past first's cursor
+    first.record_escrow_cancel("rBank", 8)
+
+    for ledger in (first, second):
+        assert ledger.exposure("rBiz", "bank001") == 1.5
+        assert ledger.get_loan("rBank", 8) is None
+
+    restarted = ExposureLedger(tmp_path)
+    restarted.load()
+    assert restarted.exposure("rBiz", "bank001") == 1.5
+
+
+def test_borrower_payment_to_the_bank_repays_principal(tmp_path):
+    ledger = ExposureLedger(tmp_path)
+    bank_id_for = {"rBank": "bank001"}.get
+    ledger.apply_transaction(_create_result("rBank", 7, "rBiz", 5_000_000_000, "H1"), bank_id_for)
+    ledger.apply_transaction({"tx_json": {"TransactionType": "EscrowFinish", "Owner": "rBank", "OfferSequence": 7}}, bank_id_for)
+    assert ledger.exposure("rBiz", "bank001") == 5000
+
+    payment = {
+        "hash": "P1",
+        "tx_json": {"TransactionType": "Payment", "Account": "rBiz", "Destination": "rBank", "Amount": "9000000000"},
+        "meta": {"TransactionResult": "tesSUCCESS", "delivered_amount": "2000000000"},
+    }
+    assert ledger.apply_transaction(payment, bank_id_for)
+    # Another worker syncing the same transaction does not count it twice
+    ledger.apply_transaction(payment, bank_id_for)
+    assert ledger.exposure("rBiz", "bank001") == 3000
+    assert ledger.bank_exposure("bank001") == 3000
+
+    # Payments from wallets that owe the bank nothing, and failed payments, are ignored
+    stranger = {"hash": "P2", "tx_json": {"TransactionType": "Payment", "Account": "rStranger", "Destination": "rBank", "Amount": "1000000"}}
+    failed = {"hash": "P3", "tx_json": payment["tx_json"], "meta": {"TransactionResult": "tecPATH_DRY"}}
+    assert not ledger.apply_transaction(stranger, bank_id_for)
+    assert not ledger.apply_transaction(failed, bank_id_for)
+    assert ledger.exposure("rBiz", "bank001") == 3000
+
+
+def test_policy_checks_bank_wide_exposure(tmp_path):
+    ledger = ExposureLedger(tmp_path)
+    bank_id_for = {"rBank": "bank001"}.get
+    ledger.apply_transaction(_create_result("rBank", 7, "rOther", 900_000_000, "H1"), bank_id_for)
+    state = ledger.state_for("rBiz", "bank001")
+
+    engine = PolicyEngine(CreditPolicy(max_duration_days=365, max_default_rate=0.1, max_exposure=500, max_bank_exposure=1000))
+    assert engine.exposure_allows(100, state)
+    assert not engine.exposure_allows(200, state)
+    assert PolicyEngine(CreditPolicy(max_duration_days=365, max_default_rate=0.1, max_exposure=500)).exposure_allows(200, state)
@@ -0,0 +1,66 @@
+import os
+import sys
+from decimal import Decimal
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.services.ledger_export import LedgerExportJob, normalize_entry
+from conftest import FakeLedger
+
+
+def _entry(ledger_index, tx_index, tx_type="Payment", amount="1500000", account="rBiz", destination="rPeer"):
+    tx_json = {"TransactionType": tx_type, "Account": account, "Destination": destination, "Fee": "12",
+               "DeliverMax" if tx_type == "Payment" else "Amount": amount}
+    return {
+        "hash": f"H{ledger_index}-{tx_index}",
+        "ledger_index": ledger_index,
+        "date": 800_000_000 + ledger_index * 3600,  # one ledger per hour: ~24 per date partition
+        "meta": {"TransactionResult": "tesSUCCESS", "TransactionIndex": tx_index},
+        "tx_json": tx_json,
+    }
+
+
+def test_amounts_are_exact_and_counterparty_is_the_other_side():
+    xrp = normalize_entry("rBiz", _entry(10, 0))
+    assert xrp["amount_drops"] == 1_500_000 and xrp["amount"] == Decimal("1.5")
+    assert xrp["counterparty"] == "rPeer" and xrp["fee_drops"] == 12
+
+    iou = normalize_entry("rBiz", _entry(10, 1, "EscrowCreate", {"currency": "USD", "issuer": "rBank", "value": "0.1"},
+                                         account="rPeer", destination="rBiz"))
+    assert iou["amount_drops"] is None and iou["amount"] == Decimal("0.1") and iou["issuer"] == "rBank"
+    assert iou["counterparty"] == "rPeer"
+
+    assert normalize_entry("rBiz", _entry(10, 2, "TrustSet")) is None
+
+
+def test_export_is_partitioned_dictionary_encoded_and_incremental(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    ledger = FakeLedger([_entry(n, i) for n in range(1, 101) for i in range(2)])
+    job = LedgerExportJob(out_dir=tmp_path, xrpl_client=ledger, batch_rows=7)
+
+    assert job.run(["rBiz"]) == {"rBiz": 200}
+    ledger.entries += [_entry(n, 0, "EscrowFinish") for n in range(101, 111)]
+    assert job.run(["rBiz"]) == {"rBiz": 10}
+    assert ledger.calls == [0, 100]
+    assert job.load_state() == {"rBiz": 110}
+
+    table = pq.read_table(tmp_path)
+    assert table.num_rows == 210
+    assert len({p.name for p in tmp_path.glob("date=*")}) == 5
+    assert str(table.schema.field("type").type).startswith("dictionary")
+    assert table.column("amount_drops").to_pylist()[:2] == [1_500_000, 1_500_000]
+    assert not list(tmp_path.glob("date=*/*.tmp"))
+
+
+def test_a_failed_run_leaves_no_files_and_no_progress(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    class FlakyLedger(FakeLedger):
+        def iter_account_transactions(self, address, after_ledger, page_size=200):
+            yield from list(super().iter_account_transactions(address, after_ledger))[:50]
+            raise ConnectionError("ledger went away")
+
+    job = LedgerExportJob(out_dir=tmp_path, xrpl_client=FlakyLedger([_entry(n, 0) for n in range(1, 101)]), fmt="arrow")
+    with pytest.raises(ConnectionError):
+        job.run(["rBiz"])
+    assert job.load_state() == {}
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+
+from app.services.loan_jobs import JobQueueFull, LoanJobQueue
+from app.services.state_backend import MemoryStateBackend, SQLiteStateBackend
+
+
+def test_job_reports_stages_and_result_to_followers():
+    async def scenario():
+        jobs = LoanJobQueue(workers=2)
+
+        async def run(progress):
+            progress("eligibility")
+            await asyncio.sleep(0)
+            progress("matching")
+            return {"status": "approved", "tx_hash": "ABC"}
+
+        job = await jobs.submit(run)
+        events = [event async for event in job.follow(heartbeat=1)]
+        await jobs.stop()
+        return job, events
+
+    job, events = asyncio.run(scenario())
+    assert [(e["status"], e["stage"]) for e in events] == [
+        ("queued", None), ("running", None), ("running", "eligibility"), ("running", "matching"), ("succeeded", "matching"),
+    ]
+    assert [e["seq"] for e in events] == [1, 2, 3, 4, 5]
+    assert events[-1]["result"] == {"status": "approved", "tx_hash": "ABC"}
+    assert job.to_json()["status"] == "succeeded"
+
+
+def test_follow_resumes_after_last_seen_event():
+    async def scenario():
+        jobs = LoanJobQueue(workers=1)
+
+        async def run(progress):
+            progress("eligibility")
+            return {"status": "rejected"}
+
+        job = await jobs.submit(run)
+        async for _ in job.follow():
+            pass
+        resumed = [event["seq"] async for event in job.follow(after=3)]
+        await jobs.stop()
+        return resumed
+
+    assert asyncio.run(scenario()) == [4]
+
+
+def test_full_queue_refuses_new_jobs_and_failures_are_recorded():
+    async def scenario():
+        jobs = LoanJobQueue(workers=1, max_queued=1)
+        release = asyncio.Event()
+
+        async def slow(progress):
+            await release.wait()
+            return {"status": "approved"}
+
+        async def broken(progress):
+            raise ValueError("amount exceeds credit limit")
+
+        running = await jobs.submit(slow)
+        await asyncio.sleep(0)  # worker picks up the first job
+        queued = await jobs.submit(broken)
+        with pytest.raises(JobQueueFull):
+            await jobs.submit(slow)
+        assert len(jobs) == 2
+
+        release.set()
+        async for _ in queued.follow():
+            pass
+        await jobs.stop()
+        return running, queued
+
+    running, queued = asyncio.run(scenario())
+    assert running.status == "succeeded"
+    assert queued.status == "failed" and queued.error == "amount exceeds credit limit"
+
+
+def test_stop_drains_running_jobs_and_fails_queued_ones():
+    async def scenario():
+        jobs = LoanJobQueue(workers=1)
+
+        async def quick(progress):
+            await asyncio.sleep(0.01)
+            return {"status": "approved"}
+
+        first, second = await jobs.submit(quick), await jobs.submit(quick)
+        await asyncio.sleep(0)
+        await jobs.stop(drain=1)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status == "succeeded"
+    assert second.status == "failed" and "before the job ran" in second.error
+
+
+def test_jobs_outliving_the_drain_are_unknown_not_failed():
+    async def scenario():
+        jobs = LoanJobQueue(workers=1)
+        never = asyncio.Event()
+
+        async def stuck(progress):
+            progress("signing")
+            await never.wait()
+
+        job = await jobs.submit(stuck)
+        await asyncio.sleep(0)
+        await jobs.stop(drain=0.01)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "unknown" and job.done
+    assert "signing" in job.error and job.events[-1]["error"] == job.error
+
+
+def test_any_worker_sharing_the_state_backend_serves_the_job(tmp_path):
+    async def scenario():
+        state = SQLiteStateBackend(tmp_path / "state.db")
+        accepting, other = LoanJobQueue(workers=1, state=state), LoanJobQueue(workers=1, state=state)
+        release = asyncio.Event()
+
+        async def run(progress):
+            progress("eligibility")
+            await release.wait()
+            return {"status": "approved", "tx_hash": "ABC"}
+
+        job = await accepting.submit(run)
+        shared = await other.find(job.id)
+        assert shared is not None and other.get(job.id) is None
+        release.set()
+        shared.poll = 0.01
+        events = [event async for event in shared.follow(heartbeat=1)]
+        await accepting.stop()
+        assert await other.find("missing") is None
+        return job, shared, events
+
+    job, shared, events = asyncio.run(scenario())
+    assert [e["seq"] for e in events] == [e["seq"] for e in job.events]
+    assert events[-1]["result"] == {"status": "approved", "tx_hash": "ABC"}
+    assert shared.to_json() == job.to_json()
+
+
+def test_finished_jobs_are_pruned_from_the_state_backend():
+    state = MemoryStateBackend()
+    state.append_job_event("old", {"seq": 1, "status": "succeeded"}, done=True)
+    state.append_job_event("running", {"seq": 1, "status": "running"}, done=False)
+    assert state.prune_jobs(time.time() + 1) == 1
+    assert state.job_events("old") == [] and len(state.job_events("running")) == 1
@@ -0,0 +1,156 @@
+import os
+import random
+import sys
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from types import SimpleNamespace
+
+from xrpl.wallet import Wallet
+
+from app.models.loan import LoanRecord
+from app.services import maturity_scheduler as maturity_module
+from app.services.maturity_scheduler import MaturityScheduler, TimingWheel, build_maturity_scheduler
+from app.services.validation_tracker import TransactionFailed
+
+
+class FakeLedger:
+    """Records EscrowFinish submissions and the peak concurrency per signing wallet."""
+
+    def __init__(self, fail_once=()):
+        self.finished = []
+        self.fail_once = set(fail_once)
+        self._lock = threading.Lock()
+        self._active = {}
+        self.peak = {}
+
+    def finish_batch(self, batch):
+        owner = batch[0].owner
+        with self._lock:
+            self._active[owner] = self._active.get(owner, 0) + 1
+            self.peak[owner] = max(self.peak.get(owner, 0), self._active[owner])
+        try:
+            failed = []
+            for escrow in batch:
+                if escrow.key in self.fail_once:
+                    self.fail_once.discard(escrow.key)
+                    failed.append((escrow, RuntimeError("tefPAST_SEQ")))
+                    continue
+                with self._lock:
+                    self.finished.append(escrow.key)
+            return failed
+        finally:
+            with self._lock:
+                self._active[owner] -= 1
+
+
+def _escrow(owner, sequence, finish_after):
+    return LoanRecord(owner=owner, sequence=sequence, destination="rBiz", amount_drops=1, finish_after=finish_after)
+
+
+def test_wheel_expires_in_deadline_order_across_levels():
+    rng = random.Random(3)
+    wheel = TimingWheel(now=1_000_000)
+    deadlines = {i: 1_000_000 + rng.randrange(0, 200_000) for i in range(2000)}
+    for key, deadline in deadlines.items():
+        wheel.add(key, deadline, key)
+    wheel.remove(0)
+
+    seen = {}
+    for now in list(range(1_000_000, 1_200_000, 997)) + [1_200_000]:
+        for key, _ in wheel.advance(now):
+            seen[key] = now
+    assert len(wheel) == 0
+    assert 0 not in seen and len(seen) == 1999
+    assert all(deadlines[k] <= t < deadlines[k] + 997 for k, t in seen.items())
+
+
+def test_scheduler_batches_per_wallet_and_retries():
+    clock = [500]
+    ledger = FakeLedger(fail_once={("rB", 2)})
+    scheduler = MaturityScheduler(
+        finish_batch=ledger.finish_batch,
+        signer_for=lambda escrow: escrow.owner,
+        clock=lambda: clock[0],
+        batch_size=2,
+        max_per_wallet=1,
+        retry_delay=10,
+    )
+    for seq in range(1, 7):
+        scheduler.track(_escrow("rA", seq, 510))
+        scheduler.track(_escrow("rB", seq, 520))
+    scheduler.track(_escrow("rC", 1, None))  # condition-only escrows are not scheduled
+    scheduler.untrack("rA", 6)
+
+    assert scheduler.tick(505) == 0
+    assert scheduler.tick(515) == 5
+    assert scheduler.wait_idle(timeout=5)
+    assert scheduler.tick(520) == 6
+    assert scheduler.wait_idle(timeout=5)
+    assert ("rB", 2) not in ledger.finished
+
+    clock[0] = 530
+    assert scheduler.tick() == 1
+    assert scheduler.wait_idle(timeout=5)
+    assert sorted(ledger.finished) == [("rA", s) for s in range(1, 6)] + [("rB", s) for s in range(1, 7)]
+    assert ledger.peak == {"rA": 1, "rB": 1}
+    assert len(scheduler) == 0
+    scheduler.stop()
+
+
+def test_stopped_scheduler_keeps_unsubmitted_escrows_for_the_next_start():
+    ledger = FakeLedger()
+    gate = threading.Event()
+
+    def slow_finish(batch):
+        gate.wait(5)
+        return ledger.finish_batch(batch)
+
+    scheduler = MaturityScheduler(finish_batch=slow_finish, signer_for=lambda escrow: escrow.owner,
+                                  clock=lambda: 500, batch_size=1, max_workers=1, max_per_wallet=4)
+    for seq in range(1, 5):
+        scheduler.track(_escrow("rA", seq, 510))
+    assert scheduler.tick(515) == 4  # one batch running, three waiting on the single worker
+
+    scheduler.stop()
+    gate.set()
+    assert scheduler.wait_idle(timeout=5)
+    assert len(ledger.finished) == 1 and len(scheduler) == 3
+
+    scheduler.start(interval=60)
+    assert scheduler.tick(516) == 3
+    assert scheduler.wait_idle(timeout=5)
+    assert sorted(ledger.finished) == [("rA", s) for s in range(1, 5)]
+    scheduler.stop()
+
+
+def test_live_finisher_signs_consecutive_sequences_and_waits_after_submitting(monkeypatch):
+    monkeypatch.setattr(maturity_module, "get_latest_validated_ledger_sequence", lambda client: 100)
+    wallet = Wallet.create()
+    events = []
+
+    class Tracker:
+        def wait(self, tx_hash):
+            events.append(("wait", tx_hash))
+            if tx_hash == "H42":
+                raise TransactionFailed({"hash": tx_hash, "status": "validated", "engine_result": "tecNO_TARGET"})
+            return {"status": "validated"}
+
+    xrpl_client = SimpleNamespace(
+        wallet=wallet,
+        address=wallet.classic_address,
+        client=SimpleNamespace(request=lambda req: SimpleNamespace(result={"account_data": {"Sequence": 41}})),
+        fee=lambda: "12",
+        tracker=Tracker(),
+        submit_signed=lambda blob, wait: events.append(("submit", blob["hash"], wait)),
+    )
+    signing = SimpleNamespace(sign_many=lambda items: [{"hash": f"H{tx.sequence}", "tx": tx} for tx, _ in items])
+    registry = SimpleNamespace(snapshot=lambda: {})
+    scheduler = build_maturity_scheduler(xrpl_client, index=None, registry=registry, wallet_cache=None, signing=signing)
+
+    batch = [_escrow("rBank", seq, 510) for seq in (7, 8, 9)]
+    failed = scheduler.finish_batch(batch)
+    assert events == [("submit", "H41", False), ("submit", "H42", False), ("submit", "H43", False),
+                      ("wait", "H41"), ("wait", "H42"), ("wait", "H43")]
+    assert [escrow.key for escrow, _ in failed] == [("rBank", 8)]
+    assert "tecNO_TARGET" in str(failed[0][1])
+    assert scheduler.max_per_wallet > 1
@@ -0,0 +1,241 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.services.payment_history_service import PaymentHistoryService
+from app.services.payment_store import HistoryFilter, PaymentStore
+from app.utils.cursors import decode_cursor, encode_cursor
+from app.utils.export import csv_chunks, gzip_chunks, ndjson_chunks
+from conftest import FakeLedger
+
+
+def _entry(ledger_index, tx_index, tx_type="Payment", amount="1000000", result="tesSUCCESS"):
+    """account_tx entry in API v2 layout (hash / date / ledger_index on the envelope)."""
+    tx_json = {"TransactionType": tx_type, "Account": "rBiz", "DeliverMax" if tx_type == "Payment" else "Amount": amount}
+    return {
+        "hash": f"H{ledger_index}-{tx_index}",
+        "ledger_index": ledger_index,
+        "date": 800_000_000 + ledger_index,
+        "meta": {"TransactionResult": result, "TransactionIndex": tx_index},
+        "tx_json": tx_json,
+        "validated": True,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PaymentStore(tmp_path / "payments.db")
+
+
+def test_history_is_synced_once_then_served_locally(store, monkeypatch):
+    ledger = FakeLedger([_entry(10, 0), _entry(10, 1, "EscrowCreate"), _entry(11, 0, "TrustSet"), _entry(12, 3, result="tecUNFUNDED")])
+    service = PaymentHistoryService(xrpl_client=ledger, store=store)
+    monkeypatch.setattr("app.services.payment_history_service.SYNC_INTERVAL", 3600)
+
+    page = service.history("rBiz", limit=10)
+    assert [p["id"] for p in page["payments"]] == ["H12-3", "H10-1", "H10-0"]
+    assert page["payments"][0]["status"] == "Failed"
+    assert page["payments"][2]["amount"] == 1.0
+    assert page["next"] is None
+    assert store.sync_state("rBiz")[0] == 12
+
+    service.history("rBiz", limit=10)
+    assert ledger.calls == [0]
+
+
+def test_sync_is_incremental_from_the_last_ledger(store):
+    ledger = FakeLedger([_entry(10, 0)])
+    service = PaymentHistoryService(xrpl_client=ledger, store=store)
+    assert service.sync("rBiz") == 1
+
+    ledger.entries += [_entry(15, 0), _entry(15, 1)]
+    assert service.sync("rBiz") == 2
+    assert ledger.calls == [0, 10]
+    assert store.count("rBiz") == 3
+
+
+def test_keyset_pages_cover_history_without_gaps(store):
+    ledger = FakeLedger([_entry(ledger, i) for ledger in range(100, 140) for i in range(3)])
+    service = PaymentHistoryService(xrpl_client=ledger, store=store)
+
+    seen, before = [], None
+    while True:
+        page = service.history("rBiz", limit=7, before=before)
+        seen += [p["id"] for p in page["payments"]]
+        before = page["next"]
+        if before is None:
+            break
+    assert len(seen) == len(set(seen)) == 120
+    assert seen[0] == "H139-2" and seen[-1] == "H100-0"
+
+
+class FakeAccountTx(FakeLedger):
+    """Newest-first account_tx pages with integer markers."""
+
+    def __init__(self, entries):
+        super().__init__(entries)
+        self.pages = 0
+
+    def get_account_transactions(self, address, limit=50, marker=None):
+        self.pages += 1
+        ordered = sorted(self.entries, key=lambda e: (e["ledger_index"], e["meta"]["TransactionIndex"]), reverse=True)
+        start = marker or 0
+        end = start + limit
+        return {"transactions": ordered[start:end], "marker": end if end < len(ordered) else None}
+
+
+def _walk(service, **kwargs):
+    seen, cursor = [], None
+    while True:
+        page = service.page("rBiz", limit=7, cursor=cursor, **kwargs)
+        seen += [p["id"] for p in page["payments"]]
+        cursor = page["cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_filters_apply_to_local_and_ledger_walks_alike(store):
+    entries = [_entry(ledger, i, ("Payment", "EscrowCreate", "TrustSet")[i], amount=str(ledger * 100_000))
+               for ledger in range(100, 300) for i in range(3)]
+    service = PaymentHistoryService(xrpl_client=FakeAccountTx(entries), store=store)
+    filters = HistoryFilter(types={"EscrowCreate"}, date_from=800_000_000 + 150 + 946684800,
+                            min_amount=10_000_000, max_amount=25_000_000)
+
+    local = _walk(service, filters=filters)
+    ledger = _walk(service, filters=filters, source="ledger")
+    assert local == ledger == [f"H{n}-1" for n in range(250, 149, -1)]
+
+
+def test_ledger_walk_stops_at_date_from(store):
+    client = FakeAccountTx([_entry(ledger, 0) for ledger in range(100, 1100)])
+    service = PaymentHistoryService(xrpl_client=client, store=store)
+    page = service.page("rBiz", limit=50, filters=HistoryFilter(date_from=800_000_000 + 1090 + 946684800), source="ledger")
+    assert len(page["payments"]) == 10 and page["cursor"] is None
+    assert client.pages == 1
+
+
+def test_cursor_is_bound_to_its_query_and_tamper_proof(store):
+    service = PaymentHistoryService(xrpl_client=FakeLedger([_entry(ledger, 0) for ledger in range(100, 120)]), store=store)
+    cursor = service.page("rBiz", limit=5)["cursor"]
+    assert service.page("rBiz", limit=5, cursor=cursor)["payments"][0]["id"] == "H114-0"
+
+    with pytest.raises(ValueError, match="does not match"):
+        service.page("rBiz", limit=5, cursor=cursor, filters=HistoryFilter(types={"Payment"}))
+    with pytest.raises(ValueError, match="does not match"):
+        service.page("rOther", limit=5, cursor=cursor)
+    body, mac = cursor.split(".")
+    forged = encode_cursor({**decode_cursor(cursor), "p": [200, 0]}).split(".")[0] + "." + mac
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        service.page("rBiz", limit=5, cursor=forged)
+    with pytest.raises(ValueError, match="Malformed cursor"):
+        service.page("rBiz", limit=5, cursor="not-a-cursor")
+
+
+def test_export_streams_every_page_as_ndjson_csv_and_gzip(store):
+    client = FakeAccountTx([_entry(ledger, i, ("Payment", "TrustSet")[i]) for ledger in range(100, 1100) for i in range(2)])
+    service = PaymentHistoryService(xrpl_client=client, store=store)
+
+    pages = service.iter_pages("rBiz", page_size=300)
+    assert len(next(pages)) == 150 and client.pages == 1  # lazy: one account_tx call per page
+
+    lines = b"".join(ndjson_chunks(service.iter_pages("rBiz", page_size=300))).decode().splitlines()
+    assert len(lines) == 1000 and json.loads(lines[0])["id"] == "H1099-0"
+
+    rows = list(csv.DictReader(io.StringIO(b"".join(csv_chunks(service.iter_pages("rBiz"))).decode())))
+    assert len(rows) == 1000 and rows[-1]["txHash"] == "H100-0" and rows[0]["amount"] == "1.0"
+
+    chunks = list(gzip_chunks(ndjson_chunks(service.iter_pages("rBiz", page_size=300))))
+    assert len(chunks) > 1
+    assert gzip.decompress(b"".join(chunks)).decode().splitlines() == lines
+
+
+def test_store_built_before_integer_amounts_is_rebuilt(tmp_path):
+    path = tmp_path / "payments.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("CREATE TABLE payments (address TEXT, amount REAL); INSERT INTO payments VALUES ('rBiz', 1.5);"
+                       "CREATE TABLE sync_state (address TEXT PRIMARY KEY, ledger_index INTEGER, synced_at REAL);"
+                       "INSERT INTO sync_state VALUES ('rBiz', 99, 0);")
+    conn.close()
+    store = PaymentStore(path)
+    assert store.sync_state("rBiz") is None and store.count("rBiz") == 0
+
+    service = PaymentHistoryService(xrpl_client=FakeLedger([_entry(10, 0, "EscrowCreate", {"currency": "USD", "issuer": "rBank", "value": "2.01"})]), store=store)
+    assert service.history("rBiz")["payments"][0]["amount"] == 2.01
+    assert store.page("rBiz")[0][0]["amount"] == 2_010_000
+
+
+def test_rollups_track_flows_per_bucket_and_ignore_replayed_rows(store):
+    day = 86_400
+    inbound = _entry(10, 0)
+    inbound["tx_json"].update(Account="rPeer", Destination="rBiz")
+    entries = [inbound, _entry(10, 1, amount="250000"), _entry(10, 2, "EscrowCreate", amount="3000000"),
+               _entry(10 + 8 * day // 3600, 0, result="tecUNFUNDED")]
+    for e in entries:
+        e["date"] = 800_000_000 + e["ledger_index"] * 3600  # ledger 10 and 8 days later
+    service = PaymentHistoryService(xrpl_client=FakeLedger(entries), store=store)
+
+    summary = service.summary("rBiz")
+    first, second = summary["buckets"]
+    assert (first["inflow"], first["outflow"], first["payments"], first["escrows"], first["failures"]) == (1.0, 3.25, 2, 1, 0)
+    assert (second["inflow"], second["outflow"], second["failures"]) == (0.0, 0.0, 1)
+    assert summary["totals"]["XRP"]["outflow"] == 3.25
+
+    store.apply("rBiz", [service._map_row(e, "rBiz") for e in entries], synced_through=300)
+    assert service.summary("rBiz", period="week")["totals"] == summary["totals"]
+    assert [b["start"] for b in service.summary("rBiz", period="week")["buckets"]] == ["2025-05-05", "2025-05-12"]  # Mondays
+
+
+def test_issued_amounts_past_64_bits_are_skipped_not_fatal(store):
+    huge = _entry(20, 0)
+    huge["tx_json"]["DeliverMax"] = {"currency": "USD", "issuer": "rIssuer", "value": "9300000000000"}
+    service = PaymentHistoryService(xrpl_client=FakeLedger([_entry(20, 1), huge]), store=store)
+
+    page = service.page("rBiz", limit=10)
+    assert [p["id"] for p in page["payments"]] == ["H20-1"]
+    assert store.sync_state("rBiz")[0] == 20
+    assert [b["currency"] for b in store.rollups("rBiz")] == ["XRP"]
+    # A filter bound past the range is clamped instead of failing the query
+    assert service.page("rBiz", limit=10, filters=HistoryFilter(min_amount=10 ** 30))["payments"] == []
+
+
+class MultiLedger:
+    """iter_account_transactions over per-address histories."""
+
+    def __init__(self, histories):
+        self.histories = histories
+
+    def iter_account_transactions(self, address, after_ledger, page_size=200):
+        return FakeLedger(self.histories[address]).iter_account_transactions(address, after_ledger)
+
+
+def test_feed_merges_addresses_newest_first_reading_only_needed_pages(store):
+    histories = {
+        "rA": [_entry(n, 0) for n in range(100, 400)],
+        "rB": [_entry(n, 1) for n in range(390, 400)],
+        "rC": [_entry(n, 2) for n in range(100, 110)],
+    }
+    histories["rB"].append(_entry(250, 0))  # one transaction seen from both rA and rB
+    service = PaymentHistoryService(xrpl_client=MultiLedger(histories), store=store)
+    reads = []
+    page = store.page
+    store.page = lambda address, **kw: reads.append(address) or page(address, **kw)
+
+    first = service.feed(["rC", "rA", "rB"], limit=20)
+    assert [(p["address"], p["id"]) for p in first["payments"][:3]] == [("rB", "H399-1"), ("rA", "H399-0"), ("rB", "H398-1")]
+    assert reads.count("rC") == 1  # its newest page was enough to know it is older than the window
+
+    seen, cursor = [(p["address"], p["id"]) for p in first["payments"]], first["cursor"]
+    while cursor:
+        page_ = service.feed(["rA", "rB", "rC"], limit=20, cursor=cursor)
+        seen += [(p["address"], p["id"]) for p in page_["payments"]]
+        cursor = page_["cursor"]
+    assert len(seen) == len(set(seen)) == 321
+    assert ("rA", "H250-0") in seen and ("rB", "H250-0") in seen
+
+    with pytest.raises(ValueError, match="does not match"):
+        service.feed(["rA"], cursor=first["cursor"])
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from xrpl.constants import CryptoAlgorithm
+from xrpl.core.keypairs import derive_keypair, generate_seed, sign
+from app.models.proof import ProofPayload
+from app.services.oracle_registry import OracleRegistry
+from app.services.proof_verifier import ProofVerifier, SignatureVerifier, canonical_message
+
+
+def _keypair(algorithm=CryptoAlgorithm.ED25519):
+    return derive_keypair(generate_seed(algorithm=algorithm))
+
+
+def _proof(private_key=None, default_rate=0.02, source="oracle"):
+    proof = ProofPayload(metrics={"default_rate": default_rate}, timestamp=datetime.utcnow(), source=source, signature=None)
+    if private_key:
+        proof.signature = sign(canonical_message(proof), private_key)
+    return proof
+
+
+@pytest.fixture
+def keys(tmp_path):
+    public_key, private_key = _keypair()
+    rotated_public, rotated_private = _keypair(CryptoAlgorithm.SECP256K1)
+    path = tmp_path / "oracles.json"
+    path.write_text(json.dumps({"oracle": [public_key, rotated_public]}))
+    return OracleRegistry(path), private_key, rotated_private, public_key, rotated_public
+
+
+def test_signed_proof_is_verified_against_registered_keys(keys):
+    registry, private_key, rotated_private, public_key, rotated_public = keys
+    verifier = ProofVerifier(registry=registry, signatures=SignatureVerifier(max_workers=0))
+
+    result = verifier.verify(_proof(private_key))
+    assert result["valid"] and result["signed"] and result["oracle_key"] == public_key
+    assert verifier.verify(_proof(rotated_private))["oracle_key"] == rotated_public
+
+    tampered = _proof(private_key)
+    tampered.metrics["default_rate"] = 0.0
+    with pytest.raises(ValueError, match="signature is invalid"):
+        verifier.verify(tampered)
+
+    untrusted_public, untrusted_private = _keypair()
+    with pytest.raises(ValueError, match="signature is invalid"):
+        verifier.verify(_proof(untrusted_private))
+    with pytest.raises(ValueError, match="not a trusted oracle"):
+        verifier.verify(_proof(private_key, source="internal"))
+
+
+def test_unsigned_proofs_follow_require_signature(keys):
+    registry = keys[0]
+    assert not ProofVerifier(registry=registry, require_signature=False).verify(_proof())["signed"]
+    with pytest.raises(ValueError, match="not signed"):
+        ProofVerifier(registry=registry, require_signature=True).verify(_proof())
+
+
+def test_verified_outcomes_are_cached_by_digest(keys):
+    registry, private_key = keys[0], keys[1]
+    signatures = SignatureVerifier(max_workers=0)
+    verifier = ProofVerifier(registry=registry, signatures=signatures)
+    proof = _proof(private_key)
+    bad = _proof(private_key)
+    bad.signature = "00" * 64
+
+    for _ in range(3):
+        verifier.verify(proof)
+        with pytest.raises(ValueError):
+            verifier.verify(bad)
+    assert signatures.misses == 2
+    assert signatures.hits == 4
+
+    # A different bank re-submitting the same proof shares the cache
+    ProofVerifier(registry=registry, signatures=signatures).verify(ProofPayload(**proof.model_dump()))
+    assert signatures.misses == 2
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_checks_uncached_signatures_together(keys, workers):
+    registry, private_key = keys[0], keys[1]
+    signatures = SignatureVerifier(max_workers=workers, batch_size=3)
+    verifier = ProofVerifier(registry=registry, signatures=signatures)
+    proofs = [_proof(private_key, default_rate=i / 100) for i in range(8)]
+    proofs[5].signature = "00" * 64
+    proofs.append(proofs[0])  # duplicate: verified once
+    proofs.append(_proof(private_key, default_rate=2.0))
+
+    try:
+        results = asyncio.run(verifier.verify_batch_async(proofs))
+    finally:
+        signatures.shutdown()
+
+    assert [r["valid"] for r in results] == [True] * 5 + [False] + [True] * 3 + [False]
+    assert "signature is invalid" in results[5]["error"]
+    assert "between 0 and 1" in results[9]["error"]
+    assert signatures.misses == 8
+    assert results[8] == results[0]
+
+
+def test_cache_is_bounded(keys):
+    registry, private_key = keys[0], keys[1]
+    signatures = SignatureVerifier(max_workers=0, cache_size=2)
+    verifier = ProofVerifier(registry=registry, signatures=signatures)
+    verifier.verify_batch([_proof(private_key, default_rate=i / 100) for i in range(5)])
+    assert len(signatures) == 2
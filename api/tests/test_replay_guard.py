@@ -0,0 +1,100 @@
+import hashlib
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.models.proof import ProofPayload
+from app.services.proof_verifier import ProofReplayError, ProofVerifier
+from app.services.replay_guard import BloomFilter, ReplayGuard
+
+
+class FakeClock:
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _digest(i):
+    return hashlib.blake2b(str(i).encode(), digest_size=32).digest()
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10_000, fp_rate=1e-3)
+    for i in range(10_000):
+        bloom.add(_digest(i))
+    assert all(_digest(i) in bloom for i in range(10_000))
+    false_positives = sum(_digest(i) in bloom for i in range(10_000, 30_000))
+    assert false_positives < 20_000 * 5e-3
+
+
+def test_duplicates_are_rejected_within_the_window_only():
+    clock = FakeClock()
+    guard = ReplayGuard(window=3600, partitions=4, capacity=1000, exact_size=2, clock=clock)
+    assert guard.check_and_record(_digest(1))
+    assert not guard.check_and_record(_digest(1))
+
+    # Pushed out of the exact LRU: the Bloom filters still remember it
+    guard.check_and_record(_digest(2))
+    guard.check_and_record(_digest(3))
+    clock.now += 1800
+    assert not guard.check_and_record(_digest(1))
+
+    clock.now += 3600 + 900 + 1
+    assert guard.check_and_record(_digest(1))
+    assert guard.replays == 2
+
+
+def test_memory_stays_bounded_over_many_windows():
+    clock = FakeClock()
+    guard = ReplayGuard(window=60, partitions=4, capacity=1000, clock=clock)
+    sizes = set()
+    for i in range(20_000):
+        clock.now += 0.5
+        guard.check_and_record(_digest(i))
+        sizes.add(guard.size_bytes)
+    assert len(guard._filters) <= guard.partitions + 2
+    assert max(sizes) <= (guard.partitions + 2) * BloomFilter(1000, guard.fp_rate).size_bytes
+    assert len(guard._recent) <= 60 / 0.5 + 1
+
+
+def _proof(**overrides):
+    fields = {"metrics": {"default_rate": 0.02}, "timestamp": datetime.utcnow(), "source": "internal", "signature": None}
+    return ProofPayload(**{**fields, **overrides})
+
+
+def test_verifier_rejects_a_replayed_proof():
+    guard = ReplayGuard(window=60)
+    verifier = ProofVerifier(max_age_minutes=30, replays=guard)
+    assert guard.window >= 35 * 60  # widened to max_age plus clock skew
+
+    proof = _proof()
+    verifier.check_replay(proof)
+    verifier.check_replay(proof)  # checking alone does not use the proof up
+    verifier.record_use(proof)
+    with pytest.raises(ProofReplayError):
+        verifier.check_replay(ProofPayload(**proof.model_dump()))
+    with pytest.raises(ProofReplayError):
+        verifier.check_replay(_proof(timestamp=proof.timestamp, signature="AB" * 64))  # re-signed copy
+    with pytest.raises(ProofReplayError):
+        verifier.record_use(proof)  # lost the race to a concurrent request
+    verifier.check_replay(_proof(timestamp=proof.timestamp + timedelta(seconds=1)))
+
+
+def test_forged_copy_does_not_burn_the_genuine_proof():
+    guard = ReplayGuard(window=60)
+    verifier = ProofVerifier(replays=guard)
+    genuine = _proof()
+    forged = _proof(timestamp=genuine.timestamp, signature="CD" * 64)
+
+    verifier.check_replay(forged)
+    assert verifier.verify_batch([forged])[0]["valid"] is False  # untrusted source: never recorded
+    verifier.check_replay(genuine)
+    verifier.record_use(genuine)
+
+
+def test_future_dated_proofs_are_rejected():
+    with pytest.raises(ValueError, match="in the future"):
+        ProofVerifier(replays=ReplayGuard(window=60)).verify(_proof(timestamp=datetime.utcnow() + timedelta(hours=1)))
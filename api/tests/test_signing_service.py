@@ -0,0 +1,70 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from xrpl.core.binarycodec import decode
+from xrpl.core.keypairs import is_valid_message
+from xrpl.core.binarycodec import encode_for_signing
+from xrpl.models.transactions import EscrowCreate
+from xrpl.wallet import Wallet
+from app.services.bank_registry import BankRegistry
+from app.services.signing_service import SigningService, SigningError
+
+
+def _prepared(wallet, sequence):
+    return EscrowCreate(
+        account=wallet.classic_address,
+        destination="rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe",
+        amount="1000000",
+        finish_after=800_000_000,
+        sequence=sequence,
+        fee="12",
+        last_ledger_sequence=1000,
+    )
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_sign_many_returns_verifiable_blobs_in_order(workers):
+    wallets = [Wallet.create(), Wallet.create()]
+    items = [(_prepared(wallets[i % 2], 10 + i), wallets[i % 2]) for i in range(6)]
+    items.append(({"TransactionType": "EscrowCreate"}, wallets[0]))
+    service = SigningService(max_workers=workers, batch_size=2)
+    try:
+        results = service.sign_many(items)
+    finally:
+        service.shutdown()
+
+    assert len(results) == 7
+    assert "error" in results[-1] and wallets[0].private_key not in results[-1]["error"]
+    for i, result in enumerate(results[:-1]):
+        tx = decode(result["tx_blob"])
+        assert tx["Sequence"] == 10 + i
+        assert tx["Account"] == wallets[i % 2].classic_address
+        signature = tx.pop("TxnSignature")
+        assert is_valid_message(bytes.fromhex(encode_for_signing(tx)), bytes.fromhex(signature), tx["SigningPubKey"])
+        assert result["last_ledger_sequence"] == 1000
+
+
+def test_sign_raises_without_leaking_the_key():
+    wallet = Wallet.create()
+    service = SigningService(max_workers=0)
+    with pytest.raises(SigningError) as exc:
+        service.sign({"TransactionType": "EscrowCreate", "Account": wallet.classic_address}, wallet)
+    assert wallet.private_key not in str(exc.value)
+
+
+def test_tasks_name_the_account_and_keys_are_installed_once(tmp_path):
+    first, second = Wallet.create(), Wallet.create()
+    service = SigningService(max_workers=1, registry=BankRegistry(tmp_path / "banks.json"))
+    try:
+        chunks = service._chunks([(_prepared(first, 1), first)])
+        assert chunks == [[(_prepared(first, 1).to_xrpl(), first.classic_address)]]
+        assert first.private_key not in repr(chunks)
+
+        pool = service.pool
+        service.sign_many([(_prepared(first, 2), first)])
+        assert service.pool is pool  # known key: same workers
+        results = service.sign_many([(_prepared(second, 3), second)])
+        assert service.pool is not pool and "error" not in results[0]  # new key: restarted with it
+    finally:
+        service.shutdown()
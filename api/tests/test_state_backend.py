@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import sys
+import time
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.bank import BankRecord
+from app.services.bank_registry import BankRegistry
+from app.models.policy import CreditPolicy
+from app.services.bank_service import BankCapacityTaken, BankService
+from app.services.exposure_ledger import ExposureLedger
+from app.services.leader_lease import LeaderLease
+from app.services.state_backend import MemoryStateBackend, SQLiteStateBackend
+
+
+def _reserve_many(db_path, attempts, results):
+    backend = SQLiteStateBackend(db_path)
+    won = sum(1 for _ in range(attempts) if backend.reserve("bank001", 10, 1_000, ttl_seconds=60))
+    results.put(won)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_sqlite_reservations_are_atomic_across_processes(tmp_path):
+    db_path = tmp_path / "state.db"
+    SQLiteStateBackend(db_path)
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_reserve_many, args=(db_path, 40, results)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(timeout=30)
+
+    total_won = sum(results.get(timeout=5) for _ in workers)
+    assert total_won == 100  # 1_000 drops limit / 10 drops each
+    assert SQLiteStateBackend(db_path).reserved_drops() == {"bank001": 1_000}
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_release_and_expiry_free_capacity(kind, tmp_path):
+    backend = MemoryStateBackend() if kind == "memory" else SQLiteStateBackend(tmp_path / "state.db")
+    first = backend.reserve("b", 600, 1_000, ttl_seconds=60)
+    assert backend.reserve("b", 600, 1_000, ttl_seconds=60) is None
+    backend.release(first)
+    assert backend.reserve("b", 600, 1_000, ttl_seconds=-1)
+    assert backend.reserved_drops() == {}
+    assert backend.incr_counter("bank_registry") == 1
+    assert backend.get_counter("bank_registry") == 1
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_committed_reservations_hold_until_settled(kind, tmp_path):
+    backend = MemoryStateBackend() if kind == "memory" else SQLiteStateBackend(tmp_path / "state.db")
+    funded = backend.reserve("b", 600, 1_000, ttl_seconds=-1)
+    backend.commit(funded)
+    assert backend.reserved_drops() == {"b": 600}  # no longer subject to the TTL
+    assert backend.reserve("b", 600, 1_000, ttl_seconds=60) is None
+    assert backend.settle("b", before=0) == 0
+    assert backend.settle("b", before=time.time() + 1) == 1
+    assert backend.reserved_drops() == {}
+
+
+def test_first_stored_setting_is_shared_by_every_worker(tmp_path, monkeypatch):
+    from app.utils import cursors
+
+    first, second = SQLiteStateBackend(tmp_path / "state.db"), SQLiteStateBackend(tmp_path / "state.db")
+    assert first.setdefault("cursor_secret", "one") == "one"
+    assert second.setdefault("cursor_secret", "two") == "one"
+
+    # Two workers without CURSOR_SECRET accept each other's pagination cursors
+    monkeypatch.delenv("CURSOR_SECRET", raising=False)
+    monkeypatch.setattr(cursors, "get_state_backend", lambda: first)
+    monkeypatch.setattr(cursors, "_secret", None)
+    token = cursors.encode_cursor({"after": 5})
+    monkeypatch.setattr(cursors, "get_state_backend", lambda: second)
+    monkeypatch.setattr(cursors, "_secret", None)
+    assert cursors.decode_cursor(token) == {"after": 5}
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_lease_has_one_holder_until_it_expires(kind, tmp_path):
+    backend = MemoryStateBackend() if kind == "memory" else SQLiteStateBackend(tmp_path / "state.db")
+    assert backend.acquire_lease("scheduler", "w1", ttl_seconds=60)
+    assert backend.acquire_lease("scheduler", "w1", ttl_seconds=60)  # renewal
+    assert not backend.acquire_lease("scheduler", "w2", ttl_seconds=60)
+    backend.release_lease("scheduler", "w2")  # not the holder: no effect
+    assert not backend.acquire_lease("scheduler", "w2", ttl_seconds=60)
+    backend.release_lease("scheduler", "w1")
+    assert backend.acquire_lease("scheduler", "w2", ttl_seconds=-1)
+    assert backend.acquire_lease("scheduler", "w1", ttl_seconds=60)  # expired
+
+
+def test_leader_lease_runs_the_component_in_one_worker():
+    backend = MemoryStateBackend()
+    running = []
+    leases = [
+        LeaderLease("sweeper", lambda i=i: running.append(i), lambda i=i: running.remove(i), state=backend)
+        for i in range(2)
+    ]
+    assert [lease.check() for lease in leases] == [True, False]
+    assert running == [0]
+    leases[0].stop()
+    assert running == [] and leases[1].check() and running == [1]
+
+
+def test_losing_every_reservation_is_a_retryable_error(tmp_path):
+    state = MemoryStateBackend()
+    service = BankService(registry=BankRegistry(tmp_path / "banks.json", state=state), state=state, xrpl_client=object())
+    bank = BankRecord(bank_id="b", bank_name="Alpha", wallet_address="rAlpha", seed="sSeed", balance_xrp=10)
+    assert service.claim_bank([], 5) == (None, None)
+    claimed, reservation_id = service.claim_bank([bank], 6)
+    assert claimed is bank
+    with pytest.raises(BankCapacityTaken):
+        service.claim_bank([bank], 6)
+    service.commit(reservation_id)
+    assert service.reserved_drops() == {"b": 6_000_000}
+
+
+def test_concurrent_requests_cannot_pass_the_exposure_caps_together(tmp_path):
+    state = MemoryStateBackend()
+    service = BankService(registry=BankRegistry(tmp_path / "banks.json", state=state), state=state, xrpl_client=object())
+    ledger = ExposureLedger(tmp_path / "exposure")
+    ledger.record_escrow_create("rBank", 1, "rOther", 40_000_000, "b")
+    bank = BankRecord(bank_id="b", bank_name="Alpha", wallet_address="rBank", seed="sSeed", balance_xrp=1000)
+    policy = CreditPolicy(max_duration_days=365, max_default_rate=0.1, max_exposure=50, max_bank_exposure=100)
+
+    # 40 of the bank-wide 100 is already lent out, so two 30 XRP loans fit but a third does not
+    first = service.reserve_exposure(bank, "rBiz", 30, policy, ledger)
+    second = service.reserve_exposure(bank, "rOther2", 30, policy, ledger)
+    assert first and second
+    assert service.reserve_exposure(bank, "rBiz3", 30, policy, ledger) is None
+    # The per-borrower cap holds across concurrent requests from one borrower too
+    assert service.reserve_exposure(bank, "rBiz", 25, policy, ledger) is None
+
+    service.release_exposure(second)
+    assert service.reserve_exposure(bank, "rBiz3", 30, policy, ledger)
@@ -0,0 +1,151 @@
+import asyncio
+import time
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.models.bank import BankRecord
+from app.routes import liquidity
+from app.services.bank_service import BankCapacityTaken
+from app.services.exposure_ledger import ExposureLedger
+from app.services.syndication import SyndicationAllocator
+
+
+def _bank(name, max_per_loan, balance, min_score=500, active=True, seed=None, extra_policy=None):
+    return BankRecord(
+        bank_id=name,
+        bank_name=name,
+        wallet_address=f"r{name}",
+        min_credit_score=min_score,
+        max_per_loan=max_per_loan,
+        balance_xrp=balance,
+        active=active,
+        seed=seed,
+        extra_policy=extra_policy,
+    )
+
+
+def test_allocate_splits_across_fewest_banks():
+    banks = [
+        _bank("A", 3000, 10000),
+        _bank("B", 6000, 4000),
+        _bank("C", 5000, 50000),
+    ]
+    plan = SyndicationAllocator().allocate(8000, banks, 650)
+    assert plan.complete
+    assert [t.bank.bank_name for t in plan.tranches] == ["C", "B"]
+    assert [t.amount_xrp for t in plan.tranches] == [5000, 3000]
+
+
+def test_allocate_respects_score_and_active_flag():
+    banks = [
+        _bank("Strict", 9000, 9000, min_score=700),
+        _bank("Off", 9000, 9000, active=False),
+        _bank("Small", 1000, 1000),
+    ]
+    plan = SyndicationAllocator().allocate(5000, banks, 650)
+    assert not plan.complete
+    assert plan.tranches == []
+
+
+def test_allocate_keeps_last_tranche_above_minimum():
+    banks = [_bank("A", 1000, 1000), _bank("B", 1000, 1000)]
+    plan = SyndicationAllocator(min_tranche_xrp=100).allocate(1050, banks, 650)
+    assert plan.complete
+    assert all(t.amount_xrp >= 100 for t in plan.tranches)
+    assert plan.allocated_drops == 1050 * 1_000_000
+
+
+class FakeBankService:
+    """Grants reservations except for the banks in full; records what was committed or released."""
+
+    def __init__(self, full=()):
+        self.full = set(full)
+        self.reserved, self.committed, self.released = [], [], []
+
+    def reserve(self, bank, amount_xrp):
+        if bank.bank_id in self.full:
+            return None
+        self.reserved.append(bank.bank_id)
+        return f"res-{bank.bank_id}"
+
+    def commit(self, reservation_id):
+        self.committed.append(reservation_id)
+
+    def release(self, reservation_id):
+        self.released.append(reservation_id)
+
+    def reserve_exposure(self, bank, business_id, amount_xrp, policy, ledger):
+        return [f"exp-{bank.bank_id}"]
+
+    def commit_exposure(self, reservation):
+        self.committed.extend(reservation or [])
+
+    def release_exposure(self, reservation):
+        self.released.extend(reservation or [])
+
+
+class FakeServices:
+    proofs = None
+    xrpl = None
+
+
+CREDIT = {"credit": {"score": 650, "factors": {"default_rate": 0.004}}}
+
+
+def _syndicate(tmp_path, monkeypatch, banks, bank_svc):
+    ledger = ExposureLedger(tmp_path)
+    ledger.record_escrow_create("rB", 1, "rOther", 3_500_000_000, "B")
+    monkeypatch.setattr(liquidity, "exposure_ledger", ledger)
+    submitted = []
+    monkeypatch.setattr(liquidity, "_submit_tranche", lambda tranche, *args: submitted.append(tranche.bank.bank_id))
+    plan = SyndicationAllocator().allocate(8000, banks, 650)
+    req = liquidity.LiquidityRequest(principal_address="rPbmSmWCcF6h1vW5QKzjyxx6LmKMo9a7N2", amount_xrp=8000, syndicate=True)
+    run = liquidity._syndicate(req, plan.tranches, int(time.time()) + 86400, CREDIT, FakeServices(), bank_svc, lambda stage: None)
+    return asyncio.run(run), submitted
+
+
+def test_syndication_stops_when_a_bank_agent_rejects(tmp_path, monkeypatch):
+    # B already lends 3500 of its 6000 bank-wide cap, so it cannot take a 3000 tranche
+    banks = [_bank("B", 6000, 4000, seed="sB", extra_policy={"max_total_exposure": 6000}), _bank("C", 5000, 50000, seed="sC")]
+    bank_svc = FakeBankService()
+    outcome, submitted = _syndicate(tmp_path, monkeypatch, banks, bank_svc)
+
+    assert outcome["status"] == "rejected" and outcome["bank_name"] == "B"
+    assert bank_svc.reserved == [] and submitted == []
+
+
+def test_syndication_reserves_every_tranche_before_submitting(tmp_path, monkeypatch):
+    banks = [_bank("B", 6000, 4000, seed="sB"), _bank("C", 5000, 50000, seed="sC")]
+    bank_svc = FakeBankService(full={"B"})
+    with pytest.raises(BankCapacityTaken):
+        _syndicate(tmp_path, monkeypatch, banks, bank_svc)
+
+    assert bank_svc.released == ["res-C", "exp-C"] and bank_svc.committed == []
+
+
+def test_bank_with_stricter_terms_rejects_the_request(tmp_path, monkeypatch):
+    class Prepared:
+        def to_dict(self):
+            return {}
+
+    class Xrpl:
+        client = None
+
+    class Services(FakeServices):
+        xrpl = Xrpl()
+
+    monkeypatch.setattr(liquidity, "exposure_ledger", ExposureLedger(tmp_path))
+    monkeypatch.setattr(liquidity, "autofill", lambda tx, client: Prepared())
+    req = liquidity.LiquidityRequest(principal_address="rPbmSmWCcF6h1vW5QKzjyxx6LmKMo9a7N2", amount_xrp=100)
+    unlock = int(time.time()) + 30 * 86400
+    bank = _bank("S", 5000, 50000, seed="sS", extra_policy={"max_duration_days": 7})
+
+    outcome = asyncio.run(liquidity._escrow_from_bank(req, bank, unlock, CREDIT, Services(), FakeBankService(), lambda stage: None))
+    assert outcome["status"] == "rejected" and outcome["bank_name"] == "S"
+    assert "30 days (max 7)" in outcome["reason"]
+
+
+def test_syndication_is_opt_in():
+    req = liquidity.LiquidityRequest(principal_address="rPbmSmWCcF6h1vW5QKzjyxx6LmKMo9a7N2", amount_xrp=10)
+    assert req.syndicate is False
+
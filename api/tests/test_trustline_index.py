@@ -0,0 +1,55 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from xrpl.models.transactions import TrustSetFlag
+from app.services.trustline_index import TrustLineIndex
+
+ISSUER = "rIssuer"
+
+
+class FakeLedger:
+    address = ISSUER
+
+    def __init__(self, lines, history=()):
+        self.lines = lines
+        self.history = list(history)
+
+    def get_trust_lines(self, address):
+        return {"lines": self.lines, "ledger_index": 10}
+
+    def iter_account_transactions(self, address, after_ledger, page_size=200):
+        return iter([entry for entry in self.history if entry["ledger_index"] > after_ledger])
+
+
+def _trust_set(account, issuer, value, ledger_index, flags=0, currency="CUR"):
+    return {"ledger_index": ledger_index, "meta": {"TransactionResult": "tesSUCCESS"}, "tx_json": {
+        "TransactionType": "TrustSet", "Account": account, "Flags": flags,
+        "LimitAmount": {"currency": currency, "issuer": issuer, "value": value},
+    }}
+
+
+def test_backfill_and_trust_set_stream():
+    ledger = FakeLedger(
+        lines=[{"account": "rA", "currency": "CUR", "limit": "0", "limit_peer": "1000000", "balance": "0"}],
+        history=[
+            _trust_set("rB", ISSUER, "500", 11),
+            _trust_set(ISSUER, "rA", "0", 12, flags=TrustSetFlag.TF_SET_FREEZE),
+            _trust_set("rB", ISSUER, "0", 13),
+            _trust_set("rC", "rSomeoneElse", "10", 13),
+        ],
+    )
+    index = TrustLineIndex()
+    assert not index.ready
+    index.backfill(ledger)
+
+    assert index.ready
+    assert index.is_issued("rA", "CUR", "1000000.0")
+    assert not index.is_issued("rA", "CUR", "5")
+    before = index.get("rA", "CUR")
+
+    assert index.sync(ledger) == 3
+    assert index.get("rA", "CUR").frozen and not before.frozen
+    assert not index.is_issued("rA", "CUR", "1000000.0")  # revoked
+    assert index.get("rB", "CUR") is None
+    assert index.count_for("rA") == 1 and index.count_for("rC") == 0
+    assert index.sync(ledger) == 0
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from app.services.validation_tracker import ValidationTracker, TransactionFailed
+
+
+class FakeResponse:
+    def __init__(self, result):
+        self.result = result
+
+
+class FakeLedgerClient:
+    """Serves ledger and tx requests from an in-memory chain and counts the calls."""
+
+    def __init__(self):
+        self.validated = 100
+        self.ledgers = {}
+        self.txs = {}
+        self.calls = 0
+
+    def close(self, hashes, results):
+        self.validated += 1
+        self.ledgers[self.validated] = list(hashes)
+        for tx_hash, result in zip(hashes, results):
+            self.txs[tx_hash] = {"hash": tx_hash, "validated": True, "ledger_index": self.validated,
+                                 "meta": {"TransactionResult": result}, "tx_json": {"TransactionType": "Payment"}}
+
+    def request(self, req):
+        self.calls += 1
+        name = type(req).__name__
+        if name == "Ledger" and req.ledger_index == "validated":
+            return FakeResponse({"ledger_index": self.validated})
+        if name == "Ledger":
+            return FakeResponse({"ledger": {"transactions": self.ledgers.get(req.ledger_index, [])}})
+        return FakeResponse(self.txs.get(req.transaction, {"error": "txnNotFound"}))
+
+
+def test_resolves_pending_hashes_once_per_ledger():
+    client = FakeLedgerClient()
+    validated_results = []
+    tracker = ValidationTracker(client, on_validated=validated_results.append)
+    tracker._ensure_polling = lambda: None  # drive poll_once by hand
+
+    futures = {h: tracker.track(h, "tesSUCCESS", last_ledger_sequence=103, submitted_ledger=100) for h in ("A", "B", "C", "D")}
+    assert tracker.status("A")["status"] == "pending"
+
+    client.close(["A", "X", "B"], ["tesSUCCESS", "tesSUCCESS", "tecUNFUNDED_PAYMENT"])
+    client.close(["C"], ["tesSUCCESS"])
+    client.calls = 0
+    assert tracker.poll_once() == 3
+    # one validated-index read, one ledger read per closed ledger, one tx read per match
+    assert client.calls == 1 + 2 + 3
+
+    assert tracker.wait("A")["status"] == "validated"
+    with pytest.raises(TransactionFailed):
+        tracker.wait("B")
+    assert asyncio.run(tracker.wait_async("C"))["ledger_index"] == 102
+    assert [r["hash"] for r in validated_results] == ["A", "C"]
+    assert not futures["D"].done()
+
+    client.close([], [])
+    client.close([], [])
+    assert tracker.poll_once() == 1
+    assert tracker.status("D")["status"] == "expired"
+    assert len(tracker) == 0
+
+
+def test_waits_are_bounded_by_last_ledger_sequence():
+    client = FakeLedgerClient()
+    tracker = ValidationTracker(client)
+    tracker._ensure_polling = lambda: None
+
+    tracker.track("A", "tesSUCCESS", last_ledger_sequence=120, submitted_ledger=100)
+    tracker.track("B", "tesSUCCESS")
+    assert tracker.wait_timeout("A") == 20 * 4.0 + 20.0
+    assert tracker.wait_timeout("B") == 120.0
+    with pytest.raises(TimeoutError):
+        tracker.wait("A", timeout=0.01)
+    with pytest.raises(TimeoutError):
+        asyncio.run(tracker.wait_async("A", timeout=0.01))
@@ -0,0 +1,60 @@
+import copy
+import json
+import os
+import pickle
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+from xrpl.wallet import Wallet
+from app.services.bank_registry import BankRegistry
+from app.services.state_backend import MemoryStateBackend
+from app.services.wallet_cache import WalletCache
+
+
+def _write(path, banks, mtime_ns):
+    path.write_text(json.dumps(banks))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _raw(bank_id, seed, min_score=500):
+    return {"bank_id": bank_id, "bank_name": bank_id, "wallet_address": f"r{bank_id}", "seed": seed,
+            "credit_policy": {"min": min_score, "max": 1000, "risk_score_threshold": 300}}
+
+
+def test_derives_once_per_bank_and_rederives_only_on_seed_change(tmp_path):
+    seed_a, seed_b = Wallet.create().seed, Wallet.create().seed
+    path = tmp_path / "banks.json"
+    _write(path, [_raw("A", seed_a)], 1_000_000_000)
+    registry = BankRegistry(path, check_interval=0, state=MemoryStateBackend())
+    cache = WalletCache(registry)
+
+    bank = registry.snapshot().get("rA")
+    first = cache.for_bank(bank)
+    assert cache.for_bank(bank) is first
+    assert first.wallet.public_key == Wallet.from_seed(seed_a).public_key
+    assert first.wallet.seed is None
+
+    # banks.json rewritten with the same seed: no new derivation
+    _write(path, [_raw("A", seed_a, min_score=400)], 2_000_000_000)
+    assert cache.for_bank(registry.snapshot().get("rA")) is first
+    assert cache.derivations == 1
+
+    # seed rotated: re-derived
+    _write(path, [_raw("A", seed_b)], 3_000_000_000)
+    rotated = cache.for_bank(registry.snapshot().get("rA"))
+    assert rotated.wallet.public_key == Wallet.from_seed(seed_b).public_key
+    assert cache.derivations == 2
+
+
+def test_key_handle_hides_and_refuses_serialization(tmp_path):
+    seed = Wallet.create().seed
+    path = tmp_path / "banks.json"
+    _write(path, [_raw("A", seed)], 1_000_000_000)
+    registry = BankRegistry(path, check_interval=0, state=MemoryStateBackend())
+    handle = WalletCache(registry).for_bank(registry.snapshot().get("rA"))
+
+    assert seed not in repr(handle) and handle.wallet.private_key not in repr(handle)
+    with pytest.raises(TypeError):
+        pickle.dumps(handle)
+    with pytest.raises(TypeError):
+        copy.deepcopy(handle)
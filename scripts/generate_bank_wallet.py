@@ -40,7 +40,7 @@ print(f"""
 
 print("\nNext steps:")
 print("1. Copy the seed and address above")
-print("2. Update api/data/banks.json with the new values")
+print("2. Update api/data/banks.json with the new values (a running API reloads it automatically)")
 print("3. (Optional) Fund the account at: https://xrpl.org/xrp-testnet/faucet.html")
 print("   OR use the Developer Console at: https://xrpl.org/resources/dev-tools/xrp-faucets/")
 print("="*60)